@@ -0,0 +1,42 @@
+#!/usr/bin/env bash
+set -euo pipefail
+
+# N mega_spider workers sharing one host-partitioned frontier (src/utils/crawl_coordinator.py).
+# Run it again on another VM with the same COORDINATOR path on a shared filesystem
+# (with working file locks) to add that VM's workers to the same crawl.
+
+REPO_DIR=${REPO_DIR:-$(cd "$(dirname "$0")/../.." && pwd)}
+WORKERS=${WORKERS:-4}
+CRAWL_DIR=${CRAWL_DIR:-/mnt/data/crawl}
+COORDINATOR=${COORDINATOR:-$CRAWL_DIR/coordinator.sqlite}
+SOURCES=${SOURCES:-$REPO_DIR/config/master_sources.yaml}
+MAX_PAGES=${MAX_PAGES:-500}  # per worker
+STORE=${STORE:-}
+# Per-worker telemetry: mega_spider_<worker>.prom + mega_spider_<worker>_metrics.jsonl
+METRICS_DIR=${METRICS_DIR:-/mnt/data/metrics}
+LOG_DIR=${LOG_DIR:-$CRAWL_DIR/logs}
+
+echo "Starting $WORKERS workers on $(hostname): coordinator=$COORDINATOR sources=$SOURCES"
+echo "Telemetry in $METRICS_DIR, logs in $LOG_DIR"
+mkdir -p "$CRAWL_DIR" "$METRICS_DIR" "$LOG_DIR"
+
+pids=()
+for i in $(seq 1 "$WORKERS"); do
+  worker="$(hostname)-$i"
+  python3 "$REPO_DIR/src/data_collection/mega_spider.py" \
+    --coordinator "$COORDINATOR" \
+    --worker-id "$worker" \
+    --sources "$SOURCES" \
+    --max-pages "$MAX_PAGES" \
+    --metrics-dir "$METRICS_DIR" \
+    ${STORE:+--store "$STORE"} \
+    >"$LOG_DIR/$worker.log" 2>&1 &
+  pids+=($!)
+done
+
+# A worker that dies hands its hosts to the others once its leases expire (30s)
+status=0
+for pid in "${pids[@]}"; do
+  wait "$pid" || status=1
+done
+exit $status
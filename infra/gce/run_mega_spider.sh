@@ -0,0 +1,25 @@
+#!/usr/bin/env bash
+set -euo pipefail
+
+# One mega_spider crawl on this VM, with crawl telemetry for node_exporter's textfile collector.
+# (run_spider.sh drives the Scrapy image, which does not export these metrics.)
+
+REPO_DIR=${REPO_DIR:-$(cd "$(dirname "$0")/../.." && pwd)}
+CRAWL_DIR=${CRAWL_DIR:-/mnt/data/crawl}
+STATE_DIR=${STATE_DIR:-$CRAWL_DIR/state}  # rerun with the same dir to resume
+SOURCES=${SOURCES:-$REPO_DIR/config/master_sources.yaml}
+MAX_PAGES=${MAX_PAGES:-500}
+STORE=${STORE:-}
+# mega_spider.prom + mega_spider_metrics.jsonl, rewritten every 10s while the crawl runs
+METRICS_DIR=${METRICS_DIR:-/mnt/data/metrics}
+
+echo "Running mega_spider on $(hostname): sources=$SOURCES max_pages=$MAX_PAGES state=$STATE_DIR"
+echo "Telemetry in $METRICS_DIR (slowest hosts: see \"Crawl telemetry\" in docs/data-ingestion.md)"
+mkdir -p "$STATE_DIR" "$METRICS_DIR"
+
+exec python3 "$REPO_DIR/src/data_collection/mega_spider.py" \
+  --sources "$SOURCES" \
+  --max-pages "$MAX_PAGES" \
+  --state-dir "$STATE_DIR" \
+  --metrics-dir "$METRICS_DIR" \
+  ${STORE:+--store "$STORE"}
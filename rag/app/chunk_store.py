@@ -0,0 +1,82 @@
+"""Shared chunk sidecar used by the lexical and dense indexes.
+
+Each index directory holds ``chunks.jsonl`` (one ``{"chunk_id", "text",
+"metadata"}`` record per internal id) and ``chunk_offsets.npy`` (byte offsets,
+N + 1 entries), so a hit is resolved with one slice of a memory-mapped file.
+"""
+from __future__ import annotations
+
+import json
+import mmap
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+
+
+@dataclass
+class SearchHit:
+    chunk_id: str
+    score: float
+    text: str
+    metadata: Dict[str, object] = field(default_factory=dict)
+
+
+def encode_chunk(chunk_id: str, text: str, metadata: Dict[str, object]) -> bytes:
+    record = {"chunk_id": chunk_id, "text": text, "metadata": metadata}
+    return json.dumps(record, ensure_ascii=False).encode("utf-8") + b"\n"
+
+
+def write_chunks(directory: Path, lines: List[bytes]) -> None:
+    offsets = np.zeros(len(lines) + 1, dtype=np.int64)
+    with (Path(directory) / "chunks.jsonl").open("wb") as handle:
+        for i, line in enumerate(lines):
+            handle.write(line)
+            offsets[i + 1] = offsets[i] + len(line)
+    np.save(Path(directory) / "chunk_offsets.npy", offsets)
+
+
+class ChunkStore:
+    """Random access to the records written by `write_chunks`."""
+
+    def __init__(self, directory: Path) -> None:
+        path = Path(directory) / "chunks.jsonl"
+        self._offsets = np.load(Path(directory) / "chunk_offsets.npy", mmap_mode="r")
+        self._file = path.open("rb")
+        self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if path.stat().st_size else b""
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def close(self) -> None:
+        if isinstance(self._data, mmap.mmap):
+            self._data.close()
+        self._file.close()
+
+    def get(self, doc_id: int) -> Dict[str, object]:
+        start, end = int(self._offsets[doc_id]), int(self._offsets[doc_id + 1])
+        return json.loads(self._data[start:end])
+
+    def hits(self, doc_ids: np.ndarray, scores: np.ndarray, top_k: int) -> List[SearchHit]:
+        """Resolve the `top_k` best (doc_id, score) pairs into hits, best first."""
+        if len(doc_ids) == 0:
+            return []
+        if top_k < len(doc_ids):
+            candidates = np.argpartition(-scores, top_k - 1)[:top_k]
+        else:
+            candidates = np.arange(len(doc_ids))
+        # Highest score first, ties broken by insertion order for stable results.
+        ordered = candidates[np.lexsort((doc_ids[candidates], -scores[candidates]))]
+        hits: List[SearchHit] = []
+        for position in ordered:
+            record = self.get(int(doc_ids[position]))
+            hits.append(
+                SearchHit(
+                    chunk_id=str(record["chunk_id"]),
+                    score=float(scores[position]),
+                    text=str(record["text"]),
+                    metadata=dict(record["metadata"]),
+                )
+            )
+        return hits
@@ -0,0 +1,115 @@
+"""Hash index from (source, ro_number, article) to chunk ids for citation checks.
+
+Built next to a retrieval index at ingest time. Keys are normalised (accents,
+case, ``Art.``/``Artículo`` prefixes, ``R.O.``/``No.`` prefixes) and hashed to
+64 bits; the table uses open addressing with linear probing, so verifying a
+citation is a constant number of array reads on memory-mapped files:
+
+- ``citation_slots.npy``: key hash per slot (0 = empty), power-of-two length
+- ``citation_offsets.npy``: per-slot boundaries into ``citation_docs.npy``
+- ``citation_docs.npy``: internal chunk ids sharing each key
+"""
+from __future__ import annotations
+
+import hashlib
+import re
+from pathlib import Path
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple
+
+import numpy as np
+
+from rag.app.text import fold_accents
+
+_ARTICLE_PREFIX = re.compile(r"^(?:art(?:iculo|s)?\.?\s*)+")
+_RO_PREFIX = re.compile(r"^(?:(?:r\.?\s*o\.?|registro oficial|suplemento|supl\.?|no\.?|nro\.?)\s*)+")
+_SPACES = re.compile(r"\s+")
+
+
+def _clean(value: object) -> str:
+    return _SPACES.sub(" ", fold_accents(str(value)).strip())
+
+
+def citation_key(source: object, ro_number: object, article: object) -> str:
+    """Canonical text key; `Artículo 65` and `art. 65` resolve to the same entry."""
+    article_text = _ARTICLE_PREFIX.sub("", _clean(article)).strip(" .")
+    ro_text = _RO_PREFIX.sub("", _clean(ro_number)).strip(" .")
+    return "\x1f".join((_clean(source), ro_text, article_text))
+
+
+def _hash(key: str) -> int:
+    value = int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "little")
+    return value or 1  # 0 marks an empty slot
+
+
+class CitationIndex:
+    def __init__(self, slots: np.ndarray, offsets: np.ndarray, docs: np.ndarray) -> None:
+        self._slots = slots
+        self._offsets = offsets
+        self._docs = docs
+        self._mask = len(slots) - 1
+
+    def __len__(self) -> int:
+        return int(np.count_nonzero(self._slots))
+
+    @classmethod
+    def build(cls, metadatas: Iterable[Mapping[str, object]]) -> "CitationIndex":
+        """Index metadata in internal-id order."""
+        groups: Dict[int, List[int]] = {}
+        for doc_id, metadata in enumerate(metadatas):
+            key = citation_key(metadata.get("source", ""), metadata.get("ro_number", ""), metadata.get("article", ""))
+            groups.setdefault(_hash(key), []).append(doc_id)
+
+        size = 1
+        while size < 2 * max(len(groups), 1):
+            size *= 2
+        slots = np.zeros(size, dtype=np.uint64)
+        placed: List[Tuple[int, int]] = []
+        for key_hash in groups:
+            slot = key_hash & (size - 1)
+            while slots[slot]:
+                slot = (slot + 1) & (size - 1)
+            slots[slot] = key_hash
+            placed.append((slot, key_hash))
+
+        counts = np.zeros(size + 1, dtype=np.int64)
+        for slot, key_hash in placed:
+            counts[slot + 1] = len(groups[key_hash])
+        offsets = np.cumsum(counts)
+        docs = np.empty(int(offsets[-1]), dtype=np.uint32)
+        for slot, key_hash in placed:
+            docs[offsets[slot] : offsets[slot + 1]] = groups[key_hash]
+        return cls(slots, offsets, docs)
+
+    def save(self, directory: Path) -> None:
+        np.save(Path(directory) / "citation_slots.npy", self._slots)
+        np.save(Path(directory) / "citation_offsets.npy", self._offsets)
+        np.save(Path(directory) / "citation_docs.npy", self._docs)
+
+    @classmethod
+    def load(cls, directory: Path) -> Optional["CitationIndex"]:
+        """Memory-map the table saved next to an index, or None if it was built without one."""
+        directory = Path(directory)
+        if not (directory / "citation_slots.npy").exists():
+            return None
+        return cls(
+            np.load(directory / "citation_slots.npy", mmap_mode="r"),
+            np.load(directory / "citation_offsets.npy", mmap_mode="r"),
+            np.load(directory / "citation_docs.npy", mmap_mode="r"),
+        )
+
+    def lookup(self, source: object, ro_number: object, article: object) -> np.ndarray:
+        """Internal chunk ids carrying this citation (empty if it does not exist)."""
+        key_hash = np.uint64(_hash(citation_key(source, ro_number, article)))
+        slot = int(key_hash) & self._mask
+        while True:
+            current = self._slots[slot]
+            if current == 0:
+                return np.empty(0, dtype=np.uint32)
+            if current == key_hash:
+                return np.asarray(self._docs[self._offsets[slot] : self._offsets[slot + 1]])
+            slot = (slot + 1) & self._mask
+
+    def contains(self, citation: Mapping[str, object]) -> bool:
+        """True if the citation's (source, ro_number, article) exists in the corpus."""
+        found = self.lookup(citation.get("source", ""), citation.get("ro_number", ""), citation.get("article", ""))
+        return len(found) > 0
@@ -0,0 +1,37 @@
+"""Runtime configuration helpers for the YACHAQ-LEX RAG stack."""
+from __future__ import annotations
+
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Optional
+
+import yaml
+
+CONFIG_PATH = Path(__file__).resolve().parents[2] / "config" / "config.yaml"
+DEFAULT_TOP_K = 5
+
+
+def load_rag_config(path: Optional[Path] = None) -> Dict[str, object]:
+    """Return the `rag` section of the repository config (empty if absent)."""
+    config_path = Path(path) if path else CONFIG_PATH
+    if not config_path.exists():
+        return {}
+    with config_path.open("r", encoding="utf-8") as handle:
+        data = yaml.safe_load(handle) or {}
+    return dict(data.get("rag") or {})
+
+
+@lru_cache(maxsize=None)
+def default_top_k(path: Optional[Path] = None) -> int:
+    """Return `rag.top_k`, falling back to DEFAULT_TOP_K (read once per path)."""
+    value = load_rag_config(path).get("top_k", DEFAULT_TOP_K)
+    top_k = int(value)
+    if top_k <= 0:
+        raise ValueError("rag.top_k must be positive")
+    return top_k
+
+
+def resolve_path(value: str) -> Path:
+    """Resolve a config path relative to the repository root."""
+    path = Path(value)
+    return path if path.is_absolute() else CONFIG_PATH.parents[1] / path
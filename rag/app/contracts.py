@@ -1,10 +1,14 @@
 """Data contracts and validation helpers for YACHAQ-LEX chunks."""
 from __future__ import annotations
 
+import re
+from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Dict, List
+from typing import Dict, List, Sequence
 from urllib.parse import urlparse
 
+import numpy as np
+
 REQUIRED_KEYS = {
     "source",
     "title",
@@ -16,6 +20,12 @@ REQUIRED_KEYS = {
     "url",
 }
 
+# Optional: the last day a chunk is in force (see rag/app/temporal_index.py).
+OPTIONAL_DATE_KEYS = ("valid_until",)
+
+ALLOWED_AUTHORITIES = frozenset({"constitution", "organic law", "law", "regulation", "resolution", "circular"})
+ARTICLE_EMPTY_MESSAGE = "article is empty"
+
 
 def validate_chunk_metadata(record: Dict[str, object]) -> List[str]:
     """Return a list of validation errors for a chunk metadata record."""
@@ -38,8 +48,7 @@ def validate_chunk_metadata(record: Dict[str, object]) -> List[str]:
         errors.append("ro_number is empty")
 
     authority = str(record.get("authority", "")).strip().lower()
-    allowed_authorities = {"constitution", "organic law", "law", "regulation", "resolution", "circular"}
-    if authority and authority not in allowed_authorities:
+    if authority and authority not in ALLOWED_AUTHORITIES:
         errors.append(f"authority '{record.get('authority')}' is not recognized")
 
     if record.get("ro_date"):
@@ -58,4 +67,210 @@ def validate_chunk_metadata(record: Dict[str, object]) -> List[str]:
     else:
         errors.append("vigency is empty")
 
+    for key in OPTIONAL_DATE_KEYS:
+        if record.get(key):
+            try:
+                datetime.strptime(str(record[key]), "%Y-%m-%d")
+            except ValueError:
+                errors.append(f"{key} must be YYYY-MM-DD")
+
+    return errors
+
+
+def validate_citable_chunk(record: Dict[str, object]) -> List[str]:
+    """`validate_chunk_metadata` plus a non-empty article, as required for retrieval indexes."""
+    errors = validate_chunk_metadata(record)
+    if not str(record.get("article", "")).strip():
+        errors.append(ARTICLE_EMPTY_MESSAGE)
     return errors
+
+
+# Bit flags reported per row by `validate_chunk_batch`.
+MISSING_KEYS = 1 << 0
+URL_EMPTY = 1 << 1
+URL_NOT_ABSOLUTE = 1 << 2
+RO_NUMBER_EMPTY = 1 << 3
+AUTHORITY_UNKNOWN = 1 << 4
+RO_DATE_EMPTY = 1 << 5
+RO_DATE_INVALID = 1 << 6
+VIGENCY_EMPTY = 1 << 7
+VIGENCY_INVALID = 1 << 8
+VALID_UNTIL_INVALID = 1 << 9
+
+_SORTED_KEYS = tuple(sorted(REQUIRED_KEYS))
+# Same grammar `datetime.strptime(..., "%Y-%m-%d")` accepts for each field.
+_DATE_PATTERN = re.compile(r"(\d\d\d\d)-(1[0-2]|0[1-9]|[1-9])-(3[0-1]|[1-2]\d|0[1-9]|[1-9]| [1-9])\Z")
+_DAYS_IN_MONTH = np.array([0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31], dtype=np.int64)
+_ABSENT = object()
+
+
+@dataclass
+class _Column:
+    """Dictionary-encoded column: distinct values plus a per-row index (-1 = absent)."""
+
+    texts: List[str]
+    truthy: np.ndarray
+    indices: np.ndarray
+
+    @property
+    def present(self) -> np.ndarray:
+        return self.indices >= 0
+
+    def take(self, per_value: np.ndarray, absent_value: bool) -> np.ndarray:
+        # The absent sentinel sits last so index -1 selects it.
+        return np.append(per_value, absent_value)[self.indices]
+
+
+def _valid_dates(texts: Sequence[str]) -> np.ndarray:
+    """Vectorized YYYY-MM-DD check over distinct date strings."""
+    parts = np.zeros((len(texts), 3), dtype=np.int64)
+    matched = np.zeros(len(texts), dtype=bool)
+    for i, text in enumerate(texts):
+        match = _DATE_PATTERN.match(text)
+        if match:
+            matched[i] = True
+            parts[i] = [int(group) for group in match.groups()]
+    year, month, day = parts[:, 0], parts[:, 1], parts[:, 2]
+    leap = (year % 4 == 0) & ((year % 100 != 0) | (year % 400 == 0))
+    limit = _DAYS_IN_MONTH[month] + ((month == 2) & leap)
+    return matched & (year >= 1) & (day <= limit)
+
+
+def _url_is_absolute(url: str) -> bool:
+    parsed = urlparse(url)
+    return bool(parsed.scheme and parsed.netloc)
+
+
+def _encode_records(records: Sequence[Dict[str, object]], key: str) -> _Column:
+    positions: Dict[object, int] = {}
+    texts: List[str] = []
+    truthy: List[bool] = []
+    indices = np.empty(len(records), dtype=np.int64)
+    for row, record in enumerate(records):
+        raw = record.get(key, _ABSENT)
+        if raw is _ABSENT:
+            indices[row] = -1
+            continue
+        marker = raw if isinstance(raw, str) else (type(raw).__name__, str(raw), bool(raw))
+        position = positions.get(marker)
+        if position is None:
+            position = positions[marker] = len(texts)
+            texts.append(str(raw))
+            truthy.append(bool(raw))
+        indices[row] = position
+    return _Column(texts, np.array(truthy, dtype=bool), indices)
+
+
+def _encode_arrow(table, key: str) -> _Column:
+    import pyarrow as pa
+
+    if key not in table.column_names:
+        return _Column([], np.zeros(0, dtype=bool), np.full(table.num_rows, -1, dtype=np.int64))
+    column = table.column(key)
+    if column.type != pa.string():
+        column = column.cast(pa.string())
+    encoded = column.combine_chunks().dictionary_encode()
+    texts = encoded.dictionary.to_pylist()
+    indices = encoded.indices.fill_null(-1).to_numpy(zero_copy_only=False).astype(np.int64)
+    return _Column(texts, np.array([bool(t) for t in texts], dtype=bool), indices)
+
+
+@dataclass
+class ChunkBatchValidation:
+    """Result of `validate_chunk_batch`: one error bitmask per row."""
+
+    error_mask: np.ndarray
+    _columns: Dict[str, _Column] = field(repr=False)
+
+    def __len__(self) -> int:
+        return len(self.error_mask)
+
+    @property
+    def valid(self) -> np.ndarray:
+        return self.error_mask == 0
+
+    def invalid_rows(self) -> np.ndarray:
+        return np.flatnonzero(self.error_mask)
+
+    def messages(self, row: int) -> List[str]:
+        """Return the messages `validate_chunk_metadata` would produce for `row`."""
+        mask = int(self.error_mask[row])
+        errors: List[str] = []
+        if mask & MISSING_KEYS:
+            missing = [key for key in _SORTED_KEYS if self._columns[key].indices[row] < 0]
+            errors.append(f"missing keys: {missing}")
+        if mask & URL_NOT_ABSOLUTE:
+            errors.append("url is not absolute")
+        if mask & URL_EMPTY:
+            errors.append("url is empty")
+        if mask & RO_NUMBER_EMPTY:
+            errors.append("ro_number is empty")
+        if mask & AUTHORITY_UNKNOWN:
+            authority = self._columns["authority"]
+            errors.append(f"authority '{authority.texts[authority.indices[row]]}' is not recognized")
+        if mask & RO_DATE_INVALID:
+            errors.append("ro_date must be YYYY-MM-DD")
+        if mask & RO_DATE_EMPTY:
+            errors.append("ro_date is empty")
+        if mask & VIGENCY_INVALID:
+            errors.append("vigency must be YYYY-MM-DD")
+        if mask & VIGENCY_EMPTY:
+            errors.append("vigency is empty")
+        if mask & VALID_UNTIL_INVALID:
+            errors.append("valid_until must be YYYY-MM-DD")
+        return errors
+
+
+def validate_chunk_batch(records) -> ChunkBatchValidation:
+    """Validate many chunk metadata records in one columnar pass.
+
+    Accepts a list of dicts or a `pyarrow.Table`. Each column is dictionary
+    encoded, so URL, authority and date checks run once per distinct value
+    rather than once per row. For Arrow input, null cells count as absent keys
+    and non-string columns are compared by their string cast.
+    """
+    keys = (*REQUIRED_KEYS, *OPTIONAL_DATE_KEYS)
+    if hasattr(records, "column_names"):
+        columns = {key: _encode_arrow(records, key) for key in keys}
+        n_rows = records.num_rows
+    else:
+        records = list(records)
+        columns = {key: _encode_records(records, key) for key in keys}
+        n_rows = len(records)
+
+    mask = np.zeros(n_rows, dtype=np.uint16)
+
+    missing = np.zeros(n_rows, dtype=bool)
+    for key in REQUIRED_KEYS:
+        missing |= ~columns[key].present
+    mask[missing] |= MISSING_KEYS
+
+    url = columns["url"]
+    url_empty = np.array([not text for text in url.texts], dtype=bool)
+    url_relative = np.array([bool(text) and not _url_is_absolute(text) for text in url.texts], dtype=bool)
+    mask[url.take(url_empty, True)] |= URL_EMPTY
+    mask[url.take(url_relative, False)] |= URL_NOT_ABSOLUTE
+
+    ro_number = columns["ro_number"]
+    blank = np.array([not text.strip() for text in ro_number.texts], dtype=bool)
+    mask[ro_number.take(blank, True)] |= RO_NUMBER_EMPTY
+
+    authority = columns["authority"]
+    normalized = [text.strip().lower() for text in authority.texts]
+    unknown = np.array([bool(a) and a not in ALLOWED_AUTHORITIES for a in normalized], dtype=bool)
+    mask[authority.take(unknown, False)] |= AUTHORITY_UNKNOWN
+
+    for key, empty_flag, invalid_flag in (
+        ("ro_date", RO_DATE_EMPTY, RO_DATE_INVALID),
+        ("vigency", VIGENCY_EMPTY, VIGENCY_INVALID),
+    ):
+        column = columns[key]
+        invalid = column.truthy & ~_valid_dates(column.texts)
+        mask[column.take(~column.truthy, True)] |= empty_flag
+        mask[column.take(invalid, False)] |= invalid_flag
+
+    valid_until = columns["valid_until"]
+    mask[valid_until.take(valid_until.truthy & ~_valid_dates(valid_until.texts), False)] |= VALID_UNTIL_INVALID
+
+    return ChunkBatchValidation(error_mask=mask, _columns=columns)
+
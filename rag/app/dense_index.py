@@ -0,0 +1,211 @@
+"""Memory-mapped dense vector index with exact CPU top-k search.
+
+An index directory holds:
+
+- ``embeddings.npy``: L2-normalised float16 matrix (N, dim), opened with ``mmap_mode="r"``
+- ``chunks.jsonl`` + ``chunk_offsets.npy``: chunk sidecar (see :mod:`rag.app.chunk_store`)
+- ``meta.json``: dimension, row count and the build's ``generation`` id (written last)
+
+The matrix is never loaded into process memory: API workers that open the same
+index share its pages through the OS page cache, and startup only maps files.
+Queries scan the matrix in row blocks, one block per thread (NumPy matmul
+releases the GIL), keep each block's best rows with ``argpartition`` and merge.
+"""
+from __future__ import annotations
+
+import json
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from rag.app.chunk_store import ChunkStore, SearchHit, encode_chunk, write_chunks
+from rag.app.citation_index import CitationIndex
+from rag.app.config import default_top_k
+from rag.app.contracts import ARTICLE_EMPTY_MESSAGE, validate_chunk_batch, validate_citable_chunk
+from rag.app.lexical_index import SIDE_INDEX_KEYS
+from rag.app.temporal_index import TemporalIndex
+
+INDEX_VERSION = 1
+DEFAULT_BLOCK_ROWS = 16384
+
+Embedder = Callable[[str], np.ndarray]
+
+
+def _normalise(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+
+
+class DenseIndexBuilder:
+    """Collects validated chunks with their embeddings and writes a :class:`DenseIndex`."""
+
+    def __init__(self, dim: int) -> None:
+        self.dim = dim
+        self._vectors: List[np.ndarray] = []
+        self._chunks: List[bytes] = []
+        self._side_metadata: List[Dict[str, object]] = []
+        self.rejected = 0
+
+    def __len__(self) -> int:
+        return len(self._chunks)
+
+    def _check_shape(self, embeddings: np.ndarray) -> np.ndarray:
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        if embeddings.ndim != 2 or embeddings.shape[1] != self.dim:
+            raise ValueError(f"embeddings must have shape (n, {self.dim})")
+        return embeddings
+
+    def add(self, chunk_id: str, text: str, metadata: Dict[str, object], embedding: np.ndarray) -> List[str]:
+        """Index a chunk; returns its contract errors and skips it if there are any."""
+        vector = self._check_shape(np.asarray(embedding).reshape(1, -1))
+        errors = validate_citable_chunk(metadata)
+        if errors:
+            self.rejected += 1
+            return errors
+        self._vectors.append(_normalise(vector).astype(np.float16))
+        self._chunks.append(encode_chunk(chunk_id, text, metadata))
+        self._side_metadata.append({key: metadata.get(key) for key in SIDE_INDEX_KEYS})
+        return []
+
+    def add_many(
+        self, chunks: Sequence[Tuple[str, str, Dict[str, object]]], embeddings: np.ndarray
+    ) -> Dict[int, List[str]]:
+        """Index (chunk_id, text, metadata) rows with one embedding row each."""
+        embeddings = self._check_shape(embeddings)
+        if len(embeddings) != len(chunks):
+            raise ValueError("chunks and embeddings must have the same length")
+        validation = validate_chunk_batch([metadata for _, _, metadata in chunks])
+        rejected: Dict[int, List[str]] = {}
+        for position, (_, _, metadata) in enumerate(chunks):
+            errors = validation.messages(position) if validation.error_mask[position] else []
+            if not str(metadata.get("article", "")).strip():
+                errors.append(ARTICLE_EMPTY_MESSAGE)
+            if errors:
+                rejected[position] = errors
+        keep = [position for position in range(len(chunks)) if position not in rejected]
+        if keep:
+            self._vectors.append(_normalise(embeddings[keep]).astype(np.float16))
+            self._chunks.extend(encode_chunk(*chunks[position]) for position in keep)
+            self._side_metadata.extend({key: chunks[position][2].get(key) for key in SIDE_INDEX_KEYS} for position in keep)
+        self.rejected += len(rejected)
+        return rejected
+
+    def write(self, directory: Path) -> Path:
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        meta_path = directory / "meta.json"
+        if meta_path.exists():
+            meta_path.unlink()
+        matrix = np.concatenate(self._vectors) if self._vectors else np.zeros((0, self.dim), dtype=np.float16)
+        np.save(directory / "embeddings.npy", matrix)
+        write_chunks(directory, self._chunks)
+        TemporalIndex.from_metadata(self._side_metadata).save(directory)
+        CitationIndex.build(self._side_metadata).save(directory)
+        with meta_path.open("w", encoding="utf-8") as handle:
+            meta = {"version": INDEX_VERSION, "documents": len(matrix), "dim": self.dim, "generation": uuid.uuid4().hex}
+            json.dump(meta, handle, indent=2)
+        return directory
+
+
+class DenseIndex:
+    """Read-only cosine-similarity index over a memory-mapped float16 matrix."""
+
+    def __init__(
+        self,
+        directory: Path,
+        embedder: Optional[Embedder] = None,
+        block_rows: int = DEFAULT_BLOCK_ROWS,
+        workers: Optional[int] = None,
+    ) -> None:
+        self.directory = Path(directory)
+        meta_path = self.directory / "meta.json"
+        if not meta_path.exists():
+            raise FileNotFoundError(f"no dense index at {self.directory}")
+        self.meta = json.loads(meta_path.read_text(encoding="utf-8"))
+        if self.meta.get("version") != INDEX_VERSION:
+            raise ValueError(f"unsupported dense index version {self.meta.get('version')}")
+        self.embedder = embedder
+        self.block_rows = block_rows
+        self.workers = workers or os.cpu_count() or 1
+        self._matrix = np.load(self.directory / "embeddings.npy", mmap_mode="r")
+        self.chunks = ChunkStore(self.directory)
+        self.temporal = TemporalIndex.load(self.directory)
+        self.citations = CitationIndex.load(self.directory)
+        self._pool: Optional[ThreadPoolExecutor] = None
+
+    def __len__(self) -> int:
+        return int(self.meta["documents"])
+
+    @property
+    def dim(self) -> int:
+        return int(self.meta["dim"])
+
+    @property
+    def generation(self) -> str:
+        """Id of the build this directory holds (indexes written before it had one: meta.json's mtime)."""
+        return str(self.meta.get("generation") or (self.directory / "meta.json").stat().st_mtime_ns)
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+        self.chunks.close()
+
+    def _block_top(
+        self, start: int, query: np.ndarray, top_k: int, mask: Optional[np.ndarray]
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        end = min(start + self.block_rows, len(self))
+        if mask is None:
+            rows = np.arange(start, end)
+            block = np.asarray(self._matrix[start:end], dtype=np.float32)
+        else:
+            # Only rows in force on the requested date are read and scored.
+            rows = start + np.flatnonzero(mask[start:end])
+            block = np.asarray(self._matrix[rows], dtype=np.float32)
+        scores = block @ query
+        if top_k < len(scores):
+            best = np.argpartition(-scores, top_k - 1)[:top_k]
+        else:
+            best = np.arange(len(scores))
+        return rows[best], scores[best]
+
+    def score(
+        self, vector: np.ndarray, top_k: int, as_of: Optional[date] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Return candidate (doc_ids, cosine scores) containing the exact top_k."""
+        query = _normalise(np.asarray(vector).reshape(-1))
+        if query.shape[0] != self.dim:
+            raise ValueError(f"query vector must have {self.dim} dimensions")
+        mask = None
+        if as_of is not None:
+            if self.temporal is None:
+                raise ValueError(f"index at {self.directory} has no validity windows")
+            mask = self.temporal.mask_at(as_of)
+        starts = range(0, len(self), self.block_rows)
+        if len(starts) <= 1 or self.workers == 1:
+            parts = [self._block_top(start, query, top_k, mask) for start in starts]
+        else:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="dense-index")
+            parts = list(self._pool.map(lambda start: self._block_top(start, query, top_k, mask), starts))
+        if not parts:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        return np.concatenate([ids for ids, _ in parts]), np.concatenate([scores for _, scores in parts])
+
+    def search_vector(
+        self, vector: np.ndarray, top_k: Optional[int] = None, as_of: Optional[date] = None
+    ) -> List[SearchHit]:
+        top_k = top_k or default_top_k()
+        doc_ids, scores = self.score(vector, top_k, as_of)
+        return self.chunks.hits(doc_ids, scores, top_k)
+
+    def search(self, query: str, top_k: Optional[int] = None, as_of: Optional[date] = None) -> List[SearchHit]:
+        """Embed `query` with the configured embedder and return the `top_k` nearest chunks."""
+        if self.embedder is None:
+            raise RuntimeError("DenseIndex.search needs an embedder; use search_vector for raw vectors")
+        return self.search_vector(self.embedder(query), top_k, as_of)
@@ -0,0 +1,58 @@
+"""Pluggable answer-generation backends for the YACHAQ-LEX API."""
+from __future__ import annotations
+
+import asyncio
+import os
+from typing import AsyncIterator, Dict, List, Protocol, Sequence, Type
+
+from rag.app.lexical_index import SearchHit
+
+
+class GenerationBackend(Protocol):
+    name: str
+
+    def stream(self, question: str, hits: Sequence[SearchHit]) -> AsyncIterator[str]:
+        """Yield answer fragments for `question` grounded on `hits`."""
+        ...
+
+
+class StubBackend:
+    """Deterministic, CPU-only backend used for local runs and load tests.
+
+    The answer quotes the first sentence of each retrieved chunk with its
+    citation, so the full API path can be exercised without a model endpoint.
+    `token_delay` simulates per-token decode latency when sizing endpoints.
+    """
+
+    name = "stub"
+
+    def __init__(self, token_delay: float = 0.0) -> None:
+        self.token_delay = token_delay
+
+    def render(self, question: str, hits: Sequence[SearchHit]) -> str:
+        if not hits:
+            return "No se encontraron fuentes vigentes para responder la pregunta."
+        lines: List[str] = []
+        for hit in hits:
+            meta = hit.metadata
+            sentence = hit.text.strip().split("\n")[0].split(". ")[0].strip()
+            lines.append(f"{sentence} [{meta.get('source')}, Art. {meta.get('article')}, R.O. {meta.get('ro_number')}]")
+        return "\n".join(lines)
+
+    async def stream(self, question: str, hits: Sequence[SearchHit]) -> AsyncIterator[str]:
+        words = self.render(question, hits).split(" ")
+        for i, word in enumerate(words):
+            await asyncio.sleep(self.token_delay)
+            yield word if i == 0 else " " + word
+
+
+BACKENDS: Dict[str, Type] = {"stub": StubBackend}
+
+
+def get_backend(name: str | None = None) -> GenerationBackend:
+    """Instantiate a backend by name (default from YACHAQ_GENERATION_BACKEND or `stub`)."""
+    name = name or os.environ.get("YACHAQ_GENERATION_BACKEND", "stub")
+    try:
+        return BACKENDS[name]()
+    except KeyError:
+        raise ValueError(f"unknown generation backend '{name}'") from None
@@ -0,0 +1,258 @@
+"""On-disk BM25 inverted index over validated YACHAQ-LEX chunks.
+
+The index is a directory of flat arrays that are memory-mapped at query time:
+
+- ``vocab.json``: term -> term id
+- ``offsets.npy``: posting-list boundaries per term id (int64, V + 1)
+- ``postings_docs.npy``: chunk ids per posting (uint32)
+- ``postings_weights.npy``: precomputed BM25 impact per posting (float32)
+- ``chunks.jsonl`` + ``chunk_offsets.npy``: stored text and citation metadata
+- ``meta.json``: corpus statistics, BM25 parameters and the build's
+  ``generation`` id (written last)
+
+Because BM25 term weights do not depend on the query, they are computed once at
+build time; a query is then a gather over its posting lists plus a partial sort.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import uuid
+from array import array
+from collections import Counter
+from datetime import date
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from rag.app.chunk_store import ChunkStore, SearchHit, encode_chunk, write_chunks
+from rag.app.citation_index import CitationIndex
+from rag.app.config import default_top_k
+from rag.app.contracts import ARTICLE_EMPTY_MESSAGE, validate_chunk_batch, validate_citable_chunk
+from rag.app.temporal_index import TemporalIndex
+from rag.app.text import tokenize
+
+INDEX_VERSION = 1
+BUILD_BATCH_SIZE = 50_000
+# Metadata kept in memory during a build for the validity and citation side indexes.
+SIDE_INDEX_KEYS = ("source", "ro_number", "article", "vigency", "valid_until")
+
+
+class LexicalIndexBuilder:
+    """Accumulates chunks in memory and writes a :class:`LexicalIndex` directory."""
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75) -> None:
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, Tuple[array, array]] = {}
+        self._doc_lengths = array("I")
+        self._chunks: List[bytes] = []
+        self._side_metadata: List[Dict[str, object]] = []
+        self.rejected = 0
+
+    def __len__(self) -> int:
+        return len(self._doc_lengths)
+
+    def add(self, chunk_id: str, text: str, metadata: Dict[str, object]) -> List[str]:
+        """Index a chunk; returns its contract errors and skips it if there are any."""
+        errors = validate_citable_chunk(metadata)
+        if errors:
+            self.rejected += 1
+            return errors
+        self._index(chunk_id, text, metadata)
+        return []
+
+    def add_many(self, chunks: Sequence[Tuple[str, str, Dict[str, object]]]) -> Dict[int, List[str]]:
+        """Index a batch of (chunk_id, text, metadata); returns errors keyed by position."""
+        validation = validate_chunk_batch([metadata for _, _, metadata in chunks])
+        rejected: Dict[int, List[str]] = {}
+        for position, (chunk_id, text, metadata) in enumerate(chunks):
+            errors = validation.messages(position) if validation.error_mask[position] else []
+            if not str(metadata.get("article", "")).strip():
+                errors.append(ARTICLE_EMPTY_MESSAGE)
+            if errors:
+                rejected[position] = errors
+                continue
+            self._index(chunk_id, text, metadata)
+        self.rejected += len(rejected)
+        return rejected
+
+    def _index(self, chunk_id: str, text: str, metadata: Dict[str, object]) -> None:
+        doc_id = len(self._doc_lengths)
+        terms = tokenize(text)
+        for term, tf in Counter(terms).items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = (array("I"), array("H"))
+            postings[0].append(doc_id)
+            postings[1].append(min(tf, 0xFFFF))
+        self._doc_lengths.append(len(terms))
+        self._chunks.append(encode_chunk(chunk_id, text, metadata))
+        self._side_metadata.append({key: metadata.get(key) for key in SIDE_INDEX_KEYS})
+
+    def write(self, directory: Path) -> Path:
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        meta_path = directory / "meta.json"
+        if meta_path.exists():
+            meta_path.unlink()
+
+        doc_lengths = np.frombuffer(self._doc_lengths, dtype=np.uint32).astype(np.float32)
+        n_docs = len(doc_lengths)
+        avgdl = float(doc_lengths.mean()) if n_docs else 0.0
+        norm = self.k1 * (1.0 - self.b + self.b * doc_lengths / avgdl) if avgdl else np.full(n_docs, self.k1, np.float32)
+
+        terms = sorted(self._postings)
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        for i, term in enumerate(terms):
+            offsets[i + 1] = offsets[i] + len(self._postings[term][0])
+        docs = np.empty(int(offsets[-1]), dtype=np.uint32)
+        weights = np.empty(int(offsets[-1]), dtype=np.float32)
+        for i, term in enumerate(terms):
+            start, end = offsets[i], offsets[i + 1]
+            term_docs = np.frombuffer(self._postings[term][0], dtype=np.uint32)
+            tf = np.frombuffer(self._postings[term][1], dtype=np.uint16).astype(np.float32)
+            df = end - start
+            idf = math.log(1.0 + (n_docs - df + 0.5) / (df + 0.5))
+            docs[start:end] = term_docs
+            weights[start:end] = idf * tf * (self.k1 + 1.0) / (tf + norm[term_docs])
+
+        write_chunks(directory, self._chunks)
+        TemporalIndex.from_metadata(self._side_metadata).save(directory)
+        CitationIndex.build(self._side_metadata).save(directory)
+        np.save(directory / "offsets.npy", offsets)
+        np.save(directory / "postings_docs.npy", docs)
+        np.save(directory / "postings_weights.npy", weights)
+        with (directory / "vocab.json").open("w", encoding="utf-8") as handle:
+            json.dump({term: i for i, term in enumerate(terms)}, handle, ensure_ascii=False)
+        with meta_path.open("w", encoding="utf-8") as handle:
+            json.dump(
+                {
+                    "version": INDEX_VERSION,
+                    "documents": n_docs,
+                    "terms": len(terms),
+                    "avgdl": avgdl,
+                    "k1": self.k1,
+                    "b": self.b,
+                    "generation": uuid.uuid4().hex,
+                },
+                handle,
+                indent=2,
+            )
+        return directory
+
+
+class LexicalIndex:
+    """Read-only, memory-mapped BM25 index produced by :class:`LexicalIndexBuilder`."""
+
+    def __init__(self, directory: Path) -> None:
+        self.directory = Path(directory)
+        meta_path = self.directory / "meta.json"
+        if not meta_path.exists():
+            raise FileNotFoundError(f"no lexical index at {self.directory}")
+        self.meta = json.loads(meta_path.read_text(encoding="utf-8"))
+        if self.meta.get("version") != INDEX_VERSION:
+            raise ValueError(f"unsupported lexical index version {self.meta.get('version')}")
+        with (self.directory / "vocab.json").open("r", encoding="utf-8") as handle:
+            self.vocab: Dict[str, int] = json.load(handle)
+        self._offsets = np.load(self.directory / "offsets.npy", mmap_mode="r")
+        self._docs = np.load(self.directory / "postings_docs.npy", mmap_mode="r")
+        self._weights = np.load(self.directory / "postings_weights.npy", mmap_mode="r")
+        self.chunks = ChunkStore(self.directory)
+        self.temporal = TemporalIndex.load(self.directory)
+        self.citations = CitationIndex.load(self.directory)
+
+    def __len__(self) -> int:
+        return int(self.meta["documents"])
+
+    @property
+    def generation(self) -> str:
+        """Id of the build this directory holds (indexes written before it had one: meta.json's mtime)."""
+        return str(self.meta.get("generation") or (self.directory / "meta.json").stat().st_mtime_ns)
+
+    def close(self) -> None:
+        self.chunks.close()
+
+    def chunk(self, doc_id: int) -> Dict[str, object]:
+        """Return the stored record (chunk_id, text, metadata) for an internal id."""
+        return self.chunks.get(doc_id)
+
+    def score(self, query: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (doc_ids, bm25_scores) for every chunk matching any query term."""
+        term_ids = [self.vocab[t] for t in dict.fromkeys(tokenize(query)) if t in self.vocab]
+        if not term_ids:
+            return np.empty(0, dtype=np.uint32), np.empty(0, dtype=np.float64)
+        spans = [(int(self._offsets[t]), int(self._offsets[t + 1])) for t in term_ids]
+        if len(spans) == 1:
+            start, end = spans[0]
+            return np.asarray(self._docs[start:end]), np.asarray(self._weights[start:end], dtype=np.float64)
+        docs = np.concatenate([self._docs[s:e] for s, e in spans])
+        weights = np.concatenate([self._weights[s:e] for s, e in spans])
+        unique_docs, inverse = np.unique(docs, return_inverse=True)
+        return unique_docs, np.bincount(inverse, weights=weights)
+
+    def search(self, query: str, top_k: Optional[int] = None, as_of: Optional[date] = None) -> List[SearchHit]:
+        """Return the `top_k` best BM25 hits (defaults to `rag.top_k`).
+
+        With `as_of`, only chunks in force on that date are ranked.
+        """
+        top_k = top_k or default_top_k()
+        doc_ids, scores = self.score(query)
+        if as_of is not None:
+            if self.temporal is None:
+                raise ValueError(f"index at {self.directory} has no validity windows")
+            keep = self.temporal.mask_at(as_of)[doc_ids]
+            doc_ids, scores = doc_ids[keep], scores[keep]
+        return self.chunks.hits(doc_ids, scores, top_k)
+
+
+def iter_chunk_records(path: Path) -> Iterable[Tuple[str, str, Dict[str, object]]]:
+    """Yield (chunk_id, text, metadata) from a chunk JSONL file.
+
+    Lines may carry metadata under a ``metadata`` key or as top-level fields.
+    """
+    with Path(path).open("r", encoding="utf-8") as handle:
+        for line_number, line in enumerate(handle, start=1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            text = str(record.get("text", ""))
+            metadata = record.get("metadata")
+            if metadata is None:
+                metadata = {k: v for k, v in record.items() if k not in {"text", "chunk_id"}}
+            yield str(record.get("chunk_id", line_number)), text, metadata
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Build or query the YACHAQ-LEX lexical index.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    build = subparsers.add_parser("build", help="Index a chunk JSONL file")
+    build.add_argument("chunks", type=Path)
+    build.add_argument("index_dir", type=Path)
+    query = subparsers.add_parser("query", help="Run a query against an index")
+    query.add_argument("index_dir", type=Path)
+    query.add_argument("text")
+    query.add_argument("--top-k", type=int, default=None)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        builder = LexicalIndexBuilder()
+        batch: List[Tuple[str, str, Dict[str, object]]] = []
+        for chunk in iter_chunk_records(args.chunks):
+            batch.append(chunk)
+            if len(batch) == BUILD_BATCH_SIZE:
+                builder.add_many(batch)
+                batch = []
+        builder.add_many(batch)
+        builder.write(args.index_dir)
+        print(json.dumps({"indexed": len(builder), "rejected": builder.rejected}, indent=2))
+    else:
+        index = LexicalIndex(args.index_dir)
+        hits = index.search(args.text, top_k=args.top_k)
+        print(json.dumps([hit.__dict__ for hit in hits], indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,70 @@
-from fastapi import FastAPI
-app=FastAPI()
-@app.get('/health')
-def h():
- return {'status':'ok'}
+"""FastAPI entrypoint for the YACHAQ-LEX RAG API."""
+from __future__ import annotations
+
+import json
+from datetime import date
+from dataclasses import asdict
+from functools import lru_cache
+from typing import AsyncIterator, Optional
+
+from fastapi import Depends, FastAPI
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+
+from rag.app.config import default_top_k, load_rag_config, resolve_path
+from rag.app.generation import get_backend
+from rag.app.lexical_index import LexicalIndex
+from rag.app.pipeline import QueryPipeline
+from rag.app.query_cache import QueryCache
+
+app = FastAPI(title="YACHAQ-LEX")
+
+
+class QueryRequest(BaseModel):
+    question: str = Field(min_length=1)
+    top_k: Optional[int] = Field(default=None, ge=1, le=50)
+    stream: bool = False
+    as_of: Optional[date] = None
+
+
+@lru_cache(maxsize=1)
+def get_pipeline() -> QueryPipeline:
+    config = load_rag_config()
+    retriever = None
+    index_dir = config.get("lexical_index_dir")
+    if index_dir and (resolve_path(str(index_dir)) / "meta.json").exists():
+        retriever = LexicalIndex(resolve_path(str(index_dir)))
+    cache = None
+    cache_config = config.get("cache") or {}
+    if cache_config.get("enabled", True):
+        disk_dir = cache_config.get("disk_dir")
+        cache = QueryCache(
+            max_entries=int(cache_config.get("max_entries", 1024)),
+            ttl_seconds=float(cache_config.get("ttl_seconds", 3600)),
+            disk_dir=resolve_path(str(disk_dir)) if disk_dir else None,
+        )
+    pipeline = QueryPipeline(None, get_backend(config.get("generation_backend")), default_top_k(), cache=cache)
+    # A disk cache may hold answers from before the index was rebuilt: keep only those of the build loaded now.
+    pipeline.swap_retriever(retriever)
+    return pipeline
+
+
+def _sse(event: str, payload: object) -> str:
+    return f"event: {event}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+
+async def _stream_events(pipeline: QueryPipeline, request: QueryRequest) -> AsyncIterator[str]:
+    async for kind, payload in pipeline.events(request.question, request.top_k, request.as_of):
+        yield _sse(kind, asdict(payload) if kind == "done" else payload)
+
+
+@app.get("/health")
+def health():
+    return {"status": "ok"}
+
+
+@app.post("/query")
+async def query(request: QueryRequest, pipeline: QueryPipeline = Depends(get_pipeline)):
+    if request.stream:
+        return StreamingResponse(_stream_events(pipeline, request), media_type="text/event-stream")
+    return asdict(await pipeline.run(request.question, request.top_k, request.as_of))
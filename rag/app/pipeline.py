@@ -0,0 +1,198 @@
+"""Async retrieve -> rerank -> generate -> citation-check pipeline with stage timings."""
+from __future__ import annotations
+
+import asyncio
+import re
+import time
+from datetime import date
+from dataclasses import asdict, dataclass, field
+from typing import AsyncIterator, Dict, List, Optional, Protocol, Tuple
+
+from rag.app.citation_index import CitationIndex, citation_key
+from rag.app.generation import GenerationBackend
+from rag.app.lexical_index import SearchHit
+from rag.app.query_cache import QueryCache
+from rag.eval.run_eval import has_valid_citation
+
+STAGES = ("retrieve", "rerank", "generate", "citation_check")
+
+# Inline citation format required by the system prompt: [LRTI, Art. 65, R.O. 463]
+ANSWER_CITATION = re.compile(
+    r"\[(?P<source>[^,\[\]]+),\s*Art\.\s*(?P<article>[^,\[\]]+),\s*R\.O\.\s*(?P<ro_number>[^\[\]]+)\]"
+)
+
+
+class Retriever(Protocol):
+    def search(self, query: str, top_k: Optional[int] = None, as_of: Optional[date] = None) -> List[SearchHit]:
+        ...
+
+
+@dataclass
+class QueryResult:
+    answer: str
+    citations: List[Dict[str, str]]
+    timings_ms: Dict[str, float] = field(default_factory=dict)
+    rejected_citations: List[Dict[str, str]] = field(default_factory=list)
+    cached: bool = False
+
+
+def _elapsed_ms(start: float) -> float:
+    return round((time.perf_counter() - start) * 1000.0, 3)
+
+
+def extract_answer_citations(answer: str) -> List[Dict[str, str]]:
+    """Parse the inline ``[source, Art. N, R.O. N]`` markers of a generated answer."""
+    return [
+        {key: value.strip() for key, value in match.groupdict().items()} for match in ANSWER_CITATION.finditer(answer)
+    ]
+
+
+def hit_citation(hit: SearchHit) -> Dict[str, str]:
+    meta = hit.metadata
+    return {
+        "chunk_id": hit.chunk_id,
+        "source": str(meta.get("source", "")),
+        "ro_number": str(meta.get("ro_number", "")),
+        "article": str(meta.get("article", "")),
+        "url": str(meta.get("url", "")),
+    }
+
+
+class QueryPipeline:
+    """Runs one question through the RAG stages without blocking the event loop.
+
+    Retrieval touches memory-mapped index files, so it runs in a worker thread;
+    generation is awaited from the backend's async stream.
+    """
+
+    def __init__(
+        self,
+        retriever: Optional[Retriever],
+        backend: GenerationBackend,
+        top_k: int,
+        cache: Optional[QueryCache] = None,
+        citation_index: Optional[CitationIndex] = None,
+    ) -> None:
+        self.retriever = retriever
+        self.backend = backend
+        self.top_k = top_k
+        self.cache = cache
+        self.citation_index = citation_index
+
+    def swap_retriever(self, retriever: Optional[Retriever]) -> int:
+        """Serve from a rebuilt index, dropping cache entries computed against any other build of it."""
+        dropped = 0
+        if self.cache is not None:
+            dropped = self.cache.bind(getattr(retriever, "generation", None))
+        self.retriever = retriever
+        self.citation_index = getattr(retriever, "citations", None)
+        return dropped
+
+    async def retrieve(self, question: str, top_k: int, as_of: Optional[date] = None) -> List[SearchHit]:
+        if self.retriever is None:
+            return []
+        namespace = f"retrieve@{as_of}"
+        if self.cache is not None:
+            cached = self.cache.get(namespace, question, top_k)
+            if cached is not None:
+                return [SearchHit(**hit) for hit in cached]
+        # Over-fetch so deduplication in `rerank` can still fill top_k.
+        hits = await asyncio.to_thread(self.retriever.search, question, top_k * 2, as_of)
+        if self.cache is not None:
+            self.cache.put(
+                namespace, question, top_k, [asdict(hit) for hit in hits], ((h.chunk_id, h.metadata) for h in hits)
+            )
+        return hits
+
+    def rerank(self, hits: List[SearchHit], top_k: int) -> List[SearchHit]:
+        """Keep the best hit per cited article, preserving retrieval order."""
+        seen = set()
+        ranked: List[SearchHit] = []
+        for hit in hits:
+            key = (hit.metadata.get("source"), hit.metadata.get("ro_number"), hit.metadata.get("article"))
+            if key in seen:
+                continue
+            seen.add(key)
+            ranked.append(hit)
+            if len(ranked) == top_k:
+                break
+        return ranked
+
+    def _resolves(self, citation: Dict[str, str], retrieved: set) -> bool:
+        if self.citation_index is not None:
+            return self.citation_index.contains(citation)
+        return citation_key(citation["source"], citation["ro_number"], citation["article"]) in retrieved
+
+    def check_citations(
+        self, hits: List[SearchHit], answer: str = ""
+    ) -> Tuple[List[Dict[str, str]], List[Dict[str, str]]]:
+        """Return (verified hit citations, answer citations that do not resolve).
+
+        With a citation index every check is a hash lookup against the corpus;
+        without one, answer citations must match a retrieved chunk.
+        """
+        citations = [c for c in map(hit_citation, hits) if has_valid_citation(c)]
+        retrieved = {citation_key(c["source"], c["ro_number"], c["article"]) for c in citations}
+        if self.citation_index is not None:
+            citations = [c for c in citations if self.citation_index.contains(c)]
+        rejected = [c for c in extract_answer_citations(answer) if not self._resolves(c, retrieved)]
+        return citations, rejected
+
+    async def events(
+        self, question: str, top_k: Optional[int] = None, as_of: Optional[date] = None
+    ) -> AsyncIterator[Tuple[str, object]]:
+        """Yield ("token", fragment) events followed by one ("done", QueryResult).
+
+        `as_of` restricts retrieval to chunks in force on that date.
+        """
+        top_k = top_k or self.top_k
+        timings: Dict[str, float] = {}
+        answer_namespace = f"answer:{self.backend.name}@{as_of}"
+
+        if self.cache is not None:
+            start = time.perf_counter()
+            cached = self.cache.get(answer_namespace, question, top_k)
+            if cached is not None:
+                # Every response carries the STAGES keys; a cache hit skips them all.
+                timings.update(dict.fromkeys(STAGES, 0.0))
+                timings["cache_lookup"] = timings["total"] = _elapsed_ms(start)
+                yield "token", cached["answer"]
+                yield "done", QueryResult(
+                    cached["answer"], cached["citations"], timings, cached["rejected_citations"], cached=True
+                )
+                return
+
+        start = time.perf_counter()
+        hits = await self.retrieve(question, top_k, as_of)
+        timings["retrieve"] = _elapsed_ms(start)
+
+        start = time.perf_counter()
+        hits = self.rerank(hits, top_k)
+        timings["rerank"] = _elapsed_ms(start)
+
+        start = time.perf_counter()
+        fragments: List[str] = []
+        async for fragment in self.backend.stream(question, hits):
+            fragments.append(fragment)
+            yield "token", fragment
+        timings["generate"] = _elapsed_ms(start)
+
+        start = time.perf_counter()
+        answer = "".join(fragments)
+        citations, rejected = self.check_citations(hits, answer)
+        timings["citation_check"] = _elapsed_ms(start)
+
+        timings["total"] = round(sum(timings[stage] for stage in STAGES), 3)
+        result = QueryResult(answer=answer, citations=citations, timings_ms=timings, rejected_citations=rejected)
+        if self.cache is not None:
+            value = {"answer": answer, "citations": citations, "rejected_citations": rejected}
+            self.cache.put(answer_namespace, question, top_k, value, ((hit.chunk_id, hit.metadata) for hit in hits))
+        yield "done", result
+
+    async def run(self, question: str, top_k: Optional[int] = None, as_of: Optional[date] = None) -> QueryResult:
+        result: Optional[QueryResult] = None
+        async for kind, payload in self.events(question, top_k, as_of):
+            if kind == "done":
+                result = payload  # type: ignore[assignment]
+        assert result is not None
+        return result
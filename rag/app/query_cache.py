@@ -0,0 +1,288 @@
+"""LRU + TTL cache for retrieval results and answers, invalidated by chunk validity.
+
+Entries are keyed by (namespace, normalised query, top_k) and remember the
+``ro_date``/``vigency`` of every chunk they cite. When an index rebuild reports
+new validity for a cited chunk (`apply_validity`), every entry citing it is
+dropped, so a law reform never serves a stale rate from cache.
+
+Entries also belong to one build of the index (`bind`). A rebuild can change
+answers without touching any cited chunk, e.g. when a reform is added under a
+new chunk_id, or when a question that found nothing now has hits, so binding a
+new generation drops everything cached before it.
+:meth:`~rag.app.pipeline.QueryPipeline.swap_retriever` binds the index it
+starts serving, on every API start included.
+
+The optional disk tier stores one JSON file per entry plus the cited-chunk
+fingerprints, reverse map and bound generation: a ``citations.json`` snapshot,
+rewritten when entries are invalidated, and a ``citations.jsonl`` journal that
+each `put` appends one line to. A restarted process reloads both, so
+invalidation holds across restarts and a restart on the same index keeps its
+entries.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Mapping, Optional, Set, Tuple
+
+from rag.app.text import tokenize
+
+Fingerprint = Tuple[str, str]
+
+JOURNAL_COMPACT_LINES = 1024  # the journal is folded into the snapshot past this (or twice the chunks cited)
+
+
+def normalize_query(query: str) -> str:
+    """Accent-, case- and punctuation-insensitive form used for cache keys."""
+    return " ".join(tokenize(query))
+
+
+def validity_fingerprint(metadata: Mapping[str, object]) -> Fingerprint:
+    return str(metadata.get("ro_date", "")), str(metadata.get("vigency", ""))
+
+
+@dataclass
+class _Entry:
+    value: object
+    expires_at: float
+    fingerprints: Dict[str, Fingerprint]
+
+
+class QueryCache:
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl_seconds: float = 3600.0,
+        disk_dir: Optional[Path] = None,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        # chunk_id -> fingerprint seen when cached, and chunk_id -> entry keys citing it.
+        self._fingerprints: Dict[str, Fingerprint] = {}
+        self._citations: Dict[str, Set[str]] = {}
+        self._journal_lines = 0
+        self.generation: Optional[str] = None  # index build the entries were computed from
+        if self.disk_dir:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+            self._load_citations()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def key(namespace: str, query: str, top_k: int) -> str:
+        payload = json.dumps([namespace, normalize_query(query), top_k], ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, namespace: str, query: str, top_k: int) -> Optional[object]:
+        key = self.key(namespace, query, top_k)
+        now = self.clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._read_disk(key)
+                if entry is not None:
+                    self._store(key, entry)
+            if entry is not None and entry.expires_at <= now:
+                self._drop(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry.value
+
+    def put(
+        self, namespace: str, query: str, top_k: int, value: object, cited: Iterable[Tuple[str, Mapping[str, object]]]
+    ) -> None:
+        """Cache `value`; `cited` yields (chunk_id, metadata) for every chunk it depends on."""
+        key = self.key(namespace, query, top_k)
+        fingerprints = {chunk_id: validity_fingerprint(metadata) for chunk_id, metadata in cited}
+        entry = _Entry(value=value, expires_at=self.clock() + self.ttl_seconds, fingerprints=fingerprints)
+        with self._lock:
+            # A cached chunk whose validity already differs means the entry is built on newer data.
+            for chunk_id, fingerprint in fingerprints.items():
+                if self._fingerprints.get(chunk_id, fingerprint) != fingerprint:
+                    self._invalidate_chunk(chunk_id)
+                self._fingerprints[chunk_id] = fingerprint
+            self._store(key, entry)
+            self._write_disk(key, entry)
+            self._append_citations(key, fingerprints)
+
+    def cited_chunks(self) -> Set[str]:
+        with self._lock:
+            return set(self._citations)
+
+    def invalidate_chunks(self, chunk_ids: Iterable[str]) -> int:
+        with self._lock:
+            dropped = sum(self._invalidate_chunk(chunk_id) for chunk_id in chunk_ids)
+            self._save_citations()
+            return dropped
+
+    def apply_validity(self, current: Mapping[str, Fingerprint | Mapping[str, object]]) -> int:
+        """Drop entries citing chunks whose ro_date/vigency differ from `current`.
+
+        `current` maps chunk_id to a fingerprint or metadata dict as found in the
+        rebuilt index; cited chunks missing from it were removed and are dropped too.
+        """
+        changed = []
+        with self._lock:
+            for chunk_id, known in self._fingerprints.items():
+                latest = current.get(chunk_id)
+                if latest is not None and not isinstance(latest, tuple):
+                    latest = validity_fingerprint(latest)
+                if latest != known:
+                    changed.append(chunk_id)
+            dropped = sum(self._invalidate_chunk(chunk_id) for chunk_id in changed)
+            self._save_citations()
+            return dropped
+
+    def bind(self, generation: Optional[str]) -> int:
+        """Serve entries of the index build `generation` only; returns how many were dropped.
+
+        Entries cached for another build, or for an unknown one (None), are
+        all dropped, on disk too, whether or not they cite any chunk.
+        """
+        with self._lock:
+            if generation is not None and generation == self.generation:
+                return 0
+            dropped = self._clear()
+            self.generation = generation
+            self._save_citations()
+            return dropped
+
+    def clear(self) -> int:
+        with self._lock:
+            dropped = self._clear()
+            self._save_citations()
+            return dropped
+
+    # Internal helpers; callers hold self._lock.
+
+    def _clear(self) -> int:
+        keys = set(self._entries)
+        if self.disk_dir:
+            # Entries evicted from memory, or citing nothing, are only known on disk
+            keys.update(path.stem for path in self.disk_dir.glob("*.json") if path.name != "citations.json")
+        for key in keys:
+            self._drop(key)
+        self._fingerprints.clear()
+        self._citations.clear()
+        return len(keys)
+
+    def _store(self, key: str, entry: _Entry) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        for chunk_id in entry.fingerprints:
+            self._citations.setdefault(chunk_id, set()).add(key)
+        while len(self._entries) > self.max_entries:
+            evicted_key, evicted = self._entries.popitem(last=False)
+            if not self.disk_dir:
+                for chunk_id in evicted.fingerprints:
+                    self._citations.get(chunk_id, set()).discard(evicted_key)
+            # With a disk tier the evicted entry stays reachable (and invalidatable) on disk.
+
+    def _drop(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            for chunk_id in entry.fingerprints:
+                self._citations.get(chunk_id, set()).discard(key)
+        if self.disk_dir:
+            path = self.disk_dir / f"{key}.json"
+            if path.exists():
+                path.unlink()
+
+    def _invalidate_chunk(self, chunk_id: str) -> int:
+        keys = self._citations.pop(chunk_id, set())
+        self._fingerprints.pop(chunk_id, None)
+        for key in keys:
+            self._drop(key)
+        return len(keys)
+
+    def _read_disk(self, key: str) -> Optional[_Entry]:
+        if not self.disk_dir:
+            return None
+        path = self.disk_dir / f"{key}.json"
+        if not path.exists():
+            return None
+        data = json.loads(path.read_text(encoding="utf-8"))
+        fingerprints = {chunk_id: tuple(fp) for chunk_id, fp in data["fingerprints"].items()}
+        if any(self._fingerprints.get(chunk_id) != fp for chunk_id, fp in fingerprints.items()):
+            path.unlink()
+            return None
+        return _Entry(value=data["value"], expires_at=data["expires_at"], fingerprints=fingerprints)
+
+    def _write_disk(self, key: str, entry: _Entry) -> None:
+        if not self.disk_dir:
+            return
+        payload = {"value": entry.value, "expires_at": entry.expires_at, "fingerprints": entry.fingerprints}
+        self._atomic_write(self.disk_dir / f"{key}.json", payload)
+
+    def _load_citations(self) -> None:
+        path = self.disk_dir / "citations.json"
+        if path.exists():
+            data = json.loads(path.read_text(encoding="utf-8"))
+            self._fingerprints = {chunk_id: tuple(fp) for chunk_id, fp in data["fingerprints"].items()}
+            self._citations = {chunk_id: set(keys) for chunk_id, keys in data["citations"].items()}
+            self.generation = data.get("generation")
+        journal = self.disk_dir / "citations.jsonl"
+        if not journal.exists():
+            return
+        for line in journal.read_text(encoding="utf-8").splitlines():
+            try:
+                record = json.loads(line)
+            except ValueError:  # torn last line of a crashed process
+                continue
+            self._journal_lines += 1
+            for chunk_id, fingerprint in record["fingerprints"].items():
+                fingerprint = tuple(fingerprint)
+                if self._fingerprints.get(chunk_id, fingerprint) != fingerprint:
+                    # Entries citing the old version were dropped when this line was written
+                    # (their files are gone or fail the fingerprint check in _read_disk).
+                    self._citations.pop(chunk_id, None)
+                self._fingerprints[chunk_id] = fingerprint
+                self._citations.setdefault(chunk_id, set()).add(record["key"])
+
+    def _append_citations(self, key: str, fingerprints: Dict[str, Fingerprint]) -> None:
+        if not self.disk_dir:
+            return
+        if self._journal_lines >= max(JOURNAL_COMPACT_LINES, 2 * len(self._fingerprints)):
+            self._save_citations()
+            return
+        line = json.dumps({"key": key, "fingerprints": fingerprints}, ensure_ascii=False)
+        with (self.disk_dir / "citations.jsonl").open("a", encoding="utf-8") as handle:
+            handle.write(line + "\n")
+        self._journal_lines += 1
+
+    def _save_citations(self) -> None:
+        if not self.disk_dir:
+            return
+        payload = {
+            "generation": self.generation,
+            "fingerprints": self._fingerprints,
+            "citations": {chunk_id: sorted(keys) for chunk_id, keys in self._citations.items() if keys},
+        }
+        self._atomic_write(self.disk_dir / "citations.json", payload)
+        # The snapshot now holds everything the journal recorded
+        (self.disk_dir / "citations.jsonl").unlink(missing_ok=True)
+        self._journal_lines = 0
+
+    @staticmethod
+    def _atomic_write(path: Path, payload: object) -> None:
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(payload, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, path)
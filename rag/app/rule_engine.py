@@ -1,9 +1,13 @@
 """Deterministic financial and administrative rules for Ecuador."""
 from __future__ import annotations
 
+import threading
 from dataclasses import dataclass
 from datetime import date, timedelta
-from typing import Dict, Iterable, List, Tuple
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, List, Tuple
+
+import numpy as np
 
 
 @dataclass
@@ -17,6 +21,25 @@ def round2(value: float) -> float:
     return round(value, 2)
 
 
+def round2_array(values: np.ndarray) -> np.ndarray:
+    """Vectorized `round2` that matches Python's `round(x, 2)` bit-for-bit.
+
+    `rint(x * 100) / 100` agrees with Python's correctly rounded `round` unless
+    the product lands within rounding error of a .5 tie (or exceeds 2**52);
+    those rare elements fall back to the scalar implementation.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    scaled = values * 100.0
+    rounded = np.rint(scaled) / 100.0
+    distance = np.abs(np.abs(scaled - np.trunc(scaled)) - 0.5)
+    unsafe = ~(distance > 2.0 * np.abs(np.spacing(scaled))) | ~(np.abs(scaled) < 2.0**52)
+    if unsafe.any():
+        rounded = np.array(rounded, copy=True)
+        for position in zip(*np.nonzero(unsafe)):
+            rounded[position] = round(float(values[position]), 2)
+    return rounded
+
+
 def compute_import_taxes(
     cif: float,
     ad_valorem: float = 0.1,
@@ -62,17 +85,206 @@ def compute_income_tax_liability(amount: float, brackets: Iterable[Tuple[float,
     return round2(max(liability, 0.0))
 
 
+@dataclass
+class ImportTaxBatch:
+    """Column-wise result of `compute_import_taxes_batch` (one entry per declaration)."""
+
+    base: np.ndarray
+    ad_valorem: np.ndarray
+    fodinfa: np.ndarray
+    ice: np.ndarray
+    iva: np.ndarray
+    total: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.total)
+
+    def result(self, index: int) -> ComputationResult:
+        taxes = {
+            "ad_valorem": float(self.ad_valorem[index]),
+            "fodinfa": float(self.fodinfa[index]),
+            "ice": float(self.ice[index]),
+            "iva": float(self.iva[index]),
+        }
+        return ComputationResult(base=float(self.base[index]), taxes=taxes, total=float(self.total[index]))
+
+
+def compute_import_taxes_batch(
+    cif: np.ndarray,
+    ad_valorem: np.ndarray | float = 0.1,
+    fodinfa: np.ndarray | float = 0.005,
+    ice: np.ndarray | float = 0.0,
+    iva: np.ndarray | float = 0.12,
+) -> ImportTaxBatch:
+    """Vectorized `compute_import_taxes`; rates may be scalars or per-row arrays."""
+    base, ad_valorem, fodinfa, ice, iva = np.broadcast_arrays(
+        *(np.asarray(value, dtype=np.float64) for value in (cif, ad_valorem, fodinfa, ice, iva))
+    )
+    base = np.atleast_1d(base)
+    if (base < 0).any():
+        raise ValueError("CIF must be non-negative")
+
+    ad_valorem_tax = base * ad_valorem
+    fodinfa_tax = base * fodinfa
+    ice_tax = base * ice
+    taxable_base = base + ad_valorem_tax + fodinfa_tax + ice_tax
+    iva_tax = taxable_base * iva
+
+    taxes = [round2_array(tax) for tax in (ad_valorem_tax, fodinfa_tax, ice_tax, iva_tax)]
+    # Same left-to-right summation order as `sum(taxes.values())`.
+    tax_sum = np.zeros_like(base)
+    for tax in taxes:
+        tax_sum = tax_sum + tax
+    return ImportTaxBatch(round2_array(base), *taxes, total=round2_array(base + tax_sum))
+
+
+def compute_income_tax_liability_batch(
+    amounts: np.ndarray, brackets: Iterable[Tuple[float, float, float]]
+) -> np.ndarray:
+    """Vectorized `compute_income_tax_liability` using a `searchsorted` bracket lookup."""
+    amounts = np.atleast_1d(np.asarray(amounts, dtype=np.float64))
+    if (amounts < 0).any():
+        raise ValueError("amount must be non-negative")
+
+    table = np.asarray(list(brackets), dtype=np.float64).reshape(-1, 3)
+    lower, rate, fixed_fee = table[:, 0], table[:, 1], table[:, 2]
+    if len(table) == 0:
+        return np.zeros_like(amounts)
+    # The scalar loop stops at the first lower limit above the amount; a running
+    # maximum keeps that behaviour even if brackets are not sorted.
+    index = np.searchsorted(np.maximum.accumulate(lower), amounts, side="right") - 1
+    matched = (index >= 0) & ~np.isnan(amounts)
+    index = np.where(matched, index, 0)
+    liability = np.where(matched, fixed_fee[index] + (amounts - lower[index]) * rate[index], 0.0)
+    # Mirrors `max(liability, 0.0)`, which keeps the first argument unless 0.0 is larger.
+    return round2_array(np.where(0.0 > liability, 0.0, liability))
+
+
+def easter_sunday(year: int) -> date:
+    """Gregorian Easter Sunday (anonymous Gregorian algorithm)."""
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return date(year, month, day + 1)
+
+
+def ecuador_national_holidays(year: int) -> List[date]:
+    """Statutory national holidays (Código del Trabajo, Art. 65) on their nominal dates.
+
+    Transfers decreed for a given year (moving a holiday to a Monday or Friday)
+    are not predictable from the statute and must be passed as extra holidays.
+    """
+    easter = easter_sunday(year)
+    return sorted(
+        [
+            date(year, 1, 1),
+            easter - timedelta(days=48),  # Carnaval (lunes)
+            easter - timedelta(days=47),  # Carnaval (martes)
+            easter - timedelta(days=2),  # Viernes Santo
+            date(year, 5, 1),
+            date(year, 5, 24),
+            date(year, 8, 10),
+            date(year, 10, 9),
+            date(year, 11, 2),
+            date(year, 11, 3),
+            date(year, 12, 25),
+        ]
+    )
+
+
+class BusinessCalendar:
+    """Working-day index with O(1) business-day arithmetic.
+
+    Days are stored as offsets from January 1st of the first covered year.
+    `cumulative[i]` counts working days in offsets [0, i] and `working` lists the
+    offsets of working days, so adding or subtracting N business days is two
+    array lookups. Coverage grows by whole years when a query falls outside it.
+    """
+
+    def __init__(self, holidays: Iterable[date] = (), national: bool = False) -> None:
+        self.holidays: FrozenSet[date] = frozenset(holidays)
+        self.national = national
+        self._lock = threading.Lock()
+        self._state: Tuple[int, int, date, np.ndarray, np.ndarray] | None = None
+
+    def _build(self, first_year: int, last_year: int) -> None:
+        origin = date(first_year, 1, 1)
+        n_days = (date(last_year + 1, 1, 1) - origin).days
+        weekday = (origin.weekday() + np.arange(n_days)) % 7
+        is_working = weekday < 5
+        closed = set(self.holidays)
+        if self.national:
+            for year in range(first_year, last_year + 1):
+                closed.update(ecuador_national_holidays(year))
+        offsets = [(day - origin).days for day in closed if first_year <= day.year <= last_year]
+        is_working[offsets] = False
+        cumulative = np.cumsum(is_working, dtype=np.int64)
+        working = np.flatnonzero(is_working).astype(np.int64)
+        self._state = (first_year, last_year, origin, cumulative, working)
+
+    def _ensure(self, first_year: int, last_year: int):
+        state = self._state
+        if state is None or first_year < state[0] or last_year > state[1]:
+            with self._lock:
+                state = self._state
+                if state is not None:
+                    first_year, last_year = min(first_year, state[0]), max(last_year, state[1])
+                if state is None or first_year < state[0] or last_year > state[1]:
+                    self._build(first_year, last_year)
+                state = self._state
+        return state
+
+    def is_working_day(self, day: date) -> bool:
+        _, _, origin, cumulative, _ = self._ensure(day.year, day.year)
+        offset = (day - origin).days
+        return bool(cumulative[offset] - (cumulative[offset - 1] if offset else 0))
+
+    def add_business_days(self, start: date, days: int) -> date:
+        """Date reached after moving `days` business days from `start` (negative = backwards)."""
+        return self.add_business_days_array(np.array([start], dtype="datetime64[D]"), days)[0].item()
+
+    def add_business_days_array(self, starts: np.ndarray, days: np.ndarray | int) -> np.ndarray:
+        """Vectorized `add_business_days` over `datetime64[D]` start dates."""
+        starts = np.asarray(starts, dtype="datetime64[D]")
+        days = np.broadcast_to(np.asarray(days, dtype=np.int64), starts.shape)
+        if starts.size == 0:
+            return starts.copy()
+        first = int(starts.min().astype("datetime64[Y]").astype(np.int64)) + 1970
+        last = int(starts.max().astype("datetime64[Y]").astype(np.int64)) + 1970
+        # About 250 working days per year; pad coverage, and grow it while a target still
+        # falls outside (dense holiday sets leave fewer working days per year).
+        span = int(np.abs(days).max()) // 240 + 1
+        moving = days != 0
+        while True:
+            _, _, origin, cumulative, working = self._ensure(first - span, last + span)
+            offsets = (starts - np.datetime64(origin, "D")).astype(np.int64)
+            through_start = cumulative[offsets]
+            start_is_working = through_start - np.where(offsets > 0, cumulative[offsets - 1], 0)
+            before_start = through_start - start_is_working
+            # Forward: the (through_start + days)-th working day; backward: counted from before start.
+            rank = np.where(days > 0, through_start + days, before_start + days + 1)
+            if not moving.any() or (rank[moving].min() >= 1 and rank[moving].max() <= len(working)):
+                break
+            span *= 2
+        targets = working[np.where(moving, rank - 1, 0)]
+        return np.datetime64(origin, "D") + np.where(moving, targets, offsets).astype("timedelta64[D]")
+
+
+@lru_cache(maxsize=64)
+def business_calendar(holidays: FrozenSet[date] = frozenset(), national: bool = False) -> BusinessCalendar:
+    """Shared calendar per holiday set; `national=True` adds Ecuadorian national holidays."""
+    return BusinessCalendar(holidays, national=national)
+
+
 def next_working_day(start: date, holidays: List[date] | None = None, days: int = 5) -> date:
     """Return the next working day after adding `days` business days."""
     if days < 0:
         raise ValueError("days must be non-negative")
-
-    holidays = set(holidays or [])
-    current = start
-    added = 0
-    while added < days:
-        current += timedelta(days=1)
-        if current.weekday() >= 5 or current in holidays:
-            continue
-        added += 1
-    return current
+    return business_calendar(frozenset(holidays or ())).add_business_days(start, days)
@@ -0,0 +1,127 @@
+"""Validity-window index answering "which chunks were in force on date X".
+
+Every chunk gets a half-open window ``[start, end)`` in days since the epoch:
+
+- ``start`` is its ``vigency`` date;
+- ``end`` is the optional ``valid_until`` date, or the ``vigency`` of the next
+  version of the same (source, article), whichever comes first. This is how the
+  pre-April-2024 IVA article stops matching once the reformed one is indexed.
+
+Windows are kept as two sorted endpoint arrays. A point-in-time query is two
+binary searches plus boolean masks over the chunk ids, so retrievers filter
+candidates before ranking instead of post-filtering their top-k.
+"""
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict, defaultdict
+from datetime import date, datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple
+
+import numpy as np
+
+OPEN_END = np.iinfo(np.int64).max
+_EPOCH = date(1970, 1, 1)
+
+
+def _day(value: object) -> Optional[int]:
+    if value in (None, ""):
+        return None
+    if isinstance(value, datetime):
+        value = value.date()
+    if not isinstance(value, date):
+        value = datetime.strptime(str(value), "%Y-%m-%d").date()
+    return (value - _EPOCH).days
+
+
+def validity_windows(metadatas: Iterable[Mapping[str, object]]) -> Tuple[np.ndarray, np.ndarray]:
+    """Return (starts, ends) day arrays for chunk metadata in internal-id order."""
+    starts: List[int] = []
+    explicit_ends: List[int] = []
+    versions: Dict[Tuple[str, str], List[int]] = defaultdict(list)
+    groups: List[Tuple[str, str]] = []
+    parsed: Dict[object, Optional[int]] = {}
+    for metadata in metadatas:
+        vigency, until = metadata.get("vigency"), metadata.get("valid_until")
+        if vigency not in parsed:
+            parsed[vigency] = _day(vigency)
+        if until not in parsed:
+            parsed[until] = _day(until)
+        start = parsed[vigency]
+        end = parsed[until]
+        starts.append(start if start is not None else np.iinfo(np.int64).min)
+        explicit_ends.append(end if end is not None else OPEN_END)
+        group = (str(metadata.get("source", "")), str(metadata.get("article", "")))
+        groups.append(group)
+        if start is not None:
+            versions[group].append(start)
+
+    next_version: Dict[Tuple[str, str], Dict[int, int]] = {}
+    for group, group_starts in versions.items():
+        distinct = sorted(set(group_starts))
+        next_version[group] = dict(zip(distinct, distinct[1:] + [OPEN_END]))
+
+    ends = [
+        min(explicit, next_version.get(group, {}).get(start, OPEN_END))
+        for start, explicit, group in zip(starts, explicit_ends, groups)
+    ]
+    return np.array(starts, dtype=np.int64), np.array(ends, dtype=np.int64)
+
+
+class TemporalIndex:
+    """Sorted-endpoint interval index over chunk validity windows."""
+
+    def __init__(self, starts: np.ndarray, ends: np.ndarray, cache_size: int = 64) -> None:
+        self.starts = np.asarray(starts, dtype=np.int64)
+        self.ends = np.asarray(ends, dtype=np.int64)
+        self._by_start = np.argsort(self.starts, kind="stable")
+        self._sorted_starts = self.starts[self._by_start]
+        self._by_end = np.argsort(self.ends, kind="stable")
+        self._sorted_ends = self.ends[self._by_end]
+        self._cache_size = cache_size
+        self._masks: "OrderedDict[int, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    @classmethod
+    def from_metadata(cls, metadatas: Iterable[Mapping[str, object]]) -> "TemporalIndex":
+        return cls(*validity_windows(metadatas))
+
+    def save(self, directory: Path) -> None:
+        np.save(Path(directory) / "validity_starts.npy", self.starts)
+        np.save(Path(directory) / "validity_ends.npy", self.ends)
+
+    @classmethod
+    def load(cls, directory: Path) -> Optional["TemporalIndex"]:
+        """Load the windows saved next to an index, or None for indexes built without them."""
+        starts_path = Path(directory) / "validity_starts.npy"
+        if not starts_path.exists():
+            return None
+        return cls(np.load(starts_path), np.load(Path(directory) / "validity_ends.npy"))
+
+    def mask_at(self, as_of: date | str) -> np.ndarray:
+        """Boolean mask over chunk ids: True where the chunk was in force on `as_of`."""
+        day = _day(as_of)
+        with self._lock:
+            mask = self._masks.get(day)
+            if mask is not None:
+                self._masks.move_to_end(day)
+                return mask
+        started = np.zeros(len(self), dtype=bool)
+        started[self._by_start[: np.searchsorted(self._sorted_starts, day, side="right")]] = True
+        not_ended = np.zeros(len(self), dtype=bool)
+        not_ended[self._by_end[np.searchsorted(self._sorted_ends, day, side="right") :]] = True
+        mask = started & not_ended
+        mask.flags.writeable = False
+        with self._lock:
+            self._masks[day] = mask
+            if len(self._masks) > self._cache_size:
+                self._masks.popitem(last=False)
+        return mask
+
+    def valid_at(self, as_of: date | str) -> np.ndarray:
+        """Chunk ids in force on `as_of`."""
+        return np.flatnonzero(self.mask_at(as_of))
@@ -0,0 +1,54 @@
+"""Spanish legal text normalisation shared by retrieval, caching and citations."""
+from __future__ import annotations
+
+import re
+import unicodedata
+from typing import Dict, List, Tuple
+
+# Legal abbreviations as they appear after accent folding and dot collapsing.
+ABBREVIATIONS: Dict[str, Tuple[str, ...]] = {
+    "art": ("articulo",),
+    "arts": ("articulo",),
+    "ro": ("registro", "oficial"),
+    "rof": ("registro", "oficial"),
+    "supl": ("suplemento",),
+    "nro": ("numero",),
+    "num": ("numeral",),
+    "lit": ("literal",),
+    "inc": ("inciso",),
+    "cod": ("codigo",),
+    "reg": ("reglamento",),
+    "dec": ("decreto",),
+    "res": ("resolucion",),
+    "disp": ("disposicion",),
+    "trans": ("transitoria",),
+}
+
+STOPWORDS = frozenset(
+    {
+        "a", "al", "con", "de", "del", "el", "en", "es", "la", "las", "lo", "los",
+        "o", "para", "por", "que", "se", "su", "sus", "un", "una", "y",
+    }
+)
+
+_DOTTED_ABBREVIATION = re.compile(r"\b([a-z])\.(?=[a-z]\.)")
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def fold_accents(text: str) -> str:
+    """Lowercase and strip diacritics (``Código`` -> ``codigo``, ``ñ`` -> ``n``)."""
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+
+def tokenize(text: str) -> List[str]:
+    """Return index terms for Spanish legal text."""
+    folded = _DOTTED_ABBREVIATION.sub(r"\1", fold_accents(text))
+    tokens: List[str] = []
+    for token in _TOKEN.findall(folded):
+        expansion = ABBREVIATIONS.get(token)
+        if expansion:
+            tokens.extend(expansion)
+        elif token not in STOPWORDS:
+            tokens.append(token)
+    return tokens
@@ -17,39 +17,37 @@ import uuid
 from pathlib import Path
 from typing import List
 
-from bs4 import BeautifulSoup
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))  # repo root, for src.utils
+from src.utils.links import element_text, iter_links, parse_html
+from src.utils.urls import canonicalize_url
 
 
 DEFAULT_URL = "https://www.compraspublicas.gob.ec/ProcesoContratacion/compras/PC/buscarProceso.cpe?sg=1"
 
 
 def parse_rows_from_html(html: str, base_url: str) -> List[dict]:
-    soup = BeautifulSoup(html, "html.parser")
+    root = parse_html(html)
     rows = []
-    for a in soup.find_all("a", href=True):
-        href = a["href"]
-        txt = a.get_text(strip=True)
+    for href, txt in iter_links(root):
         if not txt:
             continue
         if "informacionProcesoContratacion" in href or "idSoliCompra" in href or "detalle" in href or "verProceso" in href:
             rows.append({"title": txt, "href": href})
-    if not rows:
+    if not rows and root is not None:
         # fallback: table rows
-        for tr in soup.find_all("tr"):
-            tds = tr.find_all("td")
+        for tr in root.iter("tr"):
+            tds = tr.findall(".//td")
             if len(tds) >= 2:
-                txt = " | ".join(td.get_text(strip=True) for td in tds)
-                a = tr.find("a", href=True)
-                href = a["href"] if a else None
+                txt = " | ".join(element_text(td) for td in tds)
+                link = next(iter_links(tr), None)
+                href = link.href if link else None
                 rows.append({"title": txt, "href": href})
     # normalize
-    from urllib.parse import urljoin
-
     norm = []
     for r in rows:
         href = r.get("href")
         if href:
-            abs_href = urljoin(base_url, href)
+            abs_href = canonicalize_url(href, base_url)
         else:
             abs_href = None
         norm.append({"title": r.get("title"), "href": abs_href})
@@ -58,7 +56,6 @@ def parse_rows_from_html(html: str, base_url: str) -> List[dict]:
 
 def download_documents(rows: List[dict], out_dir: Path, sample_n: int = 3) -> List[dict]:
     import requests
-    from urllib.parse import urljoin
 
     out_dir.mkdir(parents=True, exist_ok=True)
     saved = []
@@ -70,12 +67,12 @@ def download_documents(rows: List[dict], out_dir: Path, sample_n: int = 3) -> Li
         try:
             resp = requests.get(href, timeout=30)
             resp.raise_for_status()
-            soup = BeautifulSoup(resp.text, "html.parser")
             docs = []
-            for a in soup.find_all("a", href=True):
-                link = a["href"]
+            for link, _ in iter_links(resp.text):
                 if link.lower().endswith(('.pdf', '.zip', '.doc', '.docx', '.xls', '.xlsx')):
-                    abs_link = urljoin(href, link)
+                    abs_link = canonicalize_url(link, href)
+                    if not abs_link:
+                        continue
                     fn = abs_link.split("/")[-1].split("?")[0]
                     path = out_dir / f"{i+1}__{fn}"
                     try:
@@ -10,11 +10,13 @@ from __future__ import annotations
 import json
 import sys
 from pathlib import Path
-from urllib.parse import urljoin
 
 import requests
 from bs4 import BeautifulSoup
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))  # repo root, for src.utils
+from src.utils.urls import canonicalize_url
+
 
 OUT_RUN = Path("rag/discovery/out_sercop_run")
 OUT_CDP = Path("rag/discovery/out_cdp")
@@ -131,7 +133,9 @@ def download_docs(rows: list, trace_id: str, sample_n: int = 3) -> list:
             for a in soup.find_all("a", href=True):
                 link = a["href"]
                 if link.lower().endswith(('.pdf', '.zip', '.doc', '.docx', '.xls', '.xlsx')):
-                    abs_link = urljoin(href, link)
+                    abs_link = canonicalize_url(link, href)
+                    if not abs_link:
+                        continue
                     fn = abs_link.split("/")[-1].split("?")[0]
                     path = docs_dir / f"{i+1}__{fn}"
                     try:
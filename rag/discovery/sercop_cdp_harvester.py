@@ -20,7 +20,9 @@ import sys
 from pathlib import Path
 from typing import List
 
-from bs4 import BeautifulSoup
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))  # repo root, for src.utils
+from src.utils.links import element_text, iter_links, parse_html
+from src.utils.urls import canonicalize_url
 
 try:
     from rag.discovery.pydoll_cdp_discovery import PydollCDPDiscovery, PydollNotInstalled
@@ -41,40 +43,36 @@ async def capture(url: str, out_dir: str | Path) -> dict:
 
 
 def parse_rows_from_html(html: str, base_url: str) -> List[dict]:
-    soup = BeautifulSoup(html, "html.parser")
+    root = parse_html(html)
     rows: List[dict] = []
 
     # Heuristic 1: find links that look like process detail
-    for a in soup.find_all("a", href=True):
-        href = a["href"]
-        txt = a.get_text(strip=True)
+    for href, txt in iter_links(root):
         if not txt:
             continue
         if re.search(r"verProceso|detalle|verProceso|idProceso|/ProcesoContratacion/", href, re.I) or re.search(r"proceso|detalle", txt, re.I):
             rows.append({"title": txt, "href": href})
 
     # Heuristic 2: find result tables with many rows
-    if not rows:
-        tables = soup.find_all("table")
+    if not rows and root is not None:
+        tables = root.iter("table")
         for t in tables:
-            trs = t.find_all("tr")
+            trs = t.iter("tr")
             for tr in trs:
-                tds = tr.find_all("td")
+                tds = tr.findall(".//td")
                 if len(tds) >= 2:
-                    txt = " | ".join(td.get_text(strip=True) for td in tds)
+                    txt = " | ".join(element_text(td) for td in tds)
                     # try to find a link inside the row
-                    a = tr.find("a", href=True)
-                    href = a["href"] if a else None
+                    link = next(iter_links(tr), None)
+                    href = link.href if link else None
                     rows.append({"title": txt, "href": href})
 
     # Normalize hrefs to absolute where possible
-    from urllib.parse import urljoin
-
     norm_rows: List[dict] = []
     for r in rows:
         href = r.get("href")
         if href:
-            abs_href = urljoin(base_url, href)
+            abs_href = canonicalize_url(href, base_url)
         else:
             abs_href = None
         norm_rows.append({"title": r.get("title"), "href": abs_href})
@@ -106,14 +104,12 @@ def download_documents(rows: List[dict], out_dir: Path, sample_n: int = 3) -> Li
             # fetch the detail page HTML
             resp = requests.get(href, timeout=30)
             resp.raise_for_status()
-            soup = BeautifulSoup(resp.text, "html.parser")
             docs = []
-            for a in soup.find_all("a", href=True):
-                link = a["href"]
+            for link, _ in iter_links(resp.text):
                 if re.search(r"\.pdf$|\.zip$|\.docx?$|\.xlsx?$", link, re.I):
-                    from urllib.parse import urljoin
-
-                    abs_link = urljoin(href, link)
+                    abs_link = canonicalize_url(link, href)
+                    if not abs_link:
+                        continue
                     fn = abs_link.split("/")[-1].split("?")[0]
                     save_path = out_dir / f"{i+1}__{fn}"
                     try:
@@ -234,8 +230,7 @@ def main(url: str = DEFAULT_URL, out_dir: str | Path = "rag/discovery/out_cdp",
                             title = str(item)
 
                         if title or href:
-                            from urllib.parse import urljoin
-                            rows.append({"title": title or "", "href": urljoin(url, href) if href else None})
+                            rows.append({"title": title or "", "href": canonicalize_url(href, url) if href else None})
 
                 except Exception:
                     # continue with next event on any parse error
@@ -14,6 +14,9 @@ from typing import List
 
 from bs4 import BeautifulSoup
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))  # repo root, for src.utils
+from src.utils.urls import canonicalize_url
+
 
 OUT_DIR = Path("rag/discovery/out_cdp")
 
@@ -42,13 +45,11 @@ def parse_rows(html: str, base_url: str) -> List[dict]:
                 href = a["href"] if a else None
                 rows.append({"title": txt, "href": href})
     # normalize
-    from urllib.parse import urljoin
-
     norm = []
     for r in rows:
         href = r.get("href")
         if href:
-            abs_href = urljoin(base_url, href)
+            abs_href = canonicalize_url(href, base_url)
         else:
             abs_href = None
         norm.append({"title": r.get("title"), "href": abs_href})
@@ -82,9 +83,9 @@ def download_docs(rows: List[dict], out_dir: Path, sample_n: int = 3) -> List[di
             for a in soup.find_all("a", href=True):
                 link = a["href"]
                 if re.search(r"\.pdf$|\.zip$|\.docx?$|\.xlsx?$", link, re.I):
-                    from urllib.parse import urljoin
-
-                    abs_link = urljoin(href, link)
+                    abs_link = canonicalize_url(link, href)
+                    if not abs_link:
+                        continue
                     fn = abs_link.split("/")[-1].split("?")[0]
                     save_path = out_dir / f"{i+1}__{fn}"
                     try:
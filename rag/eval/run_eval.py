@@ -1,10 +1,36 @@
-"""Simple evaluation pipeline for YACHAQ-LEX responses."""
+"""Simple evaluation pipeline for YACHAQ-LEX responses.
+
+Small datasets go through :func:`evaluate_records`. Production inference logs
+(several GB of JSONL per day) go through :func:`evaluate_file`, which splits the
+file into byte ranges, scores each range in a worker process while streaming
+its lines, and merges the per-shard counters. Memory per worker is bounded by
+one line plus the breakdown tables, whatever the size of the log.
+"""
 from __future__ import annotations
 
 import argparse
 import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field, fields
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, Iterable, List
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, Protocol, Tuple
+
+try:
+    import orjson
+
+    _loads = orjson.loads
+except ImportError:  # pragma: no cover - orjson is an optional speed-up
+    _loads = json.loads
+
+DEFAULT_SHARD_BYTES = 64 * 1024 * 1024
+UNATTRIBUTED = "(none)"
+
+
+class CitationResolver(Protocol):
+    def contains(self, citation: Mapping[str, object]) -> bool:
+        ...
 
 
 def has_valid_citation(citation: Dict[str, str]) -> bool:
@@ -14,32 +40,113 @@ def has_valid_citation(citation: Dict[str, str]) -> bool:
     return all(str(citation[field]).strip() for field in required_fields)
 
 
-def evaluate_records(records: Iterable[Dict[str, object]]) -> Dict[str, float]:
-    total = 0
-    citation_hits = 0
-    hallucinations = 0
-    freshness_hits = 0
+@dataclass
+class EvalCounts:
+    """Additive counters behind the evaluation metrics."""
 
-    for record in records:
-        total += 1
-        citations = record.get("citations", [])
-        validity_flag = bool(record.get("valid_as_of"))
-        if citations and all(has_valid_citation(c) for c in citations):
-            citation_hits += 1
+    total: int = 0
+    citation_hits: int = 0
+    hallucinations: int = 0
+    freshness_hits: int = 0
+    cited: int = 0
+    resolved: int = 0
+
+    def merge(self, other: "EvalCounts") -> None:
+        for counter in fields(self):
+            setattr(self, counter.name, getattr(self, counter.name) + getattr(other, counter.name))
+
+    def metrics(self, resolution: bool = False) -> Dict[str, float]:
+        if self.total == 0:
+            metrics = {"count": 0.0, "citation_accuracy": 0.0, "hallucination_rate": 0.0, "freshness_coverage": 0.0}
         else:
-            hallucinations += 1
-        if validity_flag:
-            freshness_hits += 1
+            metrics = {
+                "count": float(self.total),
+                "citation_accuracy": self.citation_hits / self.total,
+                "hallucination_rate": self.hallucinations / self.total,
+                "freshness_coverage": self.freshness_hits / self.total,
+            }
+        if resolution:
+            metrics["citation_resolution_rate"] = self.resolved / self.cited if self.cited else 0.0
+        return metrics
+
+
+@dataclass
+class PartialMetrics:
+    """Counters for one shard: overall plus per-source and per-authority breakdowns."""
+
+    overall: EvalCounts = field(default_factory=EvalCounts)
+    by_source: Dict[str, EvalCounts] = field(default_factory=dict)
+    by_authority: Dict[str, EvalCounts] = field(default_factory=dict)
+    malformed_lines: int = 0
+    malformed_citations: int = 0
+
+    def add(self, record: Mapping[str, object], citation_index: Optional[CitationResolver] = None) -> None:
+        counts = _score_record(record, citation_index)
+        self.overall.merge(counts)
+        citations, malformed = _citation_entries(record)
+        self.malformed_citations += malformed
+        # A response citing several sources counts once towards each of them.
+        default_authority = str(record.get("authority") or UNATTRIBUTED)
+        sources = {str(c.get("source") or UNATTRIBUTED) for c in citations} or {UNATTRIBUTED}
+        authorities = {str(c.get("authority") or default_authority) for c in citations} or {default_authority}
+        for key in sources:
+            self.by_source.setdefault(key, EvalCounts()).merge(counts)
+        for key in authorities:
+            self.by_authority.setdefault(key, EvalCounts()).merge(counts)
+
+    def merge(self, other: "PartialMetrics") -> None:
+        self.overall.merge(other.overall)
+        for mine, theirs in ((self.by_source, other.by_source), (self.by_authority, other.by_authority)):
+            for key, counts in theirs.items():
+                mine.setdefault(key, EvalCounts()).merge(counts)
+        self.malformed_lines += other.malformed_lines
+        self.malformed_citations += other.malformed_citations
+
+    def report(self, resolution: bool = False) -> Dict[str, object]:
+        report: Dict[str, object] = dict(self.overall.metrics(resolution))
+        report["malformed_lines"] = self.malformed_lines
+        report["malformed_citations"] = self.malformed_citations
+        for name, groups in (("by_source", self.by_source), ("by_authority", self.by_authority)):
+            report[name] = {key: groups[key].metrics(resolution) for key in sorted(groups)}
+        return report
+
+
+def _citation_entries(record: Mapping[str, object]) -> Tuple[List[Mapping[str, object]], int]:
+    """The record's citation objects, and how many other entries (strings, numbers...) it listed."""
+    citations = record.get("citations") or []
+    if not isinstance(citations, list):
+        citations = [citations]
+    entries = [c for c in citations if isinstance(c, Mapping)]
+    return entries, len(citations) - len(entries)
 
-    if total == 0:
-        return {"count": 0.0, "citation_accuracy": 0.0, "hallucination_rate": 0.0, "freshness_coverage": 0.0}
 
-    return {
-        "count": float(total),
-        "citation_accuracy": citation_hits / total,
-        "hallucination_rate": hallucinations / total,
-        "freshness_coverage": freshness_hits / total,
-    }
+def _score_record(record: Mapping[str, object], citation_index: Optional[CitationResolver]) -> EvalCounts:
+    counts = EvalCounts(total=1)
+    citations, malformed = _citation_entries(record)
+    # A response with a malformed citation entry is not well cited
+    well_formed = bool(citations) and not malformed and all(has_valid_citation(c) for c in citations)
+    if citation_index is not None:
+        found = sum(1 for c in citations if citation_index.contains(c))
+        counts.cited = len(citations) + malformed
+        counts.resolved = found
+        well_formed = well_formed and found == counts.cited
+    if well_formed:
+        counts.citation_hits = 1
+    else:
+        counts.hallucinations = 1
+    if record.get("valid_as_of"):
+        counts.freshness_hits = 1
+    return counts
+
+
+def evaluate_records(
+    records: Iterable[Dict[str, object]], citation_index: Optional[CitationResolver] = None
+) -> Dict[str, float]:
+    """Score responses; with `citation_index`, a citation only counts if it exists in the corpus."""
+    counts = EvalCounts()
+    for record in records:
+        counts.merge(_score_record(record, citation_index))
+    return counts.metrics(resolution=citation_index is not None)
 
 
 def load_records(path: Path) -> List[Dict[str, object]]:
@@ -47,13 +154,100 @@ def load_records(path: Path) -> List[Dict[str, object]]:
         return [json.loads(line) for line in handle if line.strip()]
 
 
+def shard_ranges(path: Path, shard_bytes: int = DEFAULT_SHARD_BYTES) -> List[Tuple[int, int]]:
+    """Split a file into [start, end) byte ranges of about `shard_bytes` each."""
+    size = Path(path).stat().st_size
+    return [(start, min(start + shard_bytes, size)) for start in range(0, size, max(shard_bytes, 1))]
+
+
+def iter_shard_lines(path: Path, start: int, end: int) -> Iterator[bytes]:
+    """Yield the lines whose first byte falls in [start, end).
+
+    Neighbouring ranges therefore never split or repeat a line, whatever the
+    byte boundaries are.
+    """
+    with Path(path).open("rb") as handle:
+        if start > 0:
+            # Finish the line that began before `start`; it belongs to the previous shard.
+            handle.seek(start - 1)
+            handle.readline()
+        while handle.tell() < end:
+            line = handle.readline()
+            if not line:
+                break
+            yield line
+
+
+@lru_cache(maxsize=4)
+def _citation_index(directory: str) -> CitationResolver:
+    from rag.app.citation_index import CitationIndex
+
+    index = CitationIndex.load(Path(directory))
+    if index is None:
+        raise FileNotFoundError(f"no citation table in {directory}")
+    return index
+
+
+def evaluate_shard(path: Path, start: int, end: int, citation_index_dir: Optional[str] = None) -> PartialMetrics:
+    """Score one byte range of a JSONL log. Runs in worker processes."""
+    citation_index = _citation_index(citation_index_dir) if citation_index_dir else None
+    partial = PartialMetrics()
+    for line in iter_shard_lines(path, start, end):
+        if not line.strip():
+            continue
+        try:
+            record = _loads(line)
+        except ValueError:
+            partial.malformed_lines += 1
+            continue
+        if not isinstance(record, dict):
+            partial.malformed_lines += 1
+            continue
+        partial.add(record, citation_index)
+    return partial
+
+
+def evaluate_file(
+    path: Path,
+    workers: Optional[int] = None,
+    citation_index_dir: Optional[Path] = None,
+    shard_bytes: int = DEFAULT_SHARD_BYTES,
+) -> Dict[str, object]:
+    """Evaluate a JSONL log in parallel byte-range shards and return merged metrics with breakdowns."""
+    path = Path(path)
+    index_dir = str(citation_index_dir) if citation_index_dir is not None else None
+    ranges = shard_ranges(path, shard_bytes)
+    workers = workers or os.cpu_count() or 1
+    total = PartialMetrics()
+    if workers == 1 or len(ranges) <= 1:
+        for start, end in ranges:
+            total.merge(evaluate_shard(path, start, end, index_dir))
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(ranges))) as pool:
+            futures = [pool.submit(evaluate_shard, path, start, end, index_dir) for start, end in ranges]
+            for future in futures:
+                total.merge(future.result())
+    return total.report(resolution=index_dir is not None)
+
+
 def main() -> None:
     parser = argparse.ArgumentParser(description="Evaluate YACHAQ-LEX responses.")
     parser.add_argument("dataset", type=Path, help="Path to JSONL dataset with citations and validity metadata")
+    parser.add_argument(
+        "--citation-index",
+        type=Path,
+        help="Index directory whose citation table is used to check that every citation exists in the corpus",
+    )
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument(
+        "--shard-mb", type=int, default=DEFAULT_SHARD_BYTES // (1024 * 1024), help="Byte-range shard size in MiB"
+    )
     args = parser.parse_args()
 
-    records = load_records(args.dataset)
-    metrics = evaluate_records(records)
+    if args.citation_index is not None and not (args.citation_index / "citation_slots.npy").exists():
+        parser.error(f"no citation table in {args.citation_index}")
+
+    metrics = evaluate_file(args.dataset, args.workers, args.citation_index, args.shard_mb * 1024 * 1024)
     print(json.dumps(metrics, indent=2))
 
 
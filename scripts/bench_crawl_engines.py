@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""Pages/sec of MegaSpider's threaded batch loop vs the asyncio crawl engine.
+
+Serves a synthetic link tree from several local "hosts" (one port each). One host
+answers slowly, like an overloaded government portal, which is exactly what
+stalls the batch-barrier loop.
+
+    python3 scripts/bench_crawl_engines.py --pages 300 --slow-delay 0.5
+"""
+import argparse
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src" / "data_collection"))
+from mega_spider import PER_HOST_CONNECTIONS, MegaSpider  # noqa: E402
+from src.utils.politeness import PolitenessScheduler  # noqa: E402
+
+FANOUT = 6
+
+
+def serve(ports, delay_for_port):
+    servers = []
+    for index, port in enumerate(ports):
+        delay = delay_for_port(index)
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self, delay=delay):
+                time.sleep(delay)
+                node = int(self.path.rstrip('/').split('/')[-1] or 0)
+                links = "".join(
+                    f'<a href="http://127.0.0.1:{ports[(node + i) % len(ports)]}/normativa/{node * FANOUT + i + 1}">'
+                    f'Reglamento {node * FANOUT + i + 1}</a>'
+                    for i in range(FANOUT)
+                )
+                body = f"<html><body>{links}</body></html>".encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+    return servers
+
+
+class LocalSpider(MegaSpider):
+    def is_valid_domain(self, url):
+        return url.startswith('http://127.0.0.1')
+
+
+def measure(engine, seeds, pages, workers, rate):
+    politeness = PolitenessScheduler(rate=rate, burst=rate, max_concurrency=PER_HOST_CONNECTIONS)
+    spider = LocalSpider(seed_urls=seeds, max_pages=pages, workers=workers, politeness=politeness)
+    spider.url_queue.extend((url, 0) for url in seeds)
+    start = time.perf_counter()
+    if engine == 'async':
+        import asyncio
+        asyncio.run(spider.crawl_async())
+    else:
+        spider.crawl_threaded()
+    elapsed = time.perf_counter() - start
+    return spider.pages_crawled, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--hosts', type=int, default=4)
+    parser.add_argument('--pages', type=int, default=300)
+    parser.add_argument('--workers', type=int, default=10)
+    parser.add_argument('--delay', type=float, default=0.02, help="response time of normal hosts (s)")
+    parser.add_argument('--slow-delay', type=float, default=0.5, help="response time of the slow host (s)")
+    parser.add_argument('--base-port', type=int, default=18800)
+    parser.add_argument('--rate', type=float, default=1000.0,
+                        help="per-host requests/s allowed by the politeness scheduler (default: effectively unlimited)")
+    args = parser.parse_args()
+
+    ports = [args.base_port + i for i in range(args.hosts)]
+    servers = serve(ports, lambda index: args.slow_delay if index == 0 else args.delay)
+    try:
+        for engine in ('threaded', 'async'):
+            # Fresh node ids per run so both engines crawl the same tree shape.
+            seeds = [f"http://127.0.0.1:{port}/normativa/0" for port in ports]
+            pages, elapsed = measure(engine, seeds, args.pages, args.workers, args.rate)
+            print(f"{engine:>8}: {pages} pages in {elapsed:.2f}s = {pages / elapsed:.1f} pages/s")
+    finally:
+        for server in servers:
+            server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
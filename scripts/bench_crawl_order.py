@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""High-quality documents found under a page budget: FIFO vs best-first frontier.
+
+Runs ResourceRegistry.discover_resources over a synthetic set of .gob.ec
+portals served in process (no network). Like the real portals, every page
+lists its news, events and transparency sections before the normative ones,
+and normative sections link to laws and regulations while the rest link to
+reports, budgets and forms.
+
+    python3 scripts/bench_crawl_order.py --pages 200 --depth 4
+"""
+import argparse
+import random
+import sys
+import tempfile
+import urllib.parse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src" / "data_collection"))
+from resource_registry import MIN_QUALITY_SCORE, ResourceRegistry  # noqa: E402
+from src.utils.crawl_state import MemoryFrontier, PriorityFrontier  # noqa: E402
+from src.utils.object_store import LocalStore  # noqa: E402
+
+HOSTS = ["www.sri.gob.ec", "www.trabajo.gob.ec", "www.turismo.gob.ec", "www.cultura.gob.ec"]
+NOISE_SECTIONS = ["Noticias", "Eventos", "Galería de fotos", "Transparencia", "Boletines", "Agenda"]
+LEGAL_SECTIONS = ["Normativa vigente", "Reglamentos", "Resoluciones", "Leyes orgánicas"]
+NOISE_DOCS = ["Informe de gestión", "Presupuesto anual", "Formulario de solicitud", "Cronograma", "Boletín"]
+LEGAL_DOCS = ["Ley Orgánica", "Código", "Reglamento General", "Resolución NAC", "Decreto Ejecutivo"]
+
+
+class SyntheticPortals:
+    """Pages generated on demand from their URL, so every run sees the same site."""
+
+    def __init__(self, fanout=8, docs=6):
+        self.fanout = fanout
+        self.docs = docs
+
+    def page(self, url):
+        parts = urllib.parse.urlsplit(url)
+        rng = random.Random(url)
+        legal = parts.path.startswith("/normativa")
+        slug = parts.path.strip("/").replace("/", "-") or "inicio"
+        links = []
+        sections = NOISE_SECTIONS + LEGAL_SECTIONS
+        for i in range(self.fanout):
+            label = sections[i % len(sections)] if not legal else rng.choice(LEGAL_SECTIONS + NOISE_SECTIONS[:2])
+            kind = "normativa" if label in LEGAL_SECTIONS else "contenido"
+            host = parts.netloc if rng.random() < 0.8 else rng.choice(HOSTS)
+            links.append((f"https://{host}/{kind}/{slug}-{i}", label))
+        titles = LEGAL_DOCS if legal else NOISE_DOCS
+        for i in range(self.docs):
+            title = f"{rng.choice(titles)} {rng.randrange(1, 999)}"
+            links.append((f"https://{parts.netloc}/documents/{slug}-{i}.pdf", title))
+        return "".join(f'<a href="{href}">{text}</a>' for href, text in links)
+
+
+class Response:
+    def __init__(self, text):
+        self.status_code = 200
+        self.text = text
+
+
+class Session:
+    def __init__(self, site):
+        self.site = site
+
+    def get(self, url, **kwargs):
+        return Response(self.site.page(url))
+
+
+def crawl(frontier, pages, depth, site):
+    with tempfile.TemporaryDirectory() as tmp:
+        registry = ResourceRegistry(store=LocalStore(tmp))
+        registry.session = Session(site)
+        registry.frontier = frontier
+        registry.discover_resources([f"https://{host}/" for host in HOSTS], max_depth=depth, max_pages=pages)
+    scores = [r['quality_score'] for r in registry.resources]
+    return len(scores), sum(s >= MIN_QUALITY_SCORE for s in scores), sum(scores) / max(len(scores), 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=200, help="page budget (max_pages)")
+    parser.add_argument("--depth", type=int, default=4)
+    parser.add_argument("--fanout", type=int, default=8)
+    args = parser.parse_args()
+
+    site = SyntheticPortals(fanout=args.fanout)
+    results = {}
+    for name, frontier in (("fifo", MemoryFrontier()), ("best-first", PriorityFrontier())):
+        results[name] = crawl(frontier, args.pages, args.depth, site)
+    print(f"\n{'frontier':12} {'pdfs':>6} {'high-quality':>13} {'mean score':>11}")
+    for name, (found, high, mean) in results.items():
+        print(f"{name:12} {found:6d} {high:13d} {mean:11.2f}")
+    fifo, best = results["fifo"][1], results["best-first"][1]
+    print(f"\nHigh-quality (>= {MIN_QUALITY_SCORE}) documents in {args.pages} pages: "
+          f"{fifo} -> {best} ({best / max(fifo, 1):.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""Pages/sec of a distributed MegaSpider crawl with 1, 2, 4... worker processes.
+
+Serves one local "host" (one port each) per institution host in
+config/master_sources.yaml, each a link tree answering after `--delay`
+seconds, and runs N worker processes sharing one coordinator file. Every worker keeps the
+production per-host politeness (`--rate` requests/s per host), so throughput
+should grow with the workers until the hosts' combined rate is the limit.
+
+    python3 scripts/bench_distributed_crawl.py --workers 1 2 4 --pages 2000
+"""
+import argparse
+import asyncio
+import multiprocessing
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src" / "data_collection"))
+from mega_spider import PER_HOST_CONNECTIONS, MegaSpider, load_source_urls  # noqa: E402
+from src.utils.crawl_coordinator import CrawlCoordinator  # noqa: E402
+from src.utils.object_store import LocalStore  # noqa: E402
+from src.utils.politeness import PolitenessScheduler  # noqa: E402
+
+FANOUT = 6
+
+
+def serve(ports, delay):
+    """Each port is a tree of FANOUT links per page, within the same host."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == '/robots.txt':
+                self.send_error(404)
+                return
+            time.sleep(delay)
+            node = int(self.path.rsplit('/', 1)[-1])
+            links = "".join(f'<a href="/normativa/{node * FANOUT + i + 1}">Reglamento {node * FANOUT + i + 1}</a>'
+                            for i in range(FANOUT))
+            body = f"<html><body>{links}</body></html>".encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    servers = []
+    for port in ports:
+        server = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+    return servers
+
+
+class LocalSpider(MegaSpider):
+    def is_valid_domain(self, url):
+        return url.startswith('http://127.0.0.1')
+
+
+def crawl(path, seeds, pages, concurrency, rate, results):
+    coordinator = CrawlCoordinator(path, lease_ttl=3.0).start()
+    politeness = PolitenessScheduler(rate=rate, burst=rate, max_concurrency=PER_HOST_CONNECTIONS)
+    spider = LocalSpider(seed_urls=seeds, max_pages=pages, workers=concurrency, politeness=politeness,
+                         store=LocalStore(Path(path).parent / "store"), coordinator=coordinator)
+    spider.url_queue.extend((url, 0) for url in seeds)
+    asyncio.run(spider.crawl_async())
+    spider.url_queue.close()
+    coordinator.stop()
+    results.put(spider.pages_crawled)
+
+
+def measure(workers, seeds, pages, concurrency, rate):
+    context = multiprocessing.get_context("fork")
+    results = context.Queue()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "crawl.sqlite"
+        CrawlCoordinator(path).close()  # create the schema before the workers race for it
+        processes = [context.Process(target=crawl, args=(path, seeds, pages // workers, concurrency, rate, results))
+                     for _ in range(workers)]
+        start = time.perf_counter()
+        for process in processes:
+            process.start()
+        crawled = sum(results.get() for _ in processes)
+        elapsed = time.perf_counter() - start
+        for process in processes:
+            process.join()
+    return crawled, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--pages', type=int, default=2000, help="total page budget, split between the workers")
+    parser.add_argument('--concurrency', type=int, default=10, help="requests in flight per worker")
+    parser.add_argument('--delay', type=float, default=0.2, help="response time of every host (s)")
+    parser.add_argument('--rate', type=float, default=4.0, help="per-host requests/s allowed by the politeness scheduler")
+    parser.add_argument('--base-port', type=int, default=19800)
+    args = parser.parse_args()
+
+    hosts = sorted({urllib.parse.urlsplit(url).netloc for url in load_source_urls()})
+    ports = [args.base_port + i for i in range(len(hosts))]
+    servers = serve(ports, args.delay)
+    print(f"{len(hosts)} institution hosts from master_sources.yaml, {args.delay}s per response")
+    try:
+        baseline = None
+        for workers in args.workers:
+            seeds = [f"http://127.0.0.1:{port}/normativa/0" for port in ports]
+            pages, elapsed = measure(workers, seeds, args.pages, args.concurrency, args.rate)
+            rate = pages / elapsed
+            baseline = baseline or rate / workers
+            print(f"{workers:>3} workers: {pages} pages in {elapsed:.2f}s = {rate:.1f} pages/s "
+                  f"({rate / baseline / workers:.0%} of linear)")
+    finally:
+        for server in servers:
+            server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""Links scored per second on one core: per-keyword ``in`` loops vs src.utils.keywords.
+
+"Before" is the scoring the spiders did until the keyword tables were compiled:
+ResourceRegistry's quality score and category, and MegaSpider's legal-content check,
+each scanning the link once per keyword. "After" is the same decisions made by
+the current code, with pyahocorasick's automaton when it is installed and with
+the regex backend. All are checked to agree on every link.
+
+Links come from saved portal HTML snapshots (files or directories of *.html),
+or from a synthetic mix of normative and noise links.
+
+    python3 scripts/bench_keyword_matching.py rag/discovery/out_cdp --repeat 5
+"""
+import argparse
+import random
+import sys
+import tempfile
+import time
+import urllib.parse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src" / "data_collection"))
+import mega_spider  # noqa: E402
+from mega_spider import MegaSpider  # noqa: E402
+from resource_registry import ResourceRegistry  # noqa: E402
+from src.utils import keywords, legal_terms  # noqa: E402
+from src.utils.keywords import KeywordMatcher  # noqa: E402
+from src.utils.legal_terms import (  # noqa: E402
+    AUTHORITATIVE_DOMAINS, CATEGORY_KEYWORDS, DEFAULT_CATEGORY, HIGH_VALUE_KEYWORDS, LEGAL_KEYWORDS,
+    LOW_VALUE_KEYWORDS,
+)
+from src.utils.links import iter_links  # noqa: E402
+from src.utils.object_store import LocalStore  # noqa: E402
+
+TITLES = [
+    "Resolución No. NAC-DGERCGC{n:05d} Reforma al Reglamento", "Código Orgánico Integral Penal",
+    "Ley Orgánica de Contratación Pública", "Acuerdo Ministerial MDT-2023-{n:03d}", "Noticias",
+    "Galería de fotos del evento {n}", "Informe de gestión {n}", "Presupuesto institucional {n}",
+    "Cronograma de capacitaciones", "Formulario de solicitud {n}", "Boletín de prensa {n}",
+]
+HOSTS = ["www.sri.gob.ec", "www.trabajo.gob.ec", "www.turismo.gob.ec", "www.cultura.gob.ec", "www.iess.gob.ec"]
+
+
+def synthetic_links(count):
+    rng = random.Random(0)
+    links = []
+    for n in range(count):
+        title = rng.choice(TITLES).format(n=n)
+        slug = "_".join(title.split()[:3])
+        links.append((f"https://{rng.choice(HOSTS)}/documents/10184/{n}/{slug}.pdf?version=1.{n % 7}", title))
+    return links
+
+
+def snapshot_links(paths):
+    links = []
+    for path in map(Path, paths):
+        for page in sorted(path.rglob("*.html")) if path.is_dir() else [path]:
+            base = f"https://{page.stem}/"
+            html = page.read_text(encoding="utf-8", errors="replace")
+            links.extend((urllib.parse.urljoin(base, href), text) for href, text in iter_links(html))
+    return links
+
+
+def score_before(url, title, domain):
+    score = 0.3
+    combined_text = (url + ' ' + title).lower()
+    for keyword, boost in HIGH_VALUE_KEYWORDS.items():
+        if keyword in combined_text:
+            score += boost * 0.1
+    for keyword, penalty in LOW_VALUE_KEYWORDS.items():
+        if keyword in combined_text:
+            score += penalty * 0.1
+    for auth_domain, boost in AUTHORITATIVE_DOMAINS.items():
+        if auth_domain in domain:
+            score += boost * 0.15
+            break
+    return max(0, min(1, score))
+
+
+def categorize_before(url, title):
+    combined = (url + ' ' + title).lower()
+    for category, table in CATEGORY_KEYWORDS:
+        if any(k in combined for k in table):
+            return category
+    return DEFAULT_CATEGORY
+
+
+def legal_before(url, text):
+    combined = (url + ' ' + text).lower()
+    return any(kw in combined for kw in LEGAL_KEYWORDS)
+
+
+def before(links):
+    return [
+        (round(score_before(url, title, domain), 2), categorize_before(url, title), legal_before(url, title))
+        for url, title, domain in links
+    ]
+
+
+def after(registry, spider):
+    def run(links):
+        results = []
+        for url, title, domain in links:
+            terms = legal_terms.find_terms(url, title)
+            results.append((
+                round(registry.calculate_quality_score(url, title, domain, terms), 2),
+                registry.categorize_resource(url, title, terms),
+                spider.is_legal_content(url, title),
+            ))
+        return results
+    return run
+
+
+def best_time(run, links, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = run(links)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("snapshots", nargs="*", help="HTML files or directories (default: synthetic links)")
+    parser.add_argument("--links", type=int, default=20000, help="number of synthetic links")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    pairs = snapshot_links(args.snapshots) or synthetic_links(args.links)
+    links = [(url, title, urllib.parse.urlsplit(url).netloc) for url, title in pairs]
+    store = LocalStore(Path(tempfile.mkdtemp()))
+    registry, spider = ResourceRegistry(store=store), MegaSpider(store=store)
+
+    old_time, old = best_time(before, links, args.repeat)
+    print(f"{len(links)} links, best of {args.repeat}, one core")
+    print(f"  {'before':18} {len(links) / old_time:10,.0f} links/s")
+    backends = [("after (automaton)", True)] if keywords.ahocorasick is not None else []
+    for name, automaton in backends + [("after (regex)", False)]:
+        legal_terms.TERMS = KeywordMatcher(legal_terms.TERMS.keywords, automaton=automaton)
+        mega_spider.LEGAL = KeywordMatcher(legal_terms.LEGAL.keywords, automaton=automaton)
+        new_time, new = best_time(after(registry, spider), links, args.repeat)
+        mismatches = sum(a != b for a, b in zip(old, new))
+        print(f"  {name:18} {len(links) / new_time:10,.0f} links/s  {old_time / new_time:4.1f}x"
+              f"  ({mismatches} mismatching decisions)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""Link extraction time per page: BeautifulSoup(html.parser) vs src.utils.links.
+
+Runs over saved portal HTML snapshots (files or directories of *.html, e.g. the
+CDP captures under rag/discovery/out_cdp); without any, over a synthetic
+Liferay-style listing page of the size the .gob.ec portals serve.
+
+    python3 scripts/bench_link_extraction.py rag/discovery/out_cdp --repeat 5
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+from bs4 import BeautifulSoup
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from src.utils.links import iter_links  # noqa: E402
+
+
+def synthetic_portal(rows=3000):
+    nav = "".join(f'<li><a href="/web/guest/seccion-{i}">Sección {i}</a></li>' for i in range(150))
+    body = "".join(
+        f'<tr><td>{i}</td><td><a href="/documents/10184/{i}/Resolucion_{i}.pdf?version=1.{i % 7}">'
+        f'Resolución No. NAC-DGERCGC{i:05d} <span class="fecha">2023-0{i % 9 + 1}-1{i % 9}</span></a></td>'
+        f'<td>Reforma al reglamento de aplicación de la Ley de Régimen Tributario Interno</td></tr>'
+        for i in range(rows)
+    )
+    script = "<script>var portlet = {" + ",".join(f'"p{i}": "{i}"' for i in range(500)) + "};</script>"
+    return (
+        f'<!DOCTYPE html><html><head><meta charset="utf-8"><title>Normativa</title>{script}</head>'
+        f'<body><nav><ul>{nav}</ul></nav><table class="taglib-search-iterator">{body}</table></body></html>'
+    )
+
+
+def load_snapshots(paths):
+    pages = []
+    for path in map(Path, paths):
+        files = sorted(path.rglob("*.html")) if path.is_dir() else [path]
+        pages.extend((str(f), f.read_text(encoding="utf-8", errors="replace")) for f in files)
+    return pages
+
+
+def with_soup(html):
+    soup = BeautifulSoup(html, "html.parser")
+    return [(a.get("href", "").strip(), a.get_text().strip()) for a in soup.find_all("a", href=True)]
+
+
+def with_lxml(html):
+    return list(iter_links(html))
+
+
+def best_time(extract, html, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = extract(html)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("snapshots", nargs="*", help="HTML files or directories (default: a synthetic portal page)")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    pages = load_snapshots(args.snapshots) or [("synthetic portal", synthetic_portal())]
+    total_soup = total_lxml = 0.0
+    print(f"{'page':40} {'KB':>7} {'links':>6} {'soup ms':>9} {'lxml ms':>9} {'speedup':>8}")
+    for name, html in pages:
+        soup_time, soup_links = best_time(with_soup, html, args.repeat)
+        lxml_time, lxml_links = best_time(with_lxml, html, args.repeat)
+        total_soup += soup_time
+        total_lxml += lxml_time
+        same = [href for href, _ in soup_links] == [href for href, _ in lxml_links]
+        print(
+            f"{name[-40:]:40} {len(html) / 1024:7.0f} {len(lxml_links):6d} {soup_time * 1000:9.1f} "
+            f"{lxml_time * 1000:9.1f} {soup_time / lxml_time:7.1f}x" + ("" if same else "  (hrefs differ)")
+        )
+    print(f"\nTotal: soup {total_soup * 1000:.1f} ms, lxml {total_lxml * 1000:.1f} ms, "
+          f"{total_soup / total_lxml:.1f}x faster")
+
+
+if __name__ == "__main__":
+    main()
@@ -11,14 +11,19 @@ Usage: nohup python3 discover_ecuador_sources.py &
 """
 
 import os
+import sys
 import json
 import time
 import requests
 import hashlib
 from datetime import datetime
+from pathlib import Path
 from typing import Dict, List, Optional
 import re
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))  # repo root, for src.utils
+from src.utils.urls import UrlDeduper
+
 # Configuration
 REGISTRY_FILE = "/Users/macbookpro201916i964gb1tb/Downloads/1x/yachaq/registry/discovered_sources.json"
 LOG_FILE = "/tmp/ecuador_discovery.log"
@@ -200,6 +205,7 @@ def discover_data_endpoints(domain: str) -> List[Dict]:
 def discover_files_on_page(url: str) -> List[Dict]:
     """Find downloadable files on a page"""
     files = []
+    deduper = UrlDeduper()
     try:
         r = requests.get(url, headers=HEADERS, timeout=30)
         if r.status_code != 200:
@@ -213,9 +219,10 @@ def discover_files_on_page(url: str) -> List[Dict]:
         for pattern in patterns:
             matches = re.findall(pattern, r.text, re.I)
             for match in matches:
-                file_url = match[0]
-                if not file_url.startswith("http"):
-                    file_url = url.rstrip("/") + "/" + file_url.lstrip("/")
+                # Resolve like a browser would and skip other spellings of the same file
+                file_url = deduper.add(match[0], url)
+                if not file_url:
+                    continue
                 
                 files.append({
                     "url": file_url,
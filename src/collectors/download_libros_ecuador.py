@@ -12,14 +12,17 @@ Sources:
 """
 
 import os
+import sys
 import json
 import time
 import requests
 from datetime import datetime
-import subprocess
+from pathlib import Path
 import re
 
-S3_BUCKET = "s3://yachaq-lex-raw-0017472631"
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))  # repo root, for src.utils
+from src.utils.object_store import open_store
+
 S3_PREFIX = "libros_ecuador"
 LOCAL_TEMP = "/tmp/libros_ecuador"
 LOG_FILE = "/tmp/libros_ecuador_download.log"
@@ -126,27 +129,27 @@ def download_archive_text(identifier):
         log(f"Archive download error: {e}")
     return None
 
-def save_to_s3(content, filename, metadata):
-    """Save content to S3 with metadata"""
-    local_path = os.path.join(LOCAL_TEMP, filename)
-    s3_path = f"{S3_BUCKET}/{S3_PREFIX}/{filename}"
+def save_to_s3(content, filename, metadata, store=None):
+    """Save content to the object store with metadata"""
+    store = store or open_store()
+    key = f"{S3_PREFIX}/{filename}"
     
-    # Save with metadata header
-    with open(local_path, 'w', encoding='utf-8') as f:
-        f.write(f"# METADATA\n")
-        f.write(f"# Title: {metadata.get('title', 'Unknown')}\n")
-        f.write(f"# Author: {metadata.get('author', 'Unknown')}\n")
-        f.write(f"# Source: {metadata.get('source', 'Unknown')}\n")
-        f.write(f"# License: Public Domain\n")
-        f.write(f"# Collected: {datetime.now().isoformat()}\n")
-        f.write(f"# ---\n\n")
-        f.write(content)
+    # Metadata header, streamed ahead of the text without building a local copy
+    header = (
+        f"# METADATA\n"
+        f"# Title: {metadata.get('title', 'Unknown')}\n"
+        f"# Author: {metadata.get('author', 'Unknown')}\n"
+        f"# Source: {metadata.get('source', 'Unknown')}\n"
+        f"# License: Public Domain\n"
+        f"# Collected: {datetime.now().isoformat()}\n"
+        f"# ---\n\n"
+    ).encode('utf-8')
+    body = content.encode('utf-8')
     
-    size = os.path.getsize(local_path)
+    size = len(header) + len(body)
     log(f"  Saving: {filename} ({size/1024:.1f} KB)")
     
-    subprocess.run(["aws", "s3", "cp", local_path, s3_path], check=True)
-    os.remove(local_path)
+    store.put(key, [header, body], content_type="text/plain; charset=utf-8")
     return True
 
 def main():
@@ -156,6 +159,7 @@ def main():
     log("=" * 60)
     
     collected = 0
+    store = open_store()
     
     # Search for Ecuadorian authors on Gutenberg
     log("\n=== PROJECT GUTENBERG ===")
@@ -174,7 +178,7 @@ def main():
                     "title": title,
                     "author": author,
                     "source": "Project Gutenberg"
-                })
+                }, store)
                 collected += 1
             time.sleep(1)
     
@@ -203,7 +207,7 @@ def main():
                     "title": title,
                     "author": doc.get("creator", "Unknown"),
                     "source": "Internet Archive"
-                })
+                }, store)
                 collected += 1
             time.sleep(1)
     
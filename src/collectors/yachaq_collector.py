@@ -9,7 +9,7 @@ Features:
 - Automatic logging of all sources
 - Data quality validation
 - Ecuador data protection compliance
-- S3 upload with metadata
+- Object-store upload (S3 or a local directory) with metadata
 
 Usage:
     from yachaq_collector import YachaqCollector
@@ -20,19 +20,23 @@ Usage:
 """
 
 import os
+import sys
 import json
 import hashlib
 import logging
 from datetime import datetime
+from pathlib import Path
 from typing import Dict, List, Optional, Any
 from dataclasses import dataclass, asdict
 from abc import ABC, abstractmethod
-import subprocess
 import requests
 import re
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))  # repo root, for src.utils
+from src.utils.keywords import KeywordMatcher
+from src.utils.object_store import ObjectStore, open_store
+
 # Configuration
-S3_BUCKET = "s3://yachaq-lex-raw-0017472631"
 REGISTRY_PATH = "/Users/macbookpro201916i964gb1tb/Downloads/1x/yachaq/registry"
 LOGS_PATH = "/Users/macbookpro201916i964gb1tb/Downloads/1x/yachaq/logs"
 
@@ -93,6 +97,7 @@ class DataValidator:
         '.gob.ec', '.gov.ec', '.edu.ec', 
         'datosabiertos.gob.ec', 'wikipedia.org'
     ]
+    GOV_DOMAIN_MATCHER = KeywordMatcher(GOV_DOMAINS)
     
     @classmethod
     def check_pii(cls, text: str) -> bool:
@@ -105,7 +110,7 @@ class DataValidator:
     @classmethod
     def is_government_source(cls, url: str) -> bool:
         """Check if URL is from government domain"""
-        return any(domain in url.lower() for domain in cls.GOV_DOMAINS)
+        return cls.GOV_DOMAIN_MATCHER.search(url.lower()) is not None
     
     @classmethod
     def validate_data_protection(cls, url: str, content: str) -> DataProtectionCheck:
@@ -187,8 +192,9 @@ class SourceRegistry:
 class BaseCollector(ABC):
     """Base class for all collectors"""
     
-    def __init__(self, registry: SourceRegistry):
+    def __init__(self, registry: SourceRegistry, store: Optional[ObjectStore] = None):
         self.registry = registry
+        self.store = store or open_store()
         self.headers = {
             "User-Agent": "YachaqLLM/1.0 (Educational; https://yachaq.ec)"
         }
@@ -202,24 +208,15 @@ class BaseCollector(ABC):
         """Generate unique source ID"""
         return hashlib.md5(url.encode()).hexdigest()[:12]
     
-    def _upload_to_s3(self, content: str, s3_path: str) -> bool:
-        """Upload content to S3"""
-        import tempfile
-        
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False) as f:
-            if isinstance(content, str):
-                f.write(content)
-            else:
-                json.dump(content, f, ensure_ascii=False)
-            temp_path = f.name
+    def _upload(self, content: str, key: str) -> bool:
+        """Upload content to the object store"""
+        if not isinstance(content, str):
+            content = json.dumps(content, ensure_ascii=False)
+        content_type = "application/json" if key.endswith(".json") else "text/plain; charset=utf-8"
         
         try:
-            result = subprocess.run(
-                ["aws", "s3", "cp", temp_path, s3_path],
-                capture_output=True, text=True
-            )
-            os.unlink(temp_path)
-            return result.returncode == 0
+            self.store.put(key, content, content_type=content_type)
+            return True
         except Exception as e:
             logger.error(f"S3 upload failed: {e}")
             return False
@@ -253,8 +250,8 @@ class APICollector(BaseCollector):
                 logger.warning(f"Low quality score ({quality}) for {url}")
             
             # Upload to S3
-            s3_path = f"{S3_BUCKET}/yachaq/{category}/{source_id}.json"
-            if self._upload_to_s3(content, s3_path):
+            key = f"yachaq/{category}/{source_id}.json"
+            if self._upload(content, key):
                 # Register source
                 source = DataSource(
                     source_id=source_id,
@@ -265,7 +262,7 @@ class APICollector(BaseCollector):
                     license="Public Domain / CC BY 4.0",
                     is_public=True,
                     collected_at=datetime.now().isoformat(),
-                    s3_path=s3_path,
+                    s3_path=self.store.uri(key),
                     size_bytes=len(content),
                     record_count=len(data) if isinstance(data, list) else 1,
                     quality_score=quality,
@@ -310,8 +307,8 @@ class WebCollector(BaseCollector):
                 return None
             
             # Upload to S3
-            s3_path = f"{S3_BUCKET}/yachaq/{category}/{source_id}.txt"
-            if self._upload_to_s3(text, s3_path):
+            key = f"yachaq/{category}/{source_id}.txt"
+            if self._upload(text, key):
                 source = DataSource(
                     source_id=source_id,
                     source_type="web",
@@ -321,7 +318,7 @@ class WebCollector(BaseCollector):
                     license="Public Domain",
                     is_public=True,
                     collected_at=datetime.now().isoformat(),
-                    s3_path=s3_path,
+                    s3_path=self.store.uri(key),
                     size_bytes=len(text),
                     record_count=1,
                     quality_score=quality,
@@ -340,10 +337,11 @@ class WebCollector(BaseCollector):
 class YachaqCollector:
     """Main Yachaq data collection orchestrator"""
     
-    def __init__(self):
+    def __init__(self, store: Optional[ObjectStore] = None):
         self.registry = SourceRegistry()
-        self.api_collector = APICollector(self.registry)
-        self.web_collector = WebCollector(self.registry)
+        self.store = store or open_store()
+        self.api_collector = APICollector(self.registry, self.store)
+        self.web_collector = WebCollector(self.registry, self.store)
         logger.info("YachaqCollector initialized")
     
     def collect_from_api(self, url: str, **kwargs) -> Optional[str]:
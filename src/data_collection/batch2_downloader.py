@@ -4,10 +4,16 @@ BATCH 2 - More Verified Documents → S3
 =======================================
 """
 
-import subprocess
-import os
+import sys
+from pathlib import Path
 
-S3_BUCKET = "s3://yachaq-lex-raw-0017472631"
+import requests
+import urllib3
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))  # repo root, for src.utils
+from src.utils.content_store import ContentStore
+from src.utils.http_cache import HttpCache
+from src.utils.object_store import open_store
 
 # New verified documents
 DOCS = [
@@ -27,41 +33,52 @@ DOCS = [
     ("LOPPM", "https://www.gob.ec/sites/default/files/regulations/2020-03/CONSTITUCION_2008.pdf", "asamblea/constitucion_gob_ec.pdf"),
 ]
 
-def download_upload(name, url, s3_path):
+def download_upload(name, url, s3_path, http_cache, content_store):
     print(f"\n📥 {name}")
     
-    # Test URL
-    test = subprocess.run(['curl', '-sI', '--max-time', '10', url], capture_output=True, text=True)
-    if '200' not in test.stdout and '302' not in test.stdout:
-        print(f"   ❌ URL not accessible")
+    # Conditional GET (redirects followed); unchanged documents are not re-uploaded
+    try:
+        fetched = http_cache.fetch(requests, url, timeout=60, verify=False)
+    except requests.RequestException:
+        print("   ❌ URL not accessible")
+        return False
+    if fetched.unchanged:
+        print(f"   ⏭️ Unchanged: {s3_path}")
+        return True
+    if not fetched.changed:
+        print("   ❌ URL not accessible")
         return False
     
-    # Download
-    tmp = f"/tmp/{name.replace(' ', '_')}.pdf"
-    subprocess.run(['curl', '-sL', '--max-time', '60', '-o', tmp, url], capture_output=True)
-    
-    if not os.path.exists(tmp) or os.path.getsize(tmp) < 1000:
-        print(f"   ❌ Download failed")
+    if len(fetched.content) < 1000:
+        print("   ❌ Download failed")
         return False
     
-    print(f"   ✓ Downloaded: {os.path.getsize(tmp)//1024} KB")
+    print(f"   ✓ Downloaded: {len(fetched.content)//1024} KB")
     
-    # Upload
-    result = subprocess.run(['aws', 's3', 'cp', tmp, f"{S3_BUCKET}/{s3_path}", '--region', 'us-east-1'], capture_output=True)
-    os.unlink(tmp)
+    # Upload (skipped when the same bytes came from another URL)
+    try:
+        blob = content_store.put(url, fetched.content, content_type='application/pdf', name=s3_path,
+                                 sha256=fetched.sha256)
+    except Exception:
+        return False
     
-    if result.returncode == 0:
-        print(f"   ✅ Uploaded: {s3_path}")
-        return True
-    return False
+    http_cache.store(fetched)
+    print(f"   ✅ Uploaded: {s3_path}" if blob.created else f"   🔗 Already stored: {s3_path}")
+    return True
 
 def main():
     print("=" * 60)
     print("  📋 BATCH 2 - More Documents → S3")
     print("=" * 60)
     
-    success = sum(1 for d in DOCS if download_upload(*d))
+    store = open_store()
+    http_cache = HttpCache(namespace=store.uri())
+    content_store = ContentStore(store)
+    success = sum(1 for d in DOCS if download_upload(*d, http_cache, content_store))
+    http_cache.close()
+    content_store.close()
     print(f"\n✅ Uploaded: {success}/{len(DOCS)}")
 
 if __name__ == "__main__":
+    urllib3.disable_warnings()
     main()
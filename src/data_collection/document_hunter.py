@@ -8,28 +8,37 @@ A smart, autonomous crawler that:
 3. Validates and downloads PDFs
 4. Uploads directly to S3
 
-Uses: requests, BeautifulSoup, concurrent downloads
+Uses: requests, lxml link extraction, concurrent downloads
 """
 
-import os
 import re
+import sys
 import hashlib
+import importlib.util
 import subprocess
-import tempfile
 import urllib.parse
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from collections import defaultdict
+from pathlib import Path
 
 try:
     import requests
-    from bs4 import BeautifulSoup
 except ImportError:
-    subprocess.run(['pip3', 'install', 'requests', 'beautifulsoup4', '-q'])
+    subprocess.run(['pip3', 'install', 'requests', '-q'])
     import requests
-    from bs4 import BeautifulSoup
+if importlib.util.find_spec('lxml') is None:  # src.utils.links parses with lxml
+    subprocess.run(['pip3', 'install', 'lxml', '-q'])
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))  # repo root, for src.utils
+from src.utils.content_store import ContentStore
+from src.utils.http_cache import HttpCache
+from src.utils.links import iter_links
+from src.utils.object_store import open_store
+from src.utils.politeness import PoliteSession
+from src.utils.pdf_probe import PdfProbe, RejectedDocument
+from src.utils.range_download import RangeDownloader
 
 # Configuration
-S3_BUCKET = "s3://yachaq-lex-raw-0017472631"
 MAX_WORKERS = 5
 TIMEOUT = 30
 
@@ -95,8 +104,9 @@ VERIFIED_URLS = {
 }
 
 class DocumentHunter:
-    def __init__(self):
-        self.session = requests.Session()
+    def __init__(self, http_cache=None, store=None, content_store=None, politeness=None):
+        # Per-host rate limits, 429/503 backoff and robots.txt for every request
+        self.session = PoliteSession(requests.Session(), politeness)
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,application/pdf,*/*;q=0.8',
@@ -104,7 +114,15 @@ class DocumentHunter:
         })
         self.downloaded = set()
         self.failed = []
+        self.rejected = {}  # url -> why it was not a usable PDF
         self.stats = defaultdict(int)
+        self.store = store or open_store()
+        self.http_cache = http_cache or HttpCache(namespace=self.store.uri())
+        self.content_store = content_store or ContentStore(self.store)
+        # Big codes come in parallel byte ranges and resume where a timeout left them;
+        # HTML error pages and oversized files are dropped after the first chunk
+        self.probe = PdfProbe()
+        self.downloader = RangeDownloader(http_cache=self.http_cache, probe=self.probe)
     
     def is_valid_pdf(self, content):
         """Check if content is a valid PDF"""
@@ -114,38 +132,45 @@ class DocumentHunter:
         """Download a URL and upload to S3 if valid PDF"""
         try:
             print(f"   📥 Downloading: {url[:60]}...")
-            response = self.session.get(url, timeout=TIMEOUT, verify=False, stream=True)
+            fetched = self.downloader.fetch(self.session, url, timeout=TIMEOUT, verify=False)
             
-            if response.status_code == 200:
-                content = response.content
-                
-                if self.is_valid_pdf(content):
-                    # Save temp and upload
-                    with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as tmp:
-                        tmp.write(content)
-                        tmp_path = tmp.name
-                    
-                    size_kb = len(content) / 1024
+            if fetched.unchanged:
+                print(f"   ⏭️ Unchanged since last upload: {s3_path}")
+                self.downloaded.add(doc_name)
+                self.stats["unchanged"] += 1
+                return True
+            
+            if fetched.changed:
+                if self.is_valid_pdf(fetched.head(4)):
+                    size_kb = fetched.size / 1024
                     print(f"   ✓ Valid PDF ({size_kb:.0f} KB)")
                     
-                    # Upload to S3
-                    full_s3_path = f"{S3_BUCKET}/{s3_path}"
-                    result = subprocess.run(
-                        ['aws', 's3', 'cp', tmp_path, full_s3_path, '--region', 'us-east-1'],
-                        capture_output=True, text=True
-                    )
-                    os.unlink(tmp_path)
-                    
-                    if result.returncode == 0:
-                        print(f"   ✅ S3: {s3_path}")
-                        self.downloaded.add(doc_name)
+                    # Upload straight from memory or the downloaded file, once per distinct content
+                    try:
+                        blob = self.content_store.put(url, fetched.body(), content_type='application/pdf',
+                                                      name=s3_path, sha256=fetched.sha256)
+                    finally:
+                        fetched.discard()
+                    self.http_cache.store(fetched)
+                    self.downloaded.add(doc_name)
+                    if blob.created:
+                        print(f"   ✅ S3: {s3_path} -> {blob.sha256[:12]}")
                         self.stats["uploaded"] += 1
-                        return True
+                    else:
+                        print(f"   🔗 Same content already stored as {blob.sha256[:12]}")
+                        self.stats["duplicate"] += 1
+                    return True
                 else:
+                    fetched.discard()
                     print(f"   ⚠️ Not a PDF (HTML page or error)")
             else:
-                print(f"   ❌ HTTP {response.status_code}")
+                print(f"   ❌ HTTP {fetched.status}")
                 
+        except RejectedDocument as e:
+            self.rejected[url] = e.rejection.record()
+            self.stats["rejected"] += 1
+            print(f"   ⚠️ Not a PDF: {e.rejection}")
+            return False
         except Exception as e:
             print(f"   ❌ Error: {str(e)[:40]}")
         
@@ -160,13 +185,10 @@ class DocumentHunter:
             if response.status_code != 200:
                 return []
             
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
             # Find all PDF links
             pdf_links = []
-            for link in soup.find_all('a', href=True):
-                href = link.get('href', '')
-                text = link.get_text().lower()
+            for href, text in iter_links(response.text):
+                text = text.lower()
                 
                 # Check if it's a PDF or looks like a legal document
                 if '.pdf' in href.lower() or any(kw in text for kw in ['ley', 'código', 'reglamento', 'resolución']):
@@ -220,6 +242,9 @@ class DocumentHunter:
         print("  📊 HUNT COMPLETE")
         print("=" * 70)
         print(f"  ✅ Uploaded: {self.stats['uploaded']}")
+        print(f"  ⏭️ Unchanged: {self.stats['unchanged']}")
+        print(f"  🔗 Already stored from another URL: {self.stats['duplicate']}")
+        print(f"  ⚠️ Rejected (not a PDF or too large): {self.stats['rejected']}")
         print(f"  ❌ Failed: {self.stats['failed']}")
         print(f"\n  📂 Documents in S3:")
         for doc in self.downloaded:
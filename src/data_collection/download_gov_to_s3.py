@@ -5,13 +5,15 @@ GOVERNMENT DATA DOWNLOADER → S3
 Downloads documents from Ecuador government sources directly to S3.
 """
 
-import subprocess
-import os
-import tempfile
+import sys
 import requests
+from pathlib import Path
 from urllib.parse import urljoin
 
-S3_BUCKET = "s3://yachaq-lex-raw-0017472631"
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))  # repo root, for src.utils
+from src.utils.content_store import ContentStore
+from src.utils.http_cache import HttpCache
+from src.utils.object_store import open_store
 
 # Known PDF URLs from official sources
 DOCUMENTS = [
@@ -89,41 +91,33 @@ DOCUMENTS = [
     },
 ]
 
-def download_and_upload(doc):
-    """Download PDF and upload to S3"""
+def download_and_upload(doc, http_cache, content_store):
+    """Download PDF and upload to S3, skipping documents unchanged since the last upload"""
     print(f"\n📥 Downloading: {doc['name']}")
     print(f"   From: {doc['url'][:60]}...")
     
     try:
-        # Download to temp file
-        response = requests.get(doc['url'], timeout=60, verify=False)
-        response.raise_for_status()
-        
-        with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as tmp:
-            tmp.write(response.content)
-            tmp_path = tmp.name
+        # Conditional GET: a 304 (or an identical body) never reaches S3
+        fetched = http_cache.fetch(requests, doc['url'], timeout=60, verify=False)
+        if fetched.unchanged:
+            print(f"   ⏭️ Unchanged since last upload")
+            return True
+        if not fetched.changed:
+            print(f"   ❌ Download failed: HTTP {fetched.status}")
+            return False
         
-        file_size = len(response.content) / 1024  # KB
+        file_size = len(fetched.content) / 1024  # KB
         print(f"   Size: {file_size:.0f} KB")
         
-        # Upload to S3
-        s3_full_path = f"{S3_BUCKET}/{doc['s3_path']}"
-        print(f"   Uploading to: {s3_full_path}")
-        
-        result = subprocess.run(
-            ['aws', 's3', 'cp', tmp_path, s3_full_path, '--region', 'us-east-1'],
-            capture_output=True, text=True
-        )
-        
-        # Cleanup
-        os.unlink(tmp_path)
-        
-        if result.returncode == 0:
-            print(f"   ✅ SUCCESS")
-            return True
+        # Upload to the object store, unless the same bytes came from another URL
+        blob = content_store.put(doc['url'], fetched.content, content_type='application/pdf',
+                                 name=doc['s3_path'], sha256=fetched.sha256)
+        http_cache.store(fetched)
+        if blob.created:
+            print(f"   ✅ SUCCESS: {content_store.uri(blob.sha256)}")
         else:
-            print(f"   ❌ S3 upload failed: {result.stderr}")
-            return False
+            print(f"   🔗 Already stored as {blob.sha256[:12]}")
+        return True
             
     except requests.exceptions.RequestException as e:
         print(f"   ❌ Download failed: {str(e)[:50]}")
@@ -136,18 +130,23 @@ def main():
     print("=" * 60)
     print("  🏛️ GOVERNMENT DATA DOWNLOADER → S3")
     print("=" * 60)
-    print(f"  Target bucket: {S3_BUCKET}")
+    store = open_store()
+    print(f"  Target store: {store.uri()}")
     print(f"  Documents to download: {len(DOCUMENTS)}")
     print("=" * 60)
     
     success = 0
     failed = 0
+    http_cache = HttpCache(namespace=store.uri())
+    content_store = ContentStore(store)
     
     for doc in DOCUMENTS:
-        if download_and_upload(doc):
+        if download_and_upload(doc, http_cache, content_store):
             success += 1
         else:
             failed += 1
+    http_cache.close()
+    content_store.close()
     
     print("\n" + "=" * 60)
     print("  📊 DOWNLOAD COMPLETE")
@@ -10,13 +10,14 @@ Downloads directly to S3.
 """
 
 import asyncio
-import os
-import subprocess
-import tempfile
+import sys
 import time
+from pathlib import Path
 from playwright.async_api import async_playwright
 
-S3_BUCKET = "s3://yachaq-lex-raw-0017472631"
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))  # repo root, for src.utils
+from src.utils.content_store import ContentStore
+from src.utils.object_store import UploadQueue, open_store
 
 targets = [
     {
@@ -39,7 +40,7 @@ targets = [
     }
 ]
 
-async def scrape_institutional(target):
+async def scrape_institutional(target, uploader):
     name = target["name"]
     url = target["url"]
     s3_prefix = target["s3_prefix"]
@@ -79,8 +80,8 @@ async def scrape_institutional(target):
             found_urls = list(set(found_urls)) # Deduplicate
             print(f"   Found {len(found_urls)} potential PDF documents")
 
-            # Process top 5 to avoid overloading
-            success_count = 0
+            # Process top 5 to avoid overloading; uploads run while the next PDF downloads
+            uploads = []
             for i, pdf_url in enumerate(found_urls[:5]):
                 print(f"   [{i+1}/5] Downloading: {pdf_url.split('/')[-1]}")
                 
@@ -92,26 +93,25 @@ async def scrape_institutional(target):
                         filename = pdf_url.split('/')[-1]
                         if not filename.endswith(".pdf"): filename += ".pdf"
                         
-                        # Save temp
-                        with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as tmp:
-                            tmp.write(content)
-                            tmp_path = tmp.name
-                        
-                        # Upload S3
-                        s3_full_path = f"{S3_BUCKET}/{s3_prefix}{filename}"
-                        res = subprocess.run(['aws', 's3', 'cp', tmp_path, s3_full_path, '--region', 'us-east-1'], capture_output=True)
-                        os.unlink(tmp_path)
-                        
-                        if res.returncode == 0:
-                            print(f"      ✅ S3: {filename}")
-                            success_count += 1
-                        else:
-                            print(f"      ❌ S3 failed")
+                        # Queue S3 upload (stored once per distinct content)
+                        future = uploader.submit(pdf_url, content, content_type="application/pdf",
+                                                 name=f"{s3_prefix}{filename}")
+                        uploads.append((filename, asyncio.wrap_future(future)))
                     else:
                         print(f"      ❌ Download status: {response.status}")
                 except Exception as e:
                     print(f"      ❌ Error: {str(e)[:50]}")
 
+            success_count = 0
+            for filename, upload in uploads:
+                try:
+                    blob = await upload
+                    print(f"      ✅ S3: {filename} -> {blob.sha256[:12]}" if blob.created
+                          else f"      🔗 Already stored: {filename}")
+                    success_count += 1
+                except Exception:
+                    print(f"      ❌ S3 failed: {filename}")
+
             print(f"   ✨ Completed {name}: {success_count} files uploaded")
             await browser.close()
             return success_count
@@ -126,8 +126,11 @@ async def main():
     print("=" * 60)
     
     total_success = 0
-    for target in targets:
-        total_success += await scrape_institutional(target)
+    content_store = ContentStore(open_store())
+    with UploadQueue(content_store) as uploader:
+        for target in targets:
+            total_success += await scrape_institutional(target, uploader)
+    content_store.close()
     
     print("\n" + "=" * 60)
     print(f"  📊 FINAL RESULTS: {total_success} documents added to S3")
@@ -9,39 +9,68 @@ A REAL web scraper that:
 4. Uploads directly to S3
 5. Runs autonomously until complete
 
-Uses: Scrapy-like recursive crawling with BeautifulSoup
+With --coordinator, N copies of this script (on one machine or several sharing
+the file) crawl together: URLs are partitioned by host among the workers, so
+each host is still fetched by one polite worker at a time.
+
+Uses: Scrapy-like recursive crawling with lxml link extraction
 """
 
-import os
 import re
+import sys
+import asyncio
+import argparse
 import hashlib
+import importlib.util
 import subprocess
-import tempfile
 import urllib.parse
 import threading
 import queue
 import time
 from concurrent.futures import ThreadPoolExecutor, as_completed
-from collections import deque
+from collections import Counter
+from pathlib import Path
 
 try:
     import requests
-    from bs4 import BeautifulSoup
 except ImportError:
-    subprocess.run(['pip3', 'install', 'requests', 'beautifulsoup4', '-q'])
+    subprocess.run(['pip3', 'install', 'requests', '-q'])
     import requests
-    from bs4 import BeautifulSoup
+if importlib.util.find_spec('lxml') is None:  # src.utils.links parses with lxml
+    subprocess.run(['pip3', 'install', 'lxml', '-q'])
 
 import warnings
 warnings.filterwarnings('ignore')
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))  # repo root, for src.utils
+from src.utils.crawl_coordinator import CrawlCoordinator
+from src.utils.crawl_engine import AsyncCrawlEngine
+from src.utils.crawl_metrics import CrawlMetrics, MeteredSession, MetricsExporter, busiest_hosts, default_metrics_dir
+from src.utils.content_store import ContentStore
+from src.utils.crawl_state import VISITED, CrawlState, MemoryFrontier
+from src.utils.http_cache import HttpCache
+from src.utils.legal_terms import LEGAL
+from src.utils.links import iter_links
+from src.utils.pdf_probe import PdfProbe, RejectedDocument
+from src.utils.politeness import PoliteSession, PolitenessScheduler, RobotsDisallowed
+from src.utils.range_download import RangeDownloader
+from src.utils.object_store import UploadQueue, open_store
+from src.utils.urls import canonicalize_url
+
 # Configuration
-S3_BUCKET = "s3://yachaq-lex-raw-0017472631"
 MAX_DEPTH = 3
 MAX_PAGES = 500
 MAX_PDFS = 100
 TIMEOUT = 15
 WORKERS = 10
+PER_HOST_CONNECTIONS = 8  # ceiling for the per-host concurrency the politeness scheduler adapts
+REQUESTS_PER_HOST = 4.0  # per-second token-bucket rate per host (robots.txt Crawl-delay lowers it)
+UPLOAD_WORKERS = 4
+MAX_PENDING_UPLOADS = 16  # download workers block once this many uploads are queued
+RANGE_CONNECTIONS = 4  # parallel byte ranges per large PDF
+MAX_PDF_SIZE = 200 * 1024 * 1024  # bigger "PDFs" are rejected from their headers, or cut off
+METRICS_INTERVAL = 10  # seconds between telemetry exports
+MASTER_SOURCES = Path(__file__).resolve().parents[2] / 'config' / 'master_sources.yaml'
 
 # Seed URLs - Starting points for the spider
 SEED_URLS = [
@@ -68,17 +97,29 @@ SEED_URLS = [
     "https://www.salud.gob.ec/normativa/",
 ]
 
-# Keywords that indicate legal/government documents
-LEGAL_KEYWORDS = [
-    'ley', 'codigo', 'código', 'reglamento', 'resolucion', 'resolución',
-    'decreto', 'acuerdo', 'ordenanza', 'normativa', 'constitucion',
-    'constitución', 'reforma', 'losncp', 'lrti', 'copci', 'cootad',
-    'coip', 'lopdp', 'iess', 'sri', 'sercop', 'laboral', 'tributario',
-    'aduanero', 'ambiental', 'civil', 'penal', 'societario'
-]
+
+def load_source_urls(path=MASTER_SOURCES):
+    """Seed URLs (url_principal and url_datos) of the institutions in master_sources.yaml"""
+    import yaml
+    
+    with open(path, encoding='utf-8') as f:
+        sources = yaml.safe_load(f)['sources']
+    urls = []
+    for source in sources:
+        for key in ('url_principal', 'url_datos'):
+            url = canonicalize_url((source.get(key) or '').strip())
+            if url and url not in urls:
+                urls.append(url)
+    return urls
+
 
 class MegaSpider:
-    def __init__(self):
+    def __init__(self, seed_urls=None, max_pages=MAX_PAGES, workers=WORKERS, state_dir=None, http_cache=None,
+                 store=None, content_store=None, politeness=None, metrics_dir=None, coordinator=None):
+        self.seed_urls = [canonicalize_url(url) for url in (seed_urls or SEED_URLS)]
+        self.seed_hosts = {urllib.parse.urlsplit(url).netloc.lower() for url in self.seed_urls}
+        self.max_pages = max_pages
+        self.workers = workers
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 Chrome/120.0.0.0 Safari/537.36',
@@ -86,180 +127,279 @@ class MegaSpider:
             'Accept-Language': 'es-EC,es;q=0.9,en;q=0.8',
         })
         
-        # Crawl state
-        self.visited_urls = set()
-        self.pdf_urls = set()
-        self.downloaded_pdfs = set()
-        self.url_queue = deque()
+        # Crawl state (SQLite-backed and resumable when state_dir is given)
+        self.state = None
+        if state_dir:
+            self.state = CrawlState(Path(state_dir) / 'mega_spider.sqlite')
+            self.visited_urls = self.state.set(VISITED)
+            self.pdf_urls = self.state.set('pdf')
+            self.downloaded_pdfs = self.state.set('downloaded')
+            self.rejected_pdfs = self.state.set('rejected')
+            self.url_queue = self.state.frontier
+        else:
+            self.visited_urls = set()
+            self.pdf_urls = set()
+            self.downloaded_pdfs = set()
+            self.rejected_pdfs = {}
+            self.url_queue = MemoryFrontier()
+        
+        # Distributed crawl: frontier and seen-set are shared with the other workers
+        self.coordinator = coordinator
+        self.pdf_queue = None
+        if coordinator is not None:
+            self.visited_urls = set()  # the shared frontier never hands out a URL twice
+            self.url_queue = coordinator.frontier('page')
+            self.pdf_queue = coordinator.frontier('pdf')
         self.lock = threading.Lock()
         
+        # Per-host rate limits, backoff and robots.txt, shared by both phases and engines
+        self.politeness = politeness or PolitenessScheduler(rate=REQUESTS_PER_HOST,
+                                                            max_concurrency=PER_HOST_CONNECTIONS)
+        # Per-host latency, bytes, statuses and exceptions (exported while the crawl runs)
+        self.metrics = CrawlMetrics()
+        self.metrics_dir = Path(metrics_dir) if metrics_dir else default_metrics_dir()
+        self.polite_session = PoliteSession(MeteredSession(self.session, self.metrics), self.politeness)
+        
+        # Conditional-GET cache shared with the other downloaders, opened on first download
+        self._http_cache = http_cache
+        self.store = store or open_store()
+        # PDFs are stored once per distinct content, whichever URL they came from
+        self._content_store = content_store
+        self._uploader = None
+        # Large PDFs: parallel byte ranges, resumed from disk after a timeout
+        self._downloader = None
+        # HTML error pages, login walls and oversized files are dropped after the first chunk
+        self.probe = PdfProbe(MAX_PDF_SIZE)
+        
         # Stats
-        self.pages_crawled = 0
-        self.pdfs_found = 0
-        self.pdfs_uploaded = 0
+        self.pages_crawled = len(self.visited_urls)
+        self.pdfs_found = len(self.pdf_urls)
+        self.pdfs_uploaded = len(self.downloaded_pdfs)
+        self.pdfs_unchanged = 0
+        self.pdfs_duplicate = 0
+        self.pdfs_rejected = len(self.rejected_pdfs)
         self.errors = 0
+        for name in ('pages_crawled', 'pdfs_found', 'pdfs_uploaded', 'pdfs_rejected', 'errors'):
+            self.metrics.gauge(name, lambda name=name: getattr(self, name))
+        self.metrics.gauge('queue_depth', lambda: len(self.url_queue))
+        self.metrics.per_host('politeness', self.politeness.stats)
+        if coordinator is not None:
+            self.metrics.gauge('partitions_held', lambda: len(coordinator.held))
         
     def is_valid_domain(self, url):
         """Check if URL is from Ecuador government or legal domain"""
         valid_domains = ['.gob.ec', '.gov.ec', '.edu.ec', 'lexis.com.ec', 'fielweb.com', 'oas.org']
+        if urllib.parse.urlsplit(url).netloc.lower() in self.seed_hosts:
+            return True
         return any(domain in url.lower() for domain in valid_domains)
     
     def is_legal_content(self, url, text=''):
         """Check if URL/text contains legal keywords"""
-        combined = (url + ' ' + text).lower()
-        return any(kw in combined for kw in LEGAL_KEYWORDS)
+        return LEGAL.search((url + ' ' + text).lower()) is not None
     
     def normalize_url(self, url, base_url):
-        """Convert relative URL to absolute"""
-        if url.startswith('//'):
-            return 'https:' + url
-        elif url.startswith('/'):
-            parsed = urllib.parse.urlparse(base_url)
-            return f"{parsed.scheme}://{parsed.netloc}{url}"
-        elif not url.startswith('http'):
-            return urllib.parse.urljoin(base_url, url)
-        return url
+        """Convert relative URL to its absolute canonical form (None for non-HTTP links)"""
+        return canonicalize_url(url, base_url)
     
-    def crawl_page(self, url, depth=0):
-        """Crawl a single page, extract links and PDFs"""
+    def claim_page(self, url, depth=0):
+        """Mark a page as visited before fetching it; False if it must be skipped"""
         if depth > MAX_DEPTH:
-            return [], []
-        
-        if url in self.visited_urls:
-            return [], []
+            return False
         
         with self.lock:
+            if url in self.visited_urls:
+                return False
             self.visited_urls.add(url)
             self.pages_crawled += 1
+        return True
+    
+    def count_error(self, url=None, exc=None):
+        with self.lock:
+            self.errors += 1
+    
+    def crawl_page(self, url, depth=0):
+        """Crawl a single page, extract links and PDFs"""
+        if not self.claim_page(url, depth):
+            return [], []
         
         try:
-            response = self.session.get(url, timeout=TIMEOUT, verify=False)
-            if response.status_code != 200:
-                return [], []
+            response = self.polite_session.get(url, timeout=TIMEOUT, verify=False)
+            return self.handle_page(url, response)
+        except RobotsDisallowed:
+            return [], []
+        except Exception as e:
+            self.metrics.error(url, e)
+            self.count_error(url, e)
+            return [], []
+    
+    def handle_page(self, url, response):
+        """Extract links and PDFs from a fetched page (requests or httpx response)"""
+        if response.status_code != 200:
+            return [], []
+        
+        # Check content type
+        content_type = response.headers.get('content-type', '').lower()
+        
+        # If it's a PDF, add to PDF list
+        if 'application/pdf' in content_type or url.lower().endswith('.pdf'):
+            with self.lock:
+                if url not in self.pdf_urls:
+                    self.pdf_urls.add(url)
+                    self.pdfs_found += 1
+                    print(f"   📄 PDF found: {url.split('/')[-1][:50]}")
+            return [], [url]
+        
+        new_links = []
+        new_pdfs = []
+        
+        # Stream anchors out of the page (C parser, no soup tree)
+        for href, text in iter_links(response.text):
+            full_url = self.normalize_url(href, url)
             
-            # Check content type
-            content_type = response.headers.get('content-type', '').lower()
+            # Skip fragments, javascript: links and already visited pages
+            if not full_url or full_url in self.visited_urls:
+                continue
             
-            # If it's a PDF, add to PDF list
-            if 'application/pdf' in content_type or url.lower().endswith('.pdf'):
-                with self.lock:
-                    if url not in self.pdf_urls:
-                        self.pdf_urls.add(url)
+            # Check if it's a PDF
+            if '.pdf' in full_url.lower():
+                if full_url not in self.pdf_urls:
+                    with self.lock:
+                        self.pdf_urls.add(full_url)
                         self.pdfs_found += 1
-                        print(f"   📄 PDF found: {url.split('/')[-1][:50]}")
-                return [], [url]
-            
-            # Parse HTML
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            new_links = []
-            new_pdfs = []
+                    print(f"   📄 PDF: {full_url.split('/')[-1][:50]}")
+                    new_pdfs.append(full_url)
             
-            for link in soup.find_all('a', href=True):
-                href = link.get('href', '').strip()
-                text = link.get_text().strip()
-                
-                if not href or href.startswith('#') or href.startswith('javascript:'):
-                    continue
-                
-                full_url = self.normalize_url(href, url)
-                
-                # Skip already visited
-                if full_url in self.visited_urls:
-                    continue
-                
-                # Check if it's a PDF
-                if '.pdf' in full_url.lower():
-                    if full_url not in self.pdf_urls:
-                        with self.lock:
-                            self.pdf_urls.add(full_url)
-                            self.pdfs_found += 1
-                        print(f"   📄 PDF: {full_url.split('/')[-1][:50]}")
-                        new_pdfs.append(full_url)
-                
-                # Check if we should follow this link
-                elif self.is_valid_domain(full_url):
-                    if self.is_legal_content(full_url, text):
-                        new_links.append(full_url)
-            
-            return new_links, new_pdfs
-            
-        except Exception as e:
-            with self.lock:
-                self.errors += 1
-            return [], []
+            # Check if we should follow this link
+            elif self.is_valid_domain(full_url):
+                if self.is_legal_content(full_url, text):
+                    new_links.append(full_url)
+        
+        return new_links, new_pdfs
+    
+    @property
+    def http_cache(self):
+        with self.lock:
+            if self._http_cache is None:
+                self._http_cache = HttpCache(namespace=self.store.uri())
+            return self._http_cache
+    
+    @property
+    def content_store(self):
+        with self.lock:
+            if self._content_store is None:
+                self._content_store = ContentStore(self.store)
+            return self._content_store
+    
+    @property
+    def uploader(self):
+        content_store = self.content_store
+        with self.lock:
+            if self._uploader is None:
+                self._uploader = UploadQueue(content_store, workers=UPLOAD_WORKERS, max_pending=MAX_PENDING_UPLOADS)
+            return self._uploader
+    
+    @property
+    def downloader(self):
+        http_cache = self.http_cache
+        with self.lock:
+            if self._downloader is None:
+                self._downloader = RangeDownloader(http_cache=http_cache, workers=RANGE_CONNECTIONS,
+                                                   probe=self.probe)
+            return self._downloader
     
     def download_pdf(self, url):
         """Download PDF and upload to S3"""
         try:
-            response = self.session.get(url, timeout=TIMEOUT, verify=False)
-            if response.status_code != 200:
-                return False
-            
-            content = response.content
-            
-            # Validate PDF
-            if content[:4] != b'%PDF':
-                return False
-            
-            # Generate S3 path from URL
-            parsed = urllib.parse.urlparse(url)
-            domain = parsed.netloc.replace('www.', '').replace('.gob.ec', '').replace('.', '_')
-            filename = url.split('/')[-1]
-            if not filename.endswith('.pdf'):
-                filename = hashlib.md5(url.encode()).hexdigest()[:12] + '.pdf'
-            
-            s3_path = f"scraped/{domain}/{filename}"
-            
-            # Save and upload
-            with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as tmp:
-                tmp.write(content)
-                tmp_path = tmp.name
-            
-            result = subprocess.run(
-                ['aws', 's3', 'cp', tmp_path, f"{S3_BUCKET}/{s3_path}", '--region', 'us-east-1'],
-                capture_output=True, text=True
-            )
-            os.unlink(tmp_path)
-            
-            if result.returncode == 0:
-                with self.lock:
-                    self.pdfs_uploaded += 1
-                    self.downloaded_pdfs.add(url)
-                print(f"   ✅ S3: {s3_path}")
-                return True
-            
+            fetched = self.downloader.fetch(self.polite_session, url, timeout=TIMEOUT, verify=False)
+            return self.handle_fetched(url, fetched)
+        except RejectedDocument as e:
+            self.reject_pdf(url, e.rejection)
         except Exception as e:
-            pass
+            self.metrics.error(url, e)
+            self.count_error(url, e)
         
         return False
     
-    def run(self):
-        """Main spider execution"""
-        print("=" * 70)
-        print("  🕷️ YACHAQ MEGA SPIDER - Autonomous Web Crawler")
-        print("=" * 70)
-        print(f"  📍 Seed URLs: {len(SEED_URLS)}")
-        print(f"  🔍 Max Depth: {MAX_DEPTH}")
-        print(f"  📄 Max PDFs: {MAX_PDFS}")
-        print(f"  ⚡ Workers: {WORKERS}")
-        print("=" * 70)
+    def download_failed(self, url, exc):
+        """Async-engine error hook for PDF downloads: record probe rejections, count other failures"""
+        if isinstance(exc, RejectedDocument):
+            self.reject_pdf(url, exc.rejection)
+        else:
+            self.count_error(url, exc)
+    
+    def reject_pdf(self, url, rejection):
+        """Record in the crawl state why a PDF link was not downloaded"""
+        with self.lock:
+            self.rejected_pdfs[url] = rejection.record()
+            self.pdfs_rejected += 1
+        print(f"   🚫 Rejected ({rejection}): {url[:60]}")
+    
+    def handle_fetched(self, url, fetched):
+        """Upload a conditional-GET result (body in memory or on disk) unless the stored copy is current"""
+        if fetched.unchanged:
+            with self.lock:
+                self.pdfs_unchanged += 1
+                self.downloaded_pdfs.add(url)
+            print(f"   ⏭️ Unchanged: {url[:60]}")
+            return True
+        if not fetched.changed:
+            return False
         
-        # Initialize queue with seed URLs
-        for url in SEED_URLS:
-            self.url_queue.append((url, 0))
+        # Validate PDF (the probe already vetted the first chunk of streamed downloads)
+        rejection = self.probe.inspect(fetched.head(1024), fetched.size or len(fetched.content))
+        if rejection is not None:
+            fetched.discard()
+            self.reject_pdf(url, rejection)
+            return False
         
-        # Phase 1: Crawl and discover PDFs
-        print("\n🔍 PHASE 1: Crawling and discovering PDFs...")
+        # Logical name for the alias table (the bytes are stored under their SHA-256)
+        parsed = urllib.parse.urlparse(url)
+        domain = parsed.netloc.replace('www.', '').replace('.gob.ec', '').replace('.', '_')
+        filename = url.split('/')[-1]
+        if not filename.endswith('.pdf'):
+            filename = hashlib.md5(url.encode()).hexdigest()[:12] + '.pdf'
         
-        with ThreadPoolExecutor(max_workers=WORKERS) as executor:
-            while self.url_queue and self.pages_crawled < MAX_PAGES:
+        s3_path = f"scraped/{domain}/{filename}"
+        
+        # Hand off to the upload queue; the worker moves on to the next download
+        future = self.uploader.submit(url, fetched.body(), content_type='application/pdf', name=s3_path,
+                                      sha256=fetched.sha256)
+        future.add_done_callback(lambda done: self.pdf_uploaded(url, s3_path, fetched, done))
+        return True
+    
+    def pdf_uploaded(self, url, s3_path, fetched, future):
+        """Upload-queue callback: record the stored copy"""
+        fetched.discard()
+        if future.exception() is not None:
+            self.metrics.error(url, future.exception())
+            self.count_error(url, future.exception())
+            print(f"   ❌ S3 upload failed: {s3_path}")
+            return
+        self.http_cache.store(fetched)
+        blob = future.result()
+        with self.lock:
+            if blob.created:
+                self.pdfs_uploaded += 1
+            else:
+                self.pdfs_duplicate += 1
+            self.downloaded_pdfs.add(url)
+        if blob.created:
+            print(f"   ✅ S3: {s3_path} -> {blob.sha256[:12]}")
+        else:
+            print(f"   🔗 Already stored as {blob.sha256[:12]}: {s3_path}")
+    
+    def crawl_threaded(self):
+        """Batch crawl: submit up to `workers` URLs, wait for all of them, refill"""
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            while self.url_queue and self.pages_crawled < self.max_pages:
                 # Get batch of URLs to process
                 batch = []
-                while self.url_queue and len(batch) < WORKERS:
+                while self.url_queue and len(batch) < self.workers:
                     url, depth = self.url_queue.popleft()
                     if url not in self.visited_urls:
                         batch.append((url, depth))
+                    else:
+                        self.url_queue.done(url)
                 
                 if not batch:
                     break
@@ -279,23 +419,116 @@ class MegaSpider:
                         
                     except Exception as e:
                         pass
+                    self.url_queue.done(url)
                 
                 # Progress update
                 if self.pages_crawled % 20 == 0:
                     print(f"   📊 Progress: {self.pages_crawled} pages, {self.pdfs_found} PDFs found")
+    
+    def download_threaded(self, pdf_list):
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = {executor.submit(self.download_pdf, url): url for url in pdf_list}
+            
+            for future in as_completed(futures):
+                pass  # Results printed in download_pdf
+    
+    def _engine(self, max_fetches=None):
+        return AsyncCrawlEngine(
+            concurrency=self.workers,
+            per_host=PER_HOST_CONNECTIONS,
+            timeout=TIMEOUT,
+            headers=dict(self.session.headers),
+            max_fetches=max_fetches,
+            politeness=self.politeness,
+            metrics=self.metrics,
+        )
+    
+    async def crawl_async(self):
+        """Continuous crawl: each worker picks the next URL as soon as it is free"""
+        handled = 0
+        
+        def handle(url, depth, response):
+            nonlocal handled
+            new_links, _ = self.handle_page(url, response)
+            with self.lock:
+                handled += 1
+                if handled % 20 == 0:
+                    print(f"   📊 Progress: {self.pages_crawled} pages, {self.pdfs_found} PDFs found")
+            return [(link, depth + 1) for link in new_links if link not in self.visited_urls]
+        
+        budget = max(self.max_pages - self.pages_crawled, 0)
+        await self._engine(budget).run(self.url_queue, handle, admit=self.claim_page, on_error=self.count_error)
+    
+    async def download_async(self, pdf_list):
+        def fetch(url, depth):
+            # Through the range downloader: big codes stream to disk and resume after a timeout
+            self.download_pdf(url)
+            return []
+        
+        if self.pdf_queue is not None:
+            # Every worker downloads the PDFs of the hosts it holds, whoever found them
+            self.pdf_queue.extend((url, 0) for url in pdf_list)
+            engine, items = self._engine(MAX_PDFS), self.pdf_queue
+        else:
+            engine, items = self._engine(), [(url, 0) for url in pdf_list]
+        await engine.run(items, None, fetch=fetch, on_error=self.download_failed)
+    
+    def run(self, engine='async'):
+        """Main spider execution"""
+        if self.coordinator is not None and engine != 'async':
+            raise ValueError("a distributed crawl needs the async engine")
+        print("=" * 70)
+        print("  🕷️ YACHAQ MEGA SPIDER - Autonomous Web Crawler")
+        print("=" * 70)
+        print(f"  📍 Seed URLs: {len(self.seed_urls)}")
+        print(f"  🔍 Max Depth: {MAX_DEPTH}")
+        print(f"  📄 Max PDFs: {MAX_PDFS}")
+        print(f"  ⚡ Workers: {self.workers} ({engine})")
+        name = 'mega_spider'
+        if self.coordinator is not None:
+            self.coordinator.start()
+            name = f"mega_spider_{self.coordinator.worker}"
+            print(f"  🤝 Distributed worker {self.coordinator.worker}: "
+                  f"{len(self.coordinator.held)}/{self.coordinator.partitions} host partitions "
+                  f"of {self.coordinator.path}")
+        exporter = None
+        if self.metrics_dir:
+            exporter = MetricsExporter(self.metrics, self.metrics_dir, name=name,
+                                       interval=METRICS_INTERVAL).start()
+            print(f"  📈 Telemetry: {exporter.prom_path} (+ {exporter.jsonl_path.name}) every {METRICS_INTERVAL}s")
+        print("=" * 70)
+        
+        # Initialize queue with seed URLs
+        for url in self.seed_urls:
+            self.url_queue.append((url, 0))
+        
+        # Phase 1: Crawl and discover PDFs
+        print("\n🔍 PHASE 1: Crawling and discovering PDFs...")
+        
+        if engine == 'async':
+            asyncio.run(self.crawl_async())
+        else:
+            self.crawl_threaded()
+        if self.coordinator is not None:
+            self.url_queue.close()  # pages claimed past the budget go back to the other workers
+            if self.pages_crawled >= self.max_pages:
+                self.coordinator.retire()  # and so do our hosts, to the workers with budget left
         
         print(f"\n✅ Crawl complete: {self.pages_crawled} pages, {self.pdfs_found} PDFs discovered")
         
         # Phase 2: Download and upload PDFs
         print(f"\n📥 PHASE 2: Downloading {min(len(self.pdf_urls), MAX_PDFS)} PDFs...")
         
-        pdf_list = list(self.pdf_urls)[:MAX_PDFS]
+        # Skip PDFs a previous (resumed) run already uploaded or rejected
+        pdf_list = [url for url in self.pdf_urls
+                    if url not in self.downloaded_pdfs and url not in self.rejected_pdfs][:MAX_PDFS]
         
-        with ThreadPoolExecutor(max_workers=WORKERS) as executor:
-            futures = {executor.submit(self.download_pdf, url): url for url in pdf_list}
-            
-            for future in as_completed(futures):
-                pass  # Results printed in download_pdf
+        if engine == 'async':
+            asyncio.run(self.download_async(pdf_list))
+        else:
+            self.download_threaded(pdf_list)
+        if self._uploader is not None:
+            self._uploader.close()  # wait for queued uploads
         
         # Summary
         print("\n" + "=" * 70)
@@ -304,9 +537,59 @@ class MegaSpider:
         print(f"  🌐 Pages crawled: {self.pages_crawled}")
         print(f"  📄 PDFs discovered: {self.pdfs_found}")
         print(f"  ✅ PDFs uploaded: {self.pdfs_uploaded}")
+        print(f"  ⏭️ PDFs unchanged since last run: {self.pdfs_unchanged}")
+        print(f"  🔗 PDFs already stored from another URL: {self.pdfs_duplicate}")
+        reasons = Counter(rejected['reason'] for rejected in self.rejected_pdfs.values())
+        print(f"  🚫 Rejected (not a PDF or too large): {self.pdfs_rejected}"
+              + (f" ({', '.join(f'{reason}: {n}' for reason, n in reasons.most_common())})" if reasons else ""))
         print(f"  ❌ Errors: {self.errors}")
+        host_stats = self.politeness.stats().values()
+        print(f"  🚦 Throttled responses: {sum(h['throttled'] for h in host_stats)}, "
+              f"blocked by robots.txt: {sum(h['disallowed'] for h in host_stats)}")
+        snapshot = exporter.stop() if exporter is not None else self.metrics.snapshot()
+        print(f"  📦 Downloaded: {snapshot['bytes'] / 1e6:.1f} MB in {snapshot['requests']} requests "
+              f"({snapshot['bytes'] / max(snapshot['elapsed'], 1e-9) / 1e3:.0f} KB/s)")
+        for host in busiest_hosts(snapshot):
+            stats = snapshot['hosts'][host]
+            print(f"  🐢 {host}: {stats['busy_seconds']:.0f}s in {stats['requests']} requests, "
+                  f"p95 {stats['latency']['p95'] or 0}s, {sum(stats['errors'].values())} errors")
         print("=" * 70)
+        
+        if self.coordinator is not None:
+            self.pdf_queue.close()
+            self.coordinator.stop()
+            self.coordinator.close()
+        if self.state is not None:
+            self.state.close()
+        if self._http_cache is not None:
+            self._http_cache.close()
+        if self._content_store is not None:
+            self._content_store.close()
 
 if __name__ == "__main__":
-    spider = MegaSpider()
-    spider.run()
+    parser = argparse.ArgumentParser(description="YACHAQ mega spider")
+    parser.add_argument('--engine', choices=['async', 'threaded'], default='async',
+                        help="async: continuous per-host scheduling; threaded: legacy batch loop")
+    parser.add_argument('--store', default=None,
+                        help="object store: s3://bucket[/prefix] or a local directory (default: $YACHAQ_OBJECT_STORE or the raw bucket)")
+    parser.add_argument('--state-dir', default=None,
+                        help="persist frontier and visited set here; rerun with the same dir to resume")
+    parser.add_argument('--metrics-dir', default=None,
+                        help="write mega_spider.prom and mega_spider_metrics.jsonl here while crawling (default: $YACHAQ_METRICS_DIR)")
+    parser.add_argument('--sources', nargs='?', const=str(MASTER_SOURCES), default=None,
+                        help="seed from the institutions of a master_sources.yaml (default file: config/master_sources.yaml)")
+    parser.add_argument('--max-pages', type=int, default=MAX_PAGES,
+                        help="page budget (per worker in a distributed crawl)")
+    parser.add_argument('--coordinator', default=None,
+                        help="shared crawl database; every worker started with the same file crawls a share of the hosts")
+    parser.add_argument('--worker-id', default=None,
+                        help="name of this worker in the coordinator (default: <hostname>-<pid>-<random>)")
+    args = parser.parse_args()
+    if args.coordinator and args.engine != 'async':
+        parser.error("--coordinator needs the async engine")
+    
+    coordinator = CrawlCoordinator(Path(args.coordinator), worker=args.worker_id) if args.coordinator else None
+    seeds = load_source_urls(args.sources) if args.sources else None
+    spider = MegaSpider(seed_urls=seeds, max_pages=args.max_pages, state_dir=args.state_dir,
+                        store=open_store(args.store), metrics_dir=args.metrics_dir, coordinator=coordinator)
+    spider.run(engine=args.engine)
@@ -12,173 +12,150 @@ A SMART data collector that:
 This is NOT a blind scraper - it's an intelligent curator.
 """
 
-import os
 import re
 import json
 import hashlib
+import importlib.util
 import subprocess
-import tempfile
+import sys
+import itertools
+import argparse
 import urllib.parse
 from datetime import datetime
+from pathlib import Path
 from collections import defaultdict
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
 try:
     import requests
-    from bs4 import BeautifulSoup
 except ImportError:
-    subprocess.run(['pip3', 'install', 'requests', 'beautifulsoup4', '-q'])
+    subprocess.run(['pip3', 'install', 'requests', '-q'])
     import requests
-    from bs4 import BeautifulSoup
+if importlib.util.find_spec('lxml') is None:  # src.utils.links parses with lxml
+    subprocess.run(['pip3', 'install', 'lxml', '-q'])
 
 import warnings
 warnings.filterwarnings('ignore')
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))  # repo root, for src.utils
+from src.utils.content_store import ContentStore
+from src.utils.crawl_state import VISITED, CrawlState, PriorityFrontier
+from src.utils.link_scoring import LinkScorer
+from src.utils.legal_terms import AUTHORITATIVE_DOMAINS, KEYWORD_WEIGHTS, categorize, find_terms, weighted_terms
+from src.utils.links import iter_links
+from src.utils.object_store import UploadQueue, open_store
+from src.utils.pdf_probe import PdfProbe, RejectedDocument
+from src.utils.politeness import PoliteSession
+from src.utils.s3_upload import CHUNK_SIZE
+from src.utils.urls import canonicalize_url
+
 # Configuration
-S3_BUCKET = "s3://yachaq-lex-raw-0017472631"
 REGISTRY_FILE = "/tmp/yachaq_resource_registry.json"
 MIN_QUALITY_SCORE = 0.6
 MAX_RESOURCES_TO_DOWNLOAD = 50
+MAX_PAGES = 500
+MAX_PDF_SIZE = 200 * 1024 * 1024  # bigger "PDFs" are rejected from their headers, or cut off
 TIMEOUT = 15
 
-# HIGH-VALUE keywords (score boost)
-HIGH_VALUE_KEYWORDS = {
-    # Legal codes (highest value)
-    'codigo': 3, 'código': 3, 'ley organica': 3, 'ley orgánica': 3,
-    'constitucion': 3, 'constitución': 3, 'coip': 3, 'copci': 3,
-    'cootad': 3, 'lopdp': 3, 'lrti': 3, 'losncp': 3,
-    
-    # Regulations (high value)
-    'reglamento': 2, 'decreto': 2, 'resolucion': 2, 'resolución': 2,
-    'acuerdo ministerial': 2, 'ordenanza': 2,
-    
-    # Normative (medium value)
-    'normativa': 1.5, 'reforma': 1.5, 'codificacion': 1.5,
-    
-    # Government domains (authority)
-    'sri': 1.5, 'sercop': 1.5, 'iess': 1.5, 'supercias': 1.5,
-    'aduana': 1.5, 'trabajo': 1.5, 'ambiente': 1.5,
-}
-
-# LOW-VALUE keywords (score penalty)
-LOW_VALUE_KEYWORDS = {
-    'informe': -0.5, 'certificado': -0.5, 'formulario': -0.3,
-    'manual usuario': -0.5, 'cronograma': -0.5, 'presupuesto': -0.5,
-    'estados financieros': -1, 'balance': -1, 'ejecucion': -0.5,
-}
-
-# AUTHORITATIVE domains (score boost)
-AUTHORITATIVE_DOMAINS = {
-    'asambleanacional.gob.ec': 2,
-    'lexis.com.ec': 2,
-    'sri.gob.ec': 1.5,
-    'trabajo.gob.ec': 1.5,
-    'supercias.gob.ec': 1.5,
-    'sercop.gob.ec': 1.5,
-    'compraspublicas.gob.ec': 1.5,
-    'iess.gob.ec': 1.5,
-    'aduana.gob.ec': 1.5,
-    'oas.org': 1.5,
-    'finanzas.gob.ec': 1,
-    'defensa.gob.ec': 1,
-    'telecomunicaciones.gob.ec': 1,
-}
-
 class ResourceRegistry:
-    def __init__(self):
-        self.session = requests.Session()
+    def __init__(self, state_dir=None, store=None, politeness=None):
+        self.store = store or open_store()
+        # Per-host rate limits, 429/503 backoff and robots.txt for every request
+        self.session = PoliteSession(requests.Session(), politeness)
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 Chrome/120.0.0.0 Safari/537.36',
         })
-        self.resources = []
-        self.visited_urls = set()
+        # Same tables score discovered PDFs and the crawl order (best-first frontier)
+        self.scorer = LinkScorer(KEYWORD_WEIGHTS, AUTHORITATIVE_DOMAINS)
+        # HTML error pages, login walls and oversized files are dropped after the first chunk
+        self.probe = PdfProbe(MAX_PDF_SIZE)
+        # Crawl state (SQLite-backed and resumable when state_dir is given)
+        self.state = None
+        if state_dir:
+            self.state = CrawlState(Path(state_dir) / 'resource_registry.sqlite')
+            self.visited_urls = self.state.set(VISITED)
+            self.stored_resources = self.state.set('resource')
+            self.uploaded_urls = self.state.set('uploaded')
+            self.rejected_urls = self.state.set('rejected')
+            self.frontier = self.state.frontier
+            self.resources = list(self.stored_resources.values())
+        else:
+            self.visited_urls = set()
+            self.stored_resources = None
+            self.uploaded_urls = set()
+            self.rejected_urls = {}
+            self.frontier = PriorityFrontier()
+            self.resources = []
+        # A resumed run continues the max_pages budget where the previous one stopped
+        self.pages_crawled = len(self.visited_urls)
         
-    def calculate_quality_score(self, url, title, domain):
-        """Calculate a quality score (0-1) for a resource"""
+    def calculate_quality_score(self, url, title, domain, terms=None):
+        """Calculate a quality score (0-1) for a resource (terms: find_terms(url, title), if already known)"""
         score = 0.3  # Base score
         
-        combined_text = (url + ' ' + title).lower()
-        
-        # Apply keyword scoring
-        for keyword, boost in HIGH_VALUE_KEYWORDS.items():
-            if keyword in combined_text:
-                score += boost * 0.1
+        if terms is None:
+            terms = find_terms(url, title)
         
-        for keyword, penalty in LOW_VALUE_KEYWORDS.items():
-            if keyword in combined_text:
-                score += penalty * 0.1
+        # Apply keyword scoring (HIGH_VALUE_KEYWORDS boosts, then LOW_VALUE_KEYWORDS penalties)
+        for keyword, boost in weighted_terms(terms):
+            score += boost * 0.1
         
         # Apply domain authority
-        for auth_domain, boost in AUTHORITATIVE_DOMAINS.items():
-            if auth_domain in domain:
-                score += boost * 0.15
-                break
+        score += self.scorer.domain_score(domain)
         
         # Normalize to 0-1
         return max(0, min(1, score))
     
-    def categorize_resource(self, url, title):
-        """Determine the S3 category for a resource"""
-        combined = (url + ' ' + title).lower()
-        
-        if any(k in combined for k in ['codigo', 'código', 'ley', 'constitucion']):
-            return 'legal/codigos'
-        elif any(k in combined for k in ['sri', 'tributario', 'impuesto', 'lrti']):
-            return 'tributario'
-        elif any(k in combined for k in ['sercop', 'contratacion', 'losncp', 'compras publicas']):
-            return 'contratacion'
-        elif any(k in combined for k in ['trabajo', 'laboral', 'codigo del trabajo']):
-            return 'laboral'
-        elif any(k in combined for k in ['iess', 'seguridad social', 'pension']):
-            return 'iess'
-        elif any(k in combined for k in ['aduana', 'copci', 'senae', 'importacion']):
-            return 'aduanas'
-        elif any(k in combined for k in ['supercias', 'compañia', 'societario']):
-            return 'supercias'
-        elif any(k in combined for k in ['ambiente', 'coa', 'ambiental']):
-            return 'ambiente'
-        elif any(k in combined for k in ['reglamento', 'decreto', 'acuerdo']):
-            return 'normativa'
-        else:
-            return 'otros'
+    def categorize_resource(self, url, title, terms=None):
+        """Determine the S3 category for a resource (see CATEGORY_KEYWORDS)"""
+        return categorize(find_terms(url, title) if terms is None else terms)
     
-    def discover_resources(self, seed_urls, max_depth=2):
-        """Crawl and discover resources, building the registry"""
+    def discover_resources(self, seed_urls, max_depth=2, max_pages=MAX_PAGES):
+        """Crawl and discover resources, building the registry.
+        
+        Pages are visited best-first: each link is queued with a priority from
+        its anchor text, URL words, domain authority and the PDF yield of the
+        page it was found on, so the max_pages budget goes to normative pages.
+        """
         print("=" * 70)
         print("  🧠 PHASE 1: DISCOVERING RESOURCES")
         print("=" * 70)
         
-        to_visit = [(url, 0) for url in seed_urls]
+        for url in seed_urls:
+            url = canonicalize_url(url)
+            self.frontier.push(url, 0, self.scorer.score(url))
         
-        while to_visit:
-            url, depth = to_visit.pop(0)
+        while self.frontier and self.pages_crawled < max_pages:
+            url, depth = self.frontier.popleft()
             
             if depth > max_depth or url in self.visited_urls:
+                self.frontier.done(url)
                 continue
             
             self.visited_urls.add(url)
+            self.pages_crawled += 1
             
             try:
                 response = self.session.get(url, timeout=TIMEOUT, verify=False)
                 if response.status_code != 200:
                     continue
                 
-                soup = BeautifulSoup(response.text, 'html.parser')
                 domain = urllib.parse.urlparse(url).netloc
+                page_yield = 0.0
+                children = []
                 
-                for link in soup.find_all('a', href=True):
-                    href = link.get('href', '').strip()
-                    text = link.get_text().strip()[:100]
+                for href, text in iter_links(response.text):
+                    text = text[:100]
                     
-                    if not href or href.startswith('#'):
+                    full_url = canonicalize_url(href, url)
+                    if not full_url:
                         continue
                     
-                    full_url = urllib.parse.urljoin(url, href)
-                    
                     # Check if it's a PDF
                     if '.pdf' in full_url.lower() and full_url not in self.visited_urls:
-                        score = self.calculate_quality_score(full_url, text, domain)
-                        category = self.categorize_resource(full_url, text)
+                        terms = find_terms(full_url, text)
+                        score = self.calculate_quality_score(full_url, text, domain, terms)
+                        category = self.categorize_resource(full_url, text, terms)
                         
                         resource = {
                             'url': full_url,
@@ -189,16 +166,25 @@ class ResourceRegistry:
                             'discovered_at': datetime.now().isoformat(),
                         }
                         self.resources.append(resource)
+                        if self.stored_resources is not None:
+                            self.stored_resources.add(full_url, resource)
                         self.visited_urls.add(full_url)
+                        page_yield += score
                     
                     # Follow links to same domain
                     elif depth < max_depth:
                         link_domain = urllib.parse.urlparse(full_url).netloc
                         if '.gob.ec' in link_domain or '.edu.ec' in link_domain:
-                            to_visit.append((full_url, depth + 1))
+                            children.append((full_url, text))
+                
+                # Queue after the whole page is read, so its PDF yield is known
+                for full_url, text in children:
+                    self.frontier.push(full_url, depth + 1, self.scorer.score(full_url, text, page_yield))
                 
             except Exception as e:
                 continue
+            finally:
+                self.frontier.done(url)
             
             if len(self.resources) % 50 == 0 and len(self.resources) > 0:
                 print(f"   📊 Discovered {len(self.resources)} resources...")
@@ -249,8 +235,16 @@ class ResourceRegistry:
         print("=" * 70)
         
         uploaded = 0
+        pending = {}
+        content_store = ContentStore(self.store)  # one copy per distinct PDF
+        uploader = UploadQueue(content_store)
         for i, resource in enumerate(resources[:MAX_RESOURCES_TO_DOWNLOAD], 1):
             url = resource['url']
+            if url in self.uploaded_urls:
+                uploaded += 1
+                continue
+            if url in self.rejected_urls:
+                continue
             category = resource['category']
             filename = url.split('/')[-1]
             if not filename.endswith('.pdf'):
@@ -260,33 +254,62 @@ class ResourceRegistry:
             print(f"   Score: {resource['quality_score']} | Category: {category}")
             
             try:
-                response = self.session.get(url, timeout=TIMEOUT, verify=False)
-                if response.status_code == 200 and response.content[:4] == b'%PDF':
-                    # Save to temp
-                    with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as tmp:
-                        tmp.write(response.content)
-                        tmp_path = tmp.name
-                    
-                    # Upload to S3
-                    s3_path = f"{S3_BUCKET}/curated/{category}/{filename}"
-                    result = subprocess.run(
-                        ['aws', 's3', 'cp', tmp_path, s3_path, '--region', 'us-east-1'],
-                        capture_output=True, text=True
-                    )
-                    os.unlink(tmp_path)  # Delete local file
-                    
-                    if result.returncode == 0:
-                        print(f"   ✅ S3: curated/{category}/{filename}")
-                        uploaded += 1
-                    else:
-                        print(f"   ❌ S3 upload failed")
-                else:
-                    print(f"   ⚠️ Not a valid PDF")
+                response = self.session.get(url, timeout=TIMEOUT, verify=False, stream=True)
+                try:
+                    if response.status_code != 200:
+                        response.close()
+                        print(f"   ⚠️ Not a valid PDF (HTTP {response.status_code})")
+                        continue
+                    # Vet headers and first chunk before reading on
+                    chunks = response.iter_content(chunk_size=CHUNK_SIZE)
+                    first = next(chunks, b'')
+                    self.probe.check(url, response.headers, first)
+                    # Hash and store the rest of the response as it streams in (cut off past MAX_PDF_SIZE)
+                    s3_key = f"curated/{category}/{filename}"
+                    future = uploader.submit(url, self.stream_body(url, response, first, chunks),
+                                             content_type='application/pdf', name=s3_key)
+                except BaseException:
+                    response.close()
+                    raise
+                # Also close it if the upload fails before reading the body
+                future.add_done_callback(lambda _, response=response: response.close())
+                pending[future] = (url, s3_key)
+            except RejectedDocument as e:
+                self.reject(url, e.rejection)
             except Exception as e:
                 print(f"   ❌ Error: {str(e)[:40]}")
         
+        for future in as_completed(pending):
+            url, s3_key = pending[future]
+            if future.exception() is None:
+                blob = future.result()
+                if blob.created:
+                    print(f"   ✅ S3: {s3_key} -> {blob.sha256[:12]}")
+                else:
+                    print(f"   🔗 Already stored as {blob.sha256[:12]}: {s3_key}")
+                self.uploaded_urls.add(url)
+                uploaded += 1
+            elif isinstance(future.exception(), RejectedDocument):
+                self.reject(url, future.exception().rejection)
+            else:
+                print(f"   ❌ S3 upload failed: {s3_key}")
+        uploader.close()
+        content_store.close()
+        
         return uploaded
     
+    def stream_body(self, url, response, first, chunks):
+        """The rest of a streamed PDF response, cut off past MAX_PDF_SIZE; the connection is closed however it ends"""
+        try:
+            yield from self.probe.limit(url, itertools.chain([first], chunks))
+        finally:
+            response.close()
+    
+    def reject(self, url, rejection):
+        """Record in the crawl state why a resource was not downloaded"""
+        self.rejected_urls[url] = rejection.record()
+        print(f"   ⚠️ Not a valid PDF: {rejection}")
+    
     def save_registry(self):
         """Save registry to file"""
         with open(REGISTRY_FILE, 'w', encoding='utf-8') as f:
@@ -325,5 +348,12 @@ SEED_URLS = [
 ]
 
 if __name__ == "__main__":
-    registry = ResourceRegistry()
+    parser = argparse.ArgumentParser(description="YACHAQ resource registry")
+    parser.add_argument('--store', default=None,
+                        help="object store: s3://bucket[/prefix] or a local directory (default: $YACHAQ_OBJECT_STORE or the raw bucket)")
+    parser.add_argument('--state-dir', default=None,
+                        help="persist frontier, visited set and registry here; rerun with the same dir to resume")
+    args = parser.parse_args()
+    
+    registry = ResourceRegistry(state_dir=args.state_dir, store=open_store(args.store))
     registry.run(SEED_URLS)
@@ -5,10 +5,18 @@ VERIFIED URL DOWNLOADER → S3
 Only uses VERIFIED working URLs (tested with curl -I before adding)
 """
 
-import subprocess
-import os
+import sys
+from pathlib import Path
 
-S3_BUCKET = "s3://yachaq-lex-raw-0017472631"
+import requests
+import urllib3
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))  # repo root, for src.utils
+from src.utils.content_store import ContentStore
+from src.utils.http_cache import HttpCache
+from src.utils.object_store import open_store
+from src.utils.pdf_probe import PdfProbe, RejectedDocument
+from src.utils.range_download import RangeDownloader
 
 # VERIFIED WORKING URLs (tested 2024-12-30)
 VERIFIED_DOCS = [
@@ -47,16 +55,9 @@ VERIFIED_DOCS = [
     },
 ]
 
-def test_url(url):
-    """Test if URL returns 200"""
-    result = subprocess.run(
-        ['curl', '-sI', '--max-time', '10', url],
-        capture_output=True, text=True
-    )
-    return '200' in result.stdout
-
-def download_and_upload(doc):
-    """Download and upload to S3"""
+def download_and_upload(doc, downloader, content_store):
+    """Download and upload to S3, skipping documents unchanged since the last upload"""
+    http_cache = downloader.http_cache
     name = doc['name']
     url = doc['url']
     s3_path = doc['s3_path']
@@ -64,40 +65,49 @@ def download_and_upload(doc):
     print(f"\n📥 {name}")
     print(f"   URL: {url[:70]}...")
     
-    # First verify URL
-    print(f"   Testing URL...")
-    if not test_url(url):
-        print(f"   ❌ URL not accessible (non-200)")
+    # Conditional GET: replaces the separate HEAD check, and a 304 costs no body bytes.
+    # Large files come in parallel byte ranges; a failed run resumes from the ranges on disk.
+    # An HTML error page or login wall is dropped after its first chunk.
+    try:
+        fetched = downloader.fetch(requests, url, timeout=60, verify=False)
+    except RejectedDocument as e:
+        print(f"   ❌ Not a PDF: {e.rejection}")
+        return False
+    except (requests.RequestException, OSError) as e:
+        print(f"   ❌ URL not accessible: {str(e)[:50]}")
+        return False
+    if fetched.unchanged:
+        print(f"   ⏭️ Unchanged since last upload: {s3_path}")
+        return True
+    if not fetched.changed:
+        print(f"   ❌ URL not accessible (HTTP {fetched.status})")
         return False
     print(f"   ✓ URL verified")
     
-    # Download
-    tmp_file = f"/tmp/{name.replace(' ', '_')}.pdf"
-    result = subprocess.run(
-        ['curl', '-sL', '--max-time', '60', '-o', tmp_file, url],
-        capture_output=True, text=True
-    )
-    
-    if not os.path.exists(tmp_file) or os.path.getsize(tmp_file) < 1000:
+    if fetched.size < 1000:
+        fetched.discard()
         print(f"   ❌ Download failed or file too small")
         return False
     
-    size_kb = os.path.getsize(tmp_file) / 1024
+    size_kb = fetched.size / 1024
     print(f"   ✓ Downloaded: {size_kb:.0f} KB")
     
-    # Upload to S3
-    s3_result = subprocess.run(
-        ['aws', 's3', 'cp', tmp_file, f"{S3_BUCKET}/{s3_path}", '--region', 'us-east-1'],
-        capture_output=True, text=True
-    )
-    os.unlink(tmp_file)
+    # Upload straight from memory or the downloaded file, once per distinct content
+    try:
+        blob = content_store.put(url, fetched.body(), content_type='application/pdf', name=s3_path,
+                                 sha256=fetched.sha256)
+    except Exception as e:
+        print(f"   ❌ S3 upload failed: {str(e)[:50]}")
+        return False
+    finally:
+        fetched.discard()
     
-    if s3_result.returncode == 0:
-        print(f"   ✅ Uploaded: {s3_path}")
-        return True
+    http_cache.store(fetched)
+    if blob.created:
+        print(f"   ✅ Uploaded: {s3_path} -> {blob.sha256[:12]}")
     else:
-        print(f"   ❌ S3 upload failed: {s3_result.stderr[:50]}")
-        return False
+        print(f"   🔗 Already stored as {blob.sha256[:12]}: {s3_path}")
+    return True
 
 def main():
     print("=" * 60)
@@ -106,20 +116,31 @@ def main():
     
     success = 0
     failed = 0
+    store = open_store()
+    http_cache = HttpCache(namespace=store.uri())
+    downloader = RangeDownloader(http_cache=http_cache, probe=PdfProbe())
+    content_store = ContentStore(store)
     
     for doc in VERIFIED_DOCS:
-        if download_and_upload(doc):
+        if download_and_upload(doc, downloader, content_store):
             success += 1
         else:
             failed += 1
+    http_cache.close()
     
     print("\n" + "=" * 60)
     print(f"  RESULTS: ✅ {success} uploaded, ❌ {failed} failed")
     print("=" * 60)
     
-    # Show what was uploaded
-    print("\n📂 Recent S3 uploads:")
-    subprocess.run(['aws', 's3', 'ls', S3_BUCKET, '--recursive', '--human-readable', '|', 'tail', '-10'], shell=False)
+    # Show what is in the store (one batched existence check)
+    print(f"\n📂 {store.uri()}")
+    hashes = {doc['s3_path']: content_store.resolve(doc['url']) for doc in VERIFIED_DOCS}
+    present = store.exists_many(content_store.blob_key(sha) for sha in hashes.values() if sha)
+    for name, sha in hashes.items():
+        found = sha is not None and present[content_store.blob_key(sha)]
+        print(f"   {'✅' if found else '❌'} {name}" + (f" -> {sha[:12]}" if found else ""))
+    content_store.close()
 
 if __name__ == "__main__":
+    urllib3.disable_warnings()
     main()
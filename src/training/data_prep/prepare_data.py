@@ -11,9 +11,11 @@ Usage:
 """
 
 import os
+import sys
 import json
 import glob
 import argparse
+import itertools
 import subprocess
 from pathlib import Path
 from typing import List, Dict, Optional
@@ -29,18 +31,21 @@ except ImportError:
     import tiktoken
     from datasets import Dataset, DatasetDict
 
-import boto3
-
 # Configuration
 # Default local paths (can be overridden)
 REPO_ROOT = Path(__file__).resolve().parents[3]
+sys.path.insert(0, str(REPO_ROOT))  # for src.utils
+from src.utils.content_store import DerivedCache
+from src.utils.http_cache import content_hash
+from src.utils.object_store import LocalStore, ObjectStore, open_store
+
 DATA_DIR = REPO_ROOT / "data"
 LOCAL_CACHE = REPO_ROOT / "data" / "cache"
 
-# S3 Configuration
-S3_BUCKET = "yachaq-lex-raw-0017472631"
+# Object store layout (bucket: $YACHAQ_OBJECT_STORE or the raw bucket)
 S3_RAW_PREFIX = ""  # Root of bucket
 S3_TRAIN_PREFIX = "training"
+TEXT_SUFFIXES = ('.txt', '.md', '.json', '.csv')
 
 # Tokenizer
 ENCODING = "cl100k_base"  # GPT-4 / Llama 3 tokenizer
@@ -51,17 +56,21 @@ def log(msg: str):
 class YachaqDataPreparer:
     """Prepare Ecuador data for LLM training"""
     
-    def __init__(self, sample_mode: bool = False):
+    def __init__(self, sample_mode: bool = False, store: Optional[ObjectStore] = None):
         self.enc = tiktoken.get_encoding(ENCODING)
         self.data_dir = DATA_DIR
         self.data_dir.mkdir(parents=True, exist_ok=True)
         self.cache_dir = LOCAL_CACHE
         self.cache_dir.mkdir(parents=True, exist_ok=True)
         self.sample_mode = sample_mode
-        self.s3_client = boto3.client('s3')
+        self.store = store or open_store()
+        # Extraction and tokenization results, keyed on the SHA-256 of the source bytes
+        derived = LocalStore(self.cache_dir / "derived")
+        self.text_cache = DerivedCache(derived, "text")
+        self.token_cache = DerivedCache(derived, f"tokens-{ENCODING}")
         
     def download_from_s3(self, categories: List[str]) -> List[str]:
-        """Download training data from S3"""
+        """Download training data from the object store"""
         all_files = []
         
         for category in categories:
@@ -70,35 +79,19 @@ class YachaqDataPreparer:
             local_cat_dir.mkdir(parents=True, exist_ok=True)
             
             if self.sample_mode:
-                # In sample mode, valid S3 list is needed.
-                # Use paginator to get just a few files
-                paginator = self.s3_client.get_paginator('list_objects_v2')
-                pages = paginator.paginate(Bucket=S3_BUCKET, Prefix=f"{category}/", PaginationConfig={'MaxItems': 10})
-                
-                for page in pages:
-                    if 'Contents' not in page:
-                        continue
-                    for obj in page['Contents']:
-                        key = obj['Key']
-                        if key.endswith(('.txt', '.md', '.json', '.csv')):
-                            local_path = self.cache_dir / key
-                            local_path.parent.mkdir(parents=True, exist_ok=True)
-                            if not local_path.exists():
-                                self.s3_client.download_file(S3_BUCKET, key, str(local_path))
-                            all_files.append(str(local_path))
+                # A few files per category
+                for info in itertools.islice(
+                    (o for o in self.store.list(f"{category}/") if o.key.endswith(TEXT_SUFFIXES)), 10
+                ):
+                    local_path = self.cache_dir / info.key
+                    if not local_path.exists():
+                        self.store.download_file(info.key, local_path)
+                    all_files.append(str(local_path))
             else:
-                # Full sync
-                cmd = [
-                    "aws", "s3", "sync",
-                    f"s3://{S3_BUCKET}/{category}",
-                    str(local_cat_dir),
-                    "--exclude", "*.zip",
-                    "--exclude", "*.pdf"
-                ]
-                subprocess.run(cmd, check=True)
-                all_files.extend(list(local_cat_dir.rglob("*.*")))
+                # Full sync of the text files (PDFs and archives are never fetched)
+                all_files.extend(self.store.sync_down(category, local_cat_dir, suffixes=TEXT_SUFFIXES))
                 
-        return [str(f) for f in all_files if str(f).endswith(('.txt', '.md', '.json', '.csv'))]
+        return [str(f) for f in all_files if str(f).endswith(TEXT_SUFFIXES)]
     
     def read_file(self, filepath: str) -> str:
         """Read content from various file types"""
@@ -128,6 +121,23 @@ class YachaqDataPreparer:
             log(f"Error reading {path}: {e}")
             return ""
     
+    def extract_text(self, filepath: str, sha256: str) -> str:
+        """Text of a file, extracted once per distinct content"""
+        cached = self.text_cache.get(sha256)
+        if cached is not None:
+            return cached.decode('utf-8')
+        text = self.read_file(filepath)
+        if text:  # read errors are retried next run
+            self.text_cache.put(sha256, text.encode('utf-8'))
+        return text
+    
+    def tokenize(self, text: str, sha256: str) -> np.ndarray:
+        """Token ids of a text, encoded once per distinct source content"""
+        data = self.token_cache.get_or_compute(
+            sha256, lambda: np.asarray(self.enc.encode(text, disallowed_special=()), dtype=np.uint32).tobytes()
+        )
+        return np.frombuffer(data, dtype=np.uint32)
+    
     def prepare_dataset(self, categories: List[str] = None) -> List[Dict]:
         """Prepare dataset in memory (list of dicts)"""
         if categories is None:
@@ -140,15 +150,24 @@ class YachaqDataPreparer:
         log(f"Processing {len(files)} files...")
         
         data_items = []
+        seen = set()
+        duplicates = 0
         for filepath in files:
-            content = self.read_file(filepath)
+            sha256 = content_hash(Path(filepath).read_bytes())
+            if sha256 in seen:
+                duplicates += 1  # same bytes under another name or category
+                continue
+            seen.add(sha256)
+            content = self.extract_text(filepath, sha256)
             if len(content.strip()) > 100:
                 data_items.append({
                     "text": content,
-                    "source": str(filepath).split("/")[-2] # Rough category
+                    "source": str(filepath).split("/")[-2], # Rough category
+                    "sha256": sha256,
+                    "n_tokens": len(self.tokenize(content, sha256)),
                 })
         
-        log(f"Collected {len(data_items)} valid text items")
+        log(f"Collected {len(data_items)} valid text items ({duplicates} duplicate files skipped)")
         return data_items
 
     def save_hf_dataset(self, data_items: List[Dict]):
@@ -172,21 +191,14 @@ class YachaqDataPreparer:
         return save_path
 
     def upload_to_s3(self, local_path: Path):
-        """Upload prepared data to S3 training prefix"""
+        """Upload prepared data to the training prefix"""
         if not local_path.exists():
             log(f"Path does not exist: {local_path}")
             return
             
-        s3_dest = f"s3://{S3_BUCKET}/{S3_TRAIN_PREFIX}"
-        log(f"Uploading {local_path} to {s3_dest}")
-        
-        subprocess.run([
-            "aws", "s3", "sync",
-            str(local_path),
-            s3_dest,
-            "--delete"
-        ], check=True)
-        log("Upload complete")
+        log(f"Uploading {local_path} to {self.store.uri(S3_TRAIN_PREFIX)}")
+        uploaded = self.store.sync_up(local_path, S3_TRAIN_PREFIX, delete=True)
+        log(f"Upload complete ({uploaded} files)")
 
     def run(self, format_type: str = "hf", upload: bool = False):
         log("Starting Data Preparation...")
@@ -208,9 +220,11 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Yachaq Data Preparation")
     parser.add_argument("--sample", action="store_true", help="Run with small sample")
     parser.add_argument("--format", type=str, default="hf", choices=["hf", "bin"], help="Output format")
-    parser.add_argument("--upload", action="store_true", help="Upload to S3")
+    parser.add_argument("--upload", action="store_true", help="Upload to the object store")
+    parser.add_argument("--store", default=None,
+                        help="s3://bucket[/prefix] or a local directory (default: $YACHAQ_OBJECT_STORE or the raw bucket)")
     
     args = parser.parse_args()
     
-    preparer = YachaqDataPreparer(sample_mode=args.sample)
+    preparer = YachaqDataPreparer(sample_mode=args.sample, store=open_store(args.store))
     preparer.run(format_type=args.format, upload=args.upload)
@@ -9,14 +9,20 @@ Usage:
     python sagemaker_process.py
 """
 
+import sys
 import boto3
 import json
 from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[3]))  # repo root, for src.utils
+from src.utils.object_store import open_store, require_s3
+from src.utils.s3_upload import split_s3_uri
 
 # Configuration
 AWS_REGION = "us-east-1"
-S3_BUCKET = "yachaq-lex-raw-0017472631"
-S3_OUTPUT = f"s3://{S3_BUCKET}/training"
+STORE = open_store()  # $YACHAQ_OBJECT_STORE or the raw bucket
+S3_OUTPUT = STORE.uri("training")
 
 # NOTE: You need to create an IAM role for SageMaker with:
 # - AmazonSageMakerFullAccess
@@ -46,8 +52,9 @@ subprocess.check_call(["pip", "install", "-q", "tiktoken", "datasets", "pandas"]
 import tiktoken
 from datasets import Dataset, DatasetDict
 
-S3_BUCKET = "yachaq-lex-raw-0017472631"
-S3_OUTPUT_PREFIX = "training"
+# Set by the launcher from the configured object store
+S3_BUCKET = os.environ.get("S3_BUCKET", "yachaq-lex-raw-0017472631")
+S3_OUTPUT_PREFIX = os.environ.get("S3_OUTPUT_PREFIX", "training")
 LOCAL_DATA = Path("/opt/ml/processing/input")
 LOCAL_OUTPUT = Path("/opt/ml/processing/output")
 ENCODING = "cl100k_base"
@@ -120,15 +127,17 @@ if __name__ == "__main__":
 '''
     
     # Upload script to S3
-    s3 = boto3.client('s3', region_name=AWS_REGION)
     script_key = "scripts/process_data.py"
-    s3.put_object(Bucket=S3_BUCKET, Key=script_key, Body=script.encode('utf-8'))
-    print(f"Uploaded processing script to s3://{S3_BUCKET}/{script_key}")
-    return f"s3://{S3_BUCKET}/{script_key}"
+    STORE.put(script_key, script, content_type='text/x-python')
+    print(f"Uploaded processing script to {STORE.uri(script_key)}")
+    return STORE.uri(script_key)
 
 def launch_processing_job():
     """Launch SageMaker Processing Job using boto3"""
     
+    require_s3(STORE)  # processing inputs and outputs must be on S3
+    output_bucket, output_prefix = split_s3_uri(S3_OUTPUT)
+    
     # Upload processing script to S3
     script_s3_uri = create_processing_script()
     
@@ -154,6 +163,10 @@ def launch_processing_job():
             'ContainerEntrypoint': ['python3', '/opt/ml/processing/input/code/process_data.py']
         },
         RoleArn=SAGEMAKER_ROLE,
+        Environment={
+            'S3_BUCKET': output_bucket,
+            'S3_OUTPUT_PREFIX': output_prefix.rstrip('/')
+        },
         ProcessingInputs=[
             {
                 'InputName': 'code',
@@ -167,7 +180,7 @@ def launch_processing_job():
             {
                 'InputName': 'data-asamblea',
                 'S3Input': {
-                    'S3Uri': f's3://{S3_BUCKET}/asamblea/',
+                    'S3Uri': STORE.uri('asamblea/'),
                     'LocalPath': '/opt/ml/processing/input/asamblea',
                     'S3DataType': 'S3Prefix',
                     'S3InputMode': 'File'
@@ -176,7 +189,7 @@ def launch_processing_job():
             {
                 'InputName': 'data-sri',
                 'S3Input': {
-                    'S3Uri': f's3://{S3_BUCKET}/sri/',
+                    'S3Uri': STORE.uri('sri/'),
                     'LocalPath': '/opt/ml/processing/input/sri',
                     'S3DataType': 'S3Prefix',
                     'S3InputMode': 'File'
@@ -185,7 +198,7 @@ def launch_processing_job():
             {
                 'InputName': 'data-tributario',
                 'S3Input': {
-                    'S3Uri': f's3://{S3_BUCKET}/tributario/',
+                    'S3Uri': STORE.uri('tributario/'),
                     'LocalPath': '/opt/ml/processing/input/tributario',
                     'S3DataType': 'S3Prefix',
                     'S3InputMode': 'File'
@@ -194,7 +207,7 @@ def launch_processing_job():
             {
                 'InputName': 'data-contratacion',
                 'S3Input': {
-                    'S3Uri': f's3://{S3_BUCKET}/contratacion/',
+                    'S3Uri': STORE.uri('contratacion/'),
                     'LocalPath': '/opt/ml/processing/input/contratacion',
                     'S3DataType': 'S3Prefix',
                     'S3InputMode': 'File'
@@ -203,7 +216,7 @@ def launch_processing_job():
             {
                 'InputName': 'data-datos_abiertos',
                 'S3Input': {
-                    'S3Uri': f's3://{S3_BUCKET}/datos_abiertos/',
+                    'S3Uri': STORE.uri('datos_abiertos/'),
                     'LocalPath': '/opt/ml/processing/input/datos_abiertos',
                     'S3DataType': 'S3Prefix',
                     'S3InputMode': 'File'
@@ -233,7 +246,7 @@ def launch_processing_job():
     print(f"{'='*60}")
     print(f"Monitor at: https://console.aws.amazon.com/sagemaker/home?region={AWS_REGION}#/processing-jobs/{job_name}")
     print(f"\\nThis job will:")
-    print(f"  1. Download data from s3://{S3_BUCKET}/")
+    print(f"  1. Download data from {STORE.uri()}")
     print(f"  2. Process and tokenize all text data")
     print(f"  3. Create HuggingFace Dataset")
     print(f"  4. Upload to {S3_OUTPUT}")
@@ -13,17 +13,22 @@ Usage:
     python sagemaker_train.py
 """
 
+import sys
 import boto3
 import sagemaker
 from sagemaker.huggingface import HuggingFace
 from datetime import datetime
+from pathlib import Path
 import json
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[3]))  # repo root, for src.utils
+from src.utils.object_store import open_store, require_s3
+
 # Configuration
 AWS_REGION = "us-east-1"
-S3_BUCKET = "yachaq-lex-raw-0017472631"
-S3_DATA_PATH = f"s3://{S3_BUCKET}/training"
-S3_OUTPUT_PATH = f"s3://{S3_BUCKET}/models"
+STORE = open_store()  # $YACHAQ_OBJECT_STORE or the raw bucket
+S3_DATA_PATH = STORE.uri("training")
+S3_OUTPUT_PATH = STORE.uri("models")
 
 # Model Configuration
 MODEL_ID = "meta-llama/Llama-3.1-8B-Instruct"  # HuggingFace model
@@ -152,6 +157,8 @@ if __name__ == "__main__":
 def launch_training_job():
     """Launch SageMaker training job"""
     
+    require_s3(STORE)  # SageMaker channels and outputs must be on S3
+    
     # Initialize
     session = sagemaker.Session()
     role = sagemaker.get_execution_role()  # Or specify IAM role ARN
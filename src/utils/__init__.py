@@ -0,0 +1,20 @@
+"""Shared crawling and ingestion utilities used by the collectors and spiders."""
+
+__all__ = [
+    "content_store",
+    "crawl_coordinator",
+    "crawl_engine",
+    "crawl_metrics",
+    "crawl_state",
+    "http_cache",
+    "keywords",
+    "legal_terms",
+    "link_scoring",
+    "links",
+    "object_store",
+    "pdf_probe",
+    "politeness",
+    "range_download",
+    "s3_upload",
+    "urls",
+]
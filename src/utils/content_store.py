@@ -0,0 +1,254 @@
+"""Content-addressed raw documents, shared by every spider and downloader.
+
+The same law is published at many URLs (COPCI alone comes from
+``aduana.gob.ec``, ``finanzas.gob.ec`` and the verified list) and used to be
+uploaded, and later processed, once per URL under a name guessed from the URL.
+Raw binaries are now stored once, under the SHA-256 of their bytes:
+
+- ``blobs/sha256/<ab>/<abcdef...>`` holds the bytes, whatever URL they came from;
+- an alias table maps each canonical URL to the hash it last served, together
+  with the logical name the caller used (``aduanas/copci.pdf``), so documents can
+  still be found by source or category;
+- :class:`DerivedCache` stores artifacts computed from a blob (extracted text,
+  token ids) under the same hash, so identical bytes are processed once too.
+
+The alias table is a SQLite file next to the HTTP cache
+(``$YACHAQ_CONTENT_INDEX`` overrides it). One file serves every store used on
+the machine, so its rows are scoped to the store's root URI: bytes indexed for
+a local test store are still uploaded to S3. It is only an index: a blob
+missing from it is still found in the object store before anything is
+uploaded again.
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from src.utils.object_store import ObjectStore
+from src.utils.s3_upload import PART_SIZE, Body, iter_chunks
+from src.utils.urls import canonicalize_url
+
+INDEX_ENV = "YACHAQ_CONTENT_INDEX"
+DEFAULT_INDEX_PATH = Path.home() / ".cache" / "yachaq" / "content_index.sqlite"
+BLOB_PREFIX = "blobs/sha256"
+DERIVED_PREFIX = "derived"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS blobs (
+    store TEXT NOT NULL,
+    sha256 TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    content_type TEXT,
+    stored_at REAL NOT NULL,
+    PRIMARY KEY (store, sha256)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS aliases (
+    store TEXT NOT NULL,
+    url TEXT NOT NULL,
+    sha256 TEXT NOT NULL,
+    name TEXT,
+    seen_at REAL NOT NULL,
+    PRIMARY KEY (store, url)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS aliases_sha256 ON aliases (store, sha256);
+"""
+
+
+def default_index_path() -> Path:
+    """Alias table shared by every downloader on this machine (``$YACHAQ_CONTENT_INDEX`` overrides it)."""
+    return Path(os.environ.get(INDEX_ENV) or DEFAULT_INDEX_PATH)
+
+
+def sharded_key(prefix: str, sha256: str) -> str:
+    return f"{prefix}/{sha256[:2]}/{sha256}"
+
+
+@dataclass(frozen=True)
+class StoredBlob:
+    """Where a document's bytes live; `created` is False when they were already stored."""
+
+    sha256: str
+    key: str
+    size: int
+    created: bool
+
+
+@dataclass(frozen=True)
+class Alias:
+    url: str
+    sha256: str
+    name: Optional[str]
+    seen_at: float
+
+
+class DerivedCache:
+    """Artifacts of one `kind` (``text``, ``tokens-cl100k_base``, ...) keyed on the source blob's hash."""
+
+    def __init__(self, store: ObjectStore, kind: str) -> None:
+        self.store = store
+        self.kind = kind
+
+    def key(self, sha256: str) -> str:
+        return sharded_key(f"{DERIVED_PREFIX}/{self.kind}", sha256)
+
+    def get(self, sha256: str) -> Optional[bytes]:
+        try:
+            return self.store.get(self.key(sha256))
+        except KeyError:
+            return None
+
+    def put(self, sha256: str, data: bytes) -> None:
+        self.store.put(self.key(sha256), data)
+
+    def get_or_compute(self, sha256: str, compute: Callable[[], bytes]) -> bytes:
+        data = self.get(sha256)
+        if data is None:
+            data = compute()
+            self.put(sha256, data)
+        return data
+
+
+class ContentStore:
+    """Raw documents under their SHA-256 in `store`, with a URL -> hash alias table.
+
+    Safe to share between worker and upload threads; concurrent puts of the same
+    bytes upload them once.
+    """
+
+    def __init__(self, store: ObjectStore, index_path: Optional[Path] = None) -> None:
+        self.store = store
+        self.scope = store.uri()  # rows of the shared index that describe this store
+        self.index_path = Path(index_path) if index_path is not None else default_index_path()
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        self.lock = threading.RLock()
+        self._claims: Dict[str, threading.Lock] = {}
+        self._db = sqlite3.connect(str(self.index_path), isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(blobs)")}
+        if columns and "store" not in columns:
+            # Rows written before the index was scoped to a store: their store is unknown, so drop them
+            self._db.executescript("DROP TABLE IF EXISTS blobs; DROP TABLE IF EXISTS aliases;")
+        self._db.executescript(_SCHEMA)
+
+    @staticmethod
+    def blob_key(sha256: str) -> str:
+        return sharded_key(BLOB_PREFIX, sha256)
+
+    def uri(self, sha256: str) -> str:
+        return self.store.uri(self.blob_key(sha256))
+
+    def derived(self, kind: str) -> DerivedCache:
+        return DerivedCache(self.store, kind)
+
+    def _claim(self, sha256: str) -> threading.Lock:
+        with self.lock:
+            return self._claims.setdefault(sha256, threading.Lock())
+
+    def has_blob(self, sha256: str) -> bool:
+        with self.lock:
+            row = self._db.execute("SELECT 1 FROM blobs WHERE store = ? AND sha256 = ?",
+                                   (self.scope, sha256)).fetchone()
+        return row is not None
+
+    def put(
+        self,
+        url: str,
+        body: Body,
+        content_type: Optional[str] = None,
+        metadata: Optional[Dict[str, str]] = None,
+        name: Optional[str] = None,
+        sha256: Optional[str] = None,
+    ) -> StoredBlob:
+        """Store the document `url` served, unless identical bytes are already stored, and alias `url` to it.
+
+        `sha256` may be passed when the caller already hashed `body` (the HTTP
+        cache and the range downloader do); a seekable file is then streamed
+        as is. Other streamed bodies are spooled to a temporary file while
+        they are hashed.
+        """
+        spool = None
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        if isinstance(body, (bytes, bytearray, memoryview)):
+            size = len(body)
+            sha256 = sha256 or hashlib.sha256(body).hexdigest()
+        elif sha256 is not None and hasattr(body, "seek"):
+            size = body.seek(0, os.SEEK_END)  # already hashed on disk (range downloads): stream as is
+            body.seek(0)
+        else:
+            spool = tempfile.SpooledTemporaryFile(max_size=PART_SIZE)
+            digest = hashlib.sha256()
+            for chunk in iter_chunks(body):
+                digest.update(chunk)
+                spool.write(chunk)
+            size = spool.tell()
+            sha256 = digest.hexdigest()
+            spool.seek(0)
+            body = spool
+
+        key = self.blob_key(sha256)
+        try:
+            with self._claim(sha256):
+                created = not (self.has_blob(sha256) or self.store.exists(key))
+                if created:
+                    metadata = dict(metadata or {})
+                    metadata.setdefault("source-url", url)
+                    self.store.put(key, body, content_type, metadata)
+                with self.lock:
+                    self._db.execute(
+                        "INSERT OR IGNORE INTO blobs (store, sha256, size, content_type, stored_at) "
+                        "VALUES (?, ?, ?, ?, ?)",
+                        (self.scope, sha256, size, content_type, time.time()),
+                    )
+        finally:
+            if spool is not None:
+                spool.close()
+        self.alias(url, sha256, name)
+        return StoredBlob(sha256, key, size, created)
+
+    def alias(self, url: str, sha256: str, name: Optional[str] = None) -> None:
+        """Record that `url` serves the blob `sha256` (a later document at the same URL replaces it)."""
+        with self.lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO aliases (store, url, sha256, name, seen_at) VALUES (?, ?, ?, ?, ?)",
+                (self.scope, canonicalize_url(url) or url, sha256, name, time.time()),
+            )
+
+    def resolve(self, url: str) -> Optional[str]:
+        """Hash of the document last stored for `url`, or None."""
+        with self.lock:
+            row = self._db.execute(
+                "SELECT sha256 FROM aliases WHERE store = ? AND url = ?", (self.scope, canonicalize_url(url) or url)
+            ).fetchone()
+        return row[0] if row else None
+
+    def aliases(self, sha256: str) -> List[Alias]:
+        """Every URL known to serve the blob `sha256`."""
+        with self.lock:
+            rows = self._db.execute(
+                "SELECT url, sha256, name, seen_at FROM aliases WHERE store = ? AND sha256 = ? ORDER BY url",
+                (self.scope, sha256),
+            ).fetchall()
+        return [Alias(*row) for row in rows]
+
+    def get(self, sha256: str) -> bytes:
+        return self.store.get(self.blob_key(sha256))
+
+    def stats(self) -> Dict[str, int]:
+        with self.lock:
+            blobs, size = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM blobs WHERE store = ?",
+                                           (self.scope,)).fetchone()
+            urls = self._db.execute("SELECT COUNT(*) FROM aliases WHERE store = ?", (self.scope,)).fetchone()[0]
+        return {"blobs": blobs, "bytes": size, "urls": urls}
+
+    def close(self) -> None:
+        with self.lock:
+            self._db.close()
@@ -0,0 +1,430 @@
+"""Shared, host-partitioned frontier for crawls run by several worker processes.
+
+One spider process per VM leaves most of the machine, and the crawl budget,
+idle while it waits on slow hosts. :class:`CrawlCoordinator` lets N workers
+share one frontier in a SQLite file:
+
+- every URL belongs to a partition picked by hashing its host, so all of a
+  host's URLs, pages and documents alike, live in the same partition;
+- workers hold time-limited *leases* on partitions and only fetch URLs from
+  partitions they hold. A host is therefore crawled by one worker at a time,
+  and that worker's :class:`~src.utils.politeness.PolitenessScheduler` (rate,
+  concurrency window, robots.txt) is the host's global politeness state;
+- a heartbeat thread renews the leases and rebalances: each live worker aims
+  for an equal share of the partitions, claiming free or expired ones and
+  draining and handing back the ones above its share. A worker that has
+  spent its budget *retires*: its share drops to zero, so its hosts go to the
+  workers that can still crawl them (until every live worker has retired);
+- claimed URLs stay in the database, marked with their owner, until the
+  worker reports them done. When a worker dies its leases expire, and the
+  worker that claims one of its partitions puts the unfinished URLs back in
+  the queue. A URL that was claimed `max_attempts` times without being
+  finished (a page that keeps crashing workers) is given up on;
+- finished URLs are kept, so the table is also the crawl-wide seen-set: a URL
+  discovered by several workers is queued and fetched once.
+
+Workers claim and report URLs in batches and write new links together with
+the completion of the page they came from, in one transaction. A crash loses
+either both or neither, so the page is re-fetched and its links are found
+again. Each URL is fetched at least once, and more than once only after a crash.
+
+The database must be reachable by every worker with working file locks: the
+processes of one machine, or machines sharing a filesystem with POSIX locks.
+Clocks of machines sharing a file are assumed to be NTP-synchronised (lease
+times are wall-clock).
+"""
+from __future__ import annotations
+
+import hashlib
+import math
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from collections import deque
+from pathlib import Path
+from typing import Callable, Deque, Dict, Iterable, List, Optional, Tuple
+
+from src.utils.crawl_engine import host_key
+from src.utils.crawl_state import Item
+
+DEFAULT_PARTITIONS = 64
+LEASE_TTL = 30.0  # seconds a partition stays with a worker that stopped heartbeating
+MAX_ATTEMPTS = 3
+
+QUEUED, CLAIMED, DONE = 0, 1, 2
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS partitions (
+    partition INTEGER PRIMARY KEY,
+    owner TEXT,
+    lease_until REAL NOT NULL DEFAULT 0,
+    draining INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS workers (
+    worker TEXT PRIMARY KEY,
+    heartbeat REAL NOT NULL,
+    retired INTEGER NOT NULL DEFAULT 0
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS urls (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    queue TEXT NOT NULL,
+    url TEXT NOT NULL,
+    partition INTEGER NOT NULL,
+    depth INTEGER NOT NULL,
+    priority REAL NOT NULL DEFAULT 0,
+    state INTEGER NOT NULL DEFAULT 0,
+    owner TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    UNIQUE (queue, url)
+);
+CREATE INDEX IF NOT EXISTS urls_ready ON urls (queue, partition, state, priority DESC, seq);
+CREATE INDEX IF NOT EXISTS urls_owner ON urls (owner, state);
+"""
+
+
+def default_worker_id() -> str:
+    """``<hostname>-<pid>-<random>``: unique per process, readable in the partition table."""
+    return f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+
+
+def host_partition(url: str, partitions: int) -> int:
+    """Partition of `url`: a stable hash of its lowercased host, so one host never spans two partitions."""
+    digest = hashlib.blake2b(host_key(url).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % partitions
+
+
+class CrawlCoordinator:
+    """This worker's handle on a shared crawl database; see the module docstring.
+
+    Call :meth:`start` to register and begin heartbeating, :meth:`stop` to
+    hand the partitions back. Safe to share between the threads of a worker.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        worker: Optional[str] = None,
+        partitions: int = DEFAULT_PARTITIONS,
+        lease_ttl: float = LEASE_TTL,
+        max_attempts: int = MAX_ATTEMPTS,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.worker = worker or default_worker_id()
+        self.lease_ttl = lease_ttl
+        self.max_attempts = max_attempts
+        self.clock = clock
+        self.lock = threading.RLock()
+        self._db = sqlite3.connect(str(self.path), timeout=60, isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+        with self._transaction():
+            self._db.execute("INSERT OR IGNORE INTO meta VALUES ('partitions', ?)", (str(partitions),))
+            stored = int(self._db.execute("SELECT value FROM meta WHERE key = 'partitions'").fetchone()[0])
+            if stored != partitions:
+                raise ValueError(f"{self.path} was created with {stored} partitions, not {partitions}")
+            self._db.executemany("INSERT OR IGNORE INTO partitions (partition) VALUES (?)",
+                                 [(p,) for p in range(partitions)])
+        self.partitions = partitions
+        self.held: List[int] = []  # partitions this worker holds, as of the last heartbeat
+        self.retired = False
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _transaction(self) -> "_Transaction":
+        return _Transaction(self)
+
+    # Membership and leases
+
+    def start(self) -> "CrawlCoordinator":
+        """Register, take a first share of the partitions and keep the leases alive in a background thread."""
+        self.heartbeat()
+        self._thread = threading.Thread(target=self._run, name=f"coordinator-{self.worker}", daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.lease_ttl / 3):
+            try:
+                self.heartbeat()
+            except sqlite3.Error:  # a busy database only delays this beat; leases outlive two more
+                pass
+
+    def heartbeat(self) -> List[int]:
+        """Renew this worker's leases and rebalance; returns the partitions it now holds."""
+        now = self.clock()
+        with self._transaction():
+            db = self._db
+            db.execute("INSERT OR REPLACE INTO workers VALUES (?, ?, ?)", (self.worker, now, int(self.retired)))
+            live, active = db.execute("SELECT COUNT(*), COUNT(*) - SUM(retired) FROM workers WHERE heartbeat > ?",
+                                      (now - self.lease_ttl,)).fetchone()
+            if self.retired and active:
+                share = 0
+            else:  # once every live worker has retired, they share the partitions again
+                share = math.ceil(self.partitions / max(active or live, 1))
+            db.execute("UPDATE partitions SET lease_until = ? WHERE owner = ?", (now + self.lease_ttl, self.worker))
+            owned = [p for (p,) in db.execute(
+                "SELECT partition FROM partitions WHERE owner = ? AND draining = 0 ORDER BY partition", (self.worker,)
+            )]
+            if len(owned) > share:
+                db.executemany("UPDATE partitions SET draining = 1 WHERE partition = ?",
+                               [(p,) for p in owned[share:]])
+            elif len(owned) < share:
+                # Keep partitions this worker was still draining before taking new ones
+                kept = [p for (p,) in db.execute(
+                    "SELECT partition FROM partitions WHERE owner = ? AND draining = 1 ORDER BY partition LIMIT ?",
+                    (self.worker, share - len(owned)),
+                )]
+                db.executemany("UPDATE partitions SET draining = 0 WHERE partition = ?", [(p,) for p in kept])
+                free = [p for (p,) in db.execute(
+                    "SELECT partition FROM partitions WHERE owner IS NULL OR lease_until < ? ORDER BY partition LIMIT ?",
+                    (now, share - len(owned) - len(kept)),
+                )]
+                for partition in free:
+                    # A previous owner's unfinished URLs go back in the queue
+                    db.execute("UPDATE urls SET state = ?, owner = NULL WHERE partition = ? AND state = ?",
+                               (QUEUED, partition, CLAIMED))
+                    db.execute(
+                        "UPDATE partitions SET owner = ?, lease_until = ?, draining = 0 WHERE partition = ?",
+                        (self.worker, now + self.lease_ttl, partition),
+                    )
+            # Hand back drained partitions once none of their URLs are in flight here
+            db.execute(
+                "UPDATE partitions SET owner = NULL, lease_until = 0, draining = 0 "
+                "WHERE owner = ? AND draining = 1 AND NOT EXISTS "
+                "(SELECT 1 FROM urls WHERE urls.partition = partitions.partition AND state = ? AND owner = ?)",
+                (self.worker, CLAIMED, self.worker),
+            )
+            self.held = [p for (p,) in db.execute(
+                "SELECT partition FROM partitions WHERE owner = ? ORDER BY partition", (self.worker,)
+            )]
+        return self.held
+
+    def retire(self) -> List[int]:
+        """Hand this worker's partitions to the workers that have not retired, once its claims are done.
+
+        For a worker whose crawl budget is spent: its hosts' queued URLs would
+        otherwise wait for it while the other workers poll an empty frontier.
+        Returns the partitions it still holds (draining its in-flight URLs).
+        """
+        self.retired = True
+        return self.heartbeat()
+
+    def stop(self) -> None:
+        """Stop heartbeating, requeue this worker's unfinished URLs and release its partitions."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        with self._transaction():
+            self._db.execute("UPDATE urls SET state = ?, owner = NULL WHERE owner = ? AND state = ?",
+                             (QUEUED, self.worker, CLAIMED))
+            self._db.execute("UPDATE partitions SET owner = NULL, lease_until = 0, draining = 0 WHERE owner = ?",
+                             (self.worker,))
+            self._db.execute("DELETE FROM workers WHERE worker = ?", (self.worker,))
+        self.held = []
+
+    def close(self) -> None:
+        with self.lock:
+            self._db.close()
+
+    # Work
+
+    def commit(self, queue: str, pushes: Iterable[Tuple[str, int, float]] = (), done: Iterable[str] = ()) -> None:
+        """Queue new ``(url, depth, priority)`` items and mark claimed URLs done, in one transaction.
+
+        Already-known URLs only get their priority raised while still queued.
+        """
+        rows = [(queue, url, host_partition(url, self.partitions), depth, priority) for url, depth, priority in pushes]
+        done = [(DONE, queue, url, self.worker) for url in done]
+        if not rows and not done:
+            return
+        with self._transaction():
+            self._db.executemany(
+                "INSERT INTO urls (queue, url, partition, depth, priority) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (queue, url) DO UPDATE SET priority = excluded.priority "
+                "WHERE urls.state = 0 AND excluded.priority > urls.priority",
+                rows,
+            )
+            self._db.executemany("UPDATE urls SET state = ?, owner = NULL WHERE queue = ? AND url = ? AND owner = ?",
+                                 done)
+
+    def claim(self, queue: str, limit: int) -> List[Item]:
+        """Up to `limit` queued URLs of the partitions this worker holds, best first."""
+        now = self.clock()
+        query = (
+            "SELECT seq, url, depth, attempts FROM urls WHERE queue = ? AND state = ? AND partition IN "
+            "(SELECT partition FROM partitions WHERE owner = ? AND lease_until > ? AND draining = 0) "
+            "ORDER BY priority DESC, seq LIMIT ?"
+        )
+        params = (queue, QUEUED, self.worker, now, limit)
+        with self.lock:  # idle workers poll: look before taking the write lock
+            if self._db.execute(query, params).fetchone() is None:
+                return []
+        with self._transaction():
+            rows = self._db.execute(query, params).fetchall()
+            given_up = [(DONE, seq) for seq, _, _, attempts in rows if attempts >= self.max_attempts]
+            claimed = [(CLAIMED, self.worker, seq) for seq, _, _, attempts in rows if attempts < self.max_attempts]
+            self._db.executemany("UPDATE urls SET state = ?, owner = NULL WHERE seq = ?", given_up)
+            self._db.executemany("UPDATE urls SET state = ?, owner = ?, attempts = attempts + 1 WHERE seq = ?",
+                                 claimed)
+        return [(url, depth) for _, url, depth, attempts in rows if attempts < self.max_attempts]
+
+    def unclaim(self, queue: str, urls: Iterable[str]) -> None:
+        """Put claimed but unprocessed URLs back in the queue (the attempt does not count)."""
+        rows = [(QUEUED, queue, url, self.worker, CLAIMED) for url in urls]
+        with self._transaction():
+            self._db.executemany(
+                "UPDATE urls SET state = ?, owner = NULL, attempts = MAX(attempts - 1, 0) "
+                "WHERE queue = ? AND url = ? AND owner = ? AND state = ?",
+                rows,
+            )
+
+    def pending(self, queue: str) -> int:
+        """Queued URLs of `queue`, crawl-wide."""
+        with self.lock:
+            return self._db.execute("SELECT COUNT(*) FROM urls WHERE queue = ? AND state = ?",
+                                    (queue, QUEUED)).fetchone()[0]
+
+    def finished(self, queue: str) -> bool:
+        """True once no worker has anything of `queue` queued or in flight."""
+        with self.lock:
+            return self._db.execute("SELECT 1 FROM urls WHERE queue = ? AND state < ? LIMIT 1",
+                                    (queue, DONE)).fetchone() is None
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Per worker: partitions held and URLs in flight (for progress output)."""
+        now = self.clock()
+        with self.lock:
+            stats: Dict[str, Dict[str, int]] = {}
+            for owner, count in self._db.execute(
+                "SELECT owner, COUNT(*) FROM partitions WHERE owner IS NOT NULL AND lease_until > ? GROUP BY owner",
+                (now,),
+            ):
+                stats.setdefault(owner, {"partitions": 0, "claimed": 0})["partitions"] = count
+            for owner, count in self._db.execute(
+                "SELECT owner, COUNT(*) FROM urls WHERE state = ? GROUP BY owner", (CLAIMED,)
+            ):
+                stats.setdefault(owner, {"partitions": 0, "claimed": 0})["claimed"] = count
+            return stats
+
+    def frontier(self, queue: str = "page", batch_size: int = 16) -> "DistributedFrontier":
+        return DistributedFrontier(self, queue, batch_size)
+
+
+class _Transaction:
+    """``BEGIN IMMEDIATE`` ... ``COMMIT`` under the coordinator's lock (rolled back on error)."""
+
+    def __init__(self, coordinator: CrawlCoordinator) -> None:
+        self.coordinator = coordinator
+
+    def __enter__(self) -> None:
+        self.coordinator.lock.acquire()
+        try:
+            self.coordinator._db.execute("BEGIN IMMEDIATE")
+        except BaseException:
+            self.coordinator.lock.release()
+            raise
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        try:
+            self.coordinator._db.execute("ROLLBACK" if exc_type is not None else "COMMIT")
+        finally:
+            self.coordinator.lock.release()
+
+
+class DistributedFrontier:
+    """A :class:`~src.utils.crawl_state.Frontier` over one queue of a :class:`CrawlCoordinator`.
+
+    URLs are claimed `batch_size` at a time; pushes and completions are
+    buffered and written together before the next claim (or on :meth:`flush`).
+    `pop` returning None only means nothing is available to this worker right
+    now; :meth:`finished` tells whether the whole crawl is done, and
+    :class:`~src.utils.crawl_engine.AsyncCrawlEngine` keeps polling until it is.
+    """
+
+    def __init__(self, coordinator: CrawlCoordinator, queue: str = "page", batch_size: int = 16) -> None:
+        self.coordinator = coordinator
+        self.queue = queue
+        self.batch_size = batch_size
+        self.lock = threading.Lock()
+        self._claimed: Deque[Item] = deque()
+        self._pushes: Dict[str, Tuple[str, int, float]] = {}
+        self._done: List[str] = []
+
+    def push(self, url: str, depth: int, priority: float = 0.0) -> None:
+        with self.lock:
+            previous = self._pushes.get(url)
+            if previous is None or priority > previous[2]:
+                self._pushes[url] = (url, depth, priority)
+            if len(self._pushes) >= 4 * self.batch_size:
+                self._flush()
+
+    def pop(self) -> Optional[Item]:
+        with self.lock:
+            if not self._claimed:
+                self._flush()
+                self._claimed.extend(self.coordinator.claim(self.queue, self.batch_size))
+            return self._claimed.popleft() if self._claimed else None
+
+    def done(self, url: str) -> None:
+        with self.lock:
+            self._done.append(url)
+            if len(self._done) >= self.batch_size:
+                self._flush()
+
+    def _flush(self) -> None:
+        pushes, done = list(self._pushes.values()), self._done
+        self._pushes, self._done = {}, []
+        self.coordinator.commit(self.queue, pushes, done)
+
+    def flush(self) -> None:
+        """Write buffered pushes and completions."""
+        with self.lock:
+            self._flush()
+
+    def close(self) -> None:
+        """Flush, and put claimed URLs that were never handed out back in the queue."""
+        with self.lock:
+            self._flush()
+            unclaimed = [url for url, _ in self._claimed]
+            self._claimed.clear()
+        self.coordinator.unclaim(self.queue, unclaimed)
+
+    def finished(self) -> bool:
+        """True once the queue is drained crawl-wide (this worker's buffers included)."""
+        with self.lock:
+            self._flush()
+            if self._claimed:
+                return False
+        return self.coordinator.finished(self.queue)
+
+    def append(self, item: Item) -> None:
+        self.push(*item)
+
+    def extend(self, items: Iterable[Item]) -> None:
+        for url, depth in items:
+            self.push(url, depth)
+
+    def popleft(self) -> Item:
+        item = self.pop()
+        if item is None:
+            raise IndexError("nothing to claim from the shared frontier")
+        return item
+
+    def __bool__(self) -> bool:
+        return not self.finished()
+
+    def __len__(self) -> int:
+        with self.lock:
+            claimed = len(self._claimed)
+        return claimed + self.coordinator.pending(self.queue)
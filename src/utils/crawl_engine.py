@@ -0,0 +1,386 @@
+"""Continuously fed asyncio crawl loop with per-host connection pools.
+
+The threaded spiders submit a batch of URLs and wait for the whole batch before
+refilling, so one slow government host stalls every worker. Here each worker
+pulls the next URL from the frontier as soon as it is free. A URL whose host
+already has `per_host` requests in flight is parked and released when that host
+frees a slot, so a slow host only ever holds its own slots. Every host gets its
+own ``httpx.AsyncClient`` whose pool is capped at the same limit.
+
+With a :class:`~src.utils.politeness.PolitenessScheduler` the per-host limit
+adapts instead: `per_host` becomes a hard cap, the scheduler's token bucket and
+concurrency window decide when a host gets its next request, robots.txt is
+honored, and 429/503 responses are retried after the host's backoff instead of
+being handed to the response handler.
+
+Response handlers are plain synchronous callables (HTML parsing, uploads); they
+run in worker threads so they never block the event loop.
+
+With a :class:`~src.utils.crawl_metrics.CrawlMetrics` every request is
+recorded (latency to the full body, status, bytes, exceptions by class) and the
+URLs parked per host are reported as a per-host ``parked`` gauge.
+
+With a `probe` (:class:`~src.utils.pdf_probe.PdfProbe`) each ``200`` body is
+streamed: the probe sees the headers and first chunk and can reject the
+response before the rest is read, and the body is cut off at its size limit.
+Rejections reach `on_error` like any other failure but do not count against
+the host's politeness state.
+
+A `fetch` callable replaces the engine's own request for downloads that bring
+their own transport (:class:`~src.utils.range_download.RangeDownloader`'s
+resumable byte ranges). The engine still schedules the items (per-host
+limits, budget, shared frontiers) and runs `fetch` in a worker thread. The
+callable's session applies politeness and records metrics itself.
+
+A frontier with a ``finished()`` method (the shared
+:class:`~src.utils.crawl_coordinator.DistributedFrontier`) can be fed by other
+processes: an empty `pop` then only means "nothing yet", and idle workers poll
+it every `IDLE_POLL` seconds until it reports the crawl finished. Its calls
+go to the coordinator's SQLite database, where a write can wait on other
+processes' locks, so they run in worker threads and never block the event loop.
+"""
+from __future__ import annotations
+
+import asyncio
+import math
+import time
+import urllib.parse
+from collections import defaultdict, deque
+from typing import Callable, Deque, Dict, Iterable, Mapping, Optional, Protocol, Union
+
+import httpx
+
+from src.utils.crawl_metrics import CrawlMetrics
+from src.utils.crawl_state import Frontier, Item, MemoryFrontier
+from src.utils.politeness import PolitenessScheduler
+
+ResponseHandler = Callable[[str, int, httpx.Response], Iterable[Item]]
+Fetch = Callable[[str, int], Iterable[Item]]
+Admit = Callable[[str, int], bool]
+ErrorHandler = Callable[[str, BaseException], None]
+RequestHeaders = Callable[[str], Mapping[str, str]]
+
+IDLE_POLL = 0.5  # seconds between looks at a shared frontier that is empty but not finished
+
+
+class BodyProbe(Protocol):
+    """Vets a response from its headers and first chunk (see :class:`~src.utils.pdf_probe.PdfProbe`)."""
+
+    def check(self, url: str, headers: Mapping[str, str], head: bytes) -> None:
+        ...
+
+    def check_size(self, url: str, received: int) -> None:
+        ...
+
+
+def host_key(url: str) -> str:
+    """Scheduling key for a URL: its lowercased network location."""
+    return urllib.parse.urlsplit(url).netloc.lower()
+
+
+class AsyncCrawlEngine:
+    """Fetches (url, depth) items with global and per-host concurrency limits."""
+
+    def __init__(
+        self,
+        concurrency: int = 10,
+        per_host: int = 4,
+        timeout: float = 15.0,
+        headers: Optional[Mapping[str, str]] = None,
+        verify: bool = False,
+        max_fetches: Optional[int] = None,
+        politeness: Optional[PolitenessScheduler] = None,
+        metrics: Optional[CrawlMetrics] = None,
+    ) -> None:
+        if concurrency < 1 or per_host < 1:
+            raise ValueError("concurrency and per_host must be positive")
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.timeout = timeout
+        self.headers = dict(headers or {})
+        self.verify = verify
+        self.max_fetches = max_fetches
+        self.politeness = politeness
+        self.metrics = metrics
+        self.fetches = 0
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self._robots_locks: Dict[str, asyncio.Lock] = {}
+
+    def _client(self, host: str) -> httpx.AsyncClient:
+        client = self._clients.get(host)
+        if client is None:
+            client = httpx.AsyncClient(
+                headers=self.headers,
+                timeout=self.timeout,
+                verify=self.verify,
+                follow_redirects=True,
+                limits=httpx.Limits(max_connections=self.per_host, max_keepalive_connections=self.per_host),
+            )
+            self._clients[host] = client
+        return client
+
+    async def _robots_allowed(self, url: str, host: str) -> bool:
+        # One robots.txt fetch per host, however many workers reach it at once.
+        politeness = self.politeness
+        if politeness.robots_url(url) is not None:
+            async with self._robots_locks.setdefault(host, asyncio.Lock()):
+                robots_url = politeness.robots_url(url)
+                if robots_url is not None:
+                    try:
+                        response = await self._client(host).get(robots_url)
+                        politeness.set_robots(url, response.status_code, response.text)
+                    except Exception:  # unreachable robots.txt: allowed, re-checked later
+                        politeness.set_robots(url, None)
+        return politeness.allowed(url)
+
+    @staticmethod
+    async def _read_probed(url: str, response: httpx.Response, probe: BodyProbe) -> httpx.Response:
+        """Read a streamed response, letting `probe` reject it from its first chunk."""
+        try:
+            if response.status_code != 200:
+                await response.aread()
+                return response
+            chunks = response.aiter_bytes()
+            head = await anext(chunks, b"")
+            probe.check(url, response.headers, head)
+            body, received = [head], len(head)
+            async for chunk in chunks:
+                received += len(chunk)
+                probe.check_size(url, received)
+                body.append(chunk)
+        finally:
+            await response.aclose()
+        # The chunks are already decoded: rebuild without Content-Encoding so they are not decoded twice
+        headers = response.headers.copy()
+        if "content-encoding" in headers:
+            del headers["content-encoding"]
+        return httpx.Response(response.status_code, headers=headers, content=b"".join(body),
+                              request=response.request, history=response.history)
+
+    async def aclose(self) -> None:
+        clients, self._clients = list(self._clients.values()), {}
+        await asyncio.gather(*(client.aclose() for client in clients), return_exceptions=True)
+
+    async def run(
+        self,
+        frontier: Union[Frontier, Iterable[Item]],
+        handle: Optional[ResponseHandler],
+        admit: Optional[Admit] = None,
+        on_error: Optional[ErrorHandler] = None,
+        request_headers: Optional[RequestHeaders] = None,
+        probe: Optional[BodyProbe] = None,
+        fetch: Optional[Fetch] = None,
+    ) -> int:
+        """Crawl until the frontier is drained or `max_fetches` is spent; returns the fetch count.
+
+        `frontier` is a :class:`~src.utils.crawl_state.Frontier` (or plain items,
+        wrapped in a :class:`MemoryFrontier`); items are pulled as workers free
+        up and marked done once handled. `handle(url, depth, response)` returns
+        new items to push. `admit(url, depth)` is checked right before fetching
+        (visited checks, depth limits) and `on_error(url, exc)` receives
+        transport and handler failures. `request_headers(url)` adds per-request
+        headers, e.g. conditional-GET validators from an HTTP cache. `probe`
+        vets ``200`` bodies from their first chunk before they are read whole.
+        `fetch(url, depth)`, when given, downloads and handles each item in a
+        worker thread instead of the engine's GET (`handle` and `probe` are
+        then unused) and returns new items to push.
+        """
+        if not hasattr(frontier, "done"):
+            frontier = MemoryFrontier(frontier)
+        finished = getattr(frontier, "finished", None)  # shared frontiers: other workers may still add URLs
+        # A custom fetch goes through its own polite, metered session
+        politeness = self.politeness if fetch is None else None
+        metrics = self.metrics
+        loop = asyncio.get_running_loop()
+        parked: Dict[str, Deque[Item]] = defaultdict(deque)
+        released: Deque[Item] = deque()
+        active: Dict[str, int] = defaultdict(int)
+        timers: Dict[str, asyncio.TimerHandle] = {}
+        retries: Dict[str, int] = {}  # throttled URLs waiting for another attempt
+        wakeup = asyncio.Condition()
+        in_flight = 0
+        stopped = False
+        if metrics is not None:
+            metrics.per_host("engine", lambda: {host: {"parked": len(queue)} for host, queue in dict(parked).items()})
+
+        def budget_spent() -> bool:
+            return self.max_fetches is not None and self.fetches >= self.max_fetches
+
+        async def call(method: Callable, *args):
+            # Shared frontiers wait on the coordinator's database locks: keep them off the loop
+            if finished is None:
+                return method(*args)
+            return await asyncio.to_thread(method, *args)
+
+        def push_all(items: Iterable[Item]) -> None:
+            for child_url, child_depth in items:
+                frontier.push(child_url, child_depth)
+
+        async def take() -> Optional[Item]:
+            if released:
+                return released.popleft()
+            return None if budget_spent() else await call(frontier.pop)
+
+        def parked_items() -> bool:
+            return any(parked.values())
+
+        async def next_item() -> Optional[Item]:
+            nonlocal stopped
+            async with wakeup:
+                while not stopped:
+                    item = await take()
+                    if item is not None:
+                        return item
+                    if in_flight == 0 and not parked_items() and (
+                        finished is None or budget_spent() or await call(finished)
+                    ):
+                        stopped = True
+                        wakeup.notify_all()
+                    elif finished is None:
+                        await wakeup.wait()
+                    else:
+                        try:
+                            await asyncio.wait_for(wakeup.wait(), IDLE_POLL)
+                        except asyncio.TimeoutError:
+                            pass
+                return None
+
+        async def release(host: str) -> None:
+            # Hand free slots to the next parked URLs of this host (several once the scheduler widens it).
+            async with wakeup:
+                for _ in range(self.per_host - active[host]):
+                    if not parked[host]:
+                        break
+                    released.append(parked[host].popleft())
+                wakeup.notify_all()
+
+        def slot_wait(url: str, host: str) -> float:
+            if active[host] >= self.per_host:
+                return math.inf
+            return 0.0 if politeness is None else politeness.try_acquire(url)
+
+        def park(host: str, item: Item, wait: float) -> None:
+            # inf: a request in flight to this host will release it; otherwise a timer does.
+            parked[host].append(item)
+            if wait != math.inf and host not in timers:
+                timers[host] = loop.call_later(wait, lambda: loop.create_task(wake(host)))
+
+        async def wake(host: str) -> None:
+            timers.pop(host, None)
+            await release(host)
+
+        def give_back(url: str) -> None:
+            if politeness is not None:
+                politeness.cancel(url)
+
+        async def worker() -> None:
+            nonlocal in_flight
+            while True:
+                item = await next_item()
+                if item is None:
+                    return
+                url, depth = item
+                host = host_key(url)
+                if politeness is not None:
+                    in_flight += 1  # the URL is held while robots.txt is fetched; don't let the crawl stop
+                    try:
+                        allowed = await self._robots_allowed(url, host)
+                    finally:
+                        in_flight -= 1
+                    if not allowed:
+                        await call(frontier.done, url)
+                        continue
+                wait = slot_wait(url, host)
+                if wait:
+                    park(host, item, wait)
+                    continue
+                if budget_spent():
+                    # Leave the URL claimed; a persistent frontier re-queues it on resume.
+                    give_back(url)
+                    await release(host)
+                    continue
+                if url not in retries and admit is not None and not admit(url, depth):
+                    give_back(url)
+                    await call(frontier.done, url)
+                    await release(host)
+                    continue
+                active[host] += 1
+                in_flight += 1
+                self.fetches += 1
+                if fetch is not None:
+                    try:
+                        await call(push_all, await asyncio.to_thread(fetch, url, depth))
+                    except Exception as exc:
+                        if on_error is not None:
+                            on_error(url, exc)
+                    finally:
+                        active[host] -= 1
+                        in_flight -= 1
+                        await call(frontier.done, url)
+                        await release(host)
+                    continue
+                retry = False
+                response, fetched = None, None
+                started = time.monotonic()
+                if metrics is not None:
+                    metrics.request_started(url)
+                try:
+                    try:
+                        headers = request_headers(url) if request_headers is not None else None
+                        client = self._client(host)
+                        if probe is None:
+                            response = await client.get(url, headers=headers)
+                        else:
+                            # Headers only: a rejected body then never counts as a transport error for the host
+                            response = await client.send(client.build_request("GET", url, headers=headers),
+                                                         stream=True)
+                    except Exception:
+                        if politeness is not None:
+                            politeness.release(url, None)
+                        raise
+                    if politeness is not None:
+                        throttled = politeness.release(
+                            url, response.status_code, time.monotonic() - started, response.headers.get("retry-after")
+                        )
+                        retry = throttled and retries.get(url, 0) < politeness.max_retries
+                    if retry:
+                        retries[url] = retries.get(url, 0) + 1
+                        if probe is not None:
+                            await response.aclose()
+                    else:
+                        if probe is not None:
+                            response = await self._read_probed(url, response, probe)
+                        fetched = time.monotonic()
+                        await call(push_all, await asyncio.to_thread(handle, url, depth, response))
+                except Exception as exc:  # one bad page must not stop the crawl
+                    if metrics is not None:
+                        metrics.error(url, exc)
+                    if on_error is not None:
+                        on_error(url, exc)
+                finally:
+                    if metrics is not None:
+                        metrics.request_finished(
+                            url,
+                            None if response is None else response.status_code,
+                            (fetched or time.monotonic()) - started,
+                            0 if fetched is None else len(response.content),
+                        )
+                    active[host] -= 1
+                    in_flight -= 1
+                    if retry:
+                        park(host, item, politeness.delay(url))
+                    else:
+                        retries.pop(url, None)
+                        await call(frontier.done, url)
+                    await release(host)
+
+        workers = [asyncio.create_task(worker()) for _ in range(self.concurrency)]
+        try:
+            await asyncio.gather(*workers)
+        finally:
+            for task in workers:
+                task.cancel()
+            for timer in timers.values():
+                timer.cancel()
+            await self.aclose()
+        return self.fetches
@@ -0,0 +1,333 @@
+"""Crawl telemetry: per-host latency histograms, throughput, status and error counts.
+
+The spiders only printed a handful of totals at the end of a run, so an
+operator watching a long crawl on the VM could not tell which host was
+holding it back. :class:`CrawlMetrics` records, per host:
+
+- a request latency histogram (time to the full body), with p50/p95 estimates;
+- response bytes and bytes/second, and request counts by status code
+  (``error`` when the request failed before a response arrived);
+- exception counts by class, for failures anywhere in the crawl loop;
+- requests in flight, plus any per-host values a callback reports (e.g. the
+  politeness scheduler's concurrency window and rate).
+
+Crawl-wide gauges such as the frontier's queue depth are read through
+callbacks when a snapshot is taken. :class:`MetricsExporter` takes a snapshot
+every `interval` seconds in a background thread. It rewrites a Prometheus
+text-format file (atomically, for node_exporter's textfile collector or a
+plain ``cat``) and appends the snapshot to a JSONL time series.
+:func:`busiest_hosts` ranks hosts by the time spent waiting on them, which is
+where a slow crawl's bottleneck shows up.
+
+:class:`~src.utils.crawl_engine.AsyncCrawlEngine` takes a metrics instance
+directly; threaded code wraps its ``requests`` session in :class:`MeteredSession`.
+"""
+from __future__ import annotations
+
+import bisect
+import json
+import os
+import threading
+import time
+import urllib.parse
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence
+
+METRICS_DIR_ENV = "YACHAQ_METRICS_DIR"
+PREFIX = "yachaq_crawl"
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)  # seconds
+ERROR_STATUS = "error"
+
+HostGauges = Callable[[], Mapping[str, Mapping[str, Any]]]
+
+
+def default_metrics_dir() -> Optional[Path]:
+    """Where the spiders export telemetry (``$YACHAQ_METRICS_DIR``), or None for no export."""
+    directory = os.environ.get(METRICS_DIR_ENV)
+    return Path(directory) if directory else None
+
+
+def _host(url: str) -> str:
+    return urllib.parse.urlsplit(url).netloc.lower()
+
+
+class Histogram:
+    """Fixed-bucket histogram (Prometheus ``le`` semantics: a value lands in the first bucket >= it)."""
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS) -> None:
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # the last one is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimate, interpolating linearly inside the bucket (the top finite bound for the +Inf bucket)."""
+        if not self.count:
+            return None
+        rank, seen = q * self.count, 0
+        for index, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                if index == len(self.buckets):
+                    return self.buckets[-1]
+                lower = self.buckets[index - 1] if index else 0.0
+                return lower + (self.buckets[index] - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+    def snapshot(self) -> Dict[str, Any]:
+        p50, p95 = self.quantile(0.5), self.quantile(0.95)
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "p50": None if p50 is None else round(p50, 4),
+            "p95": None if p95 is None else round(p95, 4),
+            "buckets": list(self.counts),
+        }
+
+
+class _HostMetrics:
+    def __init__(self) -> None:
+        self.latency = Histogram()
+        self.statuses: Counter = Counter()
+        self.errors: Counter = Counter()
+        self.bytes = 0
+        self.in_flight = 0
+
+
+class CrawlMetrics:
+    """Thread-safe telemetry of one crawl; see the module docstring."""
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic) -> None:
+        self.clock = clock
+        self.started = clock()
+        self.lock = threading.Lock()
+        self.hosts: Dict[str, _HostMetrics] = defaultdict(_HostMetrics)
+        self.gauges: Dict[str, Callable[[], float]] = {}
+        self.host_gauges: Dict[str, HostGauges] = {}
+        self._last: Optional[tuple] = None  # (time, total bytes, per-host bytes, requests) of the last snapshot
+
+    def gauge(self, name: str, read: Callable[[], float]) -> None:
+        """Report ``read()`` as crawl-wide gauge `name` in every snapshot."""
+        self.gauges[name] = read
+
+    def per_host(self, source: str, read: HostGauges) -> None:
+        """Add ``read()`` (host -> {name: number}) to the per-host values of every snapshot, as ``<source>_<name>``.
+
+        Registering the same `source` again replaces its callback.
+        """
+        self.host_gauges[source] = read
+
+    def request_started(self, url: str) -> None:
+        with self.lock:
+            self.hosts[_host(url)].in_flight += 1
+
+    def request_finished(
+        self,
+        url: str,
+        status: Optional[int],
+        latency: Optional[float] = None,
+        nbytes: int = 0,
+    ) -> None:
+        """Close a :meth:`request_started` (`status` None when no response arrived)."""
+        with self.lock:
+            host = self.hosts[_host(url)]
+            host.in_flight -= 1
+            host.statuses[ERROR_STATUS if status is None else str(status)] += 1
+            host.bytes += nbytes
+            if latency is not None:
+                host.latency.observe(latency)
+
+    def error(self, url: str, exc: BaseException) -> None:
+        """Count an exception by class; called by the code that catches it, not where it is raised."""
+        with self.lock:
+            self.hosts[_host(url)].errors[type(exc).__name__] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Current values, with bytes/second and requests/second since the previous snapshot."""
+        extra: Dict[str, Dict[str, Any]] = defaultdict(dict)
+        for source, read in list(self.host_gauges.items()):
+            for host, values in read().items():
+                extra[host].update((f"{source}_{name}", value) for name, value in values.items())
+        gauges = {name: read() for name, read in self.gauges.items()}
+        now = self.clock()
+        with self.lock:
+            since, last_bytes, last_hosts, last_requests = self._last or (self.started, 0, {}, 0)
+            window = max(now - since, 1e-9)
+            hosts, statuses, errors = {}, Counter(), Counter()
+            for name in sorted(set(self.hosts) | set(extra)):
+                host = self.hosts[name]
+                statuses.update(host.statuses)
+                errors.update(host.errors)
+                hosts[name] = {
+                    "requests": sum(host.statuses.values()),
+                    "in_flight": host.in_flight,
+                    "bytes": host.bytes,
+                    "bytes_per_second": round((host.bytes - last_hosts.get(name, 0)) / window, 1),
+                    "busy_seconds": round(host.latency.sum, 3),
+                    "statuses": dict(host.statuses),
+                    "errors": dict(host.errors),
+                    "latency": host.latency.snapshot(),
+                    **extra.get(name, {}),
+                }
+            total_bytes = sum(host["bytes"] for host in hosts.values())
+            requests = sum(statuses.values())
+            self._last = (now, total_bytes, {name: host["bytes"] for name, host in hosts.items()}, requests)
+        return {
+            "time": round(time.time(), 3),
+            "elapsed": round(now - self.started, 3),
+            "requests": requests,
+            "requests_per_second": round((requests - last_requests) / window, 2),
+            "bytes": total_bytes,
+            "bytes_per_second": round((total_bytes - last_bytes) / window, 1),
+            "in_flight": sum(host["in_flight"] for host in hosts.values()),
+            "statuses": dict(statuses),
+            "errors": dict(errors),
+            "gauges": gauges,
+            "latency_buckets": list(LATENCY_BUCKETS),
+            "hosts": hosts,
+        }
+
+
+def busiest_hosts(snapshot: Mapping[str, Any], n: int = 3) -> List[str]:
+    """Hosts of a snapshot that spent the most time in requests, busiest first."""
+    hosts = snapshot["hosts"]
+    return sorted(hosts, key=lambda name: hosts[name]["busy_seconds"], reverse=True)[:n]
+
+
+def _label(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _number(value: Any) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(int(value))
+
+
+def prometheus_text(snapshot: Mapping[str, Any], prefix: str = PREFIX) -> str:
+    """Render a :meth:`CrawlMetrics.snapshot` in the Prometheus text exposition format."""
+    lines: List[str] = []
+
+    def family(name: str, kind: str, help_text: str) -> str:
+        lines.append(f"# HELP {prefix}_{name} {help_text}")
+        lines.append(f"# TYPE {prefix}_{name} {kind}")
+        return f"{prefix}_{name}"
+
+    hosts = snapshot["hosts"]
+    metric = family("requests_total", "counter", "HTTP requests by host and status (error: no response).")
+    for host, values in hosts.items():
+        for status, count in sorted(values["statuses"].items()):
+            lines.append(f'{metric}{{host="{_label(host)}",status="{_label(status)}"}} {count}')
+    metric = family("errors_total", "counter", "Exceptions by host and class.")
+    for host, values in hosts.items():
+        for name, count in sorted(values["errors"].items()):
+            lines.append(f'{metric}{{host="{_label(host)}",exception="{_label(name)}"}} {count}')
+    metric = family("response_bytes_total", "counter", "Response body bytes by host.")
+    for host, values in hosts.items():
+        lines.append(f'{metric}{{host="{_label(host)}"}} {values["bytes"]}')
+    metric = family("bytes_per_second", "gauge", "Response bytes per second since the previous export.")
+    for host, values in hosts.items():
+        lines.append(f'{metric}{{host="{_label(host)}"}} {_number(values["bytes_per_second"])}')
+    lines.append(f"{metric} {_number(snapshot['bytes_per_second'])}")
+    metric = family("in_flight", "gauge", "Requests in flight.")
+    for host, values in hosts.items():
+        lines.append(f'{metric}{{host="{_label(host)}"}} {values["in_flight"]}')
+    lines.append(f"{metric} {snapshot['in_flight']}")
+
+    metric = family("request_duration_seconds", "histogram", "Request latency (time to the full body) by host.")
+    bounds = [repr(float(bound)) for bound in snapshot["latency_buckets"]] + ["+Inf"]
+    for host, values in hosts.items():
+        latency, cumulative = values["latency"], 0
+        for bound, count in zip(bounds, latency["buckets"]):
+            cumulative += count
+            lines.append(f'{metric}_bucket{{host="{_label(host)}",le="{bound}"}} {cumulative}')
+        lines.append(f'{metric}_sum{{host="{_label(host)}"}} {_number(float(latency["sum"]))}')
+        lines.append(f'{metric}_count{{host="{_label(host)}"}} {latency["count"]}')
+
+    reserved = {"requests", "in_flight", "bytes", "bytes_per_second", "busy_seconds", "statuses", "errors", "latency"}
+    host_gauges = sorted({name for values in hosts.values() for name in values if name not in reserved})
+    for name in host_gauges:
+        metric = family(f"host_{name}", "gauge", f"Per-host {name.replace('_', ' ')}.")
+        for host, values in hosts.items():
+            if isinstance(values.get(name), (int, float)):
+                lines.append(f'{metric}{{host="{_label(host)}"}} {_number(values[name])}')
+    for name, value in sorted(snapshot["gauges"].items()):
+        metric = family(name, "gauge", f"Crawl {name.replace('_', ' ')}.")
+        lines.append(f"{metric} {_number(value)}")
+    return "\n".join(lines) + "\n"
+
+
+class MetricsExporter:
+    """Writes `metrics` every `interval` seconds to ``<name>.prom`` and ``<name>_metrics.jsonl`` in `directory`."""
+
+    def __init__(self, metrics: CrawlMetrics, directory: Path, name: str = "crawl", interval: float = 10.0) -> None:
+        self.metrics = metrics
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.prom_path = self.directory / f"{name}.prom"
+        self.jsonl_path = self.directory / f"{name}_metrics.jsonl"
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def export(self) -> Dict[str, Any]:
+        """Take a snapshot now and write it out."""
+        snapshot = self.metrics.snapshot()
+        tmp = self.prom_path.with_suffix(".prom.tmp")
+        tmp.write_text(prometheus_text(snapshot))
+        os.replace(tmp, self.prom_path)
+        with open(self.jsonl_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(snapshot, ensure_ascii=False) + "\n")
+        return snapshot
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.export()
+
+    def start(self) -> "MetricsExporter":
+        self._thread = threading.Thread(target=self._run, name="metrics-exporter", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> Dict[str, Any]:
+        """Stop the background thread and write the final snapshot."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return self.export()
+
+
+class MeteredSession:
+    """Wraps a ``requests``-style session so each ``get`` is recorded in `metrics`.
+
+    For ``stream=True`` requests, whose body the caller reads, the latency is
+    the time to the headers and the bytes are the declared ``Content-Length``.
+    """
+
+    def __init__(self, session: Any, metrics: CrawlMetrics) -> None:
+        self.session = session
+        self.metrics = metrics
+
+    def get(self, url: str, **kwargs: Any) -> Any:
+        metrics = self.metrics
+        metrics.request_started(url)
+        started = time.monotonic()
+        try:
+            response = self.session.get(url, **kwargs)
+        except Exception:
+            metrics.request_finished(url, None, time.monotonic() - started)
+            raise
+        if kwargs.get("stream"):
+            length = response.headers.get("content-length") or ""
+            nbytes = int(length) if length.isdigit() else 0
+        else:
+            nbytes = len(response.content)
+        metrics.request_finished(url, response.status_code, time.monotonic() - started, nbytes)
+        return response
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.session, name)
@@ -0,0 +1,254 @@
+"""Disk-backed conditional-GET cache shared by the document downloaders.
+
+Nightly refresh runs used to download every multi-MB PDF again and push it to
+object storage whether it had changed or not. For each canonical URL that was
+stored successfully, the cache keeps the response validators (``ETag`` and
+``Last-Modified``) and the SHA-256 of the body:
+
+- the next request sends ``If-None-Match``/``If-Modified-Since``, and a
+  ``304 Not Modified`` reply costs no body bytes at all;
+- servers that ignore validators (common on the ``.gob.ec`` WordPress sites)
+  still answer ``200``, but a body whose hash matches the stored one is reported
+  as unchanged before anything reaches object storage.
+
+Entries are written only through :meth:`HttpCache.store`, after the upload has
+succeeded, so a failed upload is retried in full on the next run. "Stored"
+means stored in one particular object store: the file is shared by every
+downloader on the machine, so entries are keyed by a `namespace` (the store's
+root URI) as well as the URL, and a copy kept in a local test store does not
+make a later S3 run skip the document.
+
+Large documents are fetched by :mod:`src.utils.range_download`, which sends the
+same validators and hands back a :class:`Revalidation` whose body is a file on
+disk instead of bytes in memory.
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import IO, Any, Dict, Optional
+
+from src.utils.urls import canonicalize_url
+
+CACHE_ENV = "YACHAQ_HTTP_CACHE"
+DEFAULT_CACHE_PATH = Path.home() / ".cache" / "yachaq" / "http_cache.sqlite"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS http_cache (
+    namespace TEXT NOT NULL,
+    url TEXT NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    sha256 TEXT,
+    size INTEGER NOT NULL DEFAULT 0,
+    checked_at REAL NOT NULL,
+    PRIMARY KEY (namespace, url)
+) WITHOUT ROWID;
+"""
+
+
+def default_cache_path() -> Path:
+    """Cache file shared by every downloader on this machine (``$YACHAQ_HTTP_CACHE`` overrides it)."""
+    return Path(os.environ.get(CACHE_ENV) or DEFAULT_CACHE_PATH)
+
+
+def content_hash(content: bytes) -> str:
+    return hashlib.sha256(content).hexdigest()
+
+
+@dataclass
+class CacheEntry:
+    """What the cache remembers about the last stored copy of a URL."""
+
+    url: str
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    sha256: Optional[str] = None
+    size: int = 0
+    checked_at: float = 0.0
+
+    def conditional_headers(self) -> Dict[str, str]:
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+@dataclass
+class Revalidation:
+    """Outcome of a conditional GET.
+
+    `unchanged` is True for a 304 and for a 200 whose body hashes to the stored
+    copy; `content` is empty in the first case. Callers upload only when
+    `changed`, then call :meth:`HttpCache.store`.
+
+    Bodies downloaded to disk are in `path` rather than `content`; read them
+    through :meth:`head`/:meth:`body` and call :meth:`discard` once done.
+    """
+
+    url: str
+    status: int
+    content: bytes = b""
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    sha256: Optional[str] = None
+    unchanged: bool = False
+    path: Optional[Path] = None
+    size: int = 0
+    _file: Optional[IO[bytes]] = field(default=None, repr=False, compare=False)
+
+    @property
+    def ok(self) -> bool:
+        return self.unchanged or self.status == 200
+
+    @property
+    def changed(self) -> bool:
+        return self.status == 200 and not self.unchanged
+
+    def head(self, n: int) -> bytes:
+        """First `n` bytes of the body (magic-number checks)."""
+        if self.path is None:
+            return self.content[:n]
+        with open(self.path, "rb") as f:
+            return f.read(n)
+
+    def body(self) -> Any:
+        """The body as bytes, or as an open binary file when it was downloaded to disk."""
+        if self.path is None:
+            return self.content
+        if self._file is None or self._file.closed:
+            self._file = open(self.path, "rb")
+        self._file.seek(0)
+        return self._file
+
+    def discard(self) -> None:
+        """Delete a body downloaded to disk (no-op for in-memory bodies)."""
+        if self._file is not None:
+            self._file.close()
+        if self.path is not None:
+            self.path.unlink(missing_ok=True)
+
+
+class HttpCache:
+    """Validators and content hashes per canonical URL, in one SQLite file.
+
+    `namespace` names where the cached copies are kept, normally
+    ``store.uri()`` of the downloader's object store; caches with different
+    namespaces share the file but not its entries. Safe to share between the
+    worker threads of a downloader.
+    """
+
+    def __init__(self, path: Optional[Path] = None, namespace: str = "") -> None:
+        self.namespace = namespace
+        self.path = Path(path) if path is not None else default_cache_path()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.lock = threading.RLock()
+        self._db = sqlite3.connect(str(self.path), isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(http_cache)")}
+        if columns and "namespace" not in columns:
+            # Entries from before namespaces: which store they describe is unknown, so revalidate from scratch
+            self._db.execute("DROP TABLE http_cache")
+        self._db.executescript(_SCHEMA)
+
+    @staticmethod
+    def key(url: str) -> str:
+        return canonicalize_url(url) or url
+
+    def get(self, url: str) -> Optional[CacheEntry]:
+        with self.lock:
+            row = self._db.execute(
+                "SELECT url, etag, last_modified, sha256, size, checked_at FROM http_cache "
+                "WHERE namespace = ? AND url = ?",
+                (self.namespace, self.key(url)),
+            ).fetchone()
+        return CacheEntry(*row) if row else None
+
+    def headers(self, url: str) -> Dict[str, str]:
+        """Conditional request headers for `url` (empty if it was never stored)."""
+        entry = self.get(url)
+        return entry.conditional_headers() if entry else {}
+
+    def revalidate(self, url: str, response: Any) -> Revalidation:
+        """Classify a response to a conditional GET (``requests`` and ``httpx`` responses both work)."""
+        entry = self.get(url)
+        result = Revalidation(
+            url=self.key(url),
+            status=response.status_code,
+            etag=response.headers.get("etag"),
+            last_modified=response.headers.get("last-modified"),
+        )
+        if response.status_code == 304 and entry is not None:
+            result.unchanged = True
+            result.sha256 = entry.sha256
+            self._touch(result, entry)
+        elif response.status_code == 200:
+            result.content = response.content
+            result.sha256 = content_hash(result.content)
+            result.size = len(result.content)
+            self.settle(result, entry)
+        return result
+
+    def settle(self, result: Revalidation, entry: Optional[CacheEntry] = None) -> Revalidation:
+        """Mark a fully fetched 200 `result` unchanged if its hash matches the stored copy."""
+        entry = entry if entry is not None else self.get(result.url)
+        if entry is not None and entry.sha256 == result.sha256:
+            result.unchanged = True
+            self.store(result)
+        return result
+
+    def fetch(self, session: Any, url: str, **kwargs: Any) -> Revalidation:
+        """Conditional GET through `session` (a ``requests.Session`` or the ``requests`` module)."""
+        headers = dict(kwargs.pop("headers", None) or {})
+        headers.update(self.headers(url))
+        return self.revalidate(url, session.get(url, headers=headers, **kwargs))
+
+    def _touch(self, result: Revalidation, entry: CacheEntry) -> None:
+        # A 304 may carry refreshed validators; keep the newest ones.
+        with self.lock:
+            self._db.execute(
+                "UPDATE http_cache SET etag = ?, last_modified = ?, checked_at = ? WHERE namespace = ? AND url = ?",
+                (result.etag or entry.etag, result.last_modified or entry.last_modified, time.time(),
+                 self.namespace, entry.url),
+            )
+
+    def store(self, result: Revalidation) -> None:
+        """Record the validators and hash of a copy that is now in storage."""
+        if result.sha256 is None:
+            return
+        with self.lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO http_cache (namespace, url, etag, last_modified, sha256, size, checked_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    self.namespace,
+                    result.url,
+                    result.etag,
+                    result.last_modified,
+                    result.sha256,
+                    result.size or len(result.content),
+                    time.time(),
+                ),
+            )
+
+    def forget(self, url: str) -> None:
+        with self.lock:
+            self._db.execute("DELETE FROM http_cache WHERE namespace = ? AND url = ?", (self.namespace, self.key(url)))
+
+    def __len__(self) -> int:
+        with self.lock:
+            return self._db.execute("SELECT COUNT(*) FROM http_cache WHERE namespace = ?",
+                                    (self.namespace,)).fetchone()[0]
+
+    def close(self) -> None:
+        with self.lock:
+            self._db.close()
+
@@ -0,0 +1,115 @@
+"""Find every keyword of a fixed set in a text in one pass.
+
+Scoring and categorising a link used to ask ``keyword in text`` once per
+keyword of every table, some sixty substring scans of each anchor.
+:class:`KeywordMatcher` compiles the keywords once and reports all of them,
+overlapping and nested ones included, in a single pass; the result is exactly
+the set of keywords for which ``keyword in text`` is true.
+
+With pyahocorasick installed the pass is an Aho-Corasick automaton in C.
+Without it, the keywords are compiled into one regular expression shaped like
+their trie (the automaton's goto function, run by the C regex engine). Each
+match is the longest keyword starting at that position, and the keywords that
+are prefixes of it are reported with it. The search then resumes one
+character later. Both backends report matches in the same order.
+
+Matching is case-sensitive; the callers lower-case their text, as they did
+before.
+"""
+from __future__ import annotations
+
+import re
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
+
+try:
+    import ahocorasick
+except ImportError:  # optional C automaton; the regex backend is used without it
+    ahocorasick = None
+
+
+def _trie_pattern(keywords: Iterable[str]) -> str:
+    trie: Dict[str, dict] = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[""] = {}  # a keyword ends here
+
+    def build(node: Dict[str, dict]) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        return f"(?:{body})?" if "" in node else body
+
+    return build(trie)
+
+
+class KeywordMatcher:
+    """Compiled set of keywords; safe to share between threads.
+
+    `automaton` picks the backend: None uses pyahocorasick when it is
+    installed, False forces the regex one.
+    """
+
+    def __init__(self, keywords: Iterable[str], automaton: Optional[bool] = None) -> None:
+        self.keywords = frozenset(keywords)
+        if not self.keywords or "" in self.keywords:
+            raise ValueError("KeywordMatcher needs at least one keyword and no empty ones")
+        if automaton and ahocorasick is None:
+            raise ImportError("KeywordMatcher(automaton=True) needs pyahocorasick")
+        self._automaton = None
+        if automaton is not False and ahocorasick is not None:
+            self._automaton = ahocorasick.Automaton()
+            for keyword in self.keywords:
+                self._automaton.add_word(keyword, keyword)
+            self._automaton.make_automaton()
+        self._pattern = re.compile(_trie_pattern(self.keywords))
+        # For each keyword, the keywords it starts with (itself included), shortest first
+        self._prefixes = {
+            keyword: [keyword[:end] for end in range(1, len(keyword) + 1) if keyword[:end] in self.keywords]
+            for keyword in self.keywords
+        }
+
+    def finditer(self, text: str) -> Iterator[Tuple[int, str]]:
+        """``(position, keyword)`` for every occurrence, overlapping ones included, in text order."""
+        if self._automaton is not None:
+            found = [(end - len(keyword) + 1, keyword) for end, keyword in self._automaton.iter(text)]
+            found.sort(key=lambda item: (item[0], len(item[1])))
+            yield from found
+            return
+        search = self._pattern.search
+        match = search(text)
+        while match is not None:
+            start = match.start()
+            for keyword in self._prefixes[match.group()]:
+                yield start, keyword
+            match = search(text, start + 1)
+
+    def find(self, text: str) -> List[str]:
+        """Distinct keywords occurring in `text`, in order of first occurrence (shorter first on ties)."""
+        if self._automaton is not None:
+            starts: Dict[str, int] = {}
+            for end, keyword in self._automaton.iter(text):  # ends ascending, shorter first at the same end
+                starts.setdefault(keyword, end - len(keyword))
+            return sorted(starts, key=starts.__getitem__) if len(starts) > 1 else list(starts)
+        found: Dict[str, None] = {}
+        search, prefixes = self._pattern.search, self._prefixes
+        match = search(text)
+        while match is not None:
+            found.update(dict.fromkeys(prefixes[match.group()]))
+            match = search(text, match.start() + 1)
+        return list(found)
+
+    def search(self, text: str) -> Optional[str]:
+        """A keyword occurring in `text`, or None; for yes/no checks."""
+        if self._automaton is not None:
+            for _, keyword in self._automaton.iter(text):
+                return keyword
+            return None
+        match = self._pattern.search(text)
+        return match.group() if match is not None else None
+
+    def weigh(self, text: str, weights: Mapping[str, float]) -> Dict[str, float]:
+        """Matched keywords that have a weight in `weights`, mapped to it."""
+        return {keyword: weights[keyword] for keyword in self.find(text) if keyword in weights}
@@ -0,0 +1,109 @@
+"""Keyword tables for scoring and categorising Ecuadorian legal resources.
+
+The relevance, category and legal-content tables of the spiders live here,
+compiled at import into :class:`~src.utils.keywords.KeywordMatcher` instances.
+:func:`find_terms` makes a single pass over a link's URL and anchor text, and
+both the quality score and the category are read off the matched terms
+instead of rescanning the text once per table; :data:`LEGAL` answers the
+spiders' "is this legal content" check the same way.
+"""
+from __future__ import annotations
+
+import itertools
+from typing import Dict, Iterable, List, Tuple
+
+from src.utils.keywords import KeywordMatcher
+
+# HIGH-VALUE keywords (score boost)
+HIGH_VALUE_KEYWORDS: Dict[str, float] = {
+    # Legal codes (highest value)
+    'codigo': 3, 'código': 3, 'ley organica': 3, 'ley orgánica': 3,
+    'constitucion': 3, 'constitución': 3, 'coip': 3, 'copci': 3,
+    'cootad': 3, 'lopdp': 3, 'lrti': 3, 'losncp': 3,
+
+    # Regulations (high value)
+    'reglamento': 2, 'decreto': 2, 'resolucion': 2, 'resolución': 2,
+    'acuerdo ministerial': 2, 'ordenanza': 2,
+
+    # Normative (medium value)
+    'normativa': 1.5, 'reforma': 1.5, 'codificacion': 1.5,
+
+    # Government domains (authority)
+    'sri': 1.5, 'sercop': 1.5, 'iess': 1.5, 'supercias': 1.5,
+    'aduana': 1.5, 'trabajo': 1.5, 'ambiente': 1.5,
+}
+
+# LOW-VALUE keywords (score penalty)
+LOW_VALUE_KEYWORDS: Dict[str, float] = {
+    'informe': -0.5, 'certificado': -0.5, 'formulario': -0.3,
+    'manual usuario': -0.5, 'cronograma': -0.5, 'presupuesto': -0.5,
+    'estados financieros': -1, 'balance': -1, 'ejecucion': -0.5,
+}
+
+# AUTHORITATIVE domains (score boost)
+AUTHORITATIVE_DOMAINS: Dict[str, float] = {
+    'asambleanacional.gob.ec': 2,
+    'lexis.com.ec': 2,
+    'sri.gob.ec': 1.5,
+    'trabajo.gob.ec': 1.5,
+    'supercias.gob.ec': 1.5,
+    'sercop.gob.ec': 1.5,
+    'compraspublicas.gob.ec': 1.5,
+    'iess.gob.ec': 1.5,
+    'aduana.gob.ec': 1.5,
+    'oas.org': 1.5,
+    'finanzas.gob.ec': 1,
+    'defensa.gob.ec': 1,
+    'telecomunicaciones.gob.ec': 1,
+}
+
+# Keywords that indicate legal/government documents
+LEGAL_KEYWORDS: List[str] = [
+    'ley', 'codigo', 'código', 'reglamento', 'resolucion', 'resolución',
+    'decreto', 'acuerdo', 'ordenanza', 'normativa', 'constitucion',
+    'constitución', 'reforma', 'losncp', 'lrti', 'copci', 'cootad',
+    'coip', 'lopdp', 'iess', 'sri', 'sercop', 'laboral', 'tributario',
+    'aduanero', 'ambiental', 'civil', 'penal', 'societario'
+]
+
+# Storage categories, first match wins
+CATEGORY_KEYWORDS: List[Tuple[str, List[str]]] = [
+    ('legal/codigos', ['codigo', 'código', 'ley', 'constitucion']),
+    ('tributario', ['sri', 'tributario', 'impuesto', 'lrti']),
+    ('contratacion', ['sercop', 'contratacion', 'losncp', 'compras publicas']),
+    ('laboral', ['trabajo', 'laboral', 'codigo del trabajo']),
+    ('iess', ['iess', 'seguridad social', 'pension']),
+    ('aduanas', ['aduana', 'copci', 'senae', 'importacion']),
+    ('supercias', ['supercias', 'compañia', 'societario']),
+    ('ambiente', ['ambiente', 'coa', 'ambiental']),
+    ('normativa', ['reglamento', 'decreto', 'acuerdo']),
+]
+DEFAULT_CATEGORY = 'otros'
+
+KEYWORD_WEIGHTS: Dict[str, float] = {**HIGH_VALUE_KEYWORDS, **LOW_VALUE_KEYWORDS}
+
+TERMS = KeywordMatcher(itertools.chain(KEYWORD_WEIGHTS, *(keywords for _, keywords in CATEGORY_KEYWORDS)))
+LEGAL = KeywordMatcher(LEGAL_KEYWORDS)
+
+_WEIGHT_RANK: Dict[str, int] = {keyword: rank for rank, keyword in enumerate(KEYWORD_WEIGHTS)}
+_CATEGORY_RANK: Dict[str, int] = {  # keyword -> index of the first category listing it
+    keyword: rank for rank, (_, keywords) in reversed(list(enumerate(CATEGORY_KEYWORDS))) for keyword in keywords
+}
+
+
+def find_terms(url: str, text: str = '') -> List[str]:
+    """Every table keyword in ``url + ' ' + text`` (lower-cased), in one pass."""
+    return TERMS.find((url + ' ' + text).lower())
+
+
+def weighted_terms(terms: Iterable[str]) -> List[Tuple[str, float]]:
+    """``(keyword, boost)`` for the HIGH/LOW_VALUE_KEYWORDS among `terms`, in table order."""
+    weighted = sorted((term for term in terms if term in _WEIGHT_RANK), key=_WEIGHT_RANK.__getitem__)
+    return [(term, KEYWORD_WEIGHTS[term]) for term in weighted]
+
+
+def categorize(terms: Iterable[str]) -> str:
+    """Storage category of a resource whose URL and title contain `terms`."""
+    ranks = [_CATEGORY_RANK[term] for term in terms if term in _CATEGORY_RANK]
+    return CATEGORY_KEYWORDS[min(ranks)][0] if ranks else DEFAULT_CATEGORY
+
@@ -0,0 +1,76 @@
+"""Crawl priorities for links, from the same tables that score discovered documents.
+
+A FIFO frontier spends a page budget in discovery order, so the "Noticias",
+"Galería" and "Transparencia" sections that portals list first eat it before
+the crawler reaches the normative pages. :class:`LinkScorer` estimates how
+promising an unfetched page is from what is known before fetching it:
+
+- keywords in the anchor text and in the URL's path and query words;
+- the authority of the link's domain;
+- the yield of the page the link was found on (sum of the quality scores of
+  the PDFs it links to), since listing pages cluster near other listings.
+
+Scores are unbounded and only meaningful relative to each other; push them
+as priorities into a :class:`~src.utils.crawl_state.PriorityFrontier` or the
+SQLite frontier to crawl best-first.
+"""
+from __future__ import annotations
+
+import math
+import re
+import urllib.parse
+from typing import Mapping
+
+from src.utils.keywords import KeywordMatcher
+
+_NON_WORD = re.compile(r"[\W_]+")
+
+
+def url_words(url: str) -> str:
+    """Lower-case words of `url`'s path and query: ``/Ley_Organica-2023.pdf`` -> ``ley organica 2023 pdf``."""
+    parts = urllib.parse.urlsplit(url)
+    text = urllib.parse.unquote_plus(f"{parts.path} {parts.query}").lower()
+    return " ".join(_NON_WORD.sub(" ", text).split())
+
+
+class LinkScorer:
+    """Scores text and links against keyword and domain-authority tables.
+
+    `keywords` maps phrases to boosts (negative for penalties) matched as
+    substrings of lower-case text; `domains` maps domain names to authority
+    boosts, the first one contained in the link's host applying.
+    """
+
+    def __init__(
+        self,
+        keywords: Mapping[str, float],
+        domains: Mapping[str, float],
+        keyword_weight: float = 0.1,
+        domain_weight: float = 0.15,
+        yield_weight: float = 0.5,
+    ) -> None:
+        self.keywords = dict(keywords)
+        self.matcher = KeywordMatcher(self.keywords)
+        self.domains = dict(domains)
+        self.keyword_weight = keyword_weight
+        self.domain_weight = domain_weight
+        self.yield_weight = yield_weight
+
+    def text_score(self, text: str) -> float:
+        return sum(self.keywords[keyword] * self.keyword_weight for keyword in self.matcher.find(text))
+
+    def domain_score(self, host: str) -> float:
+        for domain, boost in self.domains.items():
+            if domain in host:
+                return boost * self.domain_weight
+        return 0.0
+
+    def score(self, url: str, anchor_text: str = "", parent_yield: float = 0.0) -> float:
+        """Priority of fetching `url`, linked as `anchor_text` from a page whose PDFs scored `parent_yield` in total."""
+        text = f"{anchor_text.lower()} {url_words(url)}"
+        host = urllib.parse.urlsplit(url).netloc.lower()
+        return (
+            self.text_score(text)
+            + self.domain_score(host)
+            + self.yield_weight * math.log1p(max(parent_yield, 0.0))
+        )
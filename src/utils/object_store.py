@@ -0,0 +1,346 @@
+"""Object storage for raw documents and training data, on S3 or a local directory.
+
+Every collector, spider and training script reaches storage through
+:func:`open_store`, so the bucket is configured in one place and the whole
+ingestion path can run without AWS:
+
+- ``s3://bucket[/prefix]``: :class:`S3Store`, backed by the pooled client and
+  streaming uploads of :mod:`src.utils.s3_upload`;
+- any other value (a path or ``file://`` URI): :class:`LocalStore`, which keeps
+  keys as files under a directory, for laptops, CI and benchmarks.
+
+The location comes from the argument, else ``$YACHAQ_OBJECT_STORE``, else the
+production bucket. Keys are always ``/``-separated and relative to the store.
+"""
+from __future__ import annotations
+
+import os
+import shutil
+import tempfile
+import threading
+import urllib.parse
+from abc import ABC, abstractmethod
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+
+from botocore.exceptions import ClientError
+
+from src.utils.s3_upload import CHUNK_SIZE, PART_SIZE, Body, iter_chunks, s3_client, split_s3_uri, upload_stream
+
+DEFAULT_BUCKET = "yachaq-lex-raw-0017472631"
+STORE_ENV = "YACHAQ_OBJECT_STORE"
+DEFAULT_STORE = f"s3://{DEFAULT_BUCKET}"
+
+# Existence checks for this many keys under one "directory" use one listing instead of a HEAD per key.
+LIST_THRESHOLD = 8
+
+
+@dataclass(frozen=True)
+class ObjectInfo:
+    key: str
+    size: int
+
+
+class ObjectStore(ABC):
+    """put/get/list/exists/stream over keys; bulk helpers are built on those."""
+
+    @abstractmethod
+    def uri(self, key: str = "") -> str:
+        """Location of `key` as understood outside Python (``s3://...`` or ``file://...``)."""
+
+    @abstractmethod
+    def put(
+        self, key: str, body: Body, content_type: Optional[str] = None, metadata: Optional[Dict[str, str]] = None
+    ) -> int:
+        """Store `body` (bytes, text, file object or chunk iterable) under `key`; returns bytes written."""
+
+    @abstractmethod
+    def stream(self, key: str, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+        """Read `key` in chunks; raises KeyError if it does not exist."""
+
+    @abstractmethod
+    def exists(self, key: str) -> bool:
+        ...
+
+    @abstractmethod
+    def list(self, prefix: str = "") -> Iterator[ObjectInfo]:
+        """Objects whose key starts with `prefix`, in key order."""
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        ...
+
+    def get(self, key: str) -> bytes:
+        return b"".join(self.stream(key))
+
+    def exists_many(self, keys: Iterable[str]) -> Dict[str, bool]:
+        return {key: self.exists(key) for key in keys}
+
+    def download_file(self, key: str, path: Path) -> Path:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        partial = path.with_name(path.name + ".part")
+        with partial.open("wb") as handle:
+            for chunk in self.stream(key):
+                handle.write(chunk)
+        os.replace(partial, path)
+        return path
+
+    def upload_file(self, path: Path, key: str, content_type: Optional[str] = None) -> int:
+        with Path(path).open("rb") as handle:
+            return self.put(key, handle, content_type)
+
+    def sync_down(self, prefix: str, directory: Path, suffixes: Optional[Sequence[str]] = None) -> List[Path]:
+        """Mirror objects under `prefix` into `directory`, skipping files already present with the same size."""
+        directory = Path(directory)
+        prefix = prefix.rstrip("/") + "/" if prefix else ""
+        paths = []
+        for info in self.list(prefix):
+            if suffixes and not info.key.endswith(tuple(suffixes)):
+                continue
+            path = directory / info.key[len(prefix) :]
+            if not (path.exists() and path.stat().st_size == info.size):
+                self.download_file(info.key, path)
+            paths.append(path)
+        return paths
+
+    def sync_up(self, directory: Path, prefix: str, delete: bool = False) -> int:
+        """Upload every file under `directory` to `prefix`; with `delete`, drop objects that have no local file."""
+        directory = Path(directory)
+        prefix = prefix.rstrip("/") + "/" if prefix else ""
+        keys = set()
+        for path in sorted(p for p in directory.rglob("*") if p.is_file()):
+            key = prefix + path.relative_to(directory).as_posix()
+            self.upload_file(path, key)
+            keys.add(key)
+        if delete:
+            for info in list(self.list(prefix)):
+                if info.key not in keys:
+                    self.delete(info.key)
+        return len(keys)
+
+
+class S3Store(ObjectStore):
+    """Keys under ``s3://bucket/prefix``, through one pooled client."""
+
+    def __init__(
+        self,
+        bucket: str,
+        prefix: str = "",
+        client: Any = None,
+        part_size: int = PART_SIZE,
+        workers: int = 16,
+    ) -> None:
+        self.bucket = bucket
+        self.prefix = prefix.strip("/") + "/" if prefix.strip("/") else ""
+        self.client = client if client is not None else s3_client()
+        self.part_size = part_size
+        self.workers = workers
+
+    def _key(self, key: str) -> str:
+        return self.prefix + key.lstrip("/")
+
+    def uri(self, key: str = "") -> str:
+        return f"s3://{self.bucket}/{self._key(key)}"
+
+    def put(
+        self, key: str, body: Body, content_type: Optional[str] = None, metadata: Optional[Dict[str, str]] = None
+    ) -> int:
+        return upload_stream(self.client, self.bucket, self._key(key), body, self.part_size, content_type, metadata)
+
+    def stream(self, key: str, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+        try:
+            response = self.client.get_object(Bucket=self.bucket, Key=self._key(key))
+        except ClientError as exc:
+            if exc.response.get("Error", {}).get("Code") in ("NoSuchKey", "404"):
+                raise KeyError(key) from exc
+            raise
+        body = response["Body"]
+        try:
+            yield from iter_chunks(body, chunk_size)
+        finally:
+            body.close()
+
+    def exists(self, key: str) -> bool:
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self._key(key))
+        except ClientError as exc:
+            if exc.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
+        return True
+
+    def _children(self, directory: str) -> set:
+        # Direct children of one "directory" (full keys), one request per 1000 objects.
+        found = set()
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=directory, Delimiter="/"):
+            found.update(obj["Key"] for obj in page.get("Contents", ()))
+        return found
+
+    def exists_many(self, keys: Iterable[str]) -> Dict[str, bool]:
+        """Check many keys at once: list crowded directories, HEAD the rest concurrently."""
+        keys = list(dict.fromkeys(keys))
+        groups: Dict[str, List[str]] = {}
+        for key in keys:
+            full = self._key(key)
+            groups.setdefault(full[: full.rfind("/") + 1], []).append(key)
+        result: Dict[str, bool] = {}
+        single: List[str] = []
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            listings = {}
+            for directory, members in groups.items():
+                if len(members) >= LIST_THRESHOLD:
+                    listings[directory] = pool.submit(self._children, directory)
+                else:
+                    single.extend(members)
+            heads = dict(zip(single, pool.map(self.exists, single)))
+            for directory, future in listings.items():
+                present = future.result()
+                for key in groups[directory]:
+                    result[key] = self._key(key) in present
+        result.update(heads)
+        return {key: result[key] for key in keys}
+
+    def list(self, prefix: str = "") -> Iterator[ObjectInfo]:
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self._key(prefix)):
+            for obj in page.get("Contents", ()):
+                yield ObjectInfo(obj["Key"][len(self.prefix) :], int(obj.get("Size", 0)))
+
+    def delete(self, key: str) -> None:
+        self.client.delete_object(Bucket=self.bucket, Key=self._key(key))
+
+
+class LocalStore(ObjectStore):
+    """Keys as files under a root directory; writes are atomic (temp file + rename)."""
+
+    def __init__(self, root: Path) -> None:
+        self.root = Path(root).expanduser().resolve()
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, key: str) -> Path:
+        path = (self.root / key.lstrip("/")).resolve()
+        if path != self.root and self.root not in path.parents:
+            raise ValueError(f"key escapes the store: {key}")
+        return path
+
+    def uri(self, key: str = "") -> str:
+        return self.root.as_uri() + "/" + key.lstrip("/")
+
+    def put(
+        self, key: str, body: Body, content_type: Optional[str] = None, metadata: Optional[Dict[str, str]] = None
+    ) -> int:
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        written = 0
+        fd, partial = tempfile.mkstemp(dir=path.parent, prefix=".put-")
+        try:
+            with os.fdopen(fd, "wb") as handle:
+                for chunk in iter_chunks(body):
+                    handle.write(chunk)
+                    written += len(chunk)
+            os.replace(partial, path)
+        except BaseException:
+            os.unlink(partial)
+            raise
+        return written
+
+    def stream(self, key: str, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+        path = self._path(key)
+        if not path.is_file():
+            raise KeyError(key)
+        with path.open("rb") as handle:
+            yield from iter_chunks(handle, chunk_size)
+
+    def exists(self, key: str) -> bool:
+        return self._path(key).is_file()
+
+    def list(self, prefix: str = "") -> Iterator[ObjectInfo]:
+        keys = []
+        for path in self.root.rglob("*"):
+            if path.is_file() and not path.name.startswith(".put-"):
+                key = path.relative_to(self.root).as_posix()
+                if key.startswith(prefix):
+                    keys.append((key, path))
+        for key, path in sorted(keys):
+            yield ObjectInfo(key, path.stat().st_size)
+
+    def delete(self, key: str) -> None:
+        self._path(key).unlink(missing_ok=True)
+
+    def download_file(self, key: str, path: Path) -> Path:
+        source = self._path(key)
+        if not source.is_file():
+            raise KeyError(key)
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(source, path)
+        return Path(path)
+
+
+def open_store(location: Optional[str] = None) -> ObjectStore:
+    """Store for `location`, ``$YACHAQ_OBJECT_STORE`` or the production bucket, in that order."""
+    location = location or os.environ.get(STORE_ENV) or DEFAULT_STORE
+    if location.startswith("s3://"):
+        bucket, prefix = split_s3_uri(location)
+        return S3Store(bucket, prefix)
+    if location.startswith("file://"):
+        location = urllib.parse.unquote(urllib.parse.urlsplit(location).path)
+    return LocalStore(Path(location))
+
+
+def require_s3(store: ObjectStore) -> S3Store:
+    """`store` itself if it is on S3; SageMaker jobs can only read and write S3 locations."""
+    if not isinstance(store, S3Store):
+        raise ValueError(f"an s3:// object store is required, got {store.uri()}")
+    return store
+
+
+class UploadQueue:
+    """Bounded queue of uploads to a store, drained by a pool of threads.
+
+    :meth:`submit` returns a future for the result of ``store.put`` (the byte
+    count, or a :class:`~src.utils.content_store.StoredBlob` for a content
+    store) and blocks only while `max_pending` uploads are already queued or
+    running, so download workers hand off documents without waiting on upload
+    latency.
+    """
+
+    def __init__(self, store: Any, workers: int = 4, max_pending: int = 16) -> None:
+        self.store = store
+        self._slots = threading.BoundedSemaphore(max(max_pending, workers))
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="upload")
+
+    def _upload(
+        self, key: str, body: Body, content_type: Optional[str], metadata: Optional[Dict[str, str]], options: Any
+    ) -> Any:
+        try:
+            return self.store.put(key, body, content_type, metadata, **options)
+        finally:
+            self._slots.release()
+
+    def submit(
+        self,
+        key: str,
+        body: Body,
+        content_type: Optional[str] = None,
+        metadata: Optional[Dict[str, str]] = None,
+        **options: Any,
+    ) -> "Future[Any]":
+        self._slots.acquire()
+        try:
+            return self._pool.submit(self._upload, key, body, content_type, metadata, options)
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def close(self, wait: bool = True) -> None:
+        self._pool.shutdown(wait=wait)
+
+    def __enter__(self) -> "UploadQueue":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
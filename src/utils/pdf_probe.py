@@ -0,0 +1,120 @@
+"""Reject non-PDF payloads from the headers and first bytes, before the body is downloaded.
+
+Many "PDF" links on the ``.gob.ec`` portals answer with an HTML error page,
+a login wall or a search form of a few hundred KB, some of them labelled
+``application/pdf``. The downloaders used to read the whole body and only then
+compare its first four bytes with ``%PDF``. :class:`PdfProbe` decides from the
+response headers and the first chunk instead, so the rest of a junk body is
+never read:
+
+- a declared size (``Content-Length``, or the total of a ``Content-Range``)
+  above `max_size` is rejected as ``too-large`` before any byte is read, and a
+  body without one is cut off once it passes `max_size`;
+- a body that does not start with the PDF magic number is rejected as
+  ``html`` when it sniffs as markup, whatever its ``Content-Type`` says, and
+  as ``not-pdf`` otherwise (``empty`` for no body at all).
+
+Rejections are raised as :class:`RejectedDocument`. The spiders record
+:meth:`Rejection.record` in their crawl state, so a resumed crawl does not
+fetch the same junk URL again and the reasons can be reviewed afterwards.
+"""
+from __future__ import annotations
+
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Iterable, Iterator, Mapping, Optional
+
+PDF_MAGIC = b"%PDF"
+MAX_PDF_SIZE = 200 * 1024 * 1024
+
+TOO_LARGE = "too-large"
+HTML = "html"
+NOT_PDF = "not-pdf"
+EMPTY = "empty"
+
+_MARKUP = (
+    b"<!doctype", b"<html", b"<head", b"<body", b"<title", b"<meta", b"<script", b"<link", b"<style",
+    b"<div", b"<form", b"<iframe", b"<!--", b"<?xml",
+)
+_LEADING = b"\xef\xbb\xbf \t\r\n"  # UTF-8 BOM and whitespace before the first tag
+
+
+def looks_like_html(head: bytes) -> bool:
+    """True if `head` (the first bytes of a body) is HTML or XML markup."""
+    start = head.lstrip(_LEADING)[:64].lower()
+    return start.startswith(_MARKUP) or b"<html" in head[:1024].lower()
+
+
+def declared_size(headers: Mapping[str, str]) -> Optional[int]:
+    """Full size of the body announced by `headers`, if any (the Content-Range total for a 206)."""
+    content_range = headers.get("content-range") or ""
+    total = content_range.rpartition("/")[2].strip()
+    if total.isdigit():
+        return int(total)
+    length = headers.get("content-length") or ""
+    if length.isdigit() and not headers.get("content-encoding"):
+        return int(length)
+    return None
+
+
+@dataclass(frozen=True)
+class Rejection:
+    """Why a response was not accepted as a PDF."""
+
+    reason: str
+    content_type: str = ""
+    size: Optional[int] = None
+
+    def record(self) -> Dict[str, Any]:
+        """JSON-able ledger payload."""
+        return {key: value for key, value in asdict(self).items() if value not in ("", None)}
+
+    def __str__(self) -> str:
+        details = [self.content_type] if self.content_type else []
+        if self.size is not None:
+            details.append(f"{self.size} bytes")
+        return f"{self.reason} ({', '.join(details)})" if details else self.reason
+
+
+class RejectedDocument(Exception):
+    """Raised by :class:`PdfProbe` to abandon a response before (the rest of) its body is read."""
+
+    def __init__(self, url: str, rejection: Rejection) -> None:
+        super().__init__(f"{url}: {rejection}")
+        self.url = url
+        self.rejection = rejection
+
+
+class PdfProbe:
+    """Accepts responses whose body starts with ``%PDF`` and is at most `max_size` bytes."""
+
+    def __init__(self, max_size: int = MAX_PDF_SIZE) -> None:
+        self.max_size = max_size
+
+    def inspect(self, head: bytes, size: Optional[int] = None, content_type: str = "") -> Optional[Rejection]:
+        """Rejection for a body starting with `head` of `size` bytes (if known), or None to accept it."""
+        if size is not None and size > self.max_size:
+            return Rejection(TOO_LARGE, content_type, size)
+        if head.startswith(PDF_MAGIC):
+            return None
+        if not head:
+            return Rejection(EMPTY, content_type, size)
+        return Rejection(HTML if looks_like_html(head) else NOT_PDF, content_type, size)
+
+    def check(self, url: str, headers: Mapping[str, str], head: bytes) -> None:
+        """Raise :class:`RejectedDocument` unless the response with `headers` whose body starts with `head` is a PDF."""
+        rejection = self.inspect(head, declared_size(headers), headers.get("content-type") or "")
+        if rejection is not None:
+            raise RejectedDocument(url, rejection)
+
+    def check_size(self, url: str, received: int) -> None:
+        """Raise :class:`RejectedDocument` once more than `max_size` bytes of a body have been read."""
+        if received > self.max_size:
+            raise RejectedDocument(url, Rejection(TOO_LARGE, size=received))
+
+    def limit(self, url: str, chunks: Iterable[bytes]) -> Iterator[bytes]:
+        """Pass `chunks` through, raising :class:`RejectedDocument` when they add up to more than `max_size`."""
+        received = 0
+        for chunk in chunks:
+            received += len(chunk)
+            self.check_size(url, received)
+            yield chunk
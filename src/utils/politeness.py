@@ -0,0 +1,319 @@
+"""Per-host politeness: token buckets, adaptive concurrency, backoff and robots.txt.
+
+The spiders used to hit every host with the same fixed number of workers, and
+the ``.gob.ec`` portals that throttle under a burst answered with 429/503
+responses that were simply counted as errors. :class:`PolitenessScheduler`
+keeps per-host state instead:
+
+- a token bucket caps the request rate (``rate`` requests/second with
+  ``burst`` headroom), lowered to the host's robots.txt ``Crawl-delay`` or
+  ``Request-rate`` when it declares one;
+- concurrency adapts per host, AIMD-style: each fast response widens the
+  window by about one request per round trip, up to ``max_concurrency``, a slow
+  one narrows it, and a throttled one halves both the window and the rate;
+- a 429/503 (or a transport error) blocks the host for ``Retry-After``
+  seconds, or an exponential backoff when the header is missing, and the
+  request is retried after that;
+- robots.txt is fetched once per host and cached for ``robots_ttl``.
+
+Hosts are independent, so a throttled host slows down on its own while the
+others keep their full rate. :class:`~src.utils.crawl_engine.AsyncCrawlEngine`
+takes a scheduler directly; threaded code goes through :class:`PoliteSession`.
+"""
+from __future__ import annotations
+
+import email.utils
+import math
+import threading
+import time
+import urllib.parse
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Optional
+from urllib.robotparser import RobotFileParser
+
+THROTTLE_STATUSES = (429, 503)
+MAX_RETRY_AFTER = 3600.0  # never park a host longer than this on a server's say-so
+
+
+class RobotsDisallowed(Exception):
+    """robots.txt forbids fetching the URL."""
+
+
+def parse_retry_after(value: Optional[str], now: Optional[float] = None) -> Optional[float]:
+    """Seconds to wait from a ``Retry-After`` header (delta-seconds or HTTP-date)."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - (time.time() if now is None else now))
+
+
+def _netloc(url: str) -> str:
+    return urllib.parse.urlsplit(url).netloc.lower()
+
+
+@dataclass
+class HostState:
+    """Scheduling state of one host (keyed by network location)."""
+
+    rate: float
+    max_rate: float
+    burst: float
+    tokens: float
+    limit: float
+    updated: float
+    active: int = 0
+    not_before: float = 0.0
+    throttles: int = 0  # consecutive throttled responses, for the backoff exponent
+    latency: Optional[float] = None  # EWMA of response times
+    robots: Optional[RobotFileParser] = None
+    robots_expires: float = 0.0
+    stats: Dict[str, int] = field(default_factory=lambda: {"requests": 0, "throttled": 0, "disallowed": 0})
+
+    @property
+    def concurrency(self) -> int:
+        return max(1, int(self.limit))
+
+
+class PolitenessScheduler:
+    """Decides when each host may receive its next request. Thread-safe."""
+
+    def __init__(
+        self,
+        rate: float = 4.0,
+        burst: float = 4.0,
+        min_rate: float = 0.05,
+        initial_concurrency: int = 2,
+        min_concurrency: int = 1,
+        max_concurrency: int = 8,
+        fast_latency: float = 1.0,
+        slow_latency: float = 5.0,
+        backoff_base: float = 1.0,
+        max_backoff: float = 300.0,
+        max_retries: int = 3,
+        user_agent: str = "*",
+        robots_ttl: float = 24 * 3600.0,
+        robots_retry: float = 600.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if not 1 <= min_concurrency <= initial_concurrency <= max_concurrency:
+            raise ValueError("need 1 <= min_concurrency <= initial_concurrency <= max_concurrency")
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min_rate
+        self.initial_concurrency = initial_concurrency
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.fast_latency = fast_latency
+        self.slow_latency = slow_latency
+        self.backoff_base = backoff_base
+        self.max_backoff = max_backoff
+        self.max_retries = max_retries
+        self.user_agent = user_agent
+        self.robots_ttl = robots_ttl
+        self.robots_retry = robots_retry
+        self.clock = clock
+        self.hosts: Dict[str, HostState] = {}
+        self.cond = threading.Condition()
+
+    def host(self, url: str) -> HostState:
+        key = _netloc(url)
+        with self.cond:
+            state = self.hosts.get(key)
+            if state is None:
+                state = HostState(
+                    rate=self.rate,
+                    max_rate=self.rate,
+                    burst=self.burst,
+                    tokens=self.burst,
+                    limit=float(self.initial_concurrency),
+                    updated=self.clock(),
+                )
+                self.hosts[key] = state
+            return state
+
+    def _refill(self, state: HostState, now: float) -> None:
+        state.tokens = min(state.burst, state.tokens + (now - state.updated) * state.rate)
+        state.updated = now
+
+    def _wait(self, state: HostState, now: float) -> float:
+        if now < state.not_before:
+            return state.not_before - now
+        if state.active >= state.concurrency:
+            return math.inf
+        self._refill(state, now)
+        return 0.0 if state.tokens >= 1 else (1 - state.tokens) / state.rate
+
+    def delay(self, url: str) -> float:
+        """Seconds until `url`'s host could take a request (inf: wait for one in flight to finish)."""
+        state = self.host(url)
+        with self.cond:
+            return self._wait(state, self.clock())
+
+    def try_acquire(self, url: str) -> float:
+        """Take a slot and a token for `url`'s host and return 0, or return how long to wait (see :meth:`delay`)."""
+        state = self.host(url)
+        with self.cond:
+            wait = self._wait(state, self.clock())
+            if wait == 0:
+                state.tokens -= 1
+                state.active += 1
+                state.stats["requests"] += 1
+            return wait
+
+    def acquire(self, url: str) -> None:
+        """Blocking :meth:`try_acquire`, for worker threads."""
+        with self.cond:
+            while True:
+                wait = self.try_acquire(url)
+                if wait == 0:
+                    return
+                self.cond.wait(None if wait == math.inf else wait)
+
+    def cancel(self, url: str) -> None:
+        """Give back an acquired slot and its token without sending the request."""
+        state = self.host(url)
+        with self.cond:
+            state.active -= 1
+            state.tokens = min(state.burst, state.tokens + 1)
+            self.cond.notify_all()
+
+    def release(
+        self,
+        url: str,
+        status: Optional[int],
+        latency: Optional[float] = None,
+        retry_after: Optional[str] = None,
+    ) -> bool:
+        """Record the outcome of a request (`status` None for a transport error) and free its slot.
+
+        Returns True when the host throttled the request (429/503), i.e. it
+        should be retried once :meth:`delay` allows.
+        """
+        state = self.host(url)
+        with self.cond:
+            now = self.clock()
+            state.active -= 1
+            if status is None or status in THROTTLE_STATUSES:
+                state.throttles += 1
+                state.stats["throttled"] += 1
+                backoff = min(self.max_backoff, self.backoff_base * 2 ** (state.throttles - 1))
+                requested = parse_retry_after(retry_after)
+                if requested is not None:
+                    backoff = max(backoff, min(requested, MAX_RETRY_AFTER))
+                state.not_before = max(state.not_before, now + backoff)
+                state.limit = max(float(self.min_concurrency), state.limit / 2)
+                state.rate = max(self.min_rate, state.rate / 2)
+                state.tokens = min(state.tokens, 0.0)
+            else:
+                state.throttles = 0
+                if latency is not None:
+                    state.latency = latency if state.latency is None else 0.8 * state.latency + 0.2 * latency
+                    if latency <= self.fast_latency:
+                        state.limit = min(float(self.max_concurrency), state.limit + 1 / state.limit)
+                    elif latency >= self.slow_latency:
+                        state.limit = max(float(self.min_concurrency), state.limit - 1 / state.limit)
+                state.rate = min(state.max_rate, state.rate * 1.25)
+            self.cond.notify_all()
+            return status in THROTTLE_STATUSES
+
+    def robots_url(self, url: str) -> Optional[str]:
+        """robots.txt location for `url`'s host if it still has to be (re)fetched, else None."""
+        state = self.host(url)
+        with self.cond:
+            if state.robots is not None and self.clock() < state.robots_expires:
+                return None
+        parts = urllib.parse.urlsplit(url)
+        return f"{parts.scheme}://{parts.netloc}/robots.txt"
+
+    def set_robots(self, url: str, status: Optional[int], text: str = "") -> None:
+        """Cache the robots.txt fetched for `url`'s host.
+
+        A 4xx means no restrictions. A 5xx or network failure is also treated
+        as "allow", but only for ``robots_retry`` seconds.
+        """
+        parser = RobotFileParser()
+        if status is not None and 200 <= status < 300:
+            parser.parse(text.splitlines())
+        else:
+            parser.allow_all = True
+        ttl = self.robots_ttl if status is not None and status < 500 else self.robots_retry
+        state = self.host(url)
+        with self.cond:
+            state.robots = parser
+            state.robots_expires = self.clock() + ttl
+            delay = parser.crawl_delay(self.user_agent)
+            request_rate = parser.request_rate(self.user_agent)
+            max_rate = self.rate
+            if delay:
+                max_rate = min(max_rate, 1 / float(delay))
+            if request_rate and request_rate.requests and request_rate.seconds:
+                max_rate = min(max_rate, request_rate.requests / request_rate.seconds)
+            state.max_rate = max_rate
+            state.rate = min(state.rate, max_rate)
+            if max_rate < self.rate:
+                state.burst = 1.0  # a declared delay means one request at a time, evenly spaced
+                state.tokens = min(state.tokens, 1.0)
+
+    def allowed(self, url: str) -> bool:
+        state = self.host(url)
+        with self.cond:
+            if state.robots is None or state.robots.can_fetch(self.user_agent, url):
+                return True
+            state.stats["disallowed"] += 1
+            return False
+
+    def get(self, session: Any, url: str, **kwargs: Any) -> Any:
+        """Polite ``session.get``: robots check, host slot and token, throttled responses retried after backoff.
+
+        Raises :class:`RobotsDisallowed` for URLs robots.txt forbids. After
+        ``max_retries`` the last throttled response is returned as is.
+        """
+        robots = self.robots_url(url)
+        if robots is not None:
+            try:
+                response = session.get(robots, timeout=kwargs.get("timeout"), verify=kwargs.get("verify", True))
+                self.set_robots(url, response.status_code, response.text)
+            except Exception:
+                self.set_robots(url, None)
+        if not self.allowed(url):
+            raise RobotsDisallowed(url)
+        for attempt in range(self.max_retries + 1):
+            self.acquire(url)
+            started = self.clock()
+            try:
+                response = session.get(url, **kwargs)
+            except Exception:
+                self.release(url, None)
+                raise
+            throttled = self.release(url, response.status_code, self.clock() - started, response.headers.get("retry-after"))
+            if not throttled or attempt == self.max_retries:
+                return response
+            response.close()
+        return response
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self.cond:
+            return {
+                host: dict(state.stats, concurrency=state.concurrency, rate=round(state.rate, 3))
+                for host, state in self.hosts.items()
+            }
+
+
+class PoliteSession:
+    """A ``requests.Session`` (or the ``requests`` module) whose ``get`` goes through a scheduler."""
+
+    def __init__(self, session: Any, scheduler: Optional[PolitenessScheduler] = None) -> None:
+        self.session = session
+        self.scheduler = scheduler or PolitenessScheduler()
+
+    def get(self, url: str, **kwargs: Any) -> Any:
+        return self.scheduler.get(self.session, url, **kwargs)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.session, name)
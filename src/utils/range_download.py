@@ -0,0 +1,395 @@
+"""Resumable, parallel byte-range downloads for large documents.
+
+The big codes (COPCI, COOTAD, Ley de Seguridad Social) were fetched with one
+``session.get`` that buffered the whole body in memory. On a slow government
+link the request timed out and the next run started again from byte zero.
+:class:`RangeDownloader` fetches them like this instead:
+
+- the first request asks for the first segment only (``Range: bytes=0-...``)
+  and carries the HTTP cache validators, so it doubles as the probe: ``304``
+  means unchanged, ``206`` means ranges are supported and gives the total size,
+  and ``200`` means the server ignores ranges and the body is streamed whole;
+- the remaining segments are fetched in parallel, each retried on its own, and
+  written straight into a preallocated ``.part`` file;
+- finished segments are recorded in a JSON sidecar next to it. After a crash
+  or timeout the next run asks only for the missing segments, with
+  ``If-Range`` so that a document changed in between is fetched again whole;
+- the SHA-256 advances as the contiguous prefix of finished segments grows, so
+  the hash is ready when the last segment lands (on resume, the prefix already
+  on disk is re-read once, as hashlib state cannot be saved).
+
+Bodies up to ``memory_limit`` are returned in memory as before; larger ones as
+a file, which :class:`~src.utils.content_store.ContentStore` streams to object
+storage without another copy.
+
+With a `probe` (:class:`~src.utils.pdf_probe.PdfProbe`), the headers and first
+chunk of a new download are checked before anything else is read, and whole
+bodies are cut off at the probe's size limit; a rejected download raises
+:class:`~src.utils.pdf_probe.RejectedDocument` and leaves nothing on disk.
+"""
+from __future__ import annotations
+
+import hashlib
+import itertools
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from src.utils.http_cache import HttpCache, Revalidation
+from src.utils.pdf_probe import PdfProbe, RejectedDocument
+
+DOWNLOAD_DIR_ENV = "YACHAQ_DOWNLOAD_DIR"
+DEFAULT_DOWNLOAD_DIR = Path.home() / ".cache" / "yachaq" / "downloads"
+SEGMENT_SIZE = 4 * 1024 * 1024
+READ_SIZE = 256 * 1024
+
+_CONTENT_RANGE = re.compile(r"bytes\s+(\d+)-(\d+)/(\d+|\*)", re.IGNORECASE)
+
+
+class RangeMismatch(Exception):
+    """The server answered a ranged request with a different representation (the document changed)."""
+
+
+def default_download_dir() -> Path:
+    """Partial downloads of this machine (``$YACHAQ_DOWNLOAD_DIR`` overrides it)."""
+    return Path(os.environ.get(DOWNLOAD_DIR_ENV) or DEFAULT_DOWNLOAD_DIR)
+
+
+def parse_content_range(value: Optional[str]) -> Optional[Tuple[int, int, Optional[int]]]:
+    """``bytes 0-99/1234`` -> (0, 100, 1234): start, end (exclusive) and total size (None for ``*``)."""
+    match = _CONTENT_RANGE.match(value or "")
+    if match is None:
+        return None
+    total = match.group(3)
+    return int(match.group(1)), int(match.group(2)) + 1, None if total == "*" else int(total)
+
+
+@dataclass
+class PartialDownload:
+    """Sidecar state of a download: which `segment_size` byte ranges of `size` are on disk."""
+
+    url: str
+    size: int
+    segment_size: int
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    done: List[int] = field(default_factory=list)
+
+    @property
+    def segments(self) -> int:
+        return -(-self.size // self.segment_size)
+
+    def bounds(self, index: int) -> Tuple[int, int]:
+        start = index * self.segment_size
+        return start, min(self.size, start + self.segment_size)
+
+    def missing(self) -> List[int]:
+        done = set(self.done)
+        return [index for index in range(self.segments) if index not in done]
+
+    @property
+    def validator(self) -> Optional[str]:
+        """``If-Range`` value: a strong ETag, else Last-Modified; without one a partial file cannot be trusted."""
+        if self.etag and not self.etag.startswith("W/"):
+            return self.etag
+        return self.last_modified
+
+
+class _Progress:
+    """Segments of one download as they land: sidecar updates and the running SHA-256."""
+
+    def __init__(self, state: PartialDownload, sidecar: Path, fd: int, persist: bool) -> None:
+        self.state = state
+        self.sidecar = sidecar
+        self.fd = fd
+        self.persist = persist
+        self.lock = threading.Lock()
+        self.digest = hashlib.sha256()
+        self.hashed = 0  # segments folded into the digest
+        with self.lock:
+            self._advance()
+
+    def complete(self, index: int) -> None:
+        with self.lock:
+            if index in self.state.done:
+                return
+            self.state.done.append(index)
+            if self.persist:
+                tmp = self.sidecar.with_suffix(".tmp")
+                tmp.write_text(json.dumps(asdict(self.state)))
+                os.replace(tmp, self.sidecar)
+            self._advance()
+
+    def _advance(self) -> None:
+        done = set(self.state.done)
+        while self.hashed in done:
+            offset, end = self.state.bounds(self.hashed)
+            while offset < end:
+                chunk = os.pread(self.fd, min(READ_SIZE, end - offset), offset)
+                if not chunk:
+                    raise IOError(f"short read at {offset} in {self.sidecar}")
+                self.digest.update(chunk)
+                offset += len(chunk)
+            self.hashed += 1
+
+    @property
+    def finished(self) -> bool:
+        return self.hashed == self.state.segments
+
+
+class RangeDownloader:
+    """Fetches documents in parallel byte ranges, resuming interrupted downloads from disk.
+
+    `session` is anything with a ``requests``-style ``get`` (a ``Session``, the
+    ``requests`` module or a :class:`~src.utils.politeness.PoliteSession`).
+    Safe to share between worker threads; each document uses up to `workers`
+    connections. `probe` (a :class:`~src.utils.pdf_probe.PdfProbe`) vets each
+    new download from its headers and first bytes.
+    """
+
+    def __init__(
+        self,
+        directory: Optional[Path] = None,
+        http_cache: Optional[HttpCache] = None,
+        workers: int = 4,
+        segment_size: int = SEGMENT_SIZE,
+        memory_limit: int = SEGMENT_SIZE,
+        max_attempts: int = 4,
+        retry_delay: float = 1.0,
+        probe: Optional[PdfProbe] = None,
+    ) -> None:
+        self.directory = Path(directory) if directory is not None else default_download_dir()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.http_cache = http_cache
+        self.workers = workers
+        self.segment_size = segment_size
+        self.memory_limit = memory_limit
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.probe = probe
+
+    def paths(self, url: str) -> Tuple[Path, Path]:
+        """``.part`` file and sidecar of `url`'s download."""
+        name = hashlib.sha256(HttpCache.key(url).encode("utf-8")).hexdigest()[:32]
+        return self.directory / f"{name}.part", self.directory / f"{name}.json"
+
+    def partial(self, url: str) -> Optional[PartialDownload]:
+        """Resumable state of an interrupted download of `url`, if any."""
+        part, sidecar = self.paths(url)
+        try:
+            state = PartialDownload(**json.loads(sidecar.read_text()))
+        except (OSError, ValueError, TypeError):
+            return None
+        if state.url != HttpCache.key(url) or state.validator is None or not part.exists():
+            return None
+        return state
+
+    def discard_partial(self, url: str) -> None:
+        for path in self.paths(url):
+            path.unlink(missing_ok=True)
+
+    def fetch(self, session: Any, url: str, headers: Optional[Dict[str, str]] = None, **kwargs: Any) -> Revalidation:
+        """Download `url`, resuming a partial download, as a :class:`Revalidation`.
+
+        A 304 or an unchanged hash is reported as ``unchanged`` like
+        :meth:`HttpCache.fetch` does; large bodies come back in ``path``.
+        Transport errors propagate, with the finished segments kept for the
+        next call; a probe rejection discards them.
+        """
+        headers = dict(headers or {})
+        try:
+            try:
+                return self._fetch(session, url, headers, kwargs)
+            except RangeMismatch:
+                # The document changed since the partial download started: fetch it again from scratch
+                self.discard_partial(url)
+                return self._fetch(session, url, headers, kwargs)
+        except RejectedDocument:
+            self.discard_partial(url)
+            raise
+
+    def _fetch(self, session: Any, url: str, headers: Dict[str, str], kwargs: Dict[str, Any]) -> Revalidation:
+        state = self.partial(url)
+        probe = dict(headers)
+        if state is None:
+            self.discard_partial(url)
+            if self.http_cache is not None:
+                probe.update(self.http_cache.headers(url))
+            probe["Range"] = f"bytes=0-{self.segment_size - 1}"
+        else:
+            start, end = state.bounds(state.missing()[0])
+            probe["Range"] = f"bytes={start}-{end - 1}"
+            probe["If-Range"] = state.validator
+        response = session.get(url, headers=probe, stream=True, **kwargs)
+        try:
+            if response.status_code == 304 and self.http_cache is not None:
+                return self.http_cache.revalidate(url, response)
+            if response.status_code in (200, 206):
+                chunks = response.iter_content(READ_SIZE)
+                if self.probe is not None and (state is None or response.status_code == 200):
+                    head = next(chunks, b"")
+                    self.probe.check(url, response.headers, head)
+                    chunks = itertools.chain([head], chunks)
+                if response.status_code == 206:
+                    return self._ranged(session, url, headers, kwargs, response, chunks, state)
+                return self._whole(url, response, chunks)
+            return Revalidation(
+                url=HttpCache.key(url),
+                status=response.status_code,
+                etag=response.headers.get("etag"),
+                last_modified=response.headers.get("last-modified"),
+            )
+        finally:
+            response.close()
+
+    def _result(self, url: str, response: Any, **fields: Any) -> Revalidation:
+        result = Revalidation(
+            url=HttpCache.key(url),
+            status=200,
+            etag=response.headers.get("etag"),
+            last_modified=response.headers.get("last-modified"),
+            **fields,
+        )
+        if self.http_cache is not None:
+            self.http_cache.settle(result)
+        if result.unchanged:
+            result.discard()
+            result.path = None
+        return result
+
+    def _whole(self, url: str, response: Any, chunks: Iterable[bytes]) -> Revalidation:
+        """The server ignored the range (or If-Range failed): stream the full body."""
+        self.discard_partial(url)
+        if self.probe is not None:
+            chunks = self.probe.limit(url, chunks)
+        length = response.headers.get("content-length")
+        size = int(length) if length and length.isdigit() and not response.headers.get("content-encoding") else None
+        if size is not None and size <= self.memory_limit:
+            content = b"".join(chunks)
+            return self._result(url, response, content=content, sha256=hashlib.sha256(content).hexdigest(),
+                                size=len(content))
+        part, _ = self.paths(url)
+        digest = hashlib.sha256()
+        written = 0
+        try:
+            with open(part, "wb") as f:
+                for chunk in chunks:
+                    f.write(chunk)
+                    digest.update(chunk)
+                    written += len(chunk)
+        except BaseException:
+            part.unlink(missing_ok=True)  # a whole-body stream cannot be resumed
+            raise
+        if size is not None and written != size:
+            raise IOError(f"{url}: got {written} of {size} bytes")
+        return self._finish(url, response, part, digest.hexdigest(), written)
+
+    def _finish(self, url: str, response: Any, part: Path, sha256: str, size: int) -> Revalidation:
+        path = part.with_suffix(".body")
+        os.replace(part, path)
+        return self._result(url, response, sha256=sha256, path=path, size=size)
+
+    def _ranged(
+        self,
+        session: Any,
+        url: str,
+        headers: Dict[str, str],
+        kwargs: Dict[str, Any],
+        response: Any,
+        chunks: Iterable[bytes],
+        state: Optional[PartialDownload],
+    ) -> Revalidation:
+        received = parse_content_range(response.headers.get("content-range"))
+        if received is None or received[2] is None:
+            raise IOError(f"{url}: unusable Content-Range {response.headers.get('content-range')!r}")
+        start, end, total = received
+        etag, last_modified = response.headers.get("etag"), response.headers.get("last-modified")
+        if state is not None and (state.size != total or (etag or last_modified) and
+                                  (etag, last_modified) != (state.etag, state.last_modified)):
+            raise RangeMismatch(url)
+        if state is None:
+            if start == 0 and end == total and total <= self.memory_limit:
+                content = b"".join(chunks)[:total]
+                return self._result(url, response, content=content, sha256=hashlib.sha256(content).hexdigest(),
+                                    size=total)
+            state = PartialDownload(HttpCache.key(url), total, self.segment_size, etag, last_modified)
+
+        part, sidecar = self.paths(url)
+        fd = os.open(part, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            os.ftruncate(fd, total)
+            progress = _Progress(state, sidecar, fd, persist=state.validator is not None)
+            self._write(progress, chunks, start, end)
+            missing = state.missing()
+            if missing:
+                with ThreadPoolExecutor(max_workers=min(self.workers, len(missing))) as pool:
+                    for future in [pool.submit(self._segment, session, url, headers, kwargs, progress, index)
+                                   for index in missing]:
+                        future.result()
+            if not progress.finished:
+                raise IOError(f"{url}: incomplete download")
+            sha256 = progress.digest.hexdigest()
+        finally:
+            os.close(fd)
+        sidecar.unlink(missing_ok=True)
+        return self._finish(url, response, part, sha256, total)
+
+    def _write(self, progress: _Progress, chunks: Iterable[bytes], start: int, end: int) -> int:
+        """Write a 206 body covering [start, end) and mark the segments it completes; returns the end offset."""
+        state, offset = progress.state, start
+        for chunk in chunks:
+            chunk = chunk[: end - offset]
+            os.pwrite(progress.fd, chunk, offset)
+            offset += len(chunk)
+            if offset >= end:
+                break
+        first = -(-start // state.segment_size)
+        for index in range(first, state.segments):
+            segment_start, segment_end = state.bounds(index)
+            if segment_end > offset:
+                break
+            if segment_start >= start:
+                progress.complete(index)
+        return offset
+
+    def _segment(
+        self,
+        session: Any,
+        url: str,
+        headers: Dict[str, str],
+        kwargs: Dict[str, Any],
+        progress: _Progress,
+        index: int,
+    ) -> None:
+        state = progress.state
+        start, end = state.bounds(index)
+        for attempt in range(self.max_attempts):
+            ranged = dict(headers, Range=f"bytes={start}-{end - 1}")
+            if state.validator is not None:
+                ranged["If-Range"] = state.validator
+            try:
+                response = session.get(url, headers=ranged, stream=True, **kwargs)
+                try:
+                    if response.status_code == 200:
+                        raise RangeMismatch(url)
+                    received = parse_content_range(response.headers.get("content-range"))
+                    if response.status_code != 206 or received is None or received[0] != start:
+                        raise IOError(f"{url}: HTTP {response.status_code} for bytes {start}-{end - 1}")
+                    chunks = response.iter_content(READ_SIZE)
+                    if self._write(progress, chunks, start, min(end, received[1])) >= end:
+                        return
+                finally:
+                    response.close()
+            except RangeMismatch:
+                raise
+            except Exception:
+                if attempt == self.max_attempts - 1:
+                    raise
+            time.sleep(self.retry_delay * 2 ** attempt)
+        raise IOError(f"{url}: bytes {start}-{end - 1} incomplete after {self.max_attempts} attempts")
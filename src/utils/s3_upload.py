@@ -0,0 +1,134 @@
+"""In-process streaming uploads to S3.
+
+The collectors used to write every payload to a ``NamedTemporaryFile`` and fork
+``aws s3 cp`` for it: one interpreter plus CLI start-up and one extra disk
+write per object. Here objects go straight from memory, or from an HTTP
+response's chunk iterator, into S3 through one pooled, thread-safe boto3
+client:
+
+- bodies smaller than one part are sent with a single ``PutObject``;
+- larger bodies become a multipart upload fed part by part as chunks arrive,
+  so memory per upload is bounded by ``part_size`` and a failed upload is
+  aborted instead of leaving orphaned parts.
+
+The bounded upload queue and the storage-agnostic interface built on top of
+this live in :mod:`src.utils.object_store`.
+
+``AWS_ENDPOINT_URL_S3`` (or the ``endpoint_url`` argument) points the client at
+an S3-compatible stand-in for tests and offline runs.
+"""
+from __future__ import annotations
+
+from functools import lru_cache
+from typing import IO, Any, Dict, Iterable, Iterator, Optional, Tuple, Union
+
+import boto3
+from botocore.config import Config
+
+DEFAULT_REGION = "us-east-1"
+MIN_PART_SIZE = 5 * 1024 * 1024  # S3 minimum for every part but the last
+PART_SIZE = 8 * 1024 * 1024
+CHUNK_SIZE = 1024 * 1024
+
+Body = Union[bytes, str, IO[bytes], Iterable[bytes]]
+
+
+def split_s3_uri(uri: str) -> Tuple[str, str]:
+    """``s3://bucket/key`` -> (bucket, key)."""
+    if not uri.startswith("s3://"):
+        raise ValueError(f"not an s3:// URI: {uri}")
+    bucket, _, key = uri[len("s3://") :].partition("/")
+    return bucket, key
+
+
+@lru_cache(maxsize=None)
+def s3_client(region: str = DEFAULT_REGION, endpoint_url: Optional[str] = None, max_pool_connections: int = 32) -> Any:
+    """Shared boto3 S3 client; boto3 clients are thread-safe, so one pool serves every worker."""
+    config = Config(
+        max_pool_connections=max_pool_connections,
+        retries={"max_attempts": 5, "mode": "adaptive"},
+        request_checksum_calculation="when_required",
+        response_checksum_validation="when_required",
+    )
+    return boto3.client("s3", region_name=region, endpoint_url=endpoint_url, config=config)
+
+
+def iter_chunks(body: Body, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """Bytes, text, a binary file object or an iterable of byte chunks, as byte chunks."""
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+    if isinstance(body, (bytes, bytearray, memoryview)):
+        view = memoryview(body)
+        for start in range(0, len(view), chunk_size):
+            yield bytes(view[start : start + chunk_size])
+        return
+    read = getattr(body, "read", None)
+    if read is not None:
+        while True:
+            chunk = read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+        return
+    for chunk in body:
+        if chunk:
+            yield chunk
+
+
+def upload_stream(
+    client: Any,
+    bucket: str,
+    key: str,
+    body: Body,
+    part_size: int = PART_SIZE,
+    content_type: Optional[str] = None,
+    metadata: Optional[Dict[str, str]] = None,
+) -> int:
+    """Upload `body` to ``s3://bucket/key`` without touching disk; returns the bytes sent."""
+    part_size = max(part_size, MIN_PART_SIZE)
+    extra: Dict[str, Any] = {}
+    if content_type:
+        extra["ContentType"] = content_type
+    if metadata:
+        extra["Metadata"] = metadata
+
+    chunks = iter_chunks(body)
+    buffer = bytearray()
+    for chunk in chunks:
+        buffer += chunk
+        if len(buffer) >= part_size:
+            break
+    else:
+        client.put_object(Bucket=bucket, Key=key, Body=bytes(buffer), **extra)
+        return len(buffer)
+
+    upload_id = client.create_multipart_upload(Bucket=bucket, Key=key, **extra)["UploadId"]
+    parts = []
+    sent = 0
+
+    def send(data: bytes) -> None:
+        nonlocal sent
+        number = len(parts) + 1
+        response = client.upload_part(Bucket=bucket, Key=key, UploadId=upload_id, PartNumber=number, Body=data)
+        parts.append({"ETag": response["ETag"], "PartNumber": number})
+        sent += len(data)
+
+    try:
+        while True:
+            while len(buffer) >= part_size:
+                send(bytes(buffer[:part_size]))
+                del buffer[:part_size]
+            chunk = next(chunks, None)
+            if chunk is None:
+                break
+            buffer += chunk
+        if buffer:
+            send(bytes(buffer))
+        client.complete_multipart_upload(
+            Bucket=bucket, Key=key, UploadId=upload_id, MultipartUpload={"Parts": parts}
+        )
+    except BaseException:
+        client.abort_multipart_upload(Bucket=bucket, Key=key, UploadId=upload_id)
+        raise
+    return sent
+
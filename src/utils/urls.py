@@ -0,0 +1,172 @@
+"""URL canonicalization shared by every crawler and discovery script.
+
+The same document used to be fetched under several spellings. Every href is
+now resolved and rewritten to one canonical form before it is queued, checked
+against a seen-set or stored:
+
+- scheme and host are lowercased, the trailing dot and default ports dropped;
+- government and legal-database hosts are upgraded to ``https``, and bare
+  institutional domains (``sri.gob.ec``) get the ``www.`` they are served under;
+- dot-segments are collapsed (RFC 3986, section 5.2.4);
+- percent-encoding is normalized: unreserved characters are decoded, escapes
+  uppercased, and spaces and non-ASCII characters encoded (``%20``, ``%C3%B3``);
+- tracking and session parameters are dropped, then query parameters are
+  sorted, both per the host's :class:`HostRule`;
+- fragments are removed.
+"""
+from __future__ import annotations
+
+import fnmatch
+import re
+import urllib.parse
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional, Tuple
+
+# Hosts under these suffixes all serve HTTPS; http:// links to them are upgraded.
+HTTPS_SUFFIXES = (".gob.ec", ".gov.ec", ".edu.ec", "lexis.com.ec", "fielweb.com")
+
+# Second-level institutional domains (sri.gob.ec) are canonically served from www.
+WWW_SUFFIXES = (".gob.ec", ".gov.ec")
+
+# Query parameters that never select content; names are matched case-insensitively.
+TRACKING_PARAMS = (
+    "utm_*", "fbclid", "gclid", "_ga", "_gl", "mc_cid", "mc_eid",
+    "phpsessid", "jsessionid", "sessionid", "cfid", "cftoken", "replytocom",
+)
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+IGNORED_SCHEMES = ("javascript:", "mailto:", "tel:", "data:", "#")
+
+_UNRESERVED = frozenset("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-._~")
+_ESCAPE = re.compile(r"%([0-9A-Fa-f]{2})")
+_PATH_SAFE = "/:@!$&'()*+,;=-._~%"
+_QUERY_SAFE = "/?:@!$'()*+,;=-._~%"
+_SESSION_PATH_PARAM = re.compile(r";jsessionid=[^/?#]*", re.I)
+
+
+@dataclass(frozen=True)
+class HostRule:
+    """Per-host canonicalization overrides."""
+
+    drop_params: Tuple[str, ...] = ()
+    sort_params: bool = True
+    host: Optional[str] = None  # canonical host name, when it differs from the default rules
+
+
+# Rules for portals whose CMS adds parameters that do not change the document.
+HOST_RULES: Dict[str, HostRule] = {
+    # Liferay portlet state and the one-time auth token.
+    "www.iess.gob.ec": HostRule(drop_params=("p_p_auth", "p_p_state", "p_p_mode", "p_p_col_*", "*_redirect")),
+    "www.supercias.gob.ec": HostRule(drop_params=("p_p_auth", "*_redirect")),
+    # WordPress language and preview switches.
+    "www.trabajo.gob.ec": HostRule(drop_params=("lang", "preview")),
+    "www.aduana.gob.ec": HostRule(drop_params=("lang", "preview")),
+    "www.sri.gob.ec": HostRule(drop_params=("p_p_auth", "*_redirect")),
+    # SERCOP search forms: `sg` only selects the UI skin.
+    "www.compraspublicas.gob.ec": HostRule(drop_params=("sg",)),
+    "portal.compraspublicas.gob.ec": HostRule(drop_params=("sg",)),
+}
+
+
+def _normalize_escapes(component: str, safe: str) -> str:
+    def fix(match: "re.Match[str]") -> str:
+        char = chr(int(match.group(1), 16))
+        return char if char in _UNRESERVED else "%" + match.group(1).upper()
+
+    return urllib.parse.quote(_ESCAPE.sub(fix, component), safe=safe)
+
+
+def remove_dot_segments(path: str) -> str:
+    """RFC 3986 section 5.2.4: resolve `.` and `..` segments of an absolute path."""
+    output: list = []
+    segments = path.split("/")
+    for index, segment in enumerate(segments):
+        last = index == len(segments) - 1
+        if segment == ".":
+            if last:
+                output.append("")
+        elif segment == "..":
+            if len(output) > 1:
+                output.pop()
+            if last:
+                output.append("")
+        else:
+            output.append(segment)
+    result = "/".join(output)
+    return result if result.startswith("/") else "/" + result
+
+
+def _canonical_host(host: str) -> str:
+    host = host.lower().rstrip(".")
+    rule = HOST_RULES.get(host)
+    if rule is not None and rule.host:
+        return rule.host
+    if host.count(".") == 2 and not host.startswith("www.") and host.endswith(WWW_SUFFIXES):
+        return "www." + host
+    return host
+
+
+def _param_dropped(name: str, patterns: Iterable[str]) -> bool:
+    lowered = name.lower()
+    return any(fnmatch.fnmatchcase(lowered, pattern.lower()) for pattern in patterns)
+
+
+def canonicalize_url(href: str, base: Optional[str] = None) -> Optional[str]:
+    """Resolve `href` against `base` and return its canonical form.
+
+    Returns None for links that are not http(s) (``javascript:``, ``mailto:``,
+    bare fragments, ...).
+    """
+    href = (href or "").strip()
+    if not href or href.lower().startswith(IGNORED_SCHEMES):
+        return None
+    if href.startswith("//") and not base:
+        href = "https:" + href
+    url = urllib.parse.urljoin(base, href) if base else href
+    parts = urllib.parse.urlsplit(url)
+    scheme = parts.scheme.lower()
+    if scheme not in DEFAULT_PORTS or not parts.hostname:
+        return None
+
+    host = _canonical_host(parts.hostname)
+    port = parts.port
+    if port == DEFAULT_PORTS[scheme]:
+        port = None
+    if scheme == "http" and port is None and any(host.endswith(suffix) for suffix in HTTPS_SUFFIXES):
+        scheme = "https"
+    netloc = host if port is None else f"{host}:{port}"
+
+    path = _SESSION_PATH_PARAM.sub("", parts.path)
+    path = remove_dot_segments(_normalize_escapes(path, _PATH_SAFE)) if path else "/"
+
+    rule = HOST_RULES.get(host, HostRule())
+    drop = TRACKING_PARAMS + rule.drop_params
+    params = []
+    # Split the raw query instead of parse_qsl so `+` and `%2B` keep their meaning.
+    for pair in filter(None, parts.query.split("&")):
+        name, _, value = pair.partition("=")
+        if not _param_dropped(urllib.parse.unquote(name), drop):
+            params.append((_normalize_escapes(name, _QUERY_SAFE), _normalize_escapes(value, _QUERY_SAFE)))
+    if rule.sort_params:
+        params.sort()
+    query = "&".join(f"{name}={value}" if value else name for name, value in params)
+    return urllib.parse.urlunsplit((scheme, netloc, path, query, ""))
+
+
+class UrlDeduper:
+    """Tracks canonical URLs already seen and counts the duplicate spellings it absorbed."""
+
+    def __init__(self) -> None:
+        self.seen: set = set()
+        self.duplicates = 0
+
+    def add(self, href: str, base: Optional[str] = None) -> Optional[str]:
+        """Canonical URL if this is its first sighting, otherwise None."""
+        url = canonicalize_url(href, base)
+        if url is None:
+            return None
+        if url in self.seen:
+            self.duplicates += 1
+            return None
+        self.seen.add(url)
+        return url
@@ -4,6 +4,21 @@ from __future__ import annotations
 import sys
 from pathlib import Path
 
+import pytest
+
 # Insert the repository root so tests can import the `rag` package directly.
 REPO_ROOT = Path(__file__).resolve().parents[1]
 sys.path.insert(0, str(REPO_ROOT))
+
+
+@pytest.fixture
+def local_s3(monkeypatch):
+    """An S3 stand-in on localhost, with dummy credentials in the environment."""
+    from local_s3 import LocalS3
+
+    for name, value in (("AWS_ACCESS_KEY_ID", "test"), ("AWS_SECRET_ACCESS_KEY", "test"), ("AWS_DEFAULT_REGION", "us-east-1")):
+        monkeypatch.setenv(name, value)
+    monkeypatch.delenv("AWS_PROFILE", raising=False)
+    server = LocalS3()
+    yield server
+    server.close()
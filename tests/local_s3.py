@@ -0,0 +1,144 @@
+"""Minimal S3-compatible HTTP server for tests (path-style requests, no auth).
+
+Implements the calls the uploaders use: PutObject, GetObject, HeadObject,
+DeleteObject, ListObjectsV2 and the multipart upload calls.
+"""
+from __future__ import annotations
+
+import hashlib
+import itertools
+import re
+import threading
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from xml.sax.saxutils import escape
+
+
+class LocalS3:
+    def __init__(self) -> None:
+        self.objects = {}  # (bucket, key) -> bytes
+        self.headers = {}  # (bucket, key) -> {"content-type": ..., "x-amz-meta-...": ...}
+        self.uploads = {}  # upload id -> {part number: bytes}
+        self.operations = []
+        self.lock = threading.Lock()
+        self._ids = itertools.count(1)
+        store = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _target(self):
+                parts = urllib.parse.urlsplit(self.path)
+                bucket, _, key = parts.path.lstrip("/").partition("/")
+                query = dict(urllib.parse.parse_qsl(parts.query, keep_blank_values=True))
+                return bucket, urllib.parse.unquote(key), query
+
+            def _body(self):
+                return self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+            def _reply(self, status, body=b"", headers=None):
+                self.send_response(status)
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                if self.command != "HEAD":
+                    self.wfile.write(body)
+
+            def _not_found(self):
+                self._reply(404, b"<Error><Code>NoSuchKey</Code><Message>missing</Message></Error>")
+
+            def do_PUT(self):
+                bucket, key, query = self._target()
+                data = self._body()
+                etag = '"%s"' % hashlib.md5(data).hexdigest()
+                with store.lock:
+                    if "uploadId" in query:
+                        store.operations.append("UploadPart")
+                        store.uploads[query["uploadId"]][int(query["partNumber"])] = data
+                    else:
+                        store.operations.append("PutObject")
+                        store.objects[(bucket, key)] = data
+                        store.headers[(bucket, key)] = {
+                            name.lower(): value
+                            for name, value in self.headers.items()
+                            if name.lower() == "content-type" or name.lower().startswith("x-amz-meta-")
+                        }
+                self._reply(200, headers={"ETag": etag})
+
+            def do_POST(self):
+                bucket, key, query = self._target()
+                body = self._body()
+                with store.lock:
+                    if "uploads" in query:
+                        store.operations.append("CreateMultipartUpload")
+                        upload_id = str(next(store._ids))
+                        store.uploads[upload_id] = {}
+                        store.headers[(bucket, key)] = {
+                            name.lower(): value
+                            for name, value in self.headers.items()
+                            if name.lower() == "content-type" or name.lower().startswith("x-amz-meta-")
+                        }
+                        xml = (
+                            "<InitiateMultipartUploadResult><Bucket>%s</Bucket><Key>%s</Key>"
+                            "<UploadId>%s</UploadId></InitiateMultipartUploadResult>" % (bucket, escape(key), upload_id)
+                        )
+                    else:
+                        store.operations.append("CompleteMultipartUpload")
+                        parts = store.uploads.pop(query["uploadId"])
+                        numbers = [int(n) for n in re.findall(rb"<PartNumber>(\d+)</PartNumber>", body)]
+                        store.objects[(bucket, key)] = b"".join(parts[n] for n in numbers)
+                        xml = "<CompleteMultipartUploadResult><Bucket>%s</Bucket><Key>%s</Key><ETag>\"x\"</ETag>" \
+                              "</CompleteMultipartUploadResult>" % (bucket, escape(key))
+                self._reply(200, xml.encode())
+
+            def do_DELETE(self):
+                bucket, key, query = self._target()
+                with store.lock:
+                    if "uploadId" in query:
+                        store.operations.append("AbortMultipartUpload")
+                        store.uploads.pop(query["uploadId"], None)
+                    else:
+                        store.operations.append("DeleteObject")
+                        store.objects.pop((bucket, key), None)
+                self._reply(204)
+
+            def do_HEAD(self):
+                self.do_GET()
+
+            def do_GET(self):
+                bucket, key, query = self._target()
+                with store.lock:
+                    if not key:
+                        store.operations.append("ListObjectsV2")
+                        prefix = query.get("prefix", "")
+                        keys = sorted(k for b, k in store.objects if b == bucket and k.startswith(prefix))
+                        contents = "".join(
+                            "<Contents><Key>%s</Key><Size>%d</Size></Contents>"
+                            % (escape(k), len(store.objects[(bucket, k)]))
+                            for k in keys
+                        )
+                        xml = "<ListBucketResult><Name>%s</Name><Prefix>%s</Prefix><KeyCount>%d</KeyCount>" \
+                              "<IsTruncated>false</IsTruncated>%s</ListBucketResult>" % (
+                                  bucket, escape(prefix), len(keys), contents)
+                        self._reply(200, xml.encode())
+                        return
+                    store.operations.append("HeadObject" if self.command == "HEAD" else "GetObject")
+                    data = store.objects.get((bucket, key))
+                    headers = dict(store.headers.get((bucket, key), {}))
+                if data is None:
+                    self._not_found()
+                    return
+                headers["ETag"] = '"%s"' % hashlib.md5(data).hexdigest()
+                self._reply(200, data, headers)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.endpoint = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
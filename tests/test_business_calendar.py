@@ -0,0 +1,66 @@
+import random
+from datetime import date, timedelta
+
+import numpy as np
+
+from rag.app.rule_engine import BusinessCalendar, business_calendar, ecuador_national_holidays, next_working_day
+
+
+def _walk(start, holidays, days):
+    """Reference day-by-day walk (the original `next_working_day` loop, both directions)."""
+    holidays = set(holidays)
+    step = 1 if days >= 0 else -1
+    current, added = start, 0
+    while added < abs(days):
+        current += timedelta(days=step)
+        if current.weekday() >= 5 or current in holidays:
+            continue
+        added += 1
+    return current
+
+
+def test_ecuador_holidays_2024_include_movable_feasts():
+    holidays = ecuador_national_holidays(2024)
+    assert date(2024, 2, 12) in holidays and date(2024, 2, 13) in holidays  # Carnaval
+    assert date(2024, 3, 29) in holidays  # Viernes Santo
+    assert date(2024, 8, 10) in holidays
+    assert len(holidays) == 11
+
+
+def test_calendar_matches_day_by_day_walk():
+    rng = random.Random(3)
+    holidays = [date(2024, 1, 1) + timedelta(days=rng.randrange(900)) for _ in range(30)]
+    calendar = BusinessCalendar(holidays)
+    for _ in range(500):
+        start = date(2023, 11, 1) + timedelta(days=rng.randrange(900))
+        days = rng.randrange(-90, 90)
+        assert calendar.add_business_days(start, days) == _walk(start, holidays, days)
+
+
+def test_next_working_day_keeps_its_contract():
+    assert next_working_day(date(2024, 3, 28), [date(2024, 3, 29)], days=1) == date(2024, 4, 1)
+    assert next_working_day(date(2024, 3, 30), days=0) == date(2024, 3, 30)
+    assert next_working_day(date(2024, 12, 20), days=60) == _walk(date(2024, 12, 20), [], 60)
+
+
+def test_vectorized_over_many_start_dates():
+    calendar = business_calendar(national=True)
+    starts = np.arange("2024-01-01", "2025-01-01", dtype="datetime64[D]")
+    targets = calendar.add_business_days_array(starts, 10)
+    holidays = ecuador_national_holidays(2024) + ecuador_national_holidays(2025)
+    for start, target in zip(starts[::17], targets[::17]):
+        assert target.item() == _walk(start.item(), holidays, 10)
+    assert not calendar.is_working_day(date(2024, 5, 24))
+
+
+def test_dense_holidays_grow_coverage_instead_of_clamping():
+    # January to April closed every year: about 170 working days a year
+    holidays = [day for year in (2024, 2025, 2026) for day in
+                (date(year, 1, 1) + timedelta(days=i) for i in range(120))]
+    assert next_working_day(date(2024, 12, 20), holidays, 239) == _walk(date(2024, 12, 20), holidays, 239)
+    calendar = BusinessCalendar(holidays)
+    rng = random.Random(5)
+    for _ in range(200):
+        start = date(2024, 1, 1) + timedelta(days=rng.randrange(1100))
+        days = rng.randrange(-700, 700)
+        assert calendar.add_business_days(start, days) == _walk(start, holidays, days)
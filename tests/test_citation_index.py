@@ -0,0 +1,75 @@
+from fastapi.testclient import TestClient
+
+from rag.app.citation_index import CitationIndex, citation_key
+from rag.app.generation import StubBackend
+from rag.app.lexical_index import LexicalIndex, LexicalIndexBuilder
+from rag.app.main import app, get_pipeline
+from rag.app.pipeline import QueryPipeline
+from rag.eval.run_eval import evaluate_records
+
+
+def _metadata(source, ro_number, article):
+    return {
+        "source": source,
+        "title": "Ley de Régimen Tributario Interno",
+        "ro_number": ro_number,
+        "ro_date": "2004-11-17",
+        "article": article,
+        "authority": "law",
+        "vigency": "2024-04-01",
+        "url": "https://www.sri.gob.ec/normativa-tributaria",
+    }
+
+
+def _citation(source, ro_number, article):
+    return {"source": source, "ro_number": ro_number, "article": article, "url": "https://www.sri.gob.ec"}
+
+
+def test_citation_key_normalises_prefixes_and_accents():
+    assert citation_key("LRTI", "R.O. 463", "Artículo 65") == citation_key("lrti", "463", "Art. 65")
+    assert citation_key("LRTI", "463", "65") != citation_key("LRTI", "463", "66")
+
+
+def test_lookup_returns_every_chunk_of_a_citation(tmp_path):
+    index = CitationIndex.build(
+        [_metadata("LRTI", "463", "65"), _metadata("LRTI", "463", "66"), _metadata("LRTI", "463", "65")]
+    )
+    index.save(tmp_path)
+    loaded = CitationIndex.load(tmp_path)
+    assert list(loaded.lookup("LRTI", "463", "65")) == [0, 2]
+    assert list(loaded.lookup("LRTI", "463", "999")) == []
+    assert len(loaded) == 2
+    assert CitationIndex.load(tmp_path / "missing") is None
+
+
+def test_evaluator_counts_only_resolvable_citations():
+    index = CitationIndex.build([_metadata("LRTI", "463", "65")])
+    records = [
+        {"citations": [_citation("LRTI", "463", "65")], "valid_as_of": "2024-05-01"},
+        {"citations": [_citation("LRTI", "463", "650")], "valid_as_of": "2024-05-01"},
+    ]
+    assert evaluate_records(records)["citation_accuracy"] == 1.0
+    metrics = evaluate_records(records, index)
+    assert metrics["citation_accuracy"] == 0.5
+    assert metrics["hallucination_rate"] == 0.5
+    assert metrics["citation_resolution_rate"] == 0.5
+
+
+class _HallucinatingBackend(StubBackend):
+    def render(self, question, hits):
+        return super().render(question, hits) + " Ver también [LRTI, Art. 999, R.O. 463]."
+
+
+def test_api_reports_hallucinated_citations(tmp_path):
+    builder = LexicalIndexBuilder()
+    builder.add("lrti-65", "La tarifa general del IVA es 15%.", _metadata("LRTI", "463", "65"))
+    builder.write(tmp_path / "index")
+    index = LexicalIndex(tmp_path / "index")
+    pipeline = QueryPipeline(index, _HallucinatingBackend(), top_k=5, citation_index=index.citations)
+    app.dependency_overrides[get_pipeline] = lambda: pipeline
+    try:
+        body = TestClient(app).post("/query", json={"question": "tarifa IVA"}).json()
+    finally:
+        app.dependency_overrides.clear()
+    assert [c["article"] for c in body["citations"]] == ["65"]
+    assert body["rejected_citations"] == [{"source": "LRTI", "article": "999", "ro_number": "463"}]
@@ -0,0 +1,94 @@
+from src.utils.content_store import ContentStore
+from src.utils.http_cache import content_hash
+from src.utils.object_store import LocalStore, S3Store, UploadQueue
+from src.utils.s3_upload import s3_client
+
+COPCI = b"%PDF-1.7 Codigo Organico de la Produccion, Comercio e Inversiones"
+
+
+class CountingStore(LocalStore):
+    def __init__(self, root):
+        super().__init__(root)
+        self.puts = 0
+
+    def put(self, key, body, content_type=None, metadata=None):
+        self.puts += 1
+        return super().put(key, body, content_type, metadata)
+
+
+def test_identical_bytes_from_many_urls_are_stored_once(tmp_path):
+    store = CountingStore(tmp_path / "store")
+    content = ContentStore(store, tmp_path / "index.sqlite")
+
+    first = content.put("https://www.aduana.gob.ec/wp-content/uploads/COPCI.pdf", COPCI, name="aduanas/copci.pdf")
+    second = content.put("http://finanzas.gob.ec/copci.pdf?utm_source=x", COPCI, name="gobierno/copci.pdf")
+
+    assert first.created and not second.created
+    assert first.sha256 == second.sha256 == content_hash(COPCI)
+    assert store.puts == 1
+    assert content.get(first.sha256) == COPCI
+    assert [a.url for a in content.aliases(first.sha256)] == [
+        "https://www.aduana.gob.ec/wp-content/uploads/COPCI.pdf",
+        "https://www.finanzas.gob.ec/copci.pdf",
+    ]
+    assert content.resolve("https://www.finanzas.gob.ec/copci.pdf") == first.sha256
+    assert content.stats() == {"blobs": 1, "bytes": len(COPCI), "urls": 2}
+
+
+def test_a_lost_index_does_not_reupload(tmp_path):
+    store = CountingStore(tmp_path / "store")
+    ContentStore(store, tmp_path / "a.sqlite").put("https://www.sri.gob.ec/lrti.pdf", COPCI)
+    blob = ContentStore(store, tmp_path / "b.sqlite").put("https://www.sri.gob.ec/lrti.pdf", COPCI)
+    assert not blob.created
+    assert store.puts == 1
+
+
+def test_one_index_shared_by_two_stores_uploads_to_each(tmp_path):
+    local, production = CountingStore(tmp_path / "local"), CountingStore(tmp_path / "production")
+    ContentStore(local, tmp_path / "index.sqlite").put("https://www.sri.gob.ec/lrti.pdf", COPCI)
+    content = ContentStore(production, tmp_path / "index.sqlite")
+
+    assert content.resolve("https://www.sri.gob.ec/lrti.pdf") is None
+    assert content.put("https://www.sri.gob.ec/lrti.pdf", COPCI).created
+    assert production.puts == 1 and content.get(content_hash(COPCI)) == COPCI
+    assert content.stats() == {"blobs": 1, "bytes": len(COPCI), "urls": 1}
+
+
+def test_streamed_bodies_are_hashed_before_upload(local_s3, tmp_path):
+    client = s3_client(endpoint_url=local_s3.endpoint)
+    content = ContentStore(S3Store("raw", client=client), tmp_path / "index.sqlite")
+
+    blob = content.put("https://www.sri.gob.ec/a.pdf", iter([COPCI[:10], COPCI[10:]]), content_type="application/pdf")
+    content.put("https://www.sri.gob.ec/b.pdf", iter([COPCI]))
+
+    assert local_s3.objects[("raw", blob.key)] == COPCI
+    assert blob.key == f"blobs/sha256/{blob.sha256[:2]}/{blob.sha256}"
+    assert local_s3.headers[("raw", blob.key)]["x-amz-meta-source-url"] == "https://www.sri.gob.ec/a.pdf"
+    assert local_s3.operations.count("PutObject") == 1
+
+
+def test_concurrent_uploads_of_the_same_bytes(tmp_path):
+    store = CountingStore(tmp_path / "store")
+    content = ContentStore(store, tmp_path / "index.sqlite")
+    with UploadQueue(content, workers=8) as queue:
+        futures = [queue.submit(f"https://www.iess.gob.ec/ley{i}.pdf", COPCI, name=f"iess/{i}.pdf") for i in range(16)]
+    assert sum(future.result().created for future in futures) == 1
+    assert store.puts == 1
+    assert len(content.aliases(content_hash(COPCI))) == 16
+
+
+def test_derived_cache_computes_once_per_hash(tmp_path):
+    content = ContentStore(LocalStore(tmp_path / "store"), tmp_path / "index.sqlite")
+    texts = content.derived("text")
+    calls = []
+
+    def extract():
+        calls.append(1)
+        return b"Codigo Organico"
+
+    sha256 = content_hash(COPCI)
+    assert texts.get(sha256) is None
+    assert texts.get_or_compute(sha256, extract) == b"Codigo Organico"
+    assert texts.get_or_compute(sha256, extract) == b"Codigo Organico"
+    assert len(calls) == 1
+    assert texts.key(sha256) == f"derived/text/{sha256[:2]}/{sha256}"
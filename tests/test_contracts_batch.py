@@ -0,0 +1,79 @@
+import pytest
+
+from rag.app.contracts import (
+    AUTHORITY_UNKNOWN,
+    MISSING_KEYS,
+    RO_DATE_INVALID,
+    URL_NOT_ABSOLUTE,
+    validate_chunk_batch,
+    validate_chunk_metadata,
+)
+
+VALID = {
+    "source": "LRTI",
+    "title": "Ley de Régimen Tributario Interno",
+    "ro_number": "463",
+    "ro_date": "2004-11-17",
+    "article": "65",
+    "authority": "Organic Law",
+    "vigency": "2024-04-01",
+    "url": "https://www.sri.gob.ec/normativa-tributaria",
+}
+
+
+def _variants():
+    records = [dict(VALID)]
+    for key, value in [
+        ("url", "www.sri.gob.ec/normativa"),
+        ("url", ""),
+        ("url", None),
+        ("ro_number", "   "),
+        ("authority", "Decreto"),
+        ("ro_date", "2024-02-30"),
+        ("ro_date", "2024-2-9"),
+        ("ro_date", "2024-04- 1"),
+        ("ro_date", "0000-01-01"),
+        ("vigency", "2024/04/01"),
+        ("vigency", ""),
+        ("vigency", 0),
+        ("valid_until", "31/12/2023"),
+        ("valid_until", "2023-12-31"),
+        ("valid_until", None),
+    ]:
+        record = dict(VALID)
+        record[key] = value
+        records.append(record)
+    incomplete = dict(VALID)
+    del incomplete["title"], incomplete["vigency"]
+    records.append(incomplete)
+    records.append({})
+    return records
+
+
+def test_batch_messages_match_scalar_validator():
+    records = _variants()
+    result = validate_chunk_batch(records)
+    assert len(result) == len(records)
+    for row, record in enumerate(records):
+        assert result.messages(row) == validate_chunk_metadata(record), record
+        assert bool(result.valid[row]) == (not validate_chunk_metadata(record))
+
+
+def test_batch_sets_expected_bits():
+    records = _variants()
+    result = validate_chunk_batch(records)
+    assert result.error_mask[0] == 0
+    assert result.error_mask[1] & URL_NOT_ABSOLUTE
+    assert result.error_mask[5] & AUTHORITY_UNKNOWN
+    assert result.error_mask[6] & RO_DATE_INVALID
+    assert result.error_mask[-1] & MISSING_KEYS
+    assert list(result.invalid_rows()) == [row for row, r in enumerate(records) if validate_chunk_metadata(r)]
+
+
+def test_arrow_table_treats_nulls_as_missing_keys():
+    pa = pytest.importorskip("pyarrow")
+    records = [dict(VALID), dict(VALID, ro_date="2024-13-01"), dict(VALID, url=None)]
+    result = validate_chunk_batch(pa.Table.from_pylist(records))
+    assert result.messages(0) == []
+    assert result.messages(1) == ["ro_date must be YYYY-MM-DD"]
+    assert result.messages(2) == ["missing keys: ['url']", "url is empty"]
@@ -0,0 +1,224 @@
+import asyncio
+import multiprocessing
+import sqlite3
+import threading
+import time
+from collections import Counter, defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from src.data_collection.mega_spider import MegaSpider, load_source_urls
+from src.utils.crawl_coordinator import CrawlCoordinator, host_partition
+from src.utils.crawl_engine import AsyncCrawlEngine
+from src.utils.object_store import LocalStore
+
+NODES = 15  # a binary tree of depth 3 per host, MegaSpider's MAX_DEPTH
+
+
+def coordinators(path, clock, *workers, **kwargs):
+    return [CrawlCoordinator(path, worker=worker, partitions=8, lease_ttl=10.0, clock=clock, **kwargs)
+            for worker in workers]
+
+
+def urls_for_distinct_partitions(n):
+    urls, seen = [], set()
+    for port in range(1000, 2000):
+        url = f"http://127.0.0.1:{port}/normativa/0"
+        if host_partition(url, 8) not in seen:
+            seen.add(host_partition(url, 8))
+            urls.append(url)
+        if len(urls) == n:
+            return urls
+
+
+def test_workers_split_partitions_and_share_one_seen_set(tmp_path):
+    now = [1000.0]
+    a, b = coordinators(tmp_path / "crawl.sqlite", lambda: now[0], "a", "b")
+    assert len(a.heartbeat()) == 8  # alone: every partition
+    assert b.heartbeat() == []
+    assert len(a.heartbeat()) == 4  # sees b, drains half and hands it back
+    assert len(b.heartbeat()) == 4 and not set(a.held) & set(b.held)
+
+    urls = urls_for_distinct_partitions(8)
+    frontier_a, frontier_b = a.frontier(batch_size=4), b.frontier(batch_size=4)
+    frontier_a.extend((url, 0) for url in urls)
+    frontier_a.flush()
+    claimed_a = [frontier_a.pop() for _ in range(4)]
+    claimed_b = [frontier_b.pop() for _ in range(4)]
+    assert frontier_a.pop() is None and frontier_b.pop() is None
+    assert {host_partition(url, 8) for url, _ in claimed_a} == set(a.held)
+    assert sorted(url for url, _ in claimed_a + claimed_b) == sorted(urls)
+    assert not frontier_a.finished()
+
+    for url, _ in claimed_a:
+        frontier_a.done(url)
+    for url, _ in claimed_b:
+        frontier_b.done(url)
+    frontier_b.extend((url, 1) for url in urls)  # rediscovered: already crawled
+    assert frontier_b.finished() and frontier_a.finished() and len(frontier_b) == 0
+
+
+def test_dead_worker_partitions_are_recovered(tmp_path):
+    now = [1000.0]
+    a, b = coordinators(tmp_path / "crawl.sqlite", lambda: now[0], "a", "b", max_attempts=2)
+    a.heartbeat()
+    url = urls_for_distinct_partitions(1)[0]
+    frontier_a = a.frontier()
+    frontier_a.push(url, 0)
+    assert frontier_a.pop() == (url, 0)  # a crashes with the page in flight
+
+    b.heartbeat()
+    assert b.held == [] and b.frontier().pop() is None
+    now[0] += 11  # a's leases expire
+    assert len(b.heartbeat()) == 8
+    assert b.frontier().pop() == (url, 0) and b.stats() == {"b": {"partitions": 8, "claimed": 1}}
+
+    now[0] += 11  # b dies too: the page has been tried max_attempts times
+    c, = coordinators(tmp_path / "crawl.sqlite", lambda: now[0], "c", max_attempts=2)
+    c.heartbeat()
+    assert c.frontier().pop() is None and c.frontier().finished()
+
+
+def test_retired_worker_hands_its_hosts_to_workers_with_budget_left(tmp_path):
+    now = [1000.0]
+    a, b = coordinators(tmp_path / "crawl.sqlite", lambda: now[0], "a", "b")
+    a.heartbeat(), b.heartbeat(), a.heartbeat(), b.heartbeat()
+    url = next(url for url in urls_for_distinct_partitions(8) if host_partition(url, 8) in a.held)
+    frontier_a = a.frontier()
+    frontier_a.push(url, 0)
+    assert frontier_a.pop() == (url, 0)
+    frontier_a.push(url.replace("/0", "/1"), 1)
+    frontier_a.flush()
+
+    assert a.retire() == [host_partition(url, 8)]  # kept until its page in flight is done
+    assert len(frontier_a) == 1 and frontier_a.pop() is None
+    frontier_a.done(url)
+    frontier_a.close()
+    assert a.heartbeat() == [] and len(b.heartbeat()) == 8
+    assert b.frontier().pop() == (url.replace("/0", "/1"), 1)
+
+    b.retire()  # every live worker has retired: they share the partitions again
+    a.heartbeat()
+    assert len(b.heartbeat()) == 4 and len(a.heartbeat()) == 4
+
+
+def test_a_locked_database_does_not_stall_the_event_loop(tmp_path):
+    a, = coordinators(tmp_path / "crawl.sqlite", time.time, "a")
+    a.heartbeat()
+    frontier = a.frontier(batch_size=2)
+    frontier.extend((url, 0) for url in urls_for_distinct_partitions(4))
+    frontier.flush()
+
+    other = sqlite3.connect(str(tmp_path / "crawl.sqlite"), isolation_level=None, check_same_thread=False)
+    other.execute("BEGIN IMMEDIATE")  # another process is writing
+    threading.Timer(0.5, other.execute, ("COMMIT",)).start()
+    ticks = []
+
+    async def crawl():
+        engine = AsyncCrawlEngine(concurrency=2)
+        task = asyncio.create_task(engine.run(frontier, None, fetch=lambda url, depth: []))
+        while not task.done():
+            ticks.append(time.monotonic())
+            await asyncio.sleep(0.01)
+        return await task
+
+    assert asyncio.run(crawl()) == 4 and frontier.finished()
+    assert ticks[-1] - ticks[0] >= 0.4
+    assert max(later - earlier for earlier, later in zip(ticks, ticks[1:])) < 0.2
+
+
+class _Sites:
+    """NODES pages per host (one port each) linking down the tree and to the next host's root.
+
+    Records every fetch with the worker that made it (``X-Worker``) and flags any
+    moment at which two workers had requests in flight to the same host.
+    """
+
+    def __init__(self, hosts):
+        self.fetches = Counter()
+        self.workers = Counter()
+        self.in_flight = defaultdict(Counter)
+        self.overlaps = []
+        lock = threading.Lock()
+        sites = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == "/robots.txt":
+                    self.send_error(404)
+                    return
+                host, worker = self.headers["Host"], self.headers.get("X-Worker", "?")
+                with lock:
+                    sites.fetches[host + self.path] += 1
+                    sites.workers[worker] += 1
+                    sites.in_flight[host][worker] += 1
+                    if len(+sites.in_flight[host]) > 1:
+                        sites.overlaps.append((host, dict(sites.in_flight[host])))
+                time.sleep(0.01)
+                node = int(self.path.rsplit("/", 1)[1])
+                children = [f"/normativa/{child}" for child in (2 * node + 1, 2 * node + 2) if child < NODES]
+                port = sites.ports[(sites.ports.index(self.server.server_address[1]) + 1) % len(sites.ports)]
+                links = children + [f"http://127.0.0.1:{port}/normativa/0"]
+                body = "".join(f'<a href="{link}">Reglamento</a>' for link in links).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                with lock:
+                    sites.in_flight[host][worker] -= 1
+
+            def log_message(self, *args):
+                pass
+
+        self.servers = [ThreadingHTTPServer(("127.0.0.1", 0), Handler) for _ in range(hosts)]
+        self.ports = [server.server_address[1] for server in self.servers]
+        for server in self.servers:
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    def close(self):
+        for server in self.servers:
+            server.shutdown()
+            server.server_close()
+
+
+class LocalSpider(MegaSpider):
+    def is_valid_domain(self, url):
+        return url.startswith("http://127.0.0.1")
+
+
+def crawl_worker(path, store, seeds, worker):
+    coordinator = CrawlCoordinator(path, worker=worker, partitions=8, lease_ttl=1.0).start()
+    spider = LocalSpider(seed_urls=seeds, max_pages=1000, workers=4, store=LocalStore(store), coordinator=coordinator)
+    spider.session.headers["X-Worker"] = worker
+    spider.url_queue.extend((seed, 0) for seed in spider.seed_urls)
+    asyncio.run(spider.crawl_async())
+    spider.url_queue.close()
+    coordinator.stop()
+
+
+def test_worker_processes_crawl_every_page_once_without_sharing_a_host(tmp_path):
+    workers = 3
+    sites = _Sites(hosts=6)
+    try:
+        seeds = [f"http://127.0.0.1:{port}/normativa/0" for port in sites.ports]
+        context = multiprocessing.get_context("fork")
+        processes = [context.Process(target=crawl_worker, args=(tmp_path / "crawl.sqlite", tmp_path / "store", seeds, f"w{i}"))
+                     for i in range(workers)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join(60)
+        assert [process.exitcode for process in processes] == [0] * workers
+    finally:
+        sites.close()
+
+    assert len(sites.fetches) == 6 * NODES and set(sites.fetches.values()) == {1}
+    assert sites.overlaps == [] and len(sites.workers) > 1
+    assert CrawlCoordinator(tmp_path / "crawl.sqlite", partitions=8).finished("page")
+
+
+def test_load_source_urls_reads_master_sources(tmp_path):
+    urls = load_source_urls()
+    assert "https://www.bce.fin.ec/" in urls and len(urls) == len(set(urls)) > 60
+    spider = MegaSpider(seed_urls=urls, store=LocalStore(tmp_path))
+    assert spider.is_valid_domain("https://www.bce.fin.ec/index.php/publicaciones")
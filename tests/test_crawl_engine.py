@@ -0,0 +1,89 @@
+import asyncio
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from src.utils.crawl_engine import AsyncCrawlEngine, host_key
+
+
+class _Host:
+    """Local HTTP host that records its peak number of concurrent requests."""
+
+    def __init__(self, delay):
+        self.active = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+        host = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with host.lock:
+                    host.active += 1
+                    host.peak = max(host.peak, host.active)
+                time.sleep(delay)
+                with host.lock:
+                    host.active -= 1
+                body = b"<html></html>"
+                self.send_response(200)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.base = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+
+@pytest.fixture
+def hosts():
+    slow, fast = _Host(0.3), _Host(0.01)
+    yield slow, fast
+    for host in (slow, fast):
+        host.server.shutdown()
+        host.server.server_close()
+
+
+def test_per_host_cap_and_slow_host_isolation(hosts):
+    slow, fast = hosts
+    done = {}
+
+    def handle(url, depth, response):
+        done[url] = time.perf_counter()
+        return []
+
+    items = [(f"{slow.base}/{i}", 0) for i in range(4)] + [(f"{fast.base}/{i}", 0) for i in range(20)]
+    start = time.perf_counter()
+    fetched = asyncio.run(AsyncCrawlEngine(concurrency=8, per_host=2).run(items, handle))
+
+    assert fetched == 24
+    assert slow.peak <= 2 and fast.peak <= 2
+    fast_finished = max(t for url, t in done.items() if url.startswith(fast.base)) - start
+    assert fast_finished < 0.5  # the fast host never waited behind the slow one
+
+
+def test_children_are_fed_and_budget_and_admit_respected(hosts):
+    _, fast = hosts
+    seen = set()
+
+    def admit(url, depth):
+        if url in seen:
+            return False
+        seen.add(url)
+        return True
+
+    def handle(url, depth, response):
+        node = int(url.rsplit("/", 1)[1])
+        # Every page links back to page 0 as well, which admit() rejects.
+        return [(f"{fast.base}/{node * 3 + i}", depth + 1) for i in (1, 2, 3)] + [(f"{fast.base}/0", depth + 1)]
+
+    engine = AsyncCrawlEngine(concurrency=4, per_host=1, max_fetches=15)
+    assert asyncio.run(engine.run([(f"{fast.base}/0", 0)], handle, admit=admit)) == 15
+
+
+def test_host_key_ignores_case_and_path():
+    assert host_key("https://WWW.SRI.gob.ec/normativa?x=1") == "www.sri.gob.ec"
@@ -0,0 +1,131 @@
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from src.data_collection.mega_spider import MegaSpider
+from src.utils.crawl_engine import AsyncCrawlEngine
+from src.utils.crawl_metrics import (
+    CrawlMetrics,
+    Histogram,
+    MeteredSession,
+    MetricsExporter,
+    busiest_hosts,
+    prometheus_text,
+)
+from src.utils.object_store import LocalStore
+
+
+class _Server:
+    """/ok/<n> answers a page linking to two children; /missing is a 404."""
+
+    def __init__(self):
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == "/robots.txt" or self.path == "/missing":
+                    self.send_error(404)
+                    return
+                node = int(self.path.rsplit("/", 1)[1])
+                body = "".join(f'<a href="/ok/{node * 2 + i}">Ley {i}</a>' for i in (1, 2)).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.host = f"127.0.0.1:{self.httpd.server_address[1]}"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+
+@pytest.fixture
+def server():
+    server = _Server()
+    yield server
+    server.httpd.shutdown()
+    server.httpd.server_close()
+
+
+def test_histogram_quantiles_and_prometheus_text():
+    histogram = Histogram((0.1, 1.0, 10.0))
+    for value in (0.05, 0.5, 0.5, 2.0, 60.0):
+        histogram.observe(value)
+    assert histogram.counts == [1, 2, 1, 1]
+    assert histogram.quantile(0.5) == pytest.approx(0.1 + 0.9 * 1.5 / 2)
+    assert histogram.quantile(1.0) == 10.0  # the +Inf bucket reports the top bound
+
+    now = [100.0]
+    metrics = CrawlMetrics(clock=lambda: now[0])
+    metrics.gauge("queue_depth", lambda: 7)
+    metrics.per_host("politeness", lambda: {"slow.gob.ec": {"concurrency": 1}})
+    for url, status, latency, nbytes in [("https://slow.gob.ec/a", 200, 12.0, 3000),
+                                         ("https://slow.gob.ec/b", None, 30.0, 0),
+                                         ("https://fast.gob.ec/a", 200, 0.2, 1000)]:
+        metrics.request_started(url)
+        metrics.request_finished(url, status, latency, nbytes)
+    metrics.error("https://slow.gob.ec/b", TimeoutError())
+    metrics.request_started("https://fast.gob.ec/b")
+    now[0] = 110.0
+
+    snapshot = metrics.snapshot()
+    assert snapshot["bytes_per_second"] == 400.0 and snapshot["in_flight"] == 1
+    assert snapshot["statuses"] == {"200": 2, "error": 1} and snapshot["errors"] == {"TimeoutError": 1}
+    assert busiest_hosts(snapshot, 1) == ["slow.gob.ec"]
+    assert snapshot["hosts"]["slow.gob.ec"]["politeness_concurrency"] == 1
+
+    text = prometheus_text(snapshot)
+    assert 'yachaq_crawl_requests_total{host="slow.gob.ec",status="error"} 1' in text
+    assert 'yachaq_crawl_errors_total{host="slow.gob.ec",exception="TimeoutError"} 1' in text
+    assert 'yachaq_crawl_request_duration_seconds_bucket{host="slow.gob.ec",le="10.0"} 0' in text
+    assert 'yachaq_crawl_request_duration_seconds_bucket{host="slow.gob.ec",le="+Inf"} 2' in text
+    assert 'yachaq_crawl_in_flight{host="fast.gob.ec"} 1' in text
+    assert 'yachaq_crawl_host_politeness_concurrency{host="slow.gob.ec"} 1' in text
+    assert "yachaq_crawl_queue_depth 7" in text
+    assert metrics.snapshot()["bytes_per_second"] == 0.0  # nothing new since the previous snapshot
+
+
+def test_engine_and_metered_session_record_requests(server, tmp_path):
+    metrics = CrawlMetrics()
+    errors = []
+    engine = AsyncCrawlEngine(concurrency=2, per_host=2, timeout=5, metrics=metrics)
+    items = [(f"http://{server.host}/ok/1", 0), (f"http://{server.host}/missing", 0), ("http://127.0.0.1:9/x", 0)]
+    asyncio.run(engine.run(items, lambda url, depth, response: [], on_error=lambda url, exc: errors.append(exc)))
+
+    session = MeteredSession(requests.Session(), metrics)
+    assert session.get(f"http://{server.host}/ok/2", timeout=5).status_code == 200
+
+    exporter = MetricsExporter(metrics, tmp_path, name="test")
+    exporter.export()
+    snapshot = exporter.stop()
+    local, refused = snapshot["hosts"][server.host], snapshot["hosts"]["127.0.0.1:9"]
+    assert local["statuses"] == {"200": 2, "404": 1} and local["latency"]["count"] == 3 and local["bytes"] > 0
+    assert refused["statuses"] == {"error": 1} and refused["errors"] == {type(errors[0]).__name__: 1}
+    assert snapshot["in_flight"] == 0
+
+    series = [json.loads(line) for line in (tmp_path / "test_metrics.jsonl").read_text().splitlines()]
+    assert len(series) == 2 and series[-1]["requests"] == 4
+    assert f'yachaq_crawl_response_bytes_total{{host="{server.host}"}}' in (tmp_path / "test.prom").read_text()
+
+
+def test_mega_spider_exports_queue_depth_and_counters(server, tmp_path):
+    class LocalSpider(MegaSpider):
+        def is_valid_domain(self, url):
+            return url.startswith("http://127.0.0.1")
+
+    seed = f"http://{server.host}/ok/0"
+    spider = LocalSpider(seed_urls=[seed], max_pages=3, workers=2, store=LocalStore(tmp_path / "store"),
+                         metrics_dir=tmp_path / "metrics")
+    spider.url_queue.append((seed, 0))
+    asyncio.run(spider.crawl_async())
+
+    snapshot = MetricsExporter(spider.metrics, spider.metrics_dir, name="mega_spider").export()
+    assert snapshot["gauges"]["pages_crawled"] == 3 and snapshot["gauges"]["queue_depth"] > 0
+    assert snapshot["hosts"][server.host]["statuses"]["200"] == 3
+    assert snapshot["hosts"][server.host]["politeness_requests"] >= 3
+    assert (tmp_path / "metrics" / "mega_spider.prom").exists()
@@ -0,0 +1,133 @@
+import asyncio
+import sqlite3
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from src.data_collection.mega_spider import MegaSpider
+from src.utils.crawl_state import VISITED, BloomFilter, CrawlState, MemoryFrontier, PriorityFrontier
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    urls = [f"https://www.sri.gob.ec/normativa/{i}" for i in range(1000)]
+    for url in urls:
+        bloom.add(url)
+    assert all(url in bloom for url in urls)
+    false_positives = sum(f"https://www.iess.gob.ec/{i}" in bloom for i in range(10000))
+    assert false_positives < 300
+
+
+def test_frontier_and_sets_survive_restart(tmp_path):
+    state = CrawlState(tmp_path / "crawl.sqlite", expected_urls=1000)
+    visited, pdfs = state.set(VISITED), state.set("pdf")
+    state.frontier.extend([("https://www.sri.gob.ec/a", 0), ("https://www.sri.gob.ec/b", 1)])
+    state.frontier.push("https://www.sri.gob.ec/a", 0)  # duplicates are ignored
+    assert len(state.frontier) == 2
+
+    url, _ = state.frontier.popleft()
+    visited.add(url)
+    pdfs.add("https://www.sri.gob.ec/ley.pdf", {"title": "LRTI"})
+    state.frontier.done(url)
+    in_flight, _ = state.frontier.popleft()
+    visited.add(in_flight)  # crash before this page is processed
+    state.close()
+
+    resumed = CrawlState(tmp_path / "crawl.sqlite", expected_urls=1000)
+    visited, pdfs = resumed.set(VISITED), resumed.set("pdf")
+    assert "https://www.sri.gob.ec/a" in visited
+    assert in_flight not in visited
+    assert resumed.frontier.pop() == (in_flight, 1)
+    assert list(pdfs.values()) == [{"title": "LRTI"}]
+    assert pdfs.add("https://www.sri.gob.ec/ley.pdf") is False
+    assert len(visited) == 1
+    resumed.close()
+
+
+def test_memory_frontier_is_fifo():
+    frontier = MemoryFrontier([("a", 0)])
+    frontier.append(("b", 1))
+    assert [frontier.pop(), frontier.pop(), frontier.pop()] == [("a", 0), ("b", 1), None]
+
+
+def test_priority_frontier_is_best_first():
+    frontier = PriorityFrontier([("seed", 0)])
+    frontier.push("noticias", 1, 0.1)
+    frontier.push("normativa", 1, 0.9)
+    frontier.push("eventos", 1, 0.1)
+    frontier.push("noticias", 1, 1.5)  # rediscovered from a better page
+    frontier.push("normativa", 1, 0.2)  # a lower priority never demotes
+    assert len(frontier) == 4
+    assert [frontier.pop() for _ in range(5)] == [
+        ("noticias", 1), ("normativa", 1), ("eventos", 1), ("seed", 0), None,
+    ]
+
+
+def test_sqlite_frontier_orders_by_priority_and_migrates(tmp_path):
+    path = tmp_path / "crawl.sqlite"
+    old = sqlite3.connect(str(path))
+    old.executescript(
+        "CREATE TABLE frontier (seq INTEGER PRIMARY KEY AUTOINCREMENT, url TEXT NOT NULL UNIQUE,"
+        " depth INTEGER NOT NULL, claimed INTEGER NOT NULL DEFAULT 0);"
+        "CREATE INDEX frontier_pending ON frontier (claimed, seq);"
+        "INSERT INTO frontier (url, depth) VALUES ('https://www.sri.gob.ec/old', 0);"
+    )
+    old.commit()
+    old.close()
+
+    state = CrawlState(path, expected_urls=1000)
+    state.frontier.push("https://www.sri.gob.ec/noticias", 1, 0.1)
+    state.frontier.push("https://www.sri.gob.ec/normativa", 1, 0.8)
+    state.frontier.push("https://www.sri.gob.ec/noticias", 1, 1.0)
+    assert state.frontier.pop() == ("https://www.sri.gob.ec/noticias", 1)
+    state.frontier.push("https://www.sri.gob.ec/noticias", 1, 5.0)  # claimed rows keep their place
+    state.close()
+
+    resumed = CrawlState(path, expected_urls=1000)
+    assert [resumed.frontier.pop() for _ in range(4)] == [
+        ("https://www.sri.gob.ec/noticias", 1),
+        ("https://www.sri.gob.ec/normativa", 1),
+        ("https://www.sri.gob.ec/old", 0),
+        None,
+    ]
+    resumed.close()
+
+
+def test_mega_spider_resumes_from_state_dir(tmp_path):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            node = int(self.path.rsplit("/", 1)[1])
+            links = "".join(f'<a href="/normativa/{node * 2 + i}">Ley {i}</a>' for i in (1, 2))
+            body = links.encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    seed = f"http://127.0.0.1:{server.server_address[1]}/normativa/0"
+
+    class LocalSpider(MegaSpider):
+        def is_valid_domain(self, url):
+            return url.startswith("http://127.0.0.1")
+
+    try:
+        first = LocalSpider(seed_urls=[seed], max_pages=4, workers=2, state_dir=tmp_path)
+        first.url_queue.append((seed, 0))
+        asyncio.run(first.crawl_async())
+        crawled = set(first.visited_urls)
+        first.state.close()
+
+        resumed = LocalSpider(seed_urls=[seed], max_pages=8, workers=2, state_dir=tmp_path)
+        assert resumed.pages_crawled == 4
+        asyncio.run(resumed.crawl_async())
+        assert resumed.pages_crawled == 8
+        assert crawled < set(resumed.visited_urls)
+        resumed.state.close()
+    finally:
+        server.shutdown()
+        server.server_close()
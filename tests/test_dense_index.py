@@ -0,0 +1,54 @@
+import numpy as np
+
+from rag.app.dense_index import DenseIndex, DenseIndexBuilder
+
+
+def _metadata(article: str, **overrides):
+    record = {
+        "source": "COPCI",
+        "title": "Código Orgánico de la Producción, Comercio e Inversiones",
+        "ro_number": "351",
+        "ro_date": "2010-12-29",
+        "article": article,
+        "authority": "organic law",
+        "vigency": "2024-01-01",
+        "url": "https://www.aduana.gob.ec/normativa-vigente/",
+    }
+    record.update(overrides)
+    return record
+
+
+def _build(tmp_path, n=1000, dim=16):
+    rng = np.random.default_rng(5)
+    vectors = rng.normal(size=(n, dim)).astype(np.float32)
+    chunks = [(f"copci-{i}", f"Artículo {i}", _metadata(str(i))) for i in range(n)]
+    chunks[3] = ("bad", "x", _metadata("3", url="relative/path"))
+    builder = DenseIndexBuilder(dim)
+    rejected = builder.add_many(chunks, vectors)
+    builder.write(tmp_path / "dense")
+    return vectors, rejected
+
+
+def test_exact_top_k_matches_brute_force(tmp_path):
+    vectors, rejected = _build(tmp_path)
+    assert rejected == {3: ["url is not absolute"]}
+    kept = np.delete(vectors, 3, axis=0)
+    index = DenseIndex(tmp_path / "dense", block_rows=128, workers=4)
+    query = vectors[42] + 0.01
+    hits = index.search_vector(query, top_k=5)
+
+    normalised = (kept / np.linalg.norm(kept, axis=1, keepdims=True)).astype(np.float16).astype(np.float32)
+    expected = np.argsort(-(normalised @ (query / np.linalg.norm(query))))[:5]
+    expected_ids = [f"copci-{i + 1 if i >= 3 else i}" for i in expected]
+    assert [hit.chunk_id for hit in hits] == expected_ids
+    assert hits[0].chunk_id == "copci-42"
+    assert hits[0].metadata["article"] == "42"
+    index.close()
+
+
+def test_index_is_memory_mapped_float16(tmp_path):
+    _build(tmp_path, n=10)
+    index = DenseIndex(tmp_path / "dense", embedder=lambda text: np.ones(16))
+    assert isinstance(index._matrix, np.memmap)
+    assert index._matrix.dtype == np.float16
+    assert len(index.search("cualquier consulta", top_k=3)) == 3
@@ -0,0 +1,130 @@
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from src.utils.crawl_engine import AsyncCrawlEngine
+from src.utils.http_cache import HttpCache
+
+PDF = b"%PDF-1.4 Codigo Organico de la Produccion" + b"x" * 2000
+
+
+class _Server:
+    """Serves one document; honours validators unless `ignore_validators` is set."""
+
+    def __init__(self):
+        self.body = PDF
+        self.etag = '"v1"'
+        self.ignore_validators = False
+        self.sent_bytes = 0
+        self.statuses = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if not server.ignore_validators and self.headers.get("If-None-Match") == server.etag:
+                    server.statuses.append(304)
+                    self.send_response(304)
+                    self.send_header("ETag", server.etag)
+                    self.end_headers()
+                    return
+                server.statuses.append(200)
+                server.sent_bytes += len(server.body)
+                self.send_response(200)
+                self.send_header("Content-Type", "application/pdf")
+                self.send_header("ETag", server.etag)
+                self.send_header("Last-Modified", "Tue, 02 Jan 2024 10:00:00 GMT")
+                self.send_header("Content-Length", str(len(server.body)))
+                self.end_headers()
+                self.wfile.write(server.body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}/copci.pdf"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+
+@pytest.fixture
+def server():
+    server = _Server()
+    yield server
+    server.httpd.shutdown()
+    server.httpd.server_close()
+
+
+def test_not_modified_costs_no_body_bytes(server, tmp_path):
+    cache = HttpCache(tmp_path / "http_cache.sqlite")
+    first = cache.fetch(requests, server.url, timeout=5)
+    assert first.changed and first.content == PDF
+    cache.store(first)
+
+    second = cache.fetch(requests, server.url + "#page=2", timeout=5)
+    assert second.unchanged and not second.changed
+    assert second.content == b""
+    assert server.statuses == [200, 304]
+    assert server.sent_bytes == len(PDF)
+
+
+def test_nothing_is_recorded_until_stored(server, tmp_path):
+    cache = HttpCache(tmp_path / "http_cache.sqlite")
+    cache.fetch(requests, server.url, timeout=5)  # upload failed: no store()
+    again = cache.fetch(requests, server.url, timeout=5)
+    assert again.changed
+    assert server.statuses == [200, 200]
+
+
+def test_hash_short_circuits_servers_that_ignore_validators(server, tmp_path):
+    server.ignore_validators = True
+    cache = HttpCache(tmp_path / "http_cache.sqlite")
+    cache.store(cache.fetch(requests, server.url, timeout=5))
+
+    assert cache.fetch(requests, server.url, timeout=5).unchanged
+    server.body = PDF + b" reformed"
+    server.etag = '"v2"'
+    changed = cache.fetch(requests, server.url, timeout=5)
+    assert changed.changed and changed.etag == '"v2"'
+
+
+def test_cache_persists_across_processes(server, tmp_path):
+    path = tmp_path / "http_cache.sqlite"
+    cache = HttpCache(path)
+    cache.store(cache.fetch(requests, server.url, timeout=5))
+    cache.close()
+
+    reopened = HttpCache(path)
+    assert len(reopened) == 1
+    assert reopened.headers(server.url) == {
+        "If-None-Match": '"v1"',
+        "If-Modified-Since": "Tue, 02 Jan 2024 10:00:00 GMT",
+    }
+
+
+def test_copies_in_another_store_do_not_count(server, tmp_path):
+    path = tmp_path / "http_cache.sqlite"
+    local = HttpCache(path, namespace="file:///tmp/x/")
+    local.store(local.fetch(requests, server.url, timeout=5))
+
+    production = HttpCache(path, namespace="s3://yachaq-lex-raw/")
+    assert production.headers(server.url) == {} and len(production) == 0
+    assert production.fetch(requests, server.url, timeout=5).changed
+    assert local.fetch(requests, server.url, timeout=5).unchanged
+    assert server.statuses == [200, 200, 304]
+
+
+def test_async_engine_sends_conditional_headers(server, tmp_path):
+    cache = HttpCache(tmp_path / "http_cache.sqlite")
+    cache.store(cache.fetch(requests, server.url, timeout=5))
+    results = []
+
+    def handle(url, depth, response):
+        results.append(cache.revalidate(url, response))
+        return []
+
+    engine = AsyncCrawlEngine(concurrency=2, per_host=2, timeout=5)
+    asyncio.run(engine.run([(server.url, 0)], handle, request_headers=cache.headers))
+    assert results[0].unchanged
+    assert server.statuses == [200, 304]
@@ -0,0 +1,43 @@
+import random
+
+import pytest
+
+from src.utils import keywords
+from src.utils.keywords import KeywordMatcher
+from src.utils.legal_terms import categorize, find_terms, weighted_terms
+
+BACKENDS = [False] + ([True] if keywords.ahocorasick is not None else [])
+
+
+@pytest.mark.parametrize("automaton", BACKENDS)
+def test_matches_exactly_what_substring_checks_find(automaton):
+    words = ["ab", "abc", "bca", "c", "cab", "a b", "bb", "ñb"]
+    matcher = KeywordMatcher(words, automaton=automaton)
+    rng = random.Random(7)
+    for _ in range(2000):
+        text = "".join(rng.choice("abcñ ") for _ in range(rng.randrange(0, 12)))
+        assert set(matcher.find(text)) == {word for word in words if word in text}, text
+        assert (matcher.search(text) is not None) == any(word in text for word in words)
+
+
+@pytest.mark.parametrize("automaton", BACKENDS)
+def test_reports_nested_and_overlapping_keywords_in_text_order(automaton):
+    matcher = KeywordMatcher(["ley", "ley organica", "organica", "codigo del trabajo", "trabajo"], automaton=automaton)
+    text = "codigo del trabajo y ley organica"
+    assert matcher.find(text) == ["codigo del trabajo", "trabajo", "ley", "ley organica", "organica"]
+    assert list(matcher.finditer("ley organica")) == [(0, "ley"), (0, "ley organica"), (4, "organica")]
+    assert matcher.weigh(text, {"trabajo": 1.5, "ley organica": 3}) == {"trabajo": 1.5, "ley organica": 3}
+    assert matcher.find("decreto") == [] and matcher.search("decreto") is None
+
+
+def test_rejects_empty_keywords():
+    with pytest.raises(ValueError):
+        KeywordMatcher(["ley", ""])
+
+
+def test_legal_terms_score_and_categorize_from_one_pass():
+    terms = find_terms("https://www.trabajo.gob.ec/Codigo_del_Trabajo.pdf", "Informe de reforma")
+    assert categorize(terms) == "legal/codigos"  # first matching category wins, as before
+    assert weighted_terms(terms) == [("codigo", 3), ("reforma", 1.5), ("trabajo", 1.5), ("informe", -0.5)]
+    assert categorize(find_terms("https://www.iess.gob.ec/pensiones.pdf")) == "iess"
+    assert categorize(find_terms("https://www.turismo.gob.ec/galeria.pdf", "Fotos")) == "otros"
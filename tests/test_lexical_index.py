@@ -0,0 +1,61 @@
+from rag.app.lexical_index import LexicalIndex, LexicalIndexBuilder
+from rag.app.text import tokenize
+
+
+def _metadata(article: str, **overrides):
+    record = {
+        "source": "LRTI",
+        "title": "Ley de Régimen Tributario Interno",
+        "ro_number": "463",
+        "ro_date": "2004-11-17",
+        "article": article,
+        "authority": "law",
+        "vigency": "2024-04-01",
+        "url": "https://www.sri.gob.ec/normativa-tributaria",
+    }
+    record.update(overrides)
+    return record
+
+
+def _build(tmp_path):
+    builder = LexicalIndexBuilder()
+    builder.add("lrti-65", "Artículo 65.- Tarifa del IVA: la tarifa general es del 15%.", _metadata("65"))
+    builder.add("lrti-103", "Art. 103.- Bancarización: pagos superiores a mil dólares.", _metadata("103"))
+    builder.add("copci-1", "Código Orgánico de la Producción, Comercio e Inversiones.", _metadata("1", source="COPCI"))
+    builder.write(tmp_path / "index")
+    return builder, LexicalIndex(tmp_path / "index")
+
+
+def test_tokenize_folds_accents_and_expands_abbreviations():
+    assert tokenize("Código") == ["codigo"]
+    assert tokenize("Art. 65 del R.O. 463") == ["articulo", "65", "registro", "oficial", "463"]
+
+
+def test_search_ranks_matching_chunk_first(tmp_path):
+    _, index = _build(tmp_path)
+    hits = index.search("tarifa del IVA", top_k=2)
+    assert hits[0].chunk_id == "lrti-65"
+    assert hits[0].metadata["ro_number"] == "463"
+    assert hits[0].metadata["article"] == "65"
+    assert hits[0].metadata["url"].startswith("https://")
+
+
+def test_abbreviated_query_matches_full_word(tmp_path):
+    _, index = _build(tmp_path)
+    assert index.search("codigo organico produccion", top_k=1)[0].chunk_id == "copci-1"
+    assert {hit.chunk_id for hit in index.search("articulo", top_k=5)} == {"lrti-65", "lrti-103"}
+
+
+def test_invalid_chunks_are_refused(tmp_path):
+    builder = LexicalIndexBuilder()
+    errors = builder.add("bad", "texto", _metadata("1", url="not-a-url"))
+    assert "url is not absolute" in errors
+    assert builder.add("no-article", "texto", _metadata(" ")) == ["article is empty"]
+    assert len(builder) == 0
+    assert builder.rejected == 2
+
+
+def test_unknown_terms_return_no_hits(tmp_path):
+    _, index = _build(tmp_path)
+    assert index.search("zzzz", top_k=3) == []
+    assert len(index) == 3
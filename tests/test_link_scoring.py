@@ -0,0 +1,91 @@
+from src.data_collection.resource_registry import MIN_QUALITY_SCORE, ResourceRegistry
+from src.utils.crawl_state import MemoryFrontier
+from src.utils.link_scoring import LinkScorer, url_words
+from src.utils.object_store import LocalStore
+
+SEED = "https://www.turismo.gob.ec/"
+SITE = {
+    SEED: (
+        '<a href="/noticias">Noticias</a><a href="/eventos">Eventos</a>'
+        '<a href="/transparencia">Transparencia</a><a href="/normativa">Normativa vigente</a>'
+    ),
+    "https://www.turismo.gob.ec/noticias": '<a href="/docs/informe-2023.pdf">Informe de gestión</a>',
+    "https://www.turismo.gob.ec/eventos": '<a href="/docs/cronograma.pdf">Cronograma</a>',
+    "https://www.turismo.gob.ec/transparencia": '<a href="/docs/presupuesto.pdf">Presupuesto</a>',
+    "https://www.turismo.gob.ec/normativa": (
+        '<a href="/docs/codigo-trabajo.pdf">Código del Trabajo</a>'
+        '<a href="/docs/reglamento.pdf">Reglamento a la Ley Orgánica</a>'
+        '<a href="/normativa/acuerdos">Acuerdos ministeriales</a>'
+    ),
+    "https://www.turismo.gob.ec/normativa/acuerdos": '<a href="/docs/decreto-001.pdf">Decreto Ejecutivo 001 (reforma)</a>',
+}
+
+
+class Response:
+    def __init__(self, text):
+        self.status_code = 200 if text is not None else 404
+        self.text = text or ""
+
+
+class Session:
+    def get(self, url, **kwargs):
+        return Response(SITE.get(url))
+
+
+def test_url_words_and_scores():
+    assert url_words("https://x.gob.ec/Normativa/Ley_Org%C3%A1nica-2023.pdf?tipo=codigo") == (
+        "normativa ley orgánica 2023 pdf tipo codigo"
+    )
+    scorer = LinkScorer({"reglamento": 2, "informe": -0.5}, {"sri.gob.ec": 1.5})
+    assert scorer.score("https://www.sri.gob.ec/reglamento") > scorer.score("https://www.sri.gob.ec/informe")
+    assert scorer.score("https://www.iess.gob.ec/a", "Reglamento") > scorer.score("https://www.iess.gob.ec/a")
+    assert scorer.score("https://www.iess.gob.ec/a", parent_yield=3) > scorer.score("https://www.iess.gob.ec/a")
+
+
+def crawl(tmp_path, frontier=None):
+    registry = ResourceRegistry(store=LocalStore(tmp_path))
+    registry.session = Session()
+    if frontier is not None:
+        registry.frontier = frontier
+    registry.discover_resources([SEED], max_depth=3, max_pages=3)
+    return registry
+
+
+def test_best_first_finds_more_high_quality_documents_under_budget(tmp_path):
+    fifo = crawl(tmp_path / "fifo", MemoryFrontier())
+    best = crawl(tmp_path / "best")
+    high = lambda registry: [r["url"] for r in registry.resources if r["quality_score"] >= MIN_QUALITY_SCORE]
+
+    assert fifo.pages_crawled == best.pages_crawled == 3
+    assert high(fifo) == []
+    assert high(best) == [
+        "https://www.turismo.gob.ec/docs/codigo-trabajo.pdf",
+        "https://www.turismo.gob.ec/docs/reglamento.pdf",
+        "https://www.turismo.gob.ec/docs/decreto-001.pdf",
+    ]
+
+
+def test_resumed_registry_keeps_its_page_budget(tmp_path):
+    fetched = []
+
+    class CountingSession(Session):
+        def get(self, url, **kwargs):
+            fetched.append(url)
+            return super().get(url, **kwargs)
+
+    def run(max_pages):
+        registry = ResourceRegistry(state_dir=tmp_path / "state", store=LocalStore(tmp_path / "store"))
+        registry.session = CountingSession()
+        registry.discover_resources([SEED], max_depth=3, max_pages=max_pages)
+        return registry
+
+    first = run(max_pages=3)
+    assert len(fetched) == 3
+
+    fetched.clear()
+    resumed = run(max_pages=3)
+    assert fetched == []
+    assert sorted(r["url"] for r in resumed.resources) == sorted(r["url"] for r in first.resources)
+
+    run(max_pages=10)
+    assert fetched and not set(fetched) & {SEED, "https://www.turismo.gob.ec/normativa"}
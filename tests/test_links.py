@@ -0,0 +1,61 @@
+from bs4 import BeautifulSoup
+
+from src.utils.links import Link, element_text, iter_links, parse_html
+
+PORTAL = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><script>var a = '<a href="/fake">';</script></head>
+<body>
+  <a href=" /normativa/ley.pdf ">Ley Orgánica
+      de <b>Régimen</b> Tributario</a>
+  <a name="top">anchor without href</a>
+  <!-- <a href="/commented-out">old</a> -->
+  <p>unclosed <a href="resoluciones?page=2">Siguiente
+  <table><tr><td><a href="/doc/1.pdf">Resolución 1</a></td></tr></table>
+</body></html>"""
+
+
+def test_iter_links_yields_href_and_collapsed_text():
+    assert list(iter_links(PORTAL)) == [
+        Link("/normativa/ley.pdf", "Ley Orgánica de Régimen Tributario"),
+        Link("resoluciones?page=2", "Siguiente"),
+        Link("/doc/1.pdf", "Resolución 1"),
+    ]
+
+
+def test_same_hrefs_as_html_parser_soup():
+    soup = BeautifulSoup(PORTAL, "html.parser")
+    expected = [a["href"].strip() for a in soup.find_all("a", href=True) if "commented" not in a["href"]]
+    assert [link.href for link in iter_links(PORTAL)] == expected
+
+
+def test_bytes_are_decoded_per_meta_charset():
+    page = '<html><head><meta charset="iso-8859-1"></head><body><a href="c.pdf">Código</a></body></html>'
+    assert list(iter_links(page.encode("iso-8859-1"))) == [Link("c.pdf", "Código")]
+
+
+def test_empty_and_parsed_inputs():
+    assert list(iter_links("")) == []
+    assert list(iter_links(b"  \n")) == []
+    assert list(iter_links(None)) == []
+    root = parse_html(PORTAL)
+    assert element_text(root.find(".//td")) == "Resolución 1"
+    assert [link.href for link in iter_links(root.find(".//table"))] == ["/doc/1.pdf"]
+
+
+def test_sercop_rows_from_links_and_table_fallback():
+    from rag.discovery.sercop_cdp_harvester import parse_rows_from_html
+
+    base = "https://www.compraspublicas.gob.ec/ProcesoContratacion/compras/PC/buscarProceso.cpe"
+    links = '<a href="informacionProcesoContratacion2.cpe?idSoliCompra=X1">Proceso <b>RE-001</b></a><a href="#">x</a>'
+    assert parse_rows_from_html(links, base) == [
+        {
+            "title": "Proceso RE-001",
+            "href": "https://www.compraspublicas.gob.ec/ProcesoContratacion/compras/PC/"
+            "informacionProcesoContratacion2.cpe?idSoliCompra=X1",
+        }
+    ]
+
+    table = "<table><tr><td>RE-002</td><td>Obra <a href='/files/ficha.xls'>ficha</a></td></tr><tr><td>1</td></tr></table>"
+    assert parse_rows_from_html(table, base) == [
+        {"title": "RE-002 | Obra ficha", "href": "https://www.compraspublicas.gob.ec/files/ficha.xls"}
+    ]
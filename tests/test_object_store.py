@@ -0,0 +1,125 @@
+import threading
+
+import pytest
+
+from src.utils.object_store import (
+    LIST_THRESHOLD,
+    STORE_ENV,
+    LocalStore,
+    S3Store,
+    UploadQueue,
+    open_store,
+    require_s3,
+)
+from src.utils.s3_upload import s3_client
+
+
+@pytest.fixture
+def client(local_s3):
+    return s3_client(endpoint_url=local_s3.endpoint)
+
+
+@pytest.fixture(params=["local", "s3"])
+def store(request, tmp_path):
+    if request.param == "local":
+        return LocalStore(tmp_path / "store")
+    client = s3_client(endpoint_url=request.getfixturevalue("local_s3").endpoint)
+    return S3Store("raw", prefix="corpus", client=client)
+
+
+def test_put_get_stream_exists_list_delete(store):
+    assert store.put("sri/ley.pdf", b"%PDF-1.4 ley", content_type="application/pdf") == 12
+    store.put("sri/decreto.txt", "Decreto Ejecutivo")
+    store.put("iess/resolucion.txt", [b"Resol", b"ucion"])
+
+    assert store.get("sri/ley.pdf") == b"%PDF-1.4 ley"
+    assert b"".join(store.stream("sri/decreto.txt", chunk_size=4)) == "Decreto Ejecutivo".encode()
+    assert store.exists("iess/resolucion.txt")
+    assert not store.exists("iess/missing.txt")
+    with pytest.raises(KeyError):
+        store.get("iess/missing.txt")
+
+    assert [(info.key, info.size) for info in store.list("sri/")] == [("sri/decreto.txt", 17), ("sri/ley.pdf", 12)]
+    store.delete("sri/ley.pdf")
+    assert [info.key for info in store.list()] == ["iess/resolucion.txt", "sri/decreto.txt"]
+
+
+def test_exists_many(store):
+    keys = [f"sri/doc{i}.pdf" for i in range(LIST_THRESHOLD + 2)] + ["iess/a.txt", "iess/b.txt"]
+    for key in keys[::2]:
+        store.put(key, b"x")
+    assert store.exists_many(keys) == {key: index % 2 == 0 for index, key in enumerate(keys)}
+
+
+def test_exists_many_lists_crowded_directories(local_s3, client):
+    store = S3Store("raw", client=client)
+    keys = [f"sri/doc{i}.pdf" for i in range(LIST_THRESHOLD * 3)]
+    for key in keys[:5]:
+        store.put(key, b"x")
+    local_s3.operations.clear()
+
+    found = store.exists_many(keys + ["iess/a.txt"])
+    assert [key for key, present in found.items() if present] == keys[:5]
+    assert local_s3.operations.count("ListObjectsV2") == 1
+    assert local_s3.operations.count("HeadObject") == 1  # only the lone iess key
+
+
+def test_sync_down_and_up(store, tmp_path):
+    store.put("asamblea/ley.txt", "Ley Orgánica")
+    store.put("asamblea/sub/reglamento.md", "Reglamento")
+    store.put("asamblea/scan.pdf", b"%PDF")
+
+    local = tmp_path / "local"
+    paths = store.sync_down("asamblea", local, suffixes=(".txt", ".md"))
+    assert sorted(p.relative_to(local).as_posix() for p in paths) == ["ley.txt", "sub/reglamento.md"]
+    assert (local / "ley.txt").read_text() == "Ley Orgánica"
+
+    store.put("training/stale.jsonl", b"{}")
+    assert store.sync_up(local, "training", delete=True) == 2
+    assert [info.key for info in store.list("training/")] == ["training/ley.txt", "training/sub/reglamento.md"]
+
+
+def test_local_store_rejects_keys_outside_root(tmp_path):
+    store = LocalStore(tmp_path / "store")
+    with pytest.raises(ValueError):
+        store.put("../outside.txt", b"x")
+    assert not (tmp_path / "outside.txt").exists()
+
+
+def test_open_store_selects_backend(monkeypatch, tmp_path):
+    monkeypatch.setenv(STORE_ENV, str(tmp_path / "env"))
+    assert isinstance(open_store(), LocalStore)
+    assert open_store(tmp_path.as_uri() + "/uri").root == tmp_path / "uri"
+
+    s3 = open_store("s3://yachaq-lex-raw/scraped")
+    assert isinstance(s3, S3Store)
+    assert s3.uri("sri/ley.pdf") == "s3://yachaq-lex-raw/scraped/sri/ley.pdf"
+    assert require_s3(s3) is s3
+    with pytest.raises(ValueError):
+        require_s3(open_store())
+
+
+def test_upload_queue_applies_back_pressure(local_s3, client):
+    gate = threading.Event()
+    started = threading.Semaphore(0)
+
+    def slow_body(data):
+        started.release()
+        gate.wait(5)
+        yield data
+
+    queue = UploadQueue(S3Store("raw", client=client), workers=2, max_pending=2)
+    first = [queue.submit(f"doc{i}.pdf", slow_body(b"%PDF")) for i in range(2)]
+    started.acquire(timeout=5)
+    started.acquire(timeout=5)
+
+    blocked = threading.Thread(target=queue.submit, args=("doc2.pdf", b"%PDF"))
+    blocked.start()
+    blocked.join(0.2)
+    assert blocked.is_alive()  # both slots taken until an upload finishes
+
+    gate.set()
+    blocked.join(5)
+    queue.close()
+    assert [future.result() for future in first] == [4, 4]
+    assert {key for _, key in local_s3.objects} == {"doc0.pdf", "doc1.pdf", "doc2.pdf"}
@@ -0,0 +1,155 @@
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from src.data_collection.mega_spider import MegaSpider
+from src.data_collection.resource_registry import ResourceRegistry
+from src.utils.content_store import ContentStore
+from src.utils.crawl_engine import AsyncCrawlEngine
+from src.utils.http_cache import HttpCache
+from src.utils.object_store import LocalStore
+from src.utils.pdf_probe import PdfProbe, RejectedDocument, Rejection, declared_size, looks_like_html
+from src.utils.range_download import RangeDownloader
+
+PDF = b"%PDF-1.6 Ley Organica de Servicio Publico " + b"x" * 5000
+ERROR_PAGE = b"\n<!DOCTYPE html><html><head><title>Error 404</title></head>" + b"<p>No encontrado</p>" * 20000
+
+
+class _Server:
+    """One real PDF, an HTML error page labelled as a PDF, and an oversized file."""
+
+    def __init__(self):
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                name = self.path.rsplit("/", 1)[1]
+                if name == "robots.txt":
+                    self.send_error(404)
+                    return
+                body = {"ley.pdf": PDF, "error.pdf": ERROR_PAGE, "huge.pdf": PDF + b"0" * 600_000}[name]
+                self.send_response(200)
+                self.send_header("Content-Type", "application/pdf")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                try:
+                    self.wfile.write(body)
+                except OSError:  # the client hung up after the first chunk
+                    pass
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.base = f"http://127.0.0.1:{self.httpd.server_address[1]}/docs/"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+
+@pytest.fixture
+def server():
+    server = _Server()
+    yield server
+    server.httpd.shutdown()
+    server.httpd.server_close()
+
+
+def test_inspect_classifies_bodies():
+    probe = PdfProbe(max_size=10_000)
+
+    assert probe.inspect(PDF[:1024], len(PDF)) is None
+    assert probe.inspect(ERROR_PAGE[:1024], content_type="application/pdf") == Rejection("html", "application/pdf")
+    assert probe.inspect(b"PK\x03\x04word/document.xml").reason == "not-pdf"
+    assert probe.inspect(b"").reason == "empty"
+    assert probe.inspect(PDF[:1024], 20_000).reason == "too-large"
+    assert looks_like_html(b"\xef\xbb\xbf  <html lang='es'>") and not looks_like_html(PDF)
+    assert declared_size({"content-range": "bytes 0-99/123456", "content-length": "100"}) == 123456
+    assert declared_size({"content-length": "100", "content-encoding": "gzip"}) is None
+    assert Rejection("too-large", size=20_000).record() == {"reason": "too-large", "size": 20_000}
+
+
+def test_range_downloader_rejects_after_the_first_chunk(server, tmp_path):
+    downloader = RangeDownloader(tmp_path / "downloads", probe=PdfProbe(max_size=500_000))
+
+    with pytest.raises(RejectedDocument) as rejected:
+        downloader.fetch(requests, server.base + "error.pdf", timeout=5)
+    assert rejected.value.rejection.reason == "html"
+    with pytest.raises(RejectedDocument) as rejected:
+        downloader.fetch(requests, server.base + "huge.pdf", timeout=5)
+    assert rejected.value.rejection == Rejection("too-large", "application/pdf", len(PDF) + 600_000)
+    assert list((tmp_path / "downloads").iterdir()) == []
+
+    fetched = downloader.fetch(requests, server.base + "ley.pdf", timeout=5)
+    assert fetched.changed and fetched.content == PDF
+
+
+def test_engine_probe_drops_junk_before_reading_it(server):
+    handled, errors = {}, {}
+
+    def handle(url, depth, response):
+        handled[url] = response.content
+        return []
+
+    urls = [server.base + name for name in ("ley.pdf", "error.pdf", "huge.pdf")]
+    engine = AsyncCrawlEngine(concurrency=3, per_host=3, timeout=5)
+    asyncio.run(engine.run([(url, 0) for url in urls], handle, on_error=errors.__setitem__,
+                           probe=PdfProbe(max_size=500_000)))
+
+    assert handled == {urls[0]: PDF}
+    assert {url: exc.rejection.reason for url, exc in errors.items()} == {urls[1]: "html", urls[2]: "too-large"}
+
+
+def spider(tmp_path, urls):
+    store = LocalStore(tmp_path / "store")
+    return MegaSpider(seed_urls=urls, workers=2, state_dir=tmp_path, store=store,
+                      http_cache=HttpCache(tmp_path / "http_cache.sqlite"),
+                      content_store=ContentStore(store, tmp_path / "index.sqlite"))
+
+
+def test_mega_spider_records_rejections_in_its_state(server, tmp_path, monkeypatch):
+    monkeypatch.setenv("YACHAQ_DOWNLOAD_DIR", str(tmp_path / "downloads"))
+    urls = [server.base + name for name in ("ley.pdf", "error.pdf")]
+
+    first = spider(tmp_path, urls)
+    asyncio.run(first.download_async(urls))
+    first.uploader.close()
+    assert first.pdfs_uploaded == 1 and first.pdfs_rejected == 1
+    first.state.close()
+
+    resumed = spider(tmp_path, urls)
+    assert dict(zip(resumed.rejected_pdfs, resumed.rejected_pdfs.values())) == {
+        urls[1]: {"reason": "html", "content_type": "application/pdf", "size": len(ERROR_PAGE)}
+    }
+    assert resumed.download_pdf(urls[1]) is False and resumed.pdfs_rejected == 2  # threaded path, same probe
+    resumed.state.close()
+
+
+class _StreamedResponse:
+    """A streamed PDF without Content-Length: only the size limit can stop it."""
+
+    status_code = 200
+    headers = {"content-type": "application/pdf"}
+
+    def __init__(self):
+        self.closed = False
+
+    def iter_content(self, chunk_size):
+        yield PDF
+        while True:
+            yield b"0" * chunk_size
+
+    def close(self):
+        self.closed = True
+
+
+def test_resource_registry_closes_a_stream_cut_off_midway(tmp_path, monkeypatch):
+    monkeypatch.setenv("YACHAQ_CONTENT_INDEX", str(tmp_path / "index.sqlite"))
+    response = _StreamedResponse()
+    registry = ResourceRegistry(store=LocalStore(tmp_path / "store"))
+    registry.probe = PdfProbe(max_size=100_000)
+    registry.session = type("Session", (), {"get": lambda self, url, **kwargs: response})()
+    url = "https://www.sri.gob.ec/docs/anuario.pdf"
+
+    assert registry.download_and_upload([{"url": url, "title": "Anuario", "category": "tributario",
+                                          "quality_score": 0.9}]) == 0
+    assert registry.rejected_urls[url]["reason"] == "too-large" and response.closed
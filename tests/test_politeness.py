@@ -0,0 +1,187 @@
+import asyncio
+import math
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from src.utils.crawl_engine import AsyncCrawlEngine
+from src.utils.politeness import PoliteSession, PolitenessScheduler, RobotsDisallowed, parse_retry_after
+
+URL = "https://www.sri.gob.ec/normativa"
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+def test_token_bucket_spaces_requests(clock):
+    scheduler = PolitenessScheduler(rate=2.0, burst=2.0, initial_concurrency=4, max_concurrency=4, clock=clock)
+    assert scheduler.try_acquire(URL) == 0
+    assert scheduler.try_acquire(URL) == 0
+    assert scheduler.try_acquire(URL) == pytest.approx(0.5)
+    clock.now += 0.5
+    assert scheduler.try_acquire(URL) == 0
+    assert scheduler.try_acquire("https://www.iess.gob.ec/") == 0  # other hosts have their own bucket
+
+
+def test_fast_responses_widen_concurrency_and_throttling_halves_it(clock):
+    scheduler = PolitenessScheduler(rate=100.0, burst=100.0, initial_concurrency=2, max_concurrency=6, clock=clock)
+    assert scheduler.try_acquire(URL) == 0
+    assert scheduler.try_acquire(URL) == 0
+    assert scheduler.try_acquire(URL) == math.inf  # window full until a request finishes
+
+    for _ in range(40):
+        scheduler.release(URL, 200, latency=0.1)
+        assert scheduler.try_acquire(URL) == 0
+    assert scheduler.host(URL).concurrency == 6
+
+    assert scheduler.release(URL, 503, latency=0.1, retry_after="7") is True
+    state = scheduler.host(URL)
+    assert state.concurrency == 3
+    assert state.rate == 50.0
+    assert scheduler.delay(URL) == pytest.approx(7.0)
+
+
+def test_backoff_grows_exponentially_without_retry_after(clock):
+    scheduler = PolitenessScheduler(backoff_base=1.0, max_backoff=5.0, clock=clock)
+    waits = []
+    for _ in range(4):
+        clock.now += 100  # past the previous backoff
+        assert scheduler.try_acquire(URL) == 0
+        scheduler.release(URL, 429)
+        waits.append(scheduler.delay(URL))
+    assert waits == [1.0, 2.0, 4.0, 5.0]
+
+    clock.now += 100
+    assert scheduler.try_acquire(URL) == 0
+    assert scheduler.release(URL, 200, latency=0.1) is False
+    assert scheduler.host(URL).throttles == 0
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("120") == 120.0
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT", now=1445412470.0) == 10.0
+    assert parse_retry_after("soon") is None
+    assert parse_retry_after(None) is None
+
+
+def test_robots_rules_and_crawl_delay(clock):
+    scheduler = PolitenessScheduler(rate=4.0, robots_ttl=60, robots_retry=5, clock=clock)
+    assert scheduler.robots_url(URL) == "https://www.sri.gob.ec/robots.txt"
+    scheduler.set_robots(URL, 200, "User-agent: *\nDisallow: /privado\nCrawl-delay: 2\n")
+    assert scheduler.robots_url(URL) is None
+    assert scheduler.allowed("https://www.sri.gob.ec/normativa/ley.pdf")
+    assert not scheduler.allowed("https://www.sri.gob.ec/privado/x")
+    state = scheduler.host(URL)
+    assert (state.rate, state.burst) == (0.5, 1.0)
+
+    scheduler.set_robots("https://www.iess.gob.ec/", None)  # unreachable: allow, re-check soon
+    assert scheduler.allowed("https://www.iess.gob.ec/privado")
+    clock.now += 6
+    assert scheduler.robots_url("https://www.iess.gob.ec/") == "https://www.iess.gob.ec/robots.txt"
+    assert scheduler.robots_url(URL) is None
+
+
+class _Portal:
+    """Local host that throttles its first request per path and disallows /privado."""
+
+    def __init__(self, delay=0.0):
+        self.requests = []
+        self.active = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+        portal = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with portal.lock:
+                    first = self.path not in portal.requests
+                    portal.requests.append(self.path)
+                    portal.active += 1
+                    portal.peak = max(portal.peak, portal.active)
+                time.sleep(delay)
+                with portal.lock:
+                    portal.active -= 1
+                if self.path == "/robots.txt":
+                    status, body, headers = 200, b"User-agent: *\nDisallow: /privado\n", {}
+                elif self.path.startswith("/throttled") and first:
+                    status, body, headers = 503, b"busy", {"Retry-After": "1"}
+                else:
+                    status, body, headers = 200, b"<html>ok</html>", {}
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.base = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def portal():
+    server = _Portal()
+    yield server
+    server.close()
+
+
+def test_engine_honors_robots_and_retries_throttled_responses(portal):
+    handled = {}
+
+    def handle(url, depth, response):
+        handled[url.rsplit("/", 1)[1]] = response.status_code
+        return []
+
+    items = [(f"{portal.base}/throttled", 0), (f"{portal.base}/privado", 0), (f"{portal.base}/libre", 0)]
+    engine = AsyncCrawlEngine(concurrency=4, per_host=4, politeness=PolitenessScheduler(rate=50, burst=50))
+    start = time.perf_counter()
+    asyncio.run(engine.run(items, handle))
+
+    assert handled == {"throttled": 200, "libre": 200}
+    assert portal.requests.count("/robots.txt") == 1
+    assert "/privado" not in portal.requests
+    assert portal.requests.count("/throttled") == 2
+    assert time.perf_counter() - start >= 1.0  # waited out Retry-After
+
+
+def test_engine_widens_concurrency_on_a_fast_host():
+    portal = _Portal(delay=0.02)
+    try:
+        scheduler = PolitenessScheduler(rate=500, burst=500, initial_concurrency=1, max_concurrency=6)
+        engine = AsyncCrawlEngine(concurrency=8, per_host=8, politeness=scheduler)
+        asyncio.run(engine.run([(f"{portal.base}/doc/{i}", 0) for i in range(60)], lambda *args: []))
+        assert scheduler.host(portal.base).concurrency == 6
+        assert 3 <= portal.peak <= 6
+    finally:
+        portal.close()
+
+
+def test_polite_session_retries_and_blocks_disallowed(portal):
+    session = PoliteSession(requests.Session(), PolitenessScheduler(rate=50, burst=50, backoff_base=0.1))
+    response = session.get(f"{portal.base}/throttled/sync", timeout=5)
+    assert response.status_code == 200
+    assert portal.requests.count("/throttled/sync") == 2
+    with pytest.raises(RobotsDisallowed):
+        session.get(f"{portal.base}/privado/doc.pdf", timeout=5)
+    assert session.headers is session.session.headers
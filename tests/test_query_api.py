@@ -0,0 +1,85 @@
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+from rag.app.generation import StubBackend
+from rag.app.lexical_index import LexicalIndex, LexicalIndexBuilder
+from rag.app.main import app, get_pipeline
+from rag.app.pipeline import STAGES, QueryPipeline
+
+
+def _pipeline(tmp_path):
+    builder = LexicalIndexBuilder()
+    metadata = {
+        "source": "LRTI",
+        "title": "Ley de Régimen Tributario Interno",
+        "ro_number": "463",
+        "ro_date": "2004-11-17",
+        "article": "65",
+        "authority": "law",
+        "vigency": "2024-04-01",
+        "url": "https://www.sri.gob.ec/normativa-tributaria",
+    }
+    builder.add("lrti-65", "La tarifa general del IVA es 15%. Rige desde abril de 2024.", metadata)
+    builder.add("lrti-65-dup", "Tarifa del IVA vigente para el ejercicio fiscal.", metadata)
+    builder.write(tmp_path / "index")
+    return QueryPipeline(LexicalIndex(tmp_path / "index"), StubBackend(), top_k=5)
+
+
+def test_query_returns_answer_citations_and_timings(tmp_path):
+    app.dependency_overrides[get_pipeline] = lambda: _pipeline(tmp_path)
+    try:
+        response = TestClient(app).post("/query", json={"question": "tarifa IVA"})
+    finally:
+        app.dependency_overrides.clear()
+    body = response.json()
+    assert response.status_code == 200
+    assert "[LRTI, Art. 65, R.O. 463]" in body["answer"]
+    assert [c["article"] for c in body["citations"]] == ["65"]
+    assert set(STAGES) <= set(body["timings_ms"])
+
+
+def test_query_streams_sse_events(tmp_path):
+    app.dependency_overrides[get_pipeline] = lambda: _pipeline(tmp_path)
+    try:
+        response = TestClient(app).post("/query", json={"question": "tarifa IVA", "stream": True})
+    finally:
+        app.dependency_overrides.clear()
+    events = [block for block in response.text.split("\n\n") if block]
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert all(block.startswith("event: token") for block in events[:-1])
+    done = json.loads(events[-1].split("data: ", 1)[1])
+    assert events[-1].startswith("event: done")
+    assert done["answer"].endswith("[LRTI, Art. 65, R.O. 463]")
+    assert done["timings_ms"]["total"] >= 0
+
+
+def test_stub_backend_without_hits_is_deterministic():
+    backend = StubBackend()
+    assert backend.render("q", []) == backend.render("otra", [])
+
+
+def test_app_imports_from_the_image_layout(tmp_path):
+    """Lay the files out as rag/app/Dockerfile copies them and import the module its entrypoint serves."""
+    root = Path(__file__).resolve().parents[1]
+    workdir = tmp_path / "app"
+    for source, target in re.findall(r"^COPY (\S+) (\S+)$", (root / "rag/app/Dockerfile").read_text(), re.M):
+        if target.startswith("/"):
+            continue
+        if (root / source).is_dir():
+            shutil.copytree(root / source, workdir / target, ignore=shutil.ignore_patterns("__pycache__"))
+        else:
+            workdir.mkdir(exist_ok=True)
+            shutil.copy(root / source, workdir / target)
+    module = re.search(r"uvicorn (\S+):app", (root / "rag/app/docker/entrypoint.sh").read_text()).group(1)
+    env = {key: value for key, value in os.environ.items() if key != "PYTHONPATH"}
+    # uvicorn puts its working directory (the image's WORKDIR) first on sys.path
+    code = f"import sys; sys.path.insert(0, '.'); import {module} as main; main.app; main.get_pipeline()"
+    result = subprocess.run([sys.executable, "-c", code], cwd=workdir, env=env, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
@@ -0,0 +1,131 @@
+import asyncio
+
+from rag.app import main
+from rag.app.generation import StubBackend
+from rag.app.lexical_index import LexicalIndex, LexicalIndexBuilder
+from rag.app.pipeline import STAGES, QueryPipeline
+from rag.app.query_cache import QueryCache, normalize_query
+
+IVA = {
+    "source": "LRTI",
+    "title": "Ley de Régimen Tributario Interno",
+    "ro_number": "463",
+    "ro_date": "2004-11-17",
+    "article": "65",
+    "authority": "law",
+    "vigency": "2024-04-01",
+    "url": "https://www.sri.gob.ec/normativa-tributaria",
+}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_normalized_queries_share_a_key():
+    assert normalize_query("¿Cuál es la TARIFA del IVA?") == normalize_query("cual es tarifa iva")
+    assert QueryCache.key("answer", "Tarifa IVA", 5) == QueryCache.key("answer", "tarifa   iva", 5)
+
+
+def test_lru_and_ttl_expiry():
+    clock = FakeClock()
+    cache = QueryCache(max_entries=2, ttl_seconds=10, clock=clock)
+    cache.put("answer", "a", 5, "A", [])
+    cache.put("answer", "b", 5, "B", [])
+    assert cache.get("answer", "a", 5) == "A"
+    cache.put("answer", "c", 5, "C", [])
+    assert cache.get("answer", "b", 5) is None  # least recently used
+    clock.now += 11
+    assert cache.get("answer", "a", 5) is None
+
+
+def test_validity_change_invalidates_citing_entries(tmp_path):
+    cache = QueryCache(disk_dir=tmp_path / "cache")
+    cache.put("answer", "tarifa iva", 5, {"answer": "15%"}, [("lrti-65", IVA)])
+    cache.put("answer", "bancarizacion", 5, {"answer": "$1,000"}, [("lrti-103", dict(IVA, article="103"))])
+
+    assert cache.apply_validity({"lrti-65": IVA, "lrti-103": dict(IVA, article="103")}) == 0
+    assert cache.apply_validity({"lrti-65": dict(IVA, vigency="2025-01-01"), "lrti-103": IVA}) == 1
+    assert cache.get("answer", "tarifa iva", 5) is None
+    assert cache.get("answer", "bancarizacion", 5) == {"answer": "$1,000"}
+
+    # Invalidation is persisted for the disk tier.
+    reopened = QueryCache(disk_dir=tmp_path / "cache")
+    assert reopened.get("answer", "tarifa iva", 5) is None
+    assert reopened.get("answer", "bancarizacion", 5) == {"answer": "$1,000"}
+
+
+def build(directory, vigency, rate="15%"):
+    builder = LexicalIndexBuilder()
+    builder.add("lrti-65", f"La tarifa general del IVA es {rate}.", dict(IVA, vigency=vigency))
+    builder.write(directory)
+    return LexicalIndex(directory)
+
+
+def test_pipeline_serves_repeats_from_cache_until_reform(tmp_path):
+    pipeline = QueryPipeline(build(tmp_path / "v1", "2024-04-01"), StubBackend(), top_k=5, cache=QueryCache())
+    first = asyncio.run(pipeline.run("Tarifa del IVA"))
+    second = asyncio.run(pipeline.run("tarifa iva"))
+    assert not first.cached and second.cached
+    assert second.answer == first.answer
+    assert set(STAGES) <= set(second.timings_ms)
+
+    assert pipeline.swap_retriever(build(tmp_path / "v2", "2025-01-01")) == 2
+    assert not asyncio.run(pipeline.run("tarifa iva")).cached
+
+
+def test_puts_append_to_the_journal_and_survive_a_restart(tmp_path):
+    cache = QueryCache(disk_dir=tmp_path / "cache")
+    for i in range(5):
+        cache.put("answer", f"articulo {i}", 5, {"answer": i}, [(f"lrti-{i}", dict(IVA, article=str(i)))])
+    assert not (tmp_path / "cache" / "citations.json").exists()  # no snapshot rewrite per put
+    assert len((tmp_path / "cache" / "citations.jsonl").read_text().splitlines()) == 5
+
+    reopened = QueryCache(disk_dir=tmp_path / "cache")
+    assert reopened.cited_chunks() == {f"lrti-{i}" for i in range(5)}
+    assert reopened.apply_validity({"lrti-0": dict(IVA, article="0", vigency="2025-01-01")}) == 5
+    assert not (tmp_path / "cache" / "citations.jsonl").exists()  # folded into the snapshot
+    assert QueryCache(disk_dir=tmp_path / "cache").cited_chunks() == set()
+
+
+def test_restarted_api_pipeline_reconciles_its_disk_cache_with_the_rebuilt_index(tmp_path, monkeypatch):
+    config = {"lexical_index_dir": str(tmp_path / "index"), "cache": {"disk_dir": str(tmp_path / "cache")}}
+    monkeypatch.setattr(main, "load_rag_config", lambda: config)
+
+    build(tmp_path / "index", "2024-01-01", rate="12%")
+    main.get_pipeline.cache_clear()
+    asyncio.run(main.get_pipeline().run("tarifa iva"))
+    assert asyncio.run(main.get_pipeline().run("tarifa iva")).cached
+
+    build(tmp_path / "index", "2024-04-01", rate="15%")  # IVA reform, index rebuilt while the API is down
+    main.get_pipeline.cache_clear()
+    restarted = asyncio.run(main.get_pipeline().run("tarifa iva"))
+    main.get_pipeline.cache_clear()
+    assert not restarted.cached and "15%" in restarted.answer and "12%" not in restarted.answer
+
+
+def test_rebuilt_index_drops_entries_its_citations_cannot_reach(tmp_path):
+    def serve(index):
+        return QueryPipeline(index, StubBackend(), top_k=5, cache=QueryCache(disk_dir=tmp_path / "cache"))
+
+    pipeline = serve(build(tmp_path / "index", "2008-01-01", rate="12%"))
+    pipeline.swap_retriever(pipeline.retriever)
+    asyncio.run(pipeline.run("tarifa iva"))
+    asyncio.run(pipeline.run("retenciones rimpe"))  # no hits: an entry citing nothing
+
+    same = serve(LexicalIndex(tmp_path / "index"))
+    assert same.swap_retriever(same.retriever) == 0  # a restart on the same build keeps its entries
+    assert asyncio.run(same.run("retenciones rimpe")).cached
+
+    builder = LexicalIndexBuilder()  # the reform is a new chunk; lrti-65 itself is unchanged
+    builder.add("lrti-65", "La tarifa general del IVA es 12%.", dict(IVA, vigency="2008-01-01"))
+    builder.add("lrti-65-reforma", "La tarifa general del IVA es 15%.", dict(IVA, ro_number="516", vigency="2024-04-01"))
+    builder.write(tmp_path / "index")
+    rebuilt = serve(LexicalIndex(tmp_path / "index"))
+    assert rebuilt.swap_retriever(rebuilt.retriever) == 4
+    assert not asyncio.run(rebuilt.run("retenciones rimpe")).cached
+    assert "R.O. 516" in asyncio.run(rebuilt.run("tarifa iva")).answer
@@ -0,0 +1,165 @@
+import asyncio
+import hashlib
+import os
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from src.data_collection.mega_spider import MegaSpider
+from src.utils.content_store import ContentStore
+from src.utils.http_cache import HttpCache
+from src.utils.object_store import LocalStore
+from src.utils.range_download import RangeDownloader
+
+SEGMENT = 64 * 1024
+PDF = b"%PDF-1.7 COOTAD " + os.urandom(5 * SEGMENT + 1234)
+
+
+class _Server:
+    """Serves one document with byte ranges; `broken` range starts send half their bytes and hang up."""
+
+    def __init__(self):
+        self.body = PDF
+        self.etag = '"v1"'
+        self.ranges = True
+        self.broken = set()
+        self.requests = []
+        self.sent_bytes = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                requested = self.headers.get("Range")
+                server.requests.append(requested)
+                if self.headers.get("If-None-Match") == server.etag:
+                    self.send_response(304)
+                    self.send_header("ETag", server.etag)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                match = re.match(r"bytes=(\d+)-(\d+)", requested or "")
+                if_range = self.headers.get("If-Range")
+                if not server.ranges or match is None or (if_range and if_range != server.etag):
+                    status, start, end = 200, 0, len(server.body)
+                else:
+                    status, start = 206, int(match.group(1))
+                    end = min(int(match.group(2)) + 1, len(server.body))
+                body = server.body[start:end]
+                self.send_response(status)
+                self.send_header("ETag", server.etag)
+                self.send_header("Content-Length", str(len(body)))
+                if server.ranges:
+                    self.send_header("Accept-Ranges", "bytes")
+                if status == 206:
+                    self.send_header("Content-Range", f"bytes {start}-{end - 1}/{len(server.body)}")
+                self.end_headers()
+                if start in server.broken:
+                    server.broken.discard(start)
+                    body = body[: len(body) // 2]
+                    self.close_connection = True
+                server.sent_bytes += len(body)
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}/cootad.pdf"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+
+@pytest.fixture
+def server():
+    server = _Server()
+    yield server
+    server.httpd.shutdown()
+    server.httpd.server_close()
+
+
+def downloader(tmp_path, **options):
+    options.setdefault("retry_delay", 0)
+    return RangeDownloader(tmp_path / "downloads", HttpCache(tmp_path / "http_cache.sqlite"),
+                           segment_size=SEGMENT, memory_limit=SEGMENT, **options)
+
+
+def test_downloads_large_documents_in_parallel_ranges(server, tmp_path):
+    fetched = downloader(tmp_path).fetch(requests, server.url, timeout=5)
+
+    assert fetched.changed and fetched.content == b"" and fetched.size == len(PDF)
+    assert fetched.sha256 == hashlib.sha256(PDF).hexdigest()
+    assert fetched.head(4) == b"%PDF" and fetched.body().read() == PDF
+    assert sorted(server.requests) == sorted(
+        f"bytes={i * SEGMENT}-{min((i + 1) * SEGMENT, len(PDF)) - 1}" for i in range(6)
+    )
+    assert server.sent_bytes == len(PDF)
+    fetched.discard()
+    assert list((tmp_path / "downloads").iterdir()) == []
+
+
+def test_resumes_missing_segments_after_a_failure(server, tmp_path):
+    server.broken = {2 * SEGMENT}
+    with pytest.raises(Exception):
+        downloader(tmp_path, max_attempts=1).fetch(requests, server.url, timeout=5)
+    assert downloader(tmp_path).partial(server.url).missing() == [2]
+
+    server.requests.clear()
+    fetched = downloader(tmp_path).fetch(requests, server.url, timeout=5)
+    assert server.requests == [f"bytes={2 * SEGMENT}-{3 * SEGMENT - 1}"]
+    assert fetched.sha256 == hashlib.sha256(PDF).hexdigest() and fetched.body().read() == PDF
+    assert server.sent_bytes == len(PDF) + SEGMENT // 2  # only the broken half-segment was paid twice
+
+    # Stored once the upload is done, after which the next run is a 304
+    store = ContentStore(LocalStore(tmp_path / "store"), tmp_path / "index.sqlite")
+    blob = store.put(server.url, fetched.body(), sha256=fetched.sha256)
+    assert store.get(blob.sha256) == PDF
+    fetched.discard()
+    downloader(tmp_path).http_cache.store(fetched)
+    assert downloader(tmp_path).fetch(requests, server.url, timeout=5).unchanged
+
+
+def test_async_spider_downloads_through_ranges_and_resumes(server, tmp_path):
+    store = LocalStore(tmp_path / "store")
+    content = ContentStore(store, tmp_path / "index.sqlite")
+
+    def spider(**options):
+        ranges = downloader(tmp_path, **options)
+        spider = MegaSpider(workers=2, store=store, content_store=content, http_cache=ranges.http_cache)
+        spider._downloader = ranges
+        return spider
+
+    server.broken = {2 * SEGMENT}
+    timed_out = spider(max_attempts=1)
+    asyncio.run(timed_out.download_async([server.url]))
+    assert timed_out.errors == 1 and timed_out.pdfs_uploaded == 0
+
+    server.requests.clear()
+    resumed = spider()
+    asyncio.run(resumed.download_async([server.url]))
+    resumed.uploader.close()
+    ranged = [requested for requested in server.requests if requested]  # the other one is robots.txt
+    assert ranged == [f"bytes={2 * SEGMENT}-{3 * SEGMENT - 1}"]
+    assert resumed.pdfs_uploaded == 1 and content.get(hashlib.sha256(PDF).hexdigest()) == PDF
+
+
+def test_changed_document_restarts_and_ignored_ranges_stream_whole(server, tmp_path):
+    server.broken = {SEGMENT}
+    with pytest.raises(Exception):
+        downloader(tmp_path, max_attempts=1).fetch(requests, server.url, timeout=5)
+
+    server.body, server.etag = PDF[::-1], '"v2"'  # If-Range fails: whole new body
+    fetched = downloader(tmp_path).fetch(requests, server.url, timeout=5)
+    assert fetched.sha256 == hashlib.sha256(PDF[::-1]).hexdigest()
+    assert downloader(tmp_path).partial(server.url) is None
+
+    server.ranges, server.body = False, PDF
+    fetched = downloader(tmp_path).fetch(requests, server.url, timeout=5)
+    assert fetched.sha256 == hashlib.sha256(PDF).hexdigest() and fetched.body().read() == PDF
+
+    server.ranges, server.body = True, PDF[:1000]
+    small = downloader(tmp_path).fetch(requests, server.url, timeout=5)
+    assert small.path is None and small.content == PDF[:1000]
@@ -0,0 +1,76 @@
+import random
+
+import numpy as np
+import pytest
+
+from rag.app.rule_engine import (
+    compute_import_taxes,
+    compute_import_taxes_batch,
+    compute_income_tax_liability,
+    compute_income_tax_liability_batch,
+    round2,
+    round2_array,
+)
+
+BRACKETS = [
+    (0.0, 0.0, 0.0),
+    (11902.0, 0.05, 0.0),
+    (15159.0, 0.10, 163.0),
+    (19682.0, 0.12, 615.0),
+    (26031.0, 0.15, 1377.0),
+    (34255.0, 0.20, 2611.0),
+    (45407.0, 0.25, 4841.0),
+    (60450.0, 0.30, 8602.0),
+    (80605.0, 0.35, 14648.0),
+    (107199.0, 0.37, 23956.0),
+]
+
+
+def _amounts(n=5000, seed=7):
+    rng = random.Random(seed)
+    values = [round(rng.uniform(0, 200000), rng.choice([0, 2, 3, 4])) for _ in range(n)]
+    # Classic binary-representation ties for two-decimal rounding.
+    return values + [0.0, 0.005, 0.015, 1.005, 2.675, 1.115, 8.345, 11902.0, 15158.995, 1e15 + 0.125]
+
+
+def test_round2_array_matches_python_round():
+    values = _amounts() + [v / 1000 for v in range(-5000, 5000)]
+    expected = [round2(v) for v in values]
+    assert round2_array(np.array(values)).tolist() == expected
+
+
+def test_import_tax_batch_matches_scalar_bit_for_bit():
+    rng = random.Random(11)
+    cif = _amounts()
+    ad_valorem = [rng.choice([0.0, 0.05, 0.1, 0.15, 0.3]) for _ in cif]
+    ice = [rng.choice([0.0, 0.0, 0.25]) for _ in cif]
+    iva = [rng.choice([0.12, 0.15]) for _ in cif]
+
+    batch = compute_import_taxes_batch(np.array(cif), ad_valorem=np.array(ad_valorem), ice=np.array(ice), iva=np.array(iva))
+    for i, value in enumerate(cif):
+        expected = compute_import_taxes(value, ad_valorem=ad_valorem[i], ice=ice[i], iva=iva[i])
+        assert batch.result(i) == expected
+
+
+def test_import_tax_batch_accepts_scalar_rates():
+    batch = compute_import_taxes_batch([1000.0, 2500.5])
+    assert batch.result(1) == compute_import_taxes(2500.5)
+    with pytest.raises(ValueError):
+        compute_import_taxes_batch([10.0, -1.0])
+
+
+def test_income_tax_batch_matches_scalar_bit_for_bit():
+    amounts = _amounts()
+    batch = compute_income_tax_liability_batch(np.array(amounts), BRACKETS)
+    assert batch.tolist() == [compute_income_tax_liability(a, BRACKETS) for a in amounts]
+
+
+def test_income_tax_batch_handles_unsorted_and_empty_brackets():
+    unsorted = [(0.0, 0.1, 0.0), (5000.0, 0.2, 500.0), (1000.0, 0.3, 0.0)]
+    amounts = [0.0, 999.99, 1000.0, 4999.0, 5000.0, 9000.0]
+    assert compute_income_tax_liability_batch(amounts, unsorted).tolist() == [
+        compute_income_tax_liability(a, unsorted) for a in amounts
+    ]
+    assert compute_income_tax_liability_batch(amounts, []).tolist() == [0.0] * len(amounts)
+    with pytest.raises(ValueError):
+        compute_income_tax_liability_batch([-5.0], BRACKETS)
@@ -0,0 +1,56 @@
+import json
+
+from rag.eval.run_eval import evaluate_file, evaluate_records, iter_shard_lines, shard_ranges
+
+
+def _record(source, authority, valid=True, ro_number="463"):
+    citation = {
+        "source": source,
+        "ro_number": ro_number,
+        "article": "65",
+        "url": "https://www.sri.gob.ec",
+        "authority": authority,
+    }
+    return {"citations": [citation], "valid_as_of": "2024-05-01" if valid else None}
+
+
+def _write_log(path, records):
+    with path.open("w", encoding="utf-8") as handle:
+        for record in records:
+            handle.write(json.dumps(record, ensure_ascii=False) + "\n")
+    return path
+
+
+def test_shards_cover_every_line_exactly_once(tmp_path):
+    log = _write_log(tmp_path / "log.jsonl", [_record("LRTI", "law", ro_number=str(i)) for i in range(50)])
+    lines = [line for start, end in shard_ranges(log, 37) for line in iter_shard_lines(log, start, end)]
+    assert lines == log.read_bytes().splitlines(keepends=True)
+
+
+def test_sharded_file_matches_in_memory_metrics(tmp_path):
+    records = [_record("LRTI", "law")] * 7 + [_record("COPCI", "regulation", valid=False)] * 3
+    records.append({"citations": [], "valid_as_of": None, "authority": "sri"})
+    log = _write_log(tmp_path / "log.jsonl", records)
+    with log.open("a", encoding="utf-8") as handle:
+        handle.write("{truncated\n")
+
+    report = evaluate_file(log, workers=2, shard_bytes=64)
+    expected = evaluate_records(records)
+    assert {key: report[key] for key in expected} == expected
+    assert report["malformed_lines"] == 1
+    assert report["by_source"]["LRTI"]["count"] == 7.0
+    assert report["by_source"]["COPCI"]["freshness_coverage"] == 0.0
+    assert report["by_source"]["(none)"]["hallucination_rate"] == 1.0
+    assert set(report["by_authority"]) == {"law", "regulation", "sri"}
+
+
+def test_non_object_citations_are_counted_not_fatal(tmp_path):
+    records = [_record("LRTI", "law")] * 3
+    records.append({"citations": ["LRTI art. 65", _record("LRTI", "law")["citations"][0]], "valid_as_of": None})
+    records.append({"citations": "LRTI art. 65", "valid_as_of": None, "authority": "sri"})
+    log = _write_log(tmp_path / "log.jsonl", records)
+
+    report = evaluate_file(log, workers=2, shard_bytes=64)
+    assert report["malformed_citations"] == 2 and report["malformed_lines"] == 0
+    assert report["hallucination_rate"] == 2 / 5
+    assert report["by_source"]["LRTI"]["count"] == 4.0 and report["by_source"]["(none)"]["count"] == 1.0
@@ -0,0 +1,54 @@
+import io
+
+import pytest
+
+from src.utils.s3_upload import MIN_PART_SIZE, iter_chunks, s3_client, split_s3_uri, upload_stream
+
+
+@pytest.fixture
+def client(local_s3):
+    return s3_client(endpoint_url=local_s3.endpoint)
+
+
+def test_split_s3_uri():
+    assert split_s3_uri("s3://yachaq-lex-raw/scraped/sri/ley.pdf") == ("yachaq-lex-raw", "scraped/sri/ley.pdf")
+    with pytest.raises(ValueError):
+        split_s3_uri("/tmp/ley.pdf")
+
+
+def test_iter_chunks_accepts_bytes_text_files_and_iterables():
+    assert b"".join(iter_chunks(b"abcdef", 4)) == b"abcdef"
+    assert b"".join(iter_chunks("Código", 2)) == "Código".encode()
+    assert b"".join(iter_chunks(io.BytesIO(b"x" * 10), 3)) == b"x" * 10
+    assert list(iter_chunks([b"a", b"", b"b"])) == [b"a", b"b"]
+
+
+def test_small_body_is_a_single_put(local_s3, client):
+    sent = upload_stream(client, "raw", "supercias/ley.pdf", b"%PDF-1.4 ley", content_type="application/pdf")
+    assert sent == 12
+    assert local_s3.objects[("raw", "supercias/ley.pdf")] == b"%PDF-1.4 ley"
+    assert local_s3.headers[("raw", "supercias/ley.pdf")]["content-type"] == "application/pdf"
+    assert local_s3.operations == ["PutObject"]
+
+
+def test_large_stream_goes_multipart_part_by_part(local_s3, client):
+    chunk = bytes(range(256)) * 4096  # 1 MiB
+    chunks = [chunk] * 12  # 12 MiB -> parts of 5, 5 and 2 MiB
+    sent = upload_stream(client, "raw", "copci.pdf", iter(chunks), part_size=MIN_PART_SIZE)
+    assert sent == 12 * len(chunk)
+    assert local_s3.objects[("raw", "copci.pdf")] == chunk * 12
+    assert local_s3.operations.count("UploadPart") == 3
+    assert local_s3.operations[-1] == "CompleteMultipartUpload"
+
+
+def test_failed_stream_aborts_the_multipart_upload(local_s3, client):
+    def broken():
+        yield b"x" * MIN_PART_SIZE
+        raise ConnectionError("response truncated")
+
+    with pytest.raises(ConnectionError):
+        upload_stream(client, "raw", "broken.pdf", broken(), part_size=MIN_PART_SIZE)
+    assert ("raw", "broken.pdf") not in local_s3.objects
+    assert local_s3.operations[-1] == "AbortMultipartUpload"
+    assert not local_s3.uploads
+
@@ -0,0 +1,67 @@
+from datetime import date
+
+import numpy as np
+
+from rag.app.lexical_index import LexicalIndex, LexicalIndexBuilder
+from rag.app.temporal_index import TemporalIndex, validity_windows
+
+LRTI_65 = {
+    "source": "LRTI",
+    "title": "Ley de Régimen Tributario Interno",
+    "ro_number": "463",
+    "ro_date": "2004-11-17",
+    "article": "65",
+    "authority": "law",
+    "vigency": "2008-01-01",
+    "url": "https://www.sri.gob.ec/normativa-tributaria",
+}
+
+
+def test_newer_version_of_same_article_closes_previous_window():
+    metadatas = [
+        LRTI_65,
+        dict(LRTI_65, vigency="2024-04-01", ro_number="516"),
+        dict(LRTI_65, article="66", valid_until="2020-01-01"),
+    ]
+    starts, ends = validity_windows(metadatas)
+    index = TemporalIndex(starts, ends)
+    assert list(index.valid_at("2024-03-15")) == [0]
+    assert list(index.valid_at(date(2024, 4, 1))) == [1]
+    assert list(index.valid_at("2019-12-31")) == [0, 2]
+    assert list(index.valid_at("2007-12-31")) == []
+
+
+def test_mask_matches_brute_force_window_check():
+    rng = np.random.default_rng(1)
+    starts = rng.integers(10000, 20000, size=2000)
+    ends = starts + rng.integers(1, 3000, size=2000)
+    ends[::7] = np.iinfo(np.int64).max
+    index = TemporalIndex(starts, ends)
+    for day in (9999, 12000, 15000, 19999, 25000):
+        as_of = date.fromordinal(date(1970, 1, 1).toordinal() + day)
+        assert np.array_equal(index.mask_at(as_of), (starts <= day) & (day < ends))
+
+
+def test_lexical_search_as_of_prefilters_candidates(tmp_path):
+    builder = LexicalIndexBuilder()
+    builder.add("iva-12", "Tarifa del IVA: 12%.", LRTI_65)
+    builder.add("iva-15", "Tarifa del IVA: 15%.", dict(LRTI_65, vigency="2024-04-01", ro_number="516"))
+    builder.write(tmp_path / "index")
+    index = LexicalIndex(tmp_path / "index")
+
+    assert [hit.chunk_id for hit in index.search("tarifa iva", top_k=5, as_of=date(2024, 3, 15))] == ["iva-12"]
+    assert [hit.chunk_id for hit in index.search("tarifa iva", top_k=5, as_of=date(2024, 4, 2))] == ["iva-15"]
+    assert len(index.search("tarifa iva", top_k=5)) == 2
+
+
+def test_malformed_valid_until_is_rejected_at_add_time(tmp_path):
+    builder = LexicalIndexBuilder()
+    assert builder.add("lrti-66", "Tarifa cero.", dict(LRTI_65, article="66", valid_until="31/12/2023")) == [
+        "valid_until must be YYYY-MM-DD"
+    ]
+    assert builder.add_many([("lrti-67", "Tarifa.", dict(LRTI_65, article="67", valid_until="2023-02-30"))]) == {
+        0: ["valid_until must be YYYY-MM-DD"]
+    }
+    builder.add("lrti-65", "La tarifa general del IVA.", LRTI_65)
+    builder.write(tmp_path / "index")  # the rejected chunks cannot sink the build
+    assert [hit.chunk_id for hit in LexicalIndex(tmp_path / "index").search("tarifa", as_of="2024-01-01")] == ["lrti-65"]
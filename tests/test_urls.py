@@ -0,0 +1,77 @@
+import pytest
+
+from src.utils.urls import UrlDeduper, canonicalize_url, remove_dot_segments
+
+COPCI = "https://www.aduana.gob.ec/wp-content/uploads/2019/05/COPCI-21-02-2019.pdf"
+
+
+@pytest.mark.parametrize(
+    "spelling",
+    [
+        COPCI,
+        "http://www.aduana.gob.ec/wp-content/uploads/2019/05/COPCI-21-02-2019.pdf",
+        "https://aduana.gob.ec/wp-content/uploads/2019/05/COPCI-21-02-2019.pdf",
+        "HTTPS://WWW.ADUANA.GOB.EC:443/wp-content/uploads/2019/05/COPCI-21-02-2019.pdf#page=3",
+        "https://www.aduana.gob.ec/wp-content/uploads/2019/./06/../05/COPCI-21-02-2019.pdf",
+        "https://www.aduana.gob.ec/wp-content/uploads/2019/05/COPCI%2d21-02-2019.pdf?utm_source=twitter",
+    ],
+)
+def test_spellings_of_the_same_document_collapse(spelling):
+    assert canonicalize_url(spelling) == COPCI
+
+
+def test_spaces_and_accents_are_percent_encoded():
+    expected = "https://biblioteca.defensoria.gob.ec/bitstream/37000/3398/1/Ley%20de%20Seguridad%20Social.pdf"
+    assert canonicalize_url("https://biblioteca.defensoria.gob.ec/bitstream/37000/3398/1/Ley de Seguridad Social.pdf") == expected
+    assert canonicalize_url(expected.replace("%20", "%20".lower())) == expected
+    assert canonicalize_url("/normativa/Código Orgánico.pdf", "https://www.sri.gob.ec/normativa-tributaria") == (
+        "https://www.sri.gob.ec/normativa/C%C3%B3digo%20Org%C3%A1nico.pdf"
+    )
+
+
+def test_relative_links_resolve_like_a_browser():
+    base = "https://portal.compraspublicas.gob.ec/sercop/normativa/"
+    assert canonicalize_url("../wp-content/uploads/2019/03/LOSNCP.pdf", base) == (
+        "https://portal.compraspublicas.gob.ec/sercop/wp-content/uploads/2019/03/LOSNCP.pdf"
+    )
+    assert canonicalize_url("//www.gob.ec/regulaciones") == "https://www.gob.ec/regulaciones"
+    assert canonicalize_url("javascript:void(0)", base) is None
+    assert canonicalize_url("#top", base) is None
+    assert canonicalize_url("mailto:info@sri.gob.ec", base) is None
+
+
+def test_query_parameters_are_sorted_and_host_rules_applied():
+    sercop = "https://www.compraspublicas.gob.ec/ProcesoContratacion/compras/PC/buscarProceso.cpe"
+    assert canonicalize_url("informacionProcesoContratacion.cpe?sg=1&idSoliCompra=A+B", sercop) == (
+        "https://www.compraspublicas.gob.ec/ProcesoContratacion/compras/PC/informacionProcesoContratacion.cpe"
+        "?idSoliCompra=A+B"
+    )
+    iess = "https://www.iess.gob.ec/es/web/guest/normativa?p_p_lifecycle=0&p_p_id=101&p_p_auth=x1Y2&_101_redirect=%2F"
+    assert canonicalize_url(iess) == "https://www.iess.gob.ec/es/web/guest/normativa?p_p_id=101&p_p_lifecycle=0"
+    # Non-government hosts keep their scheme and explicit ports.
+    assert canonicalize_url("http://127.0.0.1:8080/a/./b/../c?b=2&a=1") == "http://127.0.0.1:8080/a/c?a=1&b=2"
+
+
+def test_session_path_parameters_are_dropped():
+    assert canonicalize_url(
+        "https://biblioteca.defensoria.gob.ec/bitstream/37000/1/x.pdf;jsessionid=8F2A"
+    ) == "https://biblioteca.defensoria.gob.ec/bitstream/37000/1/x.pdf"
+
+
+def test_remove_dot_segments_matches_rfc_examples():
+    assert remove_dot_segments("/a/b/c/./../../g") == "/a/g"
+    assert remove_dot_segments("/mid/content=5/../6") == "/mid/6"
+    assert remove_dot_segments("/a/b/..") == "/a/"
+
+
+def test_deduper_counts_duplicate_spellings():
+    deduper = UrlDeduper()
+    links = [
+        "https://www.finanzas.gob.ec/wp-content/uploads/downloads/2023/legislacion/COOTAD.pdf",
+        "http://finanzas.gob.ec/wp-content/uploads/downloads/2023/legislacion/COOTAD.pdf",
+        "/wp-content/uploads/downloads/2023/legislacion/COOTAD.pdf?utm_campaign=leyes",
+        "/wp-content/uploads/downloads/2023/legislacion/COPCI.pdf",
+    ]
+    unique = [deduper.add(link, "https://www.finanzas.gob.ec/normativa/") for link in links]
+    assert sum(url is not None for url in unique) == 2
+    assert deduper.duplicates == 2